@@ -0,0 +1,29 @@
+# gunicorn 設定 (本番プロファイル): `python -m src.server` または
+# `gunicorn -c gunicorn.conf.py src.main:app` で使用する。
+#
+# - UvicornWorker で FastAPI (ASGI) を動かす
+# - preload_app でアプリを fork 前に 1 回だけ import し、起動時間とメモリを節約する
+#   (接続プールやキャッシュ接続は lifespan / 初回利用時にワーカーごとに生成される)
+# - SIGTERM 受信後 graceful_timeout 秒までは処理中リクエストを完了させる
+
+import os
+
+from src.server import worker_count
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '8000')}"
+workers = worker_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", 30))
+timeout = int(os.environ.get("WORKER_TIMEOUT", 120))
+keepalive = int(os.environ.get("KEEPALIVE", 5))
+
+# メモリリーク対策としてワーカーを定期的に入れ替える (0 で無効)
+max_requests = int(os.environ.get("MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", 1000))
+
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
+accesslog = "-"
+errorlog = "-"
+forwarded_allow_ips = "*"
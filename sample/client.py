@@ -2,18 +2,47 @@
 JQuants APIクライアント (MVP版)
 シンプルで最小限の機能に絞った実装
 """
+import asyncio
+import contextlib
 import logging
 import os
+from collections.abc import AsyncIterator, Iterator
 from pathlib import Path
 
-import jquantsapi
 import requests
 
+from sample.http_session import (
+    IdTokenCache,
+    RetryPolicy,
+    arequest_with_retry,
+    create_session,
+    request_with_retry,
+)
+from sample.pagination import ENDPOINTS, aiter_pages, iter_pages, records_to_dataframe
+
+# jquantsapi は import 時に pandas 等を読み込み重いため、クライアント初期化時に遅延 import する
+
+
+def _range_params(start_date: str | None = None, end_date: str | None = None, **extra: str | None) -> dict[str, str]:
+    """from / to と追加条件から None を除いたクエリパラメータを作る"""
+    params = {"from": start_date, "to": end_date, **extra}
+    return {k: v for k, v in params.items() if v}
+
 
 class JQuantsAPIClient:
     """JQuants APIクライアント"""
 
-    def __init__(self, refresh_token: str | None = None, mail_address: str | None = None, password: str | None = None, logger: logging.Logger | None = None):
+    def __init__(
+        self,
+        refresh_token: str | None = None,
+        mail_address: str | None = None,
+        password: str | None = None,
+        logger: logging.Logger | None = None,
+        session: requests.Session | None = None,
+        retry_policy: RetryPolicy | None = None,
+        pool_size: int = 10,
+        rate_limiter=None,
+    ):
         """
         初期化
 
@@ -22,9 +51,17 @@ class JQuantsAPIClient:
             mail_address: メールアドレス（refresh_token が未指定の場合に使用可能）
             password: パスワード（mail_address と併用）
             logger: ロガー（Noneの場合はデフォルトロガーを使用）
+            session: 共有する requests.Session（Noneの場合は keep-alive プールを生成）
+            retry_policy: 429 / 5xx のリトライ設定（Noneの場合は既定値）
+            pool_size: session 未指定時の接続プール上限
+            rate_limiter: エンドポイント別レートリミッター（`src.common.rate_limit.EndpointRateLimiter` 互換、Noneの場合は制限なし）
         """
         self.logger = logger or logging.getLogger(__name__)
         self.client = None
+        self.session = session or create_session(pool_size)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self._id_token = IdTokenCache()
 
         # 優先順: 引数 refresh_token -> 引数 mail/password -> 環境/.env/トークンファイル
         self.refresh_token = refresh_token
@@ -53,11 +90,7 @@ class JQuantsAPIClient:
             data = {"mailaddress": mail_address, "password": password}
             base = os.environ.get("JQUANTS_API_BASE", "https://api.jquants.com")
             url = f"{base.rstrip('/')}/v1/token/auth_user"
-            r_post = requests.post(
-                url,
-                json=data,
-                timeout=10
-            )
+            r_post = self._request("POST", url, json=data, timeout=10)
             r_post.raise_for_status()
             response = r_post.json()
 
@@ -134,12 +167,86 @@ class JQuantsAPIClient:
     def _initialize_client(self):
         """APIクライアントを初期化"""
         try:
+            import jquantsapi
+
             self.client = jquantsapi.Client(refresh_token=self.refresh_token)
             self.logger.info("JQuants APIクライアントを初期化しました")
         except Exception as e:
             self.logger.error(f"APIクライアント初期化エラー: {str(e)}")
             raise
 
+    # =====================================================================
+    # ページネーション対応の直接 HTTP 取得 (pagination_key を辿る)
+    # =====================================================================
+
+    def _request(self, method: str, url: str, **kwargs):
+        """共有セッションでリトライ付きリクエスト (401 なら ID トークンキャッシュを破棄)"""
+        response = request_with_retry(self.session, method, url, self.retry_policy, **kwargs)
+        if response.status_code == 401:
+            self._id_token.invalidate()
+        return response
+
+    def get_id_token(self) -> str:
+        """ID トークンを取得 (有効期限内はキャッシュを返す)"""
+        return self._id_token.get(self.client.get_id_token)
+
+    def _auth_headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.get_id_token()}"}
+
+    def iter_records(self, dataset: str, params: dict | None = None) -> Iterator[list[dict]]:
+        """
+        データセットの全ページをページ単位のレコードとして逐次取得
+
+        Args:
+            dataset: `sample.pagination.ENDPOINTS` のキー (例: "trades_spec")
+            params: クエリパラメータ (from / to / code など)
+
+        Yields:
+            1 ページ分のレコードのリスト
+        """
+        bucket = self.rate_limiter.bucket(dataset) if self.rate_limiter is not None else None
+
+        def get(url: str, **kwargs):
+            if bucket is not None:
+                bucket.acquire_sync()
+            return self._request("GET", url, **kwargs)
+
+        yield from iter_pages(get, ENDPOINTS[dataset], self._auth_headers(), params)
+
+    async def aiter_records(self, dataset: str, params: dict | None = None, http_client=None, limiter=None) -> AsyncIterator[list[dict]]:
+        """
+        `iter_records` の非同期版 (httpx.AsyncClient でページを取得)
+
+        Args:
+            dataset: `sample.pagination.ENDPOINTS` のキー
+            params: クエリパラメータ
+            http_client: 共有する httpx.AsyncClient (None の場合は一時的に生成)
+            limiter: `await limiter.acquire()` でページ取得ごとに待機するレートリミッター
+                (None の場合はコンストラクタの rate_limiter のエンドポイント別バケット)
+
+        Yields:
+            1 ページ分のレコードのリスト
+        """
+        import httpx
+
+        if limiter is None and self.rate_limiter is not None:
+            limiter = self.rate_limiter.bucket(dataset)
+        headers = await asyncio.to_thread(self._auth_headers)
+        async with contextlib.AsyncExitStack() as stack:
+            if http_client is None:
+                http_client = await stack.enter_async_context(httpx.AsyncClient(timeout=30.0))
+            async def get(url: str, **kwargs):
+                if limiter is not None:
+                    await limiter.acquire()
+                return await arequest_with_retry(http_client, "GET", url, self.retry_policy, **kwargs)
+
+            async for batch in aiter_pages(get, ENDPOINTS[dataset], headers, params):
+                yield batch
+
+    def _fetch_all(self, dataset: str, params: dict | None = None):
+        """全ページを取得し、最後に 1 つの DataFrame へ連結"""
+        return records_to_dataframe(self.iter_records(dataset, params), ENDPOINTS[dataset].date_columns)
+
     def get_stock_list(self):
         """
         銘柄一覧を取得
@@ -241,34 +348,8 @@ class JQuantsAPIClient:
                     code=code
                 )
             else:
-                # 直接APIを呼び出す（フォールバック）
-                id_token = self.client.get_id_token()
-                params = {}
-                if start_date:
-                    params['from'] = start_date
-                if end_date:
-                    params['to'] = end_date
-                if code:
-                    params['code'] = code
-
-                response = requests.get(
-                    "https://api.jquants.com/v1/markets/trades_spec",
-                    headers={"Authorization": f"Bearer {id_token}"},
-                    params=params,
-                    timeout=30
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                if "trades_spec" not in data:
-                    raise ValueError("APIレスポンスに 'trades_spec' がありません")
-
-                import pandas as pd
-                df = pd.DataFrame(data["trades_spec"])
-
-                # 日付列の型変換
-                if "Date" in df.columns:
-                    df["Date"] = pd.to_datetime(df["Date"])
+                # 直接APIを呼び出す（フォールバック、pagination_key を辿って全ページ取得）
+                df = self._fetch_all("trades_spec", _range_params(start_date, end_date, code=code))
 
             self.logger.info(f"投資部門別売買データを取得しました（{len(df)}件）")
             return df
@@ -299,41 +380,8 @@ class JQuantsAPIClient:
                     code=code
                 )
             else:
-                # 直接APIを呼び出す（フォールバック）
-                id_token = self.client.get_id_token()
-                params = {}
-                if start_date:
-                    params['from'] = start_date
-                if end_date:
-                    params['to'] = end_date
-                if code:
-                    params['code'] = code
-
-                response = requests.get(
-                    "https://api.jquants.com/v1/markets/weekly_margin_interest",
-                    headers={"Authorization": f"Bearer {id_token}"},
-                    params=params,
-                    timeout=30
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                # レスポンスキーは margin_interest または weekly_margin_interest の可能性
-                response_key = None
-                for key in ["weekly_margin_interest", "margin_interest", "weekly_margin"]:
-                    if key in data:
-                        response_key = key
-                        break
-
-                if not response_key:
-                    raise ValueError(f"APIレスポンスに想定キーがありません: {list(data.keys())}")
-
-                import pandas as pd
-                df = pd.DataFrame(data[response_key])
-
-                # 日付列の型変換
-                if "Date" in df.columns:
-                    df["Date"] = pd.to_datetime(df["Date"])
+                # 直接APIを呼び出す（フォールバック、pagination_key を辿って全ページ取得）
+                df = self._fetch_all("weekly_margin_interest", _range_params(start_date, end_date, code=code))
 
             self.logger.info(f"信用取引週末残高データを取得しました（{len(df)}件）")
             return df
@@ -364,34 +412,8 @@ class JQuantsAPIClient:
                     sector=sector
                 )
             else:
-                # 直接APIを呼び出す（フォールバック）
-                id_token = self.client.get_id_token()
-                params = {}
-                if start_date:
-                    params['from'] = start_date
-                if end_date:
-                    params['to'] = end_date
-                if sector:
-                    params['sector'] = sector
-
-                response = requests.get(
-                    "https://api.jquants.com/v1/markets/short_selling",
-                    headers={"Authorization": f"Bearer {id_token}"},
-                    params=params,
-                    timeout=30
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                if "short_selling" not in data:
-                    raise ValueError("APIレスポンスに 'short_selling' がありません")
-
-                import pandas as pd
-                df = pd.DataFrame(data["short_selling"])
-
-                # 日付列の型変換
-                if "Date" in df.columns:
-                    df["Date"] = pd.to_datetime(df["Date"])
+                # 直接APIを呼び出す（フォールバック、pagination_key を辿って全ページ取得）
+                df = self._fetch_all("short_selling", _range_params(start_date, end_date, sector=sector))
 
             self.logger.info(f"業種別空売り比率データを取得しました（{len(df)}件）")
             return df
@@ -422,41 +444,8 @@ class JQuantsAPIClient:
                     code=code
                 )
             else:
-                # 直接APIを呼び出す（フォールバック）
-                id_token = self.client.get_id_token()
-                params = {}
-                if start_date:
-                    params['from'] = start_date
-                if end_date:
-                    params['to'] = end_date
-                if code:
-                    params['code'] = code
-
-                response = requests.get(
-                    "https://api.jquants.com/v1/markets/short_selling_positions",
-                    headers={"Authorization": f"Bearer {id_token}"},
-                    params=params,
-                    timeout=30
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                # レスポンスキーは short_selling_positions または short_positions の可能性
-                response_key = None
-                for key in ["short_selling_positions", "short_positions", "positions"]:
-                    if key in data:
-                        response_key = key
-                        break
-
-                if not response_key:
-                    raise ValueError(f"APIレスポンスに想定キーがありません: {list(data.keys())}")
-
-                import pandas as pd
-                df = pd.DataFrame(data[response_key])
-
-                # 日付列の型変換
-                if "Date" in df.columns:
-                    df["Date"] = pd.to_datetime(df["Date"])
+                # 直接APIを呼び出す（フォールバック、pagination_key を辿って全ページ取得）
+                df = self._fetch_all("short_selling_positions", _range_params(start_date, end_date, code=code))
 
             self.logger.info(f"空売り残高報告データを取得しました（{len(df)}件）")
             return df
@@ -487,31 +476,8 @@ class JQuantsAPIClient:
             if hasattr(self.client, 'get_announcement'):
                 df = self.client.get_announcement(code=code)
             else:
-                # 直接APIを呼び出す（フォールバック）
-                id_token = self.client.get_id_token()
-                params = {}
-                if code:
-                    params['code'] = code
-
-                response = requests.get(
-                    "https://api.jquants.com/v1/fins/announcement",
-                    headers={"Authorization": f"Bearer {id_token}"},
-                    params=params,
-                    timeout=30
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                if "announcement" not in data:
-                    raise ValueError("APIレスポンスに 'announcement' がありません")
-
-                import pandas as pd
-                df = pd.DataFrame(data["announcement"])
-
-                # 日付列の型変換
-                for date_col in ["Date", "AnnouncementDate"]:
-                    if date_col in df.columns:
-                        df[date_col] = pd.to_datetime(df[date_col])
+                # 直接APIを呼び出す（フォールバック、pagination_key を辿って全ページ取得）
+                df = self._fetch_all("announcement", _range_params(code=code))
 
             self.logger.info(f"決算発表予定日データを取得しました（{len(df)}件）")
             return df
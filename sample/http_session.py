@@ -0,0 +1,193 @@
+"""
+J-Quants API 用の HTTP 接続プールとリトライポリシー
+
+    - create_session     : keep-alive の接続プール (プールサイズ上限付き) を持つ requests.Session
+    - request_with_retry : 429 / 5xx / 接続エラーを指数バックオフ + ジッターで再試行 (同期)
+    - arequest_with_retry: 同上 (httpx.AsyncClient 用)
+    - IdTokenCache       : ID トークンを有効期限付きでキャッシュ
+
+429 応答に `Retry-After` ヘッダがある場合はバックオフ計算より優先してその秒数待つ。
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, NamedTuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# J-Quants の ID トークンは 24 時間有効。期限直前の失敗を避けるため余裕を持って更新する
+ID_TOKEN_TTL = 23 * 3600.0
+
+
+class RetryPolicy(NamedTuple):
+    """
+    リトライ設定
+
+    Attributes:
+        max_retries: 最大リトライ回数 (初回リクエストを含まない)
+        backoff_base: バックオフの基準秒数 (attempt 回目の上限は base * 2**attempt)
+        backoff_max: 1 回の待機の上限秒数 (Retry-After にも適用)
+        statuses: リトライ対象の HTTP ステータス
+    """
+
+    max_retries: int = 5
+    backoff_base: float = 0.5
+    backoff_max: float = 60.0
+    statuses: frozenset[int] = RETRY_STATUSES
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """`Retry-After` ヘッダ (秒数または HTTP-date) を待機秒数に変換"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+    return max((when - datetime.now(UTC)).total_seconds(), 0.0)
+
+
+def backoff_delay(
+    attempt: int,
+    policy: RetryPolicy,
+    retry_after: float | None = None,
+    rand: Callable[[], float] = random.random,
+) -> float:
+    """
+    attempt 回目 (0 始まり) のリトライ前の待機秒数
+
+    Retry-After があればそれに従い、無ければ full jitter
+    (0 〜 min(backoff_max, backoff_base * 2**attempt) の一様乱数) を使う。
+    """
+    if retry_after is not None:
+        return min(retry_after, policy.backoff_max)
+    cap = min(policy.backoff_max, policy.backoff_base * (2**attempt))
+    return cap * rand()
+
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    """
+    keep-alive 接続プール付きの Session を生成
+
+    Args:
+        pool_size: ホストごとに保持する接続数の上限 (並列度に合わせる)
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _should_retry(status: int, policy: RetryPolicy) -> bool:
+    return status in policy.statuses
+
+
+def request_with_retry(
+    session: Any,
+    method: str,
+    url: str,
+    policy: RetryPolicy | None = None,
+    sleep: Callable[[float], Any] = time.sleep,
+    **kwargs: Any,
+) -> Any:
+    """
+    リトライ付きで HTTP リクエストを送る (同期)
+
+    リトライ回数を使い切った場合は最後の応答をそのまま返す (呼び出し側で raise_for_status)。
+    接続エラー・タイムアウトは最後の試行で送出する。
+    """
+    policy = policy or RetryPolicy()
+    for attempt in range(policy.max_retries + 1):
+        last_attempt = attempt == policy.max_retries
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if last_attempt:
+                raise
+            sleep(backoff_delay(attempt, policy))
+            continue
+        if last_attempt or not _should_retry(response.status_code, policy):
+            return response
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        response.close()
+        sleep(backoff_delay(attempt, policy, retry_after))
+    raise AssertionError("unreachable")
+
+
+async def arequest_with_retry(
+    client: Any,
+    method: str,
+    url: str,
+    policy: RetryPolicy | None = None,
+    sleep: Callable[[float], Any] = asyncio.sleep,
+    **kwargs: Any,
+) -> Any:
+    """`request_with_retry` の非同期版 (httpx.AsyncClient 用)"""
+    import httpx
+
+    policy = policy or RetryPolicy()
+    for attempt in range(policy.max_retries + 1):
+        last_attempt = attempt == policy.max_retries
+        try:
+            response = await client.request(method, url, **kwargs)
+        except (httpx.ConnectError, httpx.TimeoutException):
+            if last_attempt:
+                raise
+            await sleep(backoff_delay(attempt, policy))
+            continue
+        if last_attempt or not _should_retry(response.status_code, policy):
+            return response
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        await sleep(backoff_delay(attempt, policy, retry_after))
+    raise AssertionError("unreachable")
+
+
+class IdTokenCache:
+    """
+    ID トークンを有効期限付きでキャッシュ (スレッドセーフ)
+
+    期限内は fetch を呼ばずに同じトークンを返す。401 を受けたら `invalidate()` する。
+    """
+
+    def __init__(self, ttl: float = ID_TOKEN_TTL, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, fetch: Callable[[], str]) -> str:
+        with self._lock:
+            if self._token is None or self._clock() >= self._expires_at:
+                self._token = fetch()
+                self._expires_at = self._clock() + self.ttl
+            return self._token
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._token = None
+
+
+__all__ = [
+    "IdTokenCache",
+    "RetryPolicy",
+    "arequest_with_retry",
+    "backoff_delay",
+    "create_session",
+    "parse_retry_after",
+    "request_with_retry",
+]
@@ -0,0 +1,177 @@
+"""
+J-Quants API のページネーション対応フェッチャー
+
+J-Quants API はレスポンスが大きい場合 `pagination_key` を返し、同じクエリに
+`pagination_key` を付けて再リクエストすることで続きを取得する。
+本モジュールはページを順に取得してレコードのバッチ (1 ページ分の list[dict]) を
+逐次 yield するため、長期間の取得でも全 JSON を一度にメモリへ載せずに済む。
+DataFrame が必要な場合のみ最後に `records_to_dataframe()` で連結する。
+
+    - iter_pages  : 同期ジェネレータ (requests 互換の get 関数を使用)
+    - aiter_pages : 非同期ジェネレータ (`httpx.AsyncClient.get` 互換の関数を使用)
+"""
+
+import os
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from typing import Any, NamedTuple
+
+DEFAULT_API_BASE = "https://api.jquants.com"
+
+# 1 クエリあたりの最大ページ数 (pagination_key が循環した場合の無限ループ防止)
+MAX_PAGES = 10_000
+
+
+class JQuantsEndpoint(NamedTuple):
+    """J-Quants API エンドポイント定義"""
+
+    path: str
+    response_keys: tuple[str, ...]
+    date_columns: tuple[str, ...] = ("Date",)
+
+
+# 直接 HTTP (フォールバック・ETL) で使うエンドポイント
+ENDPOINTS: dict[str, JQuantsEndpoint] = {
+    "listed_info": JQuantsEndpoint("/v1/listed/info", ("info",)),
+    "daily_quotes": JQuantsEndpoint("/v1/prices/daily_quotes", ("daily_quotes",)),
+    "statements": JQuantsEndpoint("/v1/fins/statements", ("statements",), ("DisclosedDate",)),
+    "trades_spec": JQuantsEndpoint("/v1/markets/trades_spec", ("trades_spec",)),
+    "weekly_margin_interest": JQuantsEndpoint(
+        "/v1/markets/weekly_margin_interest",
+        ("weekly_margin_interest", "margin_interest", "weekly_margin"),
+    ),
+    "short_selling": JQuantsEndpoint("/v1/markets/short_selling", ("short_selling",)),
+    "short_selling_positions": JQuantsEndpoint(
+        "/v1/markets/short_selling_positions",
+        ("short_selling_positions", "short_positions", "positions"),
+    ),
+    "announcement": JQuantsEndpoint(
+        "/v1/fins/announcement", ("announcement",), ("Date", "AnnouncementDate")
+    ),
+}
+
+
+class PaginationError(ValueError):
+    """ページネーションが不正 (応答キー欠落・pagination_key の循環など)"""
+
+
+def api_base() -> str:
+    """API ベース URL (環境変数 JQUANTS_API_BASE で上書き可能)"""
+    return os.environ.get("JQUANTS_API_BASE", DEFAULT_API_BASE).rstrip("/")
+
+
+def extract_records(payload: dict[str, Any], response_keys: Iterable[str]) -> list[dict]:
+    """
+    レスポンス JSON からレコード配列を取り出す
+
+    Raises:
+        PaginationError: 想定したキーがどれも存在しない
+    """
+    for key in response_keys:
+        if key in payload:
+            return payload[key]
+    raise PaginationError(f"APIレスポンスに想定キーがありません: {list(payload.keys())}")
+
+
+def _next_params(
+    params: dict[str, Any], payload: dict[str, Any], seen: set[str], pages: int
+) -> dict[str, Any] | None:
+    """次ページのクエリ (最終ページなら None)"""
+    key = payload.get("pagination_key")
+    if not key:
+        return None
+    if key in seen or pages >= MAX_PAGES:
+        raise PaginationError(f"pagination_key が終端しません (pages={pages})")
+    seen.add(key)
+    return {**params, "pagination_key": key}
+
+
+def iter_pages(
+    get: Callable[..., Any],
+    endpoint: JQuantsEndpoint,
+    headers: dict[str, str],
+    params: dict[str, Any] | None = None,
+    timeout: float = 30.0,
+) -> Iterator[list[dict]]:
+    """
+    全ページを順に取得し、ページごとのレコードを yield する (同期版)
+
+    Args:
+        get: `requests.get` / `requests.Session.get` 互換の関数
+        endpoint: 取得対象のエンドポイント
+        headers: リクエストヘッダ (Authorization など)
+        params: クエリパラメータ (from / to / code など)
+        timeout: 1 リクエストのタイムアウト秒数
+
+    Yields:
+        1 ページ分のレコードのリスト
+    """
+    url = api_base() + endpoint.path
+    query: dict[str, Any] | None = dict(params or {})
+    seen: set[str] = set()
+    pages = 0
+    while query is not None:
+        response = get(url, headers=headers, params=query, timeout=timeout)
+        response.raise_for_status()
+        payload = response.json()
+        pages += 1
+        yield extract_records(payload, endpoint.response_keys)
+        query = _next_params(query, payload, seen, pages)
+
+
+async def aiter_pages(
+    get: Callable[..., Awaitable[Any]],
+    endpoint: JQuantsEndpoint,
+    headers: dict[str, str],
+    params: dict[str, Any] | None = None,
+    timeout: float = 30.0,
+) -> AsyncIterator[list[dict]]:
+    """
+    全ページを順に取得し、ページごとのレコードを yield する (非同期版)
+
+    Args:
+        get: `httpx.AsyncClient.get` 互換のコルーチン関数
+        endpoint / headers / params / timeout: `iter_pages` と同じ
+
+    Yields:
+        1 ページ分のレコードのリスト
+    """
+    url = api_base() + endpoint.path
+    query: dict[str, Any] | None = dict(params or {})
+    seen: set[str] = set()
+    pages = 0
+    while query is not None:
+        response = await get(url, headers=headers, params=query, timeout=timeout)
+        response.raise_for_status()
+        payload = response.json()
+        pages += 1
+        yield extract_records(payload, endpoint.response_keys)
+        query = _next_params(query, payload, seen, pages)
+
+
+def records_to_dataframe(batches: Iterable[list[dict]], date_columns: Iterable[str] = ("Date",)):
+    """
+    レコードのバッチを 1 つの DataFrame に連結する (pandas はここで初めて import)
+
+    ページごとに小さな DataFrame を作って最後に concat するため、
+    全ページの生 JSON を同時に保持しない。
+    """
+    import pandas as pd
+
+    frames = [pd.DataFrame(batch) for batch in batches if batch]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    for column in date_columns:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+    return df
+
+
+__all__ = [
+    "ENDPOINTS",
+    "JQuantsEndpoint",
+    "PaginationError",
+    "aiter_pages",
+    "api_base",
+    "extract_records",
+    "iter_pages",
+    "records_to_dataframe",
+]
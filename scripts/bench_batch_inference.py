@@ -0,0 +1,82 @@
+"""
+Benchmark: batched vs. single-ticker LLM inference against the local stand-in server.
+
+スタブサーバー (`src.common.llm.stub_server`) をプロセス内 (ASGI) で起動し、
+同じ銘柄集合を max_batch_size=1 (従来の 1 銘柄 1 リクエスト) とバッチ設定で
+処理したときのスループットを比較します。
+
+実行例:
+    python scripts/bench_batch_inference.py --tickers 200 --batch-size 16
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx  # noqa: E402
+
+from src.common.llm import BatchedChatClient  # noqa: E402
+from src.common.llm.stub_server import create_stub_app  # noqa: E402
+from src.common.mcp.foundry_tool_registry import FoundryConfig  # noqa: E402
+from src.stock_magi.prompts import (  # noqa: E402
+    MELCHIOR_SYSTEM_MESSAGE,
+    create_melchior_analysis_prompt,
+)
+
+
+async def run(tickers: list[str], batch_size: int, args: argparse.Namespace) -> float:
+    app = create_stub_app(args.request_latency, args.item_latency, args.server_concurrency)
+    transport = httpx.ASGITransport(app=app)
+    config = FoundryConfig(
+        FOUNDRY_ENDPOINT="http://stub", FOUNDRY_API_KEY="stub", FOUNDRY_DEPLOYMENT="stub"
+    )
+    async with httpx.AsyncClient(transport=transport, timeout=60.0) as http:
+        client = BatchedChatClient(
+            config,
+            MELCHIOR_SYSTEM_MESSAGE,
+            max_batch_size=batch_size,
+            max_wait_s=args.max_wait,
+            http_client=http,
+        )
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one(ticker: str) -> dict:
+            async with semaphore:
+                prompt = create_melchior_analysis_prompt(ticker, {"ticker": ticker})
+                return await client.analyze(ticker, prompt)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(t) for t in tickers))
+        elapsed = time.perf_counter() - started
+        await client.aclose()
+
+    print(
+        f"batch_size={batch_size:>3}  requests={client.requests_sent:>4}  "
+        f"elapsed={elapsed:6.2f}s  throughput={len(tickers) / elapsed:8.1f} tickers/s"
+    )
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-wait", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=64, help="同時に保留できる銘柄数")
+    parser.add_argument("--request-latency", type=float, default=0.2)
+    parser.add_argument("--item-latency", type=float, default=0.005)
+    parser.add_argument("--server-concurrency", type=int, default=4, help="スタブの同時処理上限")
+    args = parser.parse_args()
+
+    tickers = [f"{1000 + i}.T" for i in range(args.tickers)]
+    single = asyncio.run(run(tickers, 1, args))
+    batched = asyncio.run(run(tickers, args.batch_size, args))
+    print(f"speedup: {single / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
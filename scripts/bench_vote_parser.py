@@ -0,0 +1,88 @@
+"""
+Benchmark: structured vote parser over a corpus of sample agent responses.
+
+テキスト形式 / markdown 装飾 / JSON / 不正出力を混ぜたコーパスに対して
+`parse_agent_output` の 1 件あたり処理時間を計測し、旧実装相当の
+例外駆動 `Action(...)` 変換と比較します。
+
+実行例:
+    python scripts/bench_vote_parser.py --repeat 20000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.common.consensus.vote_parser import coerce_action, parse_agent_output  # noqa: E402
+from src.common.models import Action  # noqa: E402
+
+TEMPLATES = [
+    "Action: {action}\nConfidence: {conf}\nReasoning: PER {per}, ROE {roe}% を根拠に判断しました。",
+    "```\nAction: {action}\nConfidence: {conf}\nReasoning: 自己資本比率が高く財務は健全です。\n```",
+    "**Action**: [{action}]\n**Confidence**: {pct}%\n**Reasoning**: トレンドとバリュエーションを総合評価。",
+    '{{"action": "{action}", "confidence": {conf}, "reasoning": "fair value gap {per}%"}}',
+    "分析結果\n- Action：{action_lower}\n- Confidence：{conf}\n- Reasoning：データ不足のため慎重に判断。",
+    "I am unable to provide a recommendation for this ticker.",
+]
+
+
+def build_corpus(size: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        action = rng.choice(["BUY", "SELL", "HOLD", "strong_buy"])
+        conf = round(rng.random(), 2)
+        corpus.append(
+            rng.choice(TEMPLATES).format(
+                action=action,
+                action_lower=action.lower(),
+                conf=conf,
+                pct=int(conf * 100),
+                per=rng.randint(5, 40),
+                roe=rng.randint(1, 25),
+            )
+        )
+    return corpus
+
+
+def legacy_coerce(action_str: object) -> Action:
+    """旧 `reach_consensus` 相当の例外駆動変換 (比較用)"""
+    try:
+        return Action(action_str)
+    except Exception:
+        try:
+            return Action(action_str.upper()) if isinstance(action_str, str) else Action.HOLD
+        except Exception:
+            return Action.HOLD
+
+
+def timeit(label: str, fn, items: list, repeat: int) -> None:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            fn(item)
+    elapsed = time.perf_counter() - started
+    per_item_us = elapsed / (repeat * len(items)) * 1e6
+    print(f"{label:<32} {per_item_us:8.2f} us/item")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.corpus)
+    action_values = ["BUY", "buy", "strong_buy", "Sell", "hold", None, "n/a"] * 50
+
+    timeit("parse_agent_output (corpus)", parse_agent_output, corpus, args.repeat)
+    timeit("coerce_action (lookup)", coerce_action, action_values, args.repeat)
+    timeit("legacy Action() try/except", legacy_coerce, action_values, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
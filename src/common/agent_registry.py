@@ -0,0 +1,262 @@
+"""
+Declarative agent registry.
+
+合議に参加できるエージェントを `config/agents.json` で宣言し、エージェントとそのツールを
+プロセス内で 1 回だけ生成して使い回します (リクエストごとの生成コストをなくす)。
+
+    - factory: "モジュール:関数"。初回の利用時に import する (使わないエージェントの依存は読み込まない)
+    - tools: ツールレジストリのツール名。この順で生成関数の位置引数に渡す
+    - options: 生成関数に渡すキーワード引数。値を {"factory": "モジュール:関数"} にすると、
+      エージェントの生成時にその関数を呼んだ戻り値を渡す (特徴量ストア・文書の取得関数など)
+    - snapshot_store: true なら生成後にスナップショットストアを設定する
+    - data: データ要件 (`src.common.data_gathering`)。宣言すると生成後に `data_requirements` と
+      `data_gatherer` を設定し、エージェントは全ソースを同時に取得できる
+    - enabled: false のエージェントはパネルに選べない
+    - default_panel: リクエストでパネルを指定しなかった場合のエージェント
+
+"_" で始まるキーはコメントとして無視します (`config/mcp_servers.json` と同じ)。
+"""
+
+import importlib
+import json
+import threading
+from collections.abc import Callable, Sequence
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from pydantic import ConfigDict, Field
+from pydantic_settings import BaseSettings
+
+from src.common.data_gathering import DataGatherer, DataRequirement, parse_requirements
+from src.common.snapshots import get_snapshot_store
+
+if TYPE_CHECKING:
+    from src.common.mcp.foundry_tool_registry import FoundryToolRegistry
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parents[2] / "config" / "agents.json"
+
+
+class AgentRegistrySettings(BaseSettings):
+    """
+    エージェントレジストリ設定
+
+    環境変数から読み込み:
+        AGENTS_CONFIG_PATH: エージェント宣言の JSON ファイルパス
+    """
+
+    agents_config_path: str = Field(str(DEFAULT_CONFIG_PATH), alias="AGENTS_CONFIG_PATH")
+
+    model_config = ConfigDict(env_file=None)
+
+
+class AgentSpec(NamedTuple):
+    """エージェントの宣言 (config/agents.json の 1 エントリ)"""
+
+    name: str
+    factory: str
+    tools: tuple[str, ...] = ()
+    options: dict[str, Any] = {}
+    snapshot_store: bool = False
+    enabled: bool = True
+    description: str = ""
+    data: tuple[DataRequirement, ...] = ()
+
+
+def _load_factory(path: str) -> Callable[..., Any]:
+    """
+    "モジュール:関数" から生成関数を取り出す
+
+    Raises:
+        ValueError: 形式が不正
+    """
+    module_name, sep, attr = path.partition(":")
+    if not sep or not module_name or not attr:
+        raise ValueError(f"Invalid agent factory '{path}' (expected 'module:function')")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _resolve_options(options: dict[str, Any]) -> dict[str, Any]:
+    """options の {"factory": "モジュール:関数"} (任意で "options") を呼び出した戻り値に置き換える"""
+    resolved = {}
+    for key, value in options.items():
+        if isinstance(value, dict) and "factory" in value:
+            value = _load_factory(value["factory"])(**value.get("options", {}))
+        resolved[key] = value
+    return resolved
+
+
+class AgentRegistry:
+    """
+    宣言からエージェントを遅延生成し、プロセス内で使い回すレジストリ
+
+    生成済みのエージェントは、ツールレジストリが返すツールが同じである限り再利用する
+    (ツールレジストリを差し替えた場合だけ作り直す)。
+
+    使用例:
+        >>> agents = get_agent_registry()
+        >>> panel = agents.panel(["melchior", "balthasar"], get_tool_registry())
+
+    Args:
+        specs: エージェント名 -> 宣言
+        default_panel: パネル省略時に使うエージェント名
+    """
+
+    def __init__(self, specs: dict[str, AgentSpec], default_panel: Sequence[str] = ()):
+        self.specs = {name.lower(): spec for name, spec in specs.items()}
+        self.default_panel: list[str] = []
+        self.default_panel = self.resolve_panel(default_panel or list(self.specs)[:1])
+        self.constructed = 0
+        self._agents: dict[str, tuple[tuple[Any, ...], Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "AgentRegistry":
+        """
+        JSON 相当の dict からレジストリを作る
+
+        Raises:
+            ValueError: factory の無いエージェントがある / データ要件が不正
+        """
+        specs = {}
+        for name, entry in config.get("agents", {}).items():
+            if name.startswith("_"):
+                continue
+            if "factory" not in entry:
+                raise ValueError(f"Agent '{name}' has no factory")
+            specs[name] = AgentSpec(
+                name=name.lower(),
+                factory=entry["factory"],
+                tools=tuple(entry.get("tools", ())),
+                options=dict(entry.get("options", {})),
+                snapshot_store=bool(entry.get("snapshot_store", False)),
+                enabled=bool(entry.get("enabled", True)),
+                description=entry.get("description", ""),
+                data=parse_requirements(entry.get("data", ())),
+            )
+        return cls(specs, config.get("default_panel", ()))
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "AgentRegistry":
+        """JSON ファイルからレジストリを作る"""
+        return cls.from_config(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def spec(self, name: str) -> AgentSpec:
+        """
+        エージェントの宣言を取得 (名前の大文字・小文字は区別しない)
+
+        Raises:
+            ValueError: 宣言されていないエージェント
+        """
+        spec = self.specs.get(name.lower())
+        if spec is None:
+            raise ValueError(f"Agent '{name}' not found")
+        return spec
+
+    def names(self) -> list[str]:
+        """パネルに選べるエージェント名"""
+        return [name for name, spec in self.specs.items() if spec.enabled]
+
+    def describe(self) -> dict[str, Any]:
+        """{"default_panel": [...], "agents": {名前: {"tools", "data", "description"}}}"""
+        return {
+            "default_panel": list(self.default_panel),
+            "agents": {
+                name: {
+                    "tools": list(spec.tools),
+                    "data": [r.key for r in spec.data],
+                    "description": spec.description,
+                }
+                for name, spec in self.specs.items()
+                if spec.enabled
+            },
+        }
+
+    def tool_names(self, name: str) -> list[str]:
+        """エージェントが使うツール名 (宣言されていなければ空)"""
+        spec = self.specs.get(name.lower())
+        return list(spec.tools) if spec is not None else []
+
+    def resolve_panel(self, names: Sequence[str] | None) -> list[str]:
+        """
+        パネル指定を正規化する (省略時は default_panel、重複は除く)
+
+        Raises:
+            ValueError: 宣言されていない / 無効化されたエージェントを含む
+        """
+        if not names:
+            return list(self.default_panel)
+        panel: list[str] = []
+        for name in names:
+            spec = self.spec(name)
+            if not spec.enabled:
+                raise ValueError(f"Agent '{name}' is disabled")
+            if spec.name not in panel:
+                panel.append(spec.name)
+        return panel
+
+    def get(self, name: str, tool_registry: "FoundryToolRegistry") -> Any:
+        """
+        エージェントを取得 (初回のみ生成し、以降は同じインスタンスを返す)
+
+        Args:
+            name: エージェント名
+            tool_registry: ツールの取得元
+
+        Returns:
+            エージェントインスタンス
+
+        Raises:
+            ValueError: 宣言されていないエージェント / 未対応のツール
+        """
+        spec = self.spec(name)
+        tools = tuple(tool_registry.get_tool(tool) for tool in spec.tools)
+        if spec.data:
+            # データ要件のツールは取得時にレジストリから引くため、レジストリ自体も同一性を確認する
+            tools += (tool_registry,)
+        with self._lock:
+            cached = self._agents.get(spec.name)
+            if cached is not None and len(cached[0]) == len(tools):
+                if all(a is b for a, b in zip(cached[0], tools, strict=True)):
+                    return cached[1]
+            options = _resolve_options(spec.options)
+            agent = _load_factory(spec.factory)(*tools[: len(spec.tools)], **options)
+            if spec.snapshot_store:
+                agent.snapshot_store = get_snapshot_store()
+            if spec.data:
+                agent.data_requirements = spec.data
+                agent.data_gatherer = DataGatherer(tool_registry)
+            self._agents[spec.name] = (tools, agent)
+            self.constructed += 1
+            return agent
+
+    def panel(self, names: Sequence[str] | None, tool_registry: "FoundryToolRegistry") -> list[Any]:
+        """パネル (エージェントのリスト) を取得。names 省略時は default_panel"""
+        return [self.get(name, tool_registry) for name in self.resolve_panel(names)]
+
+
+def create_agent_registry(settings: AgentRegistrySettings | None = None) -> AgentRegistry:
+    """
+    設定ファイルからエージェントレジストリを生成
+
+    Raises:
+        FileNotFoundError: AGENTS_CONFIG_PATH が存在しない
+        ValueError: 宣言が不正
+    """
+    settings = settings or AgentRegistrySettings()
+    return AgentRegistry.from_file(settings.agents_config_path)
+
+
+@lru_cache(maxsize=1)
+def get_agent_registry() -> AgentRegistry:
+    """プロセス共通のエージェントレジストリ (初回呼び出し時に設定ファイルから生成)"""
+    return create_agent_registry()
+
+
+__all__ = [
+    "AgentRegistry",
+    "AgentRegistrySettings",
+    "AgentSpec",
+    "create_agent_registry",
+    "get_agent_registry",
+]
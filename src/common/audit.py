@@ -0,0 +1,614 @@
+"""
+Decision audit log with asynchronous batched writes.
+
+合議結果 (`FinalDecision`) をすべて保存するための監査ログです。リクエスト処理中は
+キューに積むだけにし、バックグラウンドタスクがまとめて書き込むため応答は遅くなりません。
+
+    - sqlite : 同一ホストのワーカー間で共有するローカルファイル (WAL モード)
+    - parquet: フラッシュごとに日付パーティションへ追記 (`date=YYYY-MM-DD/*.parquet`)
+    - none   : 保存しない
+
+キューは上限付き (AUDIT_QUEUE_SIZE) で、満杯のときは呼び出し側を待たせる (バックプレッシャー)。
+AUDIT_ENQUEUE_TIMEOUT 秒待っても空かない場合と、書き込みタスクが動いていない場合
+(起動前・終了処理中) はその場で直接書き込むため、記録は取りこぼさない。
+
+再試行しても書き込めないバッチは捨てずに退避ファイル (AUDIT_SPILL_DIR 配下の
+`audit-spill-<pid>.jsonl`) に追記し、書き込めるようになったら書き戻す。終了したプロセスが
+残した退避ファイルも引き取って書き戻す。状態は `/api/ready` の `audit` で確認できる。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import UTC, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from pydantic import ConfigDict, Field
+from pydantic_settings import BaseSettings
+
+from src.common.models import FinalDecision
+
+logger = logging.getLogger(__name__)
+
+# 書き込みに失敗したバッチの再試行回数
+FLUSH_RETRIES = 3
+
+# 監査レコードの列 (votes は JSON 文字列)
+AUDIT_COLUMNS = ("ts", "ticker", "final_action", "confidence", "has_conflict", "summary", "votes")
+
+
+class AuditSettings(BaseSettings):
+    """
+    監査ログ設定
+
+    環境変数から読み込み:
+        AUDIT_BACKEND: "sqlite" / "parquet" / "none"
+        AUDIT_SQLITE_PATH: SQLite ファイルパス
+        AUDIT_PARQUET_DIR: Parquet の保存先ディレクトリ
+        AUDIT_QUEUE_SIZE: キューの上限 (件)
+        AUDIT_BATCH_SIZE: 1 回の書き込みの最大件数
+        AUDIT_FLUSH_INTERVAL: 件数が溜まらなくても書き込むまでの秒数
+        AUDIT_ENQUEUE_TIMEOUT: キューが満杯のとき待つ秒数 (超えたら直接書き込む)
+        AUDIT_SPILL_DIR: 書き込めなかったレコードの退避先 (空ならメモリに保持)
+    """
+
+    audit_backend: str = Field("sqlite", alias="AUDIT_BACKEND")
+    audit_sqlite_path: str = Field("./data/audit.sqlite3", alias="AUDIT_SQLITE_PATH")
+    audit_parquet_dir: str = Field("./data/audit", alias="AUDIT_PARQUET_DIR")
+    audit_queue_size: int = Field(10000, alias="AUDIT_QUEUE_SIZE", ge=1)
+    audit_batch_size: int = Field(500, alias="AUDIT_BATCH_SIZE", ge=1)
+    audit_flush_interval: float = Field(1.0, alias="AUDIT_FLUSH_INTERVAL", gt=0)
+    audit_enqueue_timeout: float = Field(5.0, alias="AUDIT_ENQUEUE_TIMEOUT", ge=0)
+    audit_spill_dir: str = Field("./data/audit-spill", alias="AUDIT_SPILL_DIR")
+
+    model_config = ConfigDict(env_file=None)
+
+
+def audit_record(ticker: str, decision: FinalDecision, ts: float | None = None) -> dict[str, Any]:
+    """FinalDecision を監査レコード (AUDIT_COLUMNS の dict) に変換する"""
+    return {
+        "ts": time.time() if ts is None else ts,
+        "ticker": ticker,
+        "final_action": decision.final_action.value,
+        "confidence": decision.weighted_confidence,
+        "has_conflict": decision.has_conflict,
+        "summary": decision.summary,
+        "votes": json.dumps(
+            [vote.model_dump(mode="json") for vote in decision.votes], ensure_ascii=False
+        ),
+    }
+
+
+def _timestamp(value: datetime | None) -> float | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.timestamp()
+
+
+def _output(record: dict[str, Any]) -> dict[str, Any]:
+    """保存形式のレコードを API 向けに整える (時刻は ISO 8601、votes は list)"""
+    return {
+        **record,
+        "ts": datetime.fromtimestamp(record["ts"], UTC).isoformat(),
+        "has_conflict": bool(record["has_conflict"]),
+        "votes": json.loads(record["votes"]),
+    }
+
+
+def _append_jsonl(path: Path, records: list[dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _read_jsonl(path: Path) -> list[dict[str, Any]]:
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AuditWriter(ABC):
+    """監査レコードの保存先 (同期 I/O。`AuditLog` がスレッドで呼び出す)"""
+
+    @abstractmethod
+    def write(self, records: list[dict[str, Any]]) -> None:
+        """レコードをまとめて追記する"""
+
+    @abstractmethod
+    def query(
+        self,
+        ticker: str | None = None,
+        start: float | None = None,
+        end: float | None = None,
+        limit: int = 1000,
+    ) -> list[dict[str, Any]]:
+        """条件に合うレコードを新しい順に返す (start / end は UNIX 秒、両端含む)"""
+
+
+class SQLiteAuditWriter(AuditWriter):
+    """
+    SQLite ファイルへの追記
+
+    1 バッチを 1 トランザクション (`BEGIN IMMEDIATE`) で書き込む。接続はスレッドごとに遅延生成する。
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS decisions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, ticker TEXT NOT NULL, "
+                "final_action TEXT NOT NULL, confidence REAL, has_conflict INTEGER NOT NULL, "
+                "summary TEXT NOT NULL, votes TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS decisions_ticker_ts ON decisions (ticker, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS decisions_ts ON decisions (ts)")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def write(self, records: list[dict[str, Any]]) -> None:
+        placeholders = ", ".join("?" * len(AUDIT_COLUMNS))
+        rows = [tuple(r[c] for c in AUDIT_COLUMNS) for r in records]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                f"INSERT INTO decisions ({', '.join(AUDIT_COLUMNS)}) VALUES ({placeholders})", rows
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def query(
+        self,
+        ticker: str | None = None,
+        start: float | None = None,
+        end: float | None = None,
+        limit: int = 1000,
+    ) -> list[dict[str, Any]]:
+        clauses, params = [], []
+        for clause, value in (("ticker = ?", ticker), ("ts >= ?", start), ("ts <= ?", end)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT {', '.join(AUDIT_COLUMNS)} FROM decisions{where} "
+            "ORDER BY ts DESC, id DESC LIMIT ?",
+            (*params, limit),
+        )
+        return [dict(row) for row in rows]
+
+
+class ParquetAuditWriter(AuditWriter):
+    """
+    Parquet への追記 (フラッシュごとに `date=YYYY-MM-DD/audit-<時刻>-<pid>-<連番>.parquet`)
+
+    既存ファイルは書き換えないため、複数ワーカーが同じディレクトリに書いても衝突しない。
+    pyarrow / pandas が必要。
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def write(self, records: list[dict[str, Any]]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        by_day: dict[str, list[dict[str, Any]]] = {}
+        for record in records:
+            day = datetime.fromtimestamp(record["ts"], UTC).date().isoformat()
+            by_day.setdefault(day, []).append(record)
+        for day, rows in by_day.items():
+            with self._lock:
+                self._sequence += 1
+                name = f"audit-{time.time_ns()}-{os.getpid()}-{self._sequence}.parquet"
+            path = self.directory / f"date={day}" / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pylist(
+                [{c: r[c] for c in AUDIT_COLUMNS} for r in rows],
+                schema=pa.schema(
+                    [
+                        ("ts", pa.float64()),
+                        ("ticker", pa.string()),
+                        ("final_action", pa.string()),
+                        ("confidence", pa.float64()),
+                        ("has_conflict", pa.bool_()),
+                        ("summary", pa.string()),
+                        ("votes", pa.string()),
+                    ]
+                ),
+            )
+            tmp = path.with_name(f".{name}.tmp")
+            pq.write_table(table, tmp)
+            os.replace(tmp, path)
+
+    def query(
+        self,
+        ticker: str | None = None,
+        start: float | None = None,
+        end: float | None = None,
+        limit: int = 1000,
+    ) -> list[dict[str, Any]]:
+        import pandas as pd
+
+        first = datetime.fromtimestamp(start, UTC).date().isoformat() if start is not None else ""
+        last = datetime.fromtimestamp(end, UTC).date().isoformat() if end is not None else "~"
+        files = [
+            path
+            for partition in sorted(self.directory.glob("date=*"))
+            if first <= partition.name.removeprefix("date=") <= last
+            for path in sorted(partition.glob("audit-*.parquet"))
+        ]
+        if not files:
+            return []
+        df = pd.concat([pd.read_parquet(path) for path in files], ignore_index=True)
+        if ticker is not None:
+            df = df[df["ticker"] == ticker]
+        if start is not None:
+            df = df[df["ts"] >= start]
+        if end is not None:
+            df = df[df["ts"] <= end]
+        df = df.iloc[::-1].sort_values("ts", ascending=False, kind="stable").head(limit)
+        return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+class AuditLog:
+    """
+    監査ログのキューと書き込みタスク
+
+    `start()` 後は `record()` がキューに積むだけで戻り、バックグラウンドタスクが
+    batch_size 件、または flush_interval 秒ごとにまとめて書き込む。`close()` は
+    キューに残ったレコードをすべて書き込んでから終了する。
+
+    再試行しても書き込めないバッチは spill_dir の退避ファイル (None または退避にも
+    失敗した場合はメモリ) に残し、次に書き込めたとき、または待機中に書き戻す。
+    """
+
+    def __init__(
+        self,
+        writer: AuditWriter,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        enqueue_timeout: float = 5.0,
+        spill_dir: str | Path | None = None,
+    ):
+        self.writer = writer
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.written = 0
+        self.batches = 0
+        self.direct_writes = 0
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.spilled = 0
+        self.replayed = 0
+        self.last_error: str | None = None
+        self._retained: list[dict[str, Any]] = []
+        self._spill_pending = 0
+        self._spill_lock = asyncio.Lock()
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._closing
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def spill_path(self) -> Path | None:
+        """このプロセスの退避ファイル"""
+        return (
+            None if self.spill_dir is None else self.spill_dir / f"audit-spill-{os.getpid()}.jsonl"
+        )
+
+    @property
+    def unwritten(self) -> int:
+        """書き込めずに退避しているレコード数 (このプロセスの分)"""
+        return len(self._retained) + self._spill_pending
+
+    def status(self) -> dict[str, Any]:
+        """
+        書き込みの状態 (`/api/ready` 用)
+
+        Returns:
+            {"ok", "running", "pending", "written", "unwritten", "spilled", "replayed",
+             "last_error"} (ok は直近の書き込みが成功し、退避中のレコードが無いこと)
+        """
+        return {
+            "ok": self.last_error is None and not self.unwritten,
+            "running": self.running,
+            "pending": self.pending,
+            "written": self.written,
+            "unwritten": self.unwritten,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "last_error": self.last_error,
+        }
+
+    def start(self) -> asyncio.Task:
+        """書き込みタスクを起動する (起動済みならそのタスクを返す)"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def record(self, ticker: str, decision: FinalDecision) -> None:
+        """
+        合議結果を記録する
+
+        書き込みタスクが動いていればキューに積む (満杯なら enqueue_timeout 秒まで待つ)。
+        動いていない・待ちきれない場合はその場で書き込む。書き込めなければ退避し、
+        例外は呼び出し側 (リクエスト処理) に伝えない。
+        """
+        record = audit_record(ticker, decision)
+        if self.running and self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.put(record), timeout=self.enqueue_timeout)
+                return
+            except TimeoutError:
+                logger.warning("audit queue full (%d); writing synchronously", self.queue_size)
+        self.direct_writes += 1
+        try:
+            await self._write([record])
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.exception("audit direct write failed; keeping the record")
+            await self._retain([record])
+        else:
+            self.last_error = None
+
+    async def _write(self, records: list[dict[str, Any]]) -> None:
+        await asyncio.to_thread(self.writer.write, records)
+        self.written += len(records)
+        self.batches += 1
+
+    async def _flush(self, batch: list[dict[str, Any]]) -> None:
+        """
+        バッチを書き込む (書き込み先の一時的な障害に備えて FLUSH_RETRIES 回まで再試行)
+
+        それでも書き込めなければ退避し、書き込めたときは退避済みのレコードも書き戻す。
+        """
+        for attempt in range(FLUSH_RETRIES + 1):
+            try:
+                await self._write(batch)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                if attempt == FLUSH_RETRIES:
+                    logger.exception("audit flush failed; keeping %d records", len(batch))
+                    await self._retain(batch)
+                    return
+                logger.warning("audit flush failed; retrying %d records", len(batch))
+                await asyncio.sleep(self.flush_interval * 2**attempt)
+            else:
+                self.last_error = None
+                if self.unwritten:
+                    await self._replay()
+                return
+
+    async def _retain(self, batch: list[dict[str, Any]]) -> None:
+        """書き込めなかったバッチを退避ファイルに追記する (失敗したらメモリに残す)"""
+        async with self._spill_lock:
+            self.spilled += len(batch)
+            path = self.spill_path
+            if path is not None:
+                try:
+                    await asyncio.to_thread(_append_jsonl, path, batch)
+                    self._spill_pending += len(batch)
+                    return
+                except Exception:
+                    logger.exception("audit spill to %s failed; keeping records in memory", path)
+            self._retained.extend(batch)
+
+    def _spill_files(self) -> list[Path]:
+        """書き戻す退避ファイル (このプロセスの分と、終了したプロセスが残した分)"""
+        if self.spill_dir is None:
+            return []
+        files = []
+        for path in sorted(self.spill_dir.glob("audit-spill-*.jsonl")):
+            pid = int(path.stem.split("-")[2])
+            if pid != os.getpid():
+                if _process_alive(pid):
+                    continue
+                # 他のワーカーと重複して書き戻さないよう、名前を変えて引き取る
+                claimed = path.with_name(f"audit-spill-{os.getpid()}-{time.time_ns()}.jsonl")
+                try:
+                    os.rename(path, claimed)
+                except FileNotFoundError:
+                    continue
+                path = claimed
+            files.append(path)
+        return files
+
+    async def _replay(self) -> None:
+        """退避したレコードを書き戻す (失敗したら退避したまま次の機会に再試行)"""
+        async with self._spill_lock:
+            replayed = 0
+            try:
+                if self._retained:
+                    retained, self._retained = self._retained, []
+                    try:
+                        await self._write(retained)
+                    except Exception:
+                        self._retained = retained + self._retained
+                        raise
+                    replayed += len(retained)
+                files = await asyncio.to_thread(self._spill_files)
+                spilled = [(path, await asyncio.to_thread(_read_jsonl, path)) for path in files]
+                self._spill_pending = sum(len(records) for _, records in spilled)
+                for path, records in spilled:
+                    await self._write(records)
+                    path.unlink(missing_ok=True)
+                    replayed += len(records)
+                    self._spill_pending -= len(records)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+            else:
+                if replayed:
+                    self.last_error = None
+            finally:
+                if replayed:
+                    self.replayed += replayed
+                    logger.info("audit replayed %d spilled records", replayed)
+
+    def _take(self, batch: list[dict[str, Any]]) -> bool:
+        """キューに既にあるレコードを batch_size 件まで取り出す (終了の合図を受けたら True)"""
+        assert self._queue is not None
+        stop = False
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is None:
+                stop = True
+                continue
+            batch.append(item)
+        return stop
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        # 前回 (終了したプロセスを含む) 退避したまま残ったレコードを書き戻す
+        await self._replay()
+        stop = False
+        while not stop or not self._queue.empty():
+            batch: list[dict[str, Any]] = []
+            if not stop:
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)
+                except TimeoutError:
+                    if self.unwritten:
+                        await self._replay()
+                    continue
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+            # 件数が溜まるのを待たず、今キューにある分をまとめて書く
+            stop = self._take(batch) or stop
+            if not batch:
+                continue
+            await self._flush(batch)
+
+    async def close(self) -> None:
+        """キューに残ったレコードを書き込んでから書き込みタスクを止める"""
+        task, queue = self._task, self._queue
+        if task is None or queue is None or task.done():
+            return
+        self._closing = True
+        await queue.put(None)
+        await task
+        if self._retained:
+            logger.error("audit closed with %d unwritten records in memory", len(self._retained))
+
+    async def query(
+        self,
+        ticker: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int = 1000,
+    ) -> list[dict[str, Any]]:
+        """
+        記録済みの合議結果を新しい順に返す (キューに残っている分は含まない)
+
+        Args:
+            ticker: 銘柄 (記録時の表記と完全一致、None は全銘柄)
+            start / end: 期間 (両端含む。タイムゾーン無しは UTC とみなす)
+            limit: 最大件数
+
+        Returns:
+            [{"ts": ISO 8601, "ticker", "final_action", "confidence", "has_conflict",
+              "summary", "votes": [...]}]
+        """
+        rows = await asyncio.to_thread(
+            self.writer.query, ticker, _timestamp(start), _timestamp(end), limit
+        )
+        return [_output(row) for row in rows]
+
+
+def create_audit_log(settings: AuditSettings | None = None) -> AuditLog | None:
+    """
+    設定に応じた監査ログを生成
+
+    Returns:
+        AuditLog (AUDIT_BACKEND=none の場合は None)
+
+    Raises:
+        ValueError: 未知の AUDIT_BACKEND
+    """
+    settings = settings or AuditSettings()
+    backend = settings.audit_backend.lower()
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        writer: AuditWriter = SQLiteAuditWriter(settings.audit_sqlite_path)
+    elif backend == "parquet":
+        writer = ParquetAuditWriter(settings.audit_parquet_dir)
+    else:
+        raise ValueError(f"Unknown AUDIT_BACKEND '{settings.audit_backend}'")
+    return AuditLog(
+        writer,
+        queue_size=settings.audit_queue_size,
+        batch_size=settings.audit_batch_size,
+        flush_interval=settings.audit_flush_interval,
+        enqueue_timeout=settings.audit_enqueue_timeout,
+        spill_dir=settings.audit_spill_dir or None,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_audit_log() -> AuditLog | None:
+    """プロセス共通の監査ログ (環境変数から初回生成)"""
+    return create_audit_log()
+
+
+__all__ = [
+    "AUDIT_COLUMNS",
+    "AuditLog",
+    "AuditSettings",
+    "AuditWriter",
+    "ParquetAuditWriter",
+    "SQLiteAuditWriter",
+    "audit_record",
+    "create_audit_log",
+    "get_audit_log",
+]
@@ -0,0 +1,21 @@
+"""Cache backends shared across workers (memory / SQLite / Redis)."""
+
+from .backends import (
+    CacheBackend,
+    CacheSettings,
+    InMemoryCache,
+    RedisCache,
+    SQLiteCache,
+    create_cache,
+    get_cache,
+)
+
+__all__ = [
+    "CacheBackend",
+    "CacheSettings",
+    "InMemoryCache",
+    "RedisCache",
+    "SQLiteCache",
+    "create_cache",
+    "get_cache",
+]
@@ -0,0 +1,250 @@
+"""
+Cache backends for multi-worker deployments.
+
+uvicorn / gunicorn をマルチワーカーで動かすとプロセス内キャッシュはワーカーごとに
+分断されるため、同じインターフェースで次のバックエンドを切り替えられるようにします。
+
+    - memory: プロセス内 LRU (開発・テスト用、ワーカー間で共有されない)
+    - sqlite: 同一ホストのワーカー間で共有するローカルファイル (WAL モード)
+    - redis : Redis 互換サーバー (複数ホスト・複数コンテナで共有)
+
+値は JSON シリアライズ可能なものに限ります (プロセス間で共有するため)。
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from pydantic import ConfigDict, Field
+from pydantic_settings import BaseSettings
+
+
+class CacheSettings(BaseSettings):
+    """
+    キャッシュ設定
+
+    環境変数から読み込み:
+        CACHE_BACKEND: "memory" / "sqlite" / "redis"
+        CACHE_URL: Redis 接続 URL (例: redis://redis:6379/0)
+        CACHE_SQLITE_PATH: SQLite ファイルパス
+        CACHE_DEFAULT_TTL: 既定 TTL 秒数
+        CACHE_MAX_ENTRIES: memory バックエンドの最大エントリ数
+    """
+
+    cache_backend: str = Field("memory", alias="CACHE_BACKEND")
+    cache_url: str = Field("redis://localhost:6379/0", alias="CACHE_URL")
+    cache_sqlite_path: str = Field("./data/cache.sqlite3", alias="CACHE_SQLITE_PATH")
+    cache_default_ttl: float = Field(300.0, alias="CACHE_DEFAULT_TTL")
+    cache_max_entries: int = Field(4096, alias="CACHE_MAX_ENTRIES")
+
+    model_config = ConfigDict(env_file=None)
+
+
+class CacheBackend(ABC):
+    """キャッシュバックエンドの共通インターフェース (すべて非同期)"""
+
+    def __init__(self, default_ttl: float | None = None):
+        self.default_ttl = default_ttl
+
+    def _expires_at(self, ttl: float | None) -> float | None:
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.time() + ttl if ttl else None
+
+    @abstractmethod
+    async def get(self, key: str) -> Any | None:
+        """値を取得 (未登録・期限切れは None)"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        """値を保存 (ttl=None は既定 TTL、0 は無期限)"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """値を削除"""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """全エントリを削除"""
+
+    async def aclose(self) -> None:  # noqa: B027 - 解放するリソースが無いバックエンドは何もしない
+        """接続などのリソースを解放"""
+
+
+class InMemoryCache(CacheBackend):
+    """プロセス内 LRU キャッシュ (ワーカー間では共有されない)"""
+
+    def __init__(self, max_entries: int = 4096, default_ttl: float | None = None):
+        super().__init__(default_ttl)
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        self._data[key] = (value, self._expires_at(ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def clear(self) -> None:
+        self._data.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """
+    SQLite ファイルによるワーカー間共有キャッシュ
+
+    接続はスレッドごとに遅延生成するため、gunicorn の preload 後に fork しても
+    親プロセスの接続を共有しない。I/O は `asyncio.to_thread` でイベントループ外で行う。
+    """
+
+    def __init__(self, path: str | Path, default_ttl: float | None = None):
+        super().__init__(default_ttl)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key: str) -> Any | None:
+        row = (
+            self._conn()
+            .execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        return json.loads(value)
+
+    def _set(self, key: str, value: Any, expires_at: float | None) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), expires_at),
+        )
+
+    async def get(self, key: str) -> Any | None:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        await asyncio.to_thread(self._set, key, value, self._expires_at(ttl))
+
+    def _execute(self, sql: str, params: tuple = ()) -> None:
+        self._conn().execute(sql, params)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._execute, "DELETE FROM cache WHERE key = ?", (key,))
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._execute, "DELETE FROM cache")
+
+
+class RedisCache(CacheBackend):
+    """
+    Redis 互換サーバーによる共有キャッシュ
+
+    `redis` パッケージ (redis.asyncio) が必要。未インストールの場合は生成時に RuntimeError。
+    """
+
+    def __init__(self, url: str, default_ttl: float | None = None, prefix: str = "stock-magi:"):
+        super().__init__(default_ttl)
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError(
+                "CACHE_BACKEND=redis requires the 'redis' package (poetry install --extras server)"
+            ) from e
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+
+    async def get(self, key: str) -> Any | None:
+        raw = await self._client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        payload = json.dumps(value, ensure_ascii=False)
+        if ttl:
+            await self._client.set(self.prefix + key, payload, px=int(ttl * 1000))
+        else:
+            await self._client.set(self.prefix + key, payload)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self.prefix + key)
+
+    async def clear(self) -> None:
+        async for key in self._client.scan_iter(match=self.prefix + "*"):
+            await self._client.delete(key)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def create_cache(settings: CacheSettings | None = None) -> CacheBackend:
+    """
+    設定に応じたキャッシュバックエンドを生成
+
+    Raises:
+        ValueError: 未知の CACHE_BACKEND
+    """
+    settings = settings or CacheSettings()
+    backend = settings.cache_backend.lower()
+    ttl = settings.cache_default_ttl
+
+    if backend == "memory":
+        return InMemoryCache(max_entries=settings.cache_max_entries, default_ttl=ttl)
+    if backend == "sqlite":
+        return SQLiteCache(settings.cache_sqlite_path, default_ttl=ttl)
+    if backend == "redis":
+        return RedisCache(settings.cache_url, default_ttl=ttl)
+    raise ValueError(f"Unknown CACHE_BACKEND '{settings.cache_backend}'")
+
+
+@lru_cache(maxsize=1)
+def get_cache() -> CacheBackend:
+    """プロセス共通のキャッシュバックエンド (環境変数から初回生成)"""
+    return create_cache()
+
+
+__all__ = [
+    "CacheBackend",
+    "CacheSettings",
+    "InMemoryCache",
+    "RedisCache",
+    "SQLiteCache",
+    "create_cache",
+    "get_cache",
+]
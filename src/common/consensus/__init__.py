@@ -1,5 +1,12 @@
 """Consensus mechanisms package"""
 
 from src.common.consensus.orchestrators import ReusableConsensusOrchestrator, VotingStrategy
+from src.common.consensus.vote_parser import ParsedVote, parse_agent_output, vote_from_output
 
-__all__ = ["ReusableConsensusOrchestrator", "VotingStrategy"]
+__all__ = [
+    "ReusableConsensusOrchestrator",
+    "VotingStrategy",
+    "ParsedVote",
+    "parse_agent_output",
+    "vote_from_output",
+]
@@ -5,8 +5,11 @@ This orchestrator wraps Agent Framework's GroupChatOrchestrator to provide
 a domain-agnostic consensus mechanism for multi-agent systems.
 """
 
+from collections.abc import Awaitable, Callable
 from typing import Any
 
+from src.common.consensus.vote_parser import vote_from_output
+from src.common.data_gathering import RequestDataContext
 from src.common.models.decision_models import Action, AgentVote, FinalDecision
 
 
@@ -43,20 +46,26 @@ class ReusableConsensusOrchestrator:
         # from agent_framework import GroupChatOrchestrator
         # self.group_chat = GroupChatOrchestrator(agents=agents)
 
-    async def reach_consensus(self, input_context: dict[str, Any]) -> FinalDecision:
+    async def reach_consensus(
+        self,
+        input_context: dict[str, Any],
+        on_vote: Callable[[AgentVote], Awaitable[None]] | None = None,
+    ) -> FinalDecision:
         """
         マルチエージェント合議を実行し、最終決定を返す
 
         Args:
             input_context: 分析対象データ (例: {"ticker": "7203.T", "market_data": {...}})
+            on_vote: 各エージェントの投票が出るたびに呼ぶコールバック (途中経過の配信用)
 
         Returns:
             FinalDecision: 合議結果
 
         Phase 1 実装:
-            1. 各エージェントに独立して推論を依頼
-            2. 投票結果を集計
-            3. 多数決で最終アクションを決定
+            1. 全エージェントのデータ要件を 1 回ずつ同時に取得 (RequestDataContext で共有)
+            2. 各エージェントに独立して推論を依頼
+            3. 投票結果を集計
+            4. 多数決で最終アクションを決定
 
         Phase 2 拡張予定:
             - Agent Framework の GroupChat による自動ディスカッション
@@ -68,87 +77,20 @@ class ReusableConsensusOrchestrator:
 
         votes: list[AgentVote] = []
 
-        # 各エージェントから投票を収集
-        for idx, agent in enumerate(self.agents):
-            agent_name = getattr(agent, "name", "UnknownAgent")
-
-            # If caller already provided an analysis result for the first agent, use it
-            if idx == 0 and "analysis_result" in input_context:
-                provided = input_context.get("analysis_result")
-                if isinstance(provided, dict):
-                    action_str = provided.get("action")
-                    confidence = float(provided.get("confidence", 0.5))
-                    reasoning = provided.get("reasoning", "")
-                    try:
-                        action_enum = Action(action_str)
-                    except Exception:
-                        action_enum = (
-                            Action(action_str.upper())
-                            if isinstance(action_str, str)
-                            else Action.HOLD
-                        )
-                    votes.append(
-                        AgentVote(
-                            agent_name=agent_name,
-                            action=action_enum,
-                            confidence=confidence,
-                            reasoning=reasoning,
-                        )
-                    )
-                    continue
-
-            # If agent exposes async `analyze`, call it and parse the result
-            if hasattr(agent, "analyze"):
-                try:
-                    result = await agent.analyze(input_context.get("ticker", ""))
-                    # Expect result to be a dict like {"action": "BUY", "confidence": 0.8, "reasoning": "..."}
-                    action_str = result.get("action") if isinstance(result, dict) else None
-                    confidence = (
-                        float(result.get("confidence", 0.5)) if isinstance(result, dict) else 0.5
-                    )
-                    reasoning = result.get("reasoning", "") if isinstance(result, dict) else ""
-
-                    if isinstance(action_str, str):
-                        try:
-                            action_enum = Action(action_str)
-                        except Exception:
-                            # Upper-case mapping fallback
-                            action_enum = (
-                                Action(action_str.upper())
-                                if isinstance(action_str, str)
-                                else Action.HOLD
-                            )
-                    else:
-                        action_enum = Action.HOLD
-
-                    vote = AgentVote(
-                        agent_name=agent_name,
-                        action=action_enum,
-                        confidence=confidence,
-                        reasoning=reasoning,
-                    )
-                    votes.append(vote)
-                    continue
-                except Exception:
-                    # On agent error, append a neutral HOLD vote
-                    votes.append(
-                        AgentVote(
-                            agent_name=agent_name,
-                            action=Action.HOLD,
-                            confidence=0.0,
-                            reasoning="agent error",
-                        )
-                    )
-
-            # Fallback mock vote
-            votes.append(
-                AgentVote(
-                    agent_name=agent_name,
-                    action=Action.HOLD,
-                    confidence=0.5,
-                    reasoning="Phase 1 MVP - モック実装。",
-                )
-            )
+        with RequestDataContext.scope() as data_context:
+            # 同じ (ツール, 銘柄) の取得はエージェント間で 1 回にまとめ、全部を先に始めておく
+            # (分析済みの先頭エージェントの分は取得しない)
+            pending = self.agents
+            if isinstance(input_context.get("analysis_result"), dict):
+                pending = self.agents[1:]
+            data_context.prefetch(input_context.get("ticker", ""), pending)
+
+            # 各エージェントから投票を収集
+            for idx, agent in enumerate(self.agents):
+                vote = await self._collect_vote(idx, agent, input_context)
+                votes.append(vote)
+                if on_vote is not None:
+                    await on_vote(vote)
 
         # 多数決で最終アクションを決定
         final_action = self._calculate_majority_vote(votes)
@@ -164,6 +106,38 @@ class ReusableConsensusOrchestrator:
 
         return decision
 
+    async def _collect_vote(self, idx: int, agent: Any, input_context: dict[str, Any]) -> AgentVote:
+        """1 エージェントの投票を得る"""
+        agent_name = getattr(agent, "name", "UnknownAgent")
+
+        # If caller already provided an analysis result for the first agent, use it
+        if idx == 0 and isinstance(input_context.get("analysis_result"), dict):
+            return vote_from_output(agent_name, input_context["analysis_result"])
+
+        # If agent exposes async `analyze`, call it and parse the result
+        if hasattr(agent, "analyze"):
+            try:
+                result = await agent.analyze(input_context.get("ticker", ""))
+            except Exception:
+                # On agent error, return a neutral HOLD vote
+                return AgentVote(
+                    agent_name=agent_name,
+                    action=Action.HOLD,
+                    confidence=0.0,
+                    reasoning="agent error",
+                )
+
+            # dict / JSON / `Action: ... Confidence: ... Reasoning: ...` テキストを共通パーサーで解釈
+            return vote_from_output(agent_name, result)
+
+        # Fallback mock vote
+        return AgentVote(
+            agent_name=agent_name,
+            action=Action.HOLD,
+            confidence=0.5,
+            reasoning="Phase 1 MVP - モック実装。",
+        )
+
     def _calculate_majority_vote(self, votes: list[AgentVote]) -> Action:
         """
         多数決でアクションを決定
@@ -0,0 +1,180 @@
+"""
+Structured output parser for agent responses.
+
+エージェント (LLM / ヒューリスティック) の出力を投票に変換する単一のパーサー。
+`Action: / Confidence: / Reasoning:` 形式のテキストと JSON (dict) の両方を受け付け、
+事前コンパイル済み正規表現と辞書引きのみで解釈します (例外駆動のフォールバックなし)。
+"""
+
+import json
+import re
+from collections.abc import Mapping
+from typing import Any, NamedTuple
+
+from src.common.models.decision_models import Action, AgentVote
+
+# 表記揺れを含むアクション名 -> Action (大文字化した上で引く)
+_ACTION_LOOKUP: dict[str, Action] = {
+    "BUY": Action.BUY,
+    "STRONG_BUY": Action.BUY,
+    "STRONG BUY": Action.BUY,
+    "買い": Action.BUY,
+    "SELL": Action.SELL,
+    "STRONG_SELL": Action.SELL,
+    "STRONG SELL": Action.SELL,
+    "売り": Action.SELL,
+    "HOLD": Action.HOLD,
+    "NEUTRAL": Action.HOLD,
+    "保留": Action.HOLD,
+}
+
+# 行頭の装飾 (markdown の *, -, #, > など) を許容して `Key:` を検出する
+_FIELD_PATTERN = re.compile(
+    r"^[\s*_`>#-]*(action|confidence|reasoning)[\s*_`]*[:：]\s*", re.IGNORECASE | re.MULTILINE
+)
+_NUMBER_PATTERN = re.compile(r"[-+]?\d*\.?\d+")
+# "8/10" や "80 / 100" のような分数表記
+_FRACTION_PATTERN = re.compile(r"([-+]?\d*\.?\d+)\s*/\s*(\d*\.?\d+)")
+_ACTION_TOKEN_PATTERN = re.compile(
+    r"STRONG[_ ]BUY|STRONG[_ ]SELL|BUY|SELL|HOLD|NEUTRAL|買い|売り|保留", re.IGNORECASE
+)
+
+DEFAULT_CONFIDENCE = 0.5
+MIN_REASONING_LENGTH = 10
+
+
+class ParsedVote(NamedTuple):
+    """パース済みの投票内容"""
+
+    action: Action
+    confidence: float
+    reasoning: str
+
+
+def coerce_action(value: Any) -> Action:
+    """
+    任意の値を Action に変換する (不明な値は HOLD)
+
+    テキスト形式・dict のどちらの値も同じ規則で解釈する。完全一致しない文字列
+    (`"Buy."` や `"[SELL]"` など) は中のアクション名を探す。
+    """
+    if isinstance(value, Action):
+        return value
+    if not isinstance(value, str):
+        return Action.HOLD
+    action = _ACTION_LOOKUP.get(value.strip().upper())
+    if action is not None:
+        return action
+    token = _ACTION_TOKEN_PATTERN.search(value)
+    if token is None:
+        return Action.HOLD
+    return _ACTION_LOOKUP.get(token.group().upper(), Action.HOLD)
+
+
+def coerce_confidence(value: Any, default: float = DEFAULT_CONFIDENCE) -> float:
+    """
+    任意の値を 0.0-1.0 の信頼度に変換する
+
+    `"80%"` / `"80/100"` / `"8/10"` は分母で割る (いずれも 0.8)。単位の無い数値は
+    そのまま 0.0-1.0 に丸める (`85` も `1.5` も 1.0)。
+    """
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, int | float):
+        number = float(value)
+    elif isinstance(value, str):
+        fraction = _FRACTION_PATTERN.search(value)
+        if fraction is not None and float(fraction.group(2)) > 0:
+            number = float(fraction.group(1)) / float(fraction.group(2))
+        else:
+            match = _NUMBER_PATTERN.search(value)
+            if match is None:
+                return default
+            number = float(match.group())
+            if "%" in value:
+                number /= 100.0
+    else:
+        return default
+    return min(max(number, 0.0), 1.0)
+
+
+def _parse_text(text: str) -> ParsedVote:
+    fields: dict[str, str] = {}
+    matches = list(_FIELD_PATTERN.finditer(text))
+    for idx, match in enumerate(matches):
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(text)
+        key = match.group(1).lower()
+        if key not in fields:
+            fields[key] = text[match.end() : end]
+
+    reasoning = fields.get("reasoning", "").strip().rstrip("`").strip()
+    return ParsedVote(
+        coerce_action(fields.get("action")), coerce_confidence(fields.get("confidence")), reasoning
+    )
+
+
+def _parse_mapping(data: Mapping[str, Any]) -> ParsedVote:
+    reasoning = data.get("reasoning", "")
+    return ParsedVote(
+        coerce_action(data.get("action")),
+        coerce_confidence(data.get("confidence")),
+        reasoning if isinstance(reasoning, str) else str(reasoning),
+    )
+
+
+def parse_agent_output(raw: Any) -> ParsedVote:
+    """
+    エージェント出力を ParsedVote に変換する
+
+    Args:
+        raw: dict (例: {"action": "BUY", "confidence": 0.8, "reasoning": "..."}),
+            JSON 文字列、または `Action: / Confidence: / Reasoning:` 形式のテキスト
+
+    Returns:
+        ParsedVote (解釈できない項目は HOLD / 0.5 / 空文字)
+    """
+    if isinstance(raw, Mapping):
+        return _parse_mapping(raw)
+    if not isinstance(raw, str):
+        return ParsedVote(Action.HOLD, DEFAULT_CONFIDENCE, "")
+
+    stripped = raw.strip()
+    if stripped.startswith("{") and stripped.endswith("}"):
+        # JSON モードの応答のみここを通る (テキスト応答の通常経路では json を呼ばない)
+        try:
+            data = json.loads(stripped)
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, Mapping):
+            return _parse_mapping(data)
+    return _parse_text(raw)
+
+
+def vote_from_output(agent_name: str, raw: Any) -> AgentVote:
+    """
+    エージェント出力から AgentVote を生成する (短すぎる根拠にはエージェント名を補う)
+
+    dict 出力の `snapshot_id` (入力データのスナップショット) は投票に引き継ぐ。
+    """
+    action, confidence, reasoning = parse_agent_output(raw)
+    if len(reasoning) < MIN_REASONING_LENGTH:
+        reasoning = f"{agent_name}: {reasoning or 'no reasoning provided'}".ljust(
+            MIN_REASONING_LENGTH, "."
+        )
+    snapshot = raw.get("snapshot_id") if isinstance(raw, dict) else None
+    return AgentVote(
+        agent_name=agent_name,
+        action=action,
+        confidence=confidence,
+        reasoning=reasoning,
+        snapshot_id=snapshot if isinstance(snapshot, str) else None,
+    )
+
+
+__all__ = [
+    "ParsedVote",
+    "coerce_action",
+    "coerce_confidence",
+    "parse_agent_output",
+    "vote_from_output",
+]
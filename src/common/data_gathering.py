@@ -0,0 +1,412 @@
+"""
+Multi-tool data gathering.
+
+エージェントが必要とするデータ (データ要件) を宣言し、全ツールを同時に呼び出して 1 つの
+コンテキストにまとめます。エージェントのデータ取得にかかる時間は、ツールごとの時間の合計ではなく
+最も遅いツールの時間になります。
+
+    - tool: ツールレジストリのツール名 (Foundry HTTP ツール / MCP サーバー)
+    - method: 銘柄コードを渡して呼ぶツールのメソッド (既定: get_fundamentals)
+    - call: MCP サーバーのツール名。指定すると `tool.call(call, arguments)` で呼ぶ
+    - arguments: call に渡す引数。文字列中の "{ticker}" は銘柄コードに置き換える
+    - timeout: このソースの待ち時間 (秒)。None は DataGatherer の既定値
+    - required: true のソースが取得できなければ DataGatheringError とする
+
+ソースごとの失敗・タイムアウトは他のソースを止めず、`GatheredData.sources` に記録します。
+
+`RequestDataContext.scope()` の中では、同じ (ツール, 呼び出し, 銘柄) の取得を 1 回にまとめ、
+全エージェントに同じ結果を渡します。dict の結果はコピーせず `MappingProxyType` で包むため
+トップレベルは書き換えられませんが、入れ子の値は全エージェントで共有されるので書き換えないでください。
+"""
+
+import asyncio
+import inspect
+import json
+import time
+from collections.abc import Awaitable, Callable, Iterable, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import MappingProxyType
+from typing import Any, NamedTuple
+
+# ソースごとの既定の待ち時間 (秒)。Foundry HTTP ツールのクライアントタイムアウトと同じ
+DEFAULT_SOURCE_TIMEOUT = 10.0
+
+# データ自体の基準日として読むキー (先に見つかったもの)
+AS_OF_KEYS = ("as_of", "date", "Date", "updated_at", "timestamp")
+
+
+class DataGatheringError(Exception):
+    """required のソースが取得できなかった (取得できた分は result に残る)"""
+
+    def __init__(self, message: str, result: "GatheredData"):
+        super().__init__(message)
+        self.result = result
+
+
+class DataRequirement(NamedTuple):
+    """エージェントのデータ要件 (1 ソース分)"""
+
+    key: str
+    tool: str
+    method: str = "get_fundamentals"
+    call: str | None = None
+    arguments: dict[str, Any] = {}
+    timeout: float | None = None
+    required: bool = False
+
+
+class SourceStatus(NamedTuple):
+    """
+    ソースごとの取得結果のメタデータ
+
+    fetched_at は上流の取得が完了した時刻 (UNIX 秒)、elapsed は上流の取得にかかった秒数。
+    RequestDataContext で共有した取得では、各エージェントが待った時間ではなく共有の取得自体の値。
+    as_of はデータに含まれる基準日 (あれば)。
+    """
+
+    tool: str
+    ok: bool
+    fetched_at: float
+    elapsed: float
+    as_of: Any = None
+    error: str | None = None
+
+
+class Fetched(NamedTuple):
+    """1 ソースの取得結果と、上流の取得が完了した時刻 (UNIX 秒)・かかった秒数"""
+
+    value: Any
+    fetched_at: float
+    elapsed: float
+
+
+class GatheredData(NamedTuple):
+    """1 銘柄分の取得結果 (data は取得できたソースのみ)"""
+
+    ticker: str
+    data: dict[str, Any]
+    sources: dict[str, SourceStatus]
+
+    @property
+    def missing(self) -> list[str]:
+        """取得できなかったソースのキー"""
+        return [key for key, status in self.sources.items() if not status.ok]
+
+    @property
+    def complete(self) -> bool:
+        """全ソースを取得できたか"""
+        return not self.missing
+
+    def merged(self) -> dict[str, Any]:
+        """
+        dict のデータを 1 つにまとめる (同じキーは先に宣言したソースを優先)
+
+        例: morningstar の fair_value と yahoo-finance の price を 1 つの market_data にする。
+        """
+        merged: dict[str, Any] = {}
+        for value in self.data.values():
+            if isinstance(value, Mapping):
+                for name, item in value.items():
+                    merged.setdefault(name, item)
+        return merged
+
+    def freshness(self) -> dict[str, dict[str, Any]]:
+        """ソースごとのメタデータ (JSON に変換可能)"""
+        return {key: status._asdict() for key, status in self.sources.items()}
+
+    def context(self) -> dict[str, Any]:
+        """{"ticker": ..., <key>: <データ>, ..., "sources": {<key>: メタデータ}}"""
+        return {"ticker": self.ticker, **self.data, "sources": self.freshness()}
+
+
+def parse_requirements(entries: Iterable[dict[str, Any]]) -> tuple[DataRequirement, ...]:
+    """
+    JSON 相当の宣言 (config/agents.json の data) をデータ要件に変換する
+
+    Raises:
+        ValueError: key / tool が無い、または key が重複している
+    """
+    requirements: list[DataRequirement] = []
+    for entry in entries:
+        if "key" not in entry or "tool" not in entry:
+            raise ValueError(f"Data requirement needs 'key' and 'tool': {entry}")
+        if any(r.key == entry["key"] for r in requirements):
+            raise ValueError(f"Duplicate data requirement key '{entry['key']}'")
+        timeout = entry.get("timeout")
+        requirements.append(
+            DataRequirement(
+                key=entry["key"],
+                tool=entry["tool"],
+                method=entry.get("method", "get_fundamentals"),
+                call=entry.get("call"),
+                arguments=dict(entry.get("arguments", {})),
+                timeout=float(timeout) if timeout is not None else None,
+                required=bool(entry.get("required", False)),
+            )
+        )
+    return tuple(requirements)
+
+
+def _render(value: Any, ticker: str) -> Any:
+    """引数中の "{ticker}" を銘柄コードに置き換える"""
+    if isinstance(value, str):
+        return value.replace("{ticker}", ticker)
+    if isinstance(value, dict):
+        return {k: _render(v, ticker) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_render(v, ticker) for v in value]
+    return value
+
+
+def _readonly(value: Any) -> Any:
+    """dict のトップレベルを書き換え不可のビューにする (コピーしない。入れ子の値は共有のまま)"""
+    return MappingProxyType(value) if isinstance(value, dict) else value
+
+
+async def _timed(factory: Callable[[], Awaitable[Any]]) -> Fetched:
+    started = time.perf_counter()
+    value = _readonly(await factory())
+    return Fetched(value, time.time(), time.perf_counter() - started)
+
+
+# 実行中のリクエストのデータコンテキスト (RequestDataContext.scope() の中だけ設定される)
+_current_context: ContextVar["RequestDataContext | None"] = ContextVar(
+    "request_data_context", default=None
+)
+
+
+class RequestDataContext:
+    """
+    1 リクエスト (1 回の合議) の間、ソースの取得結果をエージェント間で共有する
+
+    同じキー (ツール, 呼び出し, 引数, 銘柄) の取得は最初の 1 回だけ上流を呼び、以降は同じ
+    タスクの結果 (同じオブジェクト) を返す。取得中の呼び出しにも相乗りする。
+
+    使用例:
+        >>> with RequestDataContext.scope() as data:
+        ...     data.prefetch("7203.T", agents)  # 全エージェントの要件を先に同時取得
+        ...     votes = [await agent.analyze("7203.T") for agent in agents]
+    """
+
+    def __init__(self) -> None:
+        self._tasks: dict[tuple[Any, ...], asyncio.Future[Fetched]] = {}
+        # 上流を実際に呼んだ回数
+        self.fetches = 0
+
+    @classmethod
+    def current(cls) -> "RequestDataContext | None":
+        """実行中のスコープのコンテキスト (スコープ外は None)"""
+        return _current_context.get()
+
+    @classmethod
+    @contextmanager
+    def scope(cls) -> Iterator["RequestDataContext"]:
+        """
+        データコンテキストのスコープ
+
+        既にスコープの中なら同じコンテキストを使う (外側のリクエストと共有する)。
+        スコープを抜けると、誰も待っていない取得中のタスクは取り消す。
+        """
+        existing = _current_context.get()
+        if existing is not None:
+            yield existing
+            return
+        context = cls()
+        token = _current_context.set(context)
+        try:
+            yield context
+        finally:
+            _current_context.reset(token)
+            context.close()
+
+    def _task(
+        self, key: tuple[Any, ...], factory: Callable[[], Awaitable[Any]]
+    ) -> "asyncio.Future[Fetched]":
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(_timed(factory))
+            # 誰も待たずに失敗した場合の "exception was never retrieved" を出さない
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._tasks[key] = task
+            self.fetches += 1
+        return task
+
+    async def fetch(self, key: tuple[Any, ...], factory: Callable[[], Awaitable[Any]]) -> Fetched:
+        """
+        キーの結果を取得する (初回のみ factory を呼ぶ)
+
+        待っている側がタイムアウトで取り消されても、共有のタスクは取り消さない。
+
+        Returns:
+            Fetched (fetched_at / elapsed は共有の取得が完了した時刻とかかった秒数)
+        """
+        return await asyncio.shield(self._task(key, factory))
+
+    def prefetch(self, ticker: str, agents: Iterable[Any]) -> int:
+        """
+        エージェントのデータ要件 (`data_requirements` / `data_gatherer`) の取得を全部始める
+
+        Returns:
+            新たに始めた取得の数 (重複・取得済みは数えない)
+        """
+        before = self.fetches
+        for agent in agents:
+            gatherer = getattr(agent, "data_gatherer", None)
+            if gatherer is None:
+                continue
+            for requirement in getattr(agent, "data_requirements", ()):
+                self._task(
+                    gatherer.source_key(requirement, ticker),
+                    lambda g=gatherer, r=requirement: g.call(r, ticker),
+                )
+        return self.fetches - before
+
+    def close(self) -> None:
+        """取得中のタスクを取り消す"""
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+
+
+def _as_of(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        for key in AS_OF_KEYS:
+            if value.get(key) is not None:
+                return value[key]
+    return None
+
+
+class DataGatherer:
+    """
+    データ要件のツール呼び出しを同時に実行してまとめる
+
+    使用例:
+        >>> gatherer = DataGatherer(get_tool_registry())
+        >>> gathered = await gatherer.gather("7203.T", get_agent_registry().spec("melchior").data)
+        >>> gathered.merged(), gathered.freshness()
+
+    Args:
+        tool_registry: `get_tool(name)` を持つツールの取得元 (例: `FoundryToolRegistry`)
+        timeout: timeout を指定していないソースの待ち時間 (秒)
+    """
+
+    def __init__(self, tool_registry: Any, timeout: float = DEFAULT_SOURCE_TIMEOUT):
+        self.tool_registry = tool_registry
+        self.timeout = timeout
+
+    @staticmethod
+    def source_key(requirement: DataRequirement, ticker: str) -> tuple[Any, ...]:
+        """RequestDataContext で取得をまとめるキー (ツール, 呼び出し, 引数, 銘柄)"""
+        call = requirement.call if requirement.call is not None else requirement.method
+        arguments = json.dumps(_render(requirement.arguments, ticker), sort_keys=True, default=str)
+        return (requirement.tool, call, arguments, ticker)
+
+    async def call(self, requirement: DataRequirement, ticker: str) -> Any:
+        """
+        ツールを呼び出す (タイムアウトなし・コンテキストを通さない)
+
+        同期メソッドのツールはスレッドで実行し、他のソースの取得を止めない。
+
+        Raises:
+            ValueError: 未対応のツール / メソッド
+        """
+        tool = self.tool_registry.get_tool(requirement.tool)
+        if requirement.call is not None:
+            return await tool.call(requirement.call, _render(requirement.arguments, ticker))
+        method = getattr(tool, requirement.method, None)
+        if method is None:
+            raise ValueError(f"Tool '{requirement.tool}' has no method '{requirement.method}'")
+        if inspect.iscoroutinefunction(method):
+            return await method(ticker)
+        return await asyncio.to_thread(method, ticker)
+
+    async def fetch(self, requirement: DataRequirement, ticker: str) -> Any:
+        """
+        1 ソースを取得する (タイムアウトなし)
+
+        RequestDataContext のスコープ内では、同じソースの取得をリクエスト内で 1 回にまとめる。
+
+        Returns:
+            取得結果 (dict はトップレベルを書き換え不可にしたビュー)
+        """
+        return (await self._fetch_timed(requirement, ticker)).value
+
+    async def _fetch_timed(self, requirement: DataRequirement, ticker: str) -> Fetched:
+        context = RequestDataContext.current()
+        if context is None:
+            return await _timed(lambda: self.call(requirement, ticker))
+        key = self.source_key(requirement, ticker)
+        return await context.fetch(key, lambda: self.call(requirement, ticker))
+
+    async def _fetch_one(
+        self, requirement: DataRequirement, ticker: str
+    ) -> tuple[Any, SourceStatus]:
+        started = time.perf_counter()
+        timeout = requirement.timeout if requirement.timeout is not None else self.timeout
+        try:
+            fetched = await asyncio.wait_for(self._fetch_timed(requirement, ticker), timeout)
+        except TimeoutError:
+            error = f"timed out after {timeout:g}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        else:
+            status = SourceStatus(
+                tool=requirement.tool,
+                ok=True,
+                fetched_at=fetched.fetched_at,
+                elapsed=fetched.elapsed,
+                as_of=_as_of(fetched.value),
+            )
+            return fetched.value, status
+        status = SourceStatus(
+            tool=requirement.tool,
+            ok=False,
+            fetched_at=time.time(),
+            elapsed=time.perf_counter() - started,
+            error=error,
+        )
+        return None, status
+
+    async def gather(self, ticker: str, requirements: Sequence[DataRequirement]) -> GatheredData:
+        """
+        全ソースを同時に取得する
+
+        Args:
+            ticker: 銘柄コード
+            requirements: データ要件
+
+        Returns:
+            GatheredData (失敗したソースは data に含めず、sources にエラーを記録)
+
+        Raises:
+            DataGatheringError: required のソースが取得できなかった (全ソースの完了後)
+        """
+        outcomes = await asyncio.gather(*(self._fetch_one(r, ticker) for r in requirements))
+        data: dict[str, Any] = {}
+        sources: dict[str, SourceStatus] = {}
+        for requirement, (value, status) in zip(requirements, outcomes, strict=True):
+            sources[requirement.key] = status
+            if status.ok:
+                data[requirement.key] = value
+        result = GatheredData(ticker=ticker, data=data, sources=sources)
+
+        failed = [r.key for r in requirements if r.required and not sources[r.key].ok]
+        if failed:
+            errors = "; ".join(f"{key}: {sources[key].error}" for key in failed)
+            raise DataGatheringError(f"Required data unavailable for {ticker} ({errors})", result)
+        return result
+
+
+__all__ = [
+    "AS_OF_KEYS",
+    "DEFAULT_SOURCE_TIMEOUT",
+    "DataGatherer",
+    "DataGatheringError",
+    "DataRequirement",
+    "Fetched",
+    "GatheredData",
+    "RequestDataContext",
+    "SourceStatus",
+    "parse_requirements",
+]
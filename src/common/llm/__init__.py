@@ -0,0 +1,5 @@
+"""LLM inference helpers (batching, local stand-in server)."""
+
+from .batch_inference import BatchedChatClient, BatchItemMissingError, MicroBatcher
+
+__all__ = ["BatchedChatClient", "BatchItemMissingError", "MicroBatcher"]
@@ -0,0 +1,222 @@
+"""
+Batched LLM inference for multi-item screening runs.
+
+ユニバーススクリーニングでは 1 銘柄 = 1 chat completion だとスループットが出ないため、
+保留中のプロンプトを最大バッチサイズ / 最大待ち時間でまとめて 1 リクエストにし、
+構造化 (JSON) 応答を項目ごとの結果に分割して返します。
+"""
+
+import asyncio
+import itertools
+import json
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import httpx
+
+from src.common.consensus.vote_parser import parse_agent_output
+from src.common.mcp.foundry_tool_registry import FoundryConfig
+
+BatchFn = Callable[[list[tuple[str, str]]], Awaitable[dict[str, Any]]]
+
+
+class BatchItemMissingError(RuntimeError):
+    """バッチ応答に特定項目の結果が含まれていなかった"""
+
+
+class MicroBatcher:
+    """
+    非同期マイクロバッチャー
+
+    `submit()` された (key, payload) を溜め込み、以下のどちらかでまとめて `batch_fn` を呼ぶ:
+        - 保留数が `max_batch_size` に達した
+        - 最初の保留から `max_wait_s` 秒経過した
+
+    同じ key が同時に保留されても取り違えないよう、`batch_fn` には送信ごとに一意な
+    `"<key>#<連番>"` を渡す。`batch_fn` はその ID をキーにした {id: result} を返すこと。
+    結果が欠けた項目の呼び出し元には `BatchItemMissingError` が送出される。
+    """
+
+    def __init__(self, batch_fn: BatchFn, max_batch_size: int = 16, max_wait_s: float = 0.05):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_s
+        self._pending: list[tuple[str, str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._inflight: set[asyncio.Task] = set()
+        self._ids = itertools.count()
+
+    async def submit(self, key: str, payload: str) -> Any:
+        """項目をキューに積み、バッチ実行後の結果を待つ"""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._pending.append((f"{key}#{next(self._ids)}", payload, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_s, self._flush)
+
+        return await future
+
+    async def drain(self) -> None:
+        """保留中の項目を即時送信し、実行中のバッチ完了を待つ"""
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, str, asyncio.Future]]) -> None:
+        try:
+            results = await self.batch_fn([(key, payload) for key, payload, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, _, future in batch:
+            if future.done():
+                continue
+            if key in results:
+                future.set_result(results[key])
+            else:
+                future.set_exception(BatchItemMissingError(f"no result for '{key}' in batch"))
+
+
+def build_batch_user_message(items: list[tuple[str, str]]) -> str:
+    """
+    複数項目のプロンプトを 1 つのユーザーメッセージにまとめる
+
+    各項目は `### id: <key>` 見出しで区切り、応答は JSON で項目ごとに返すよう指示する。
+    """
+    sections = [f"### id: {key}\n{prompt.strip()}" for key, prompt in items]
+    return (
+        "以下の各項目を個別に分析してください。各項目の出力形式の指示に代えて、"
+        '次の JSON 形式のみで回答してください: {"results": [{"id": "<id>", '
+        '"action": "BUY|SELL|HOLD", "confidence": 0.0-1.0, "reasoning": "<根拠>"}]}\n'
+        "すべての id について必ず 1 件ずつ結果を含めること。\n\n" + "\n\n".join(sections)
+    )
+
+
+def split_batch_results(content: str) -> dict[str, dict[str, Any]]:
+    """
+    バッチ応答 (JSON 文字列) を {id: {"action", "confidence", "reasoning"}} に分割する
+
+    Raises:
+        ValueError: JSON として解釈できない、または `results` 配列がない
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"batch response is not valid JSON: {e}") from e
+
+    results = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(results, list):
+        raise ValueError("batch response has no 'results' array")
+
+    split: dict[str, dict[str, Any]] = {}
+    for item in results:
+        if not isinstance(item, dict) or "id" not in item:
+            continue
+        action, confidence, reasoning = parse_agent_output(item)
+        split[str(item["id"])] = {
+            "action": action.value,
+            "confidence": confidence,
+            "reasoning": reasoning,
+        }
+    return split
+
+
+class BatchedChatClient:
+    """
+    Foundry (Azure OpenAI 互換) chat completions を複数項目まとめて呼ぶクライアント
+
+    使用例:
+        >>> client = BatchedChatClient(FoundryConfig(), system_message=MELCHIOR_SYSTEM_MESSAGE)
+        >>> result = await client.analyze("7203.T", prompt)
+        >>> await client.aclose()
+    """
+
+    def __init__(
+        self,
+        config: FoundryConfig,
+        system_message: str,
+        *,
+        max_batch_size: int = 16,
+        max_wait_s: float = 0.05,
+        http_client: httpx.AsyncClient | None = None,
+        timeout: float = 60.0,
+    ):
+        """
+        Args:
+            config: Foundry 接続設定
+            system_message: 全バッチ共通のシステムメッセージ
+            max_batch_size: 1 リクエストにまとめる最大項目数
+            max_wait_s: バッチが埋まるまで待つ最大秒数
+            http_client: 共有する httpx クライアント (None の場合は内部で生成)
+            timeout: 内部生成クライアントのタイムアウト秒数
+        """
+        self.config = config
+        self.system_message = system_message
+        self._owns_client = http_client is None
+        self._http = http_client or httpx.AsyncClient(timeout=timeout)
+        self._batcher = MicroBatcher(self._complete_batch, max_batch_size, max_wait_s)
+        self.requests_sent = 0
+
+    @property
+    def completions_url(self) -> str:
+        endpoint = self.config.foundry_endpoint.rstrip("/")
+        return (
+            f"{endpoint}/openai/deployments/{self.config.foundry_deployment}"
+            f"/chat/completions?api-version={self.config.foundry_api_version}"
+        )
+
+    async def analyze(self, key: str, prompt: str) -> dict[str, Any]:
+        """1 項目分のプロンプトを送信し、その項目の結果を返す (内部でバッチ化される)"""
+        return await self._batcher.submit(key, prompt)
+
+    async def _complete_batch(self, items: list[tuple[str, str]]) -> dict[str, dict[str, Any]]:
+        body = {
+            "messages": [
+                {"role": "system", "content": self.system_message},
+                {"role": "user", "content": build_batch_user_message(items)},
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0,
+        }
+        headers = {"api-key": self.config.foundry_api_key}
+
+        self.requests_sent += 1
+        resp = await self._http.post(self.completions_url, json=body, headers=headers)
+        resp.raise_for_status()
+        content = resp.json()["choices"][0]["message"]["content"]
+        return split_batch_results(content)
+
+    async def aclose(self) -> None:
+        """保留中のバッチを送信し、内部生成した HTTP クライアントを閉じる"""
+        await self._batcher.drain()
+        if self._owns_client:
+            await self._http.aclose()
+
+
+__all__ = [
+    "BatchedChatClient",
+    "BatchItemMissingError",
+    "MicroBatcher",
+    "build_batch_user_message",
+    "split_batch_results",
+]
@@ -0,0 +1,89 @@
+"""
+Local stand-in for the Foundry chat completions endpoint.
+
+テスト・ベンチマーク用のローカル代替サーバー。`BatchedChatClient` が送る
+バッチプロンプト (`### id: <key>` 区切り) を解釈し、決定論的な JSON 結果を返します。
+リクエスト単位の固定遅延・項目単位の遅延・同時処理数の上限 (デプロイメントの
+容量制限相当) を模擬できるため、バッチ化の効果をネットワークなしで計測できます。
+
+起動例:
+    python -m src.common.llm.stub_server  # http://127.0.0.1:8090
+"""
+
+import asyncio
+import json
+import os
+import re
+import zlib
+
+from fastapi import FastAPI, Request
+
+_ID_PATTERN = re.compile(r"^### id: (.+)$", re.MULTILINE)
+_ACTIONS = ("BUY", "SELL", "HOLD")
+
+
+def stub_action_for(key: str) -> str:
+    """key から決定論的にアクションを決める (テストで期待値を計算するため公開)"""
+    return _ACTIONS[zlib.crc32(key.encode()) % len(_ACTIONS)]
+
+
+def create_stub_app(
+    request_latency_s: float = 0.2,
+    per_item_latency_s: float = 0.005,
+    max_concurrency: int = 4,
+) -> FastAPI:
+    """
+    chat completions 互換のスタブアプリを作成
+
+    Args:
+        request_latency_s: 1 リクエストあたりの固定遅延 (接続・プリフィル相当)
+        per_item_latency_s: バッチ内 1 項目あたりの追加遅延 (生成トークン相当)
+        max_concurrency: 同時に処理するリクエスト数の上限 (超過分は待たされる)
+    """
+    app = FastAPI(title="LLM stand-in server")
+    app.state.requests = 0
+    capacity = asyncio.Semaphore(max_concurrency)
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat_completions(deployment: str, request: Request) -> dict:
+        body = await request.json()
+        user_content = "".join(
+            m.get("content", "") for m in body.get("messages", []) if m.get("role") == "user"
+        )
+        ids = [m.strip() for m in _ID_PATTERN.findall(user_content)] or ["single"]
+
+        app.state.requests += 1
+        async with capacity:
+            await asyncio.sleep(request_latency_s + per_item_latency_s * len(ids))
+
+        # アクションは送信ごとの連番 ("#<n>") を除いた key で決める
+        results = [
+            {
+                "id": key,
+                "action": stub_action_for(key.rpartition("#")[0] or key),
+                "confidence": 0.6,
+                "reasoning": f"stub analysis for {key}",
+            }
+            for key in ids
+        ]
+        return {
+            "model": deployment,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps({"results": results})},
+                    "finish_reason": "stop",
+                }
+            ],
+        }
+
+    return app
+
+
+app = create_stub_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=int(os.environ.get("PORT", 8090)))
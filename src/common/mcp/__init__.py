@@ -1,5 +1,14 @@
 """MCP (Model Context Protocol) package for tool integration."""
 
-from .foundry_tool_registry import FoundryConfig, FoundryToolRegistry
+from .foundry_tool_registry import FoundryConfig, FoundryToolRegistry, get_tool_registry
+from .server_pool import MCPError, MCPServerManager, MCPTool, get_mcp_server_manager
 
-__all__ = ["FoundryToolRegistry", "FoundryConfig"]
+__all__ = [
+    "FoundryToolRegistry",
+    "FoundryConfig",
+    "MCPError",
+    "MCPServerManager",
+    "MCPTool",
+    "get_mcp_server_manager",
+    "get_tool_registry",
+]
@@ -5,12 +5,29 @@ This module provides a unified interface to access tools from the Foundry Tool C
 making it reusable across different domains (stock analysis, real estate, medical diagnosis, etc.).
 """
 
-from typing import Any
+from collections.abc import Callable
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
 
-import httpx
 from pydantic import ConfigDict, Field
 from pydantic_settings import BaseSettings
 
+from src.common.agent_registry import get_agent_registry
+from src.common.cache import CacheBackend, get_cache
+from src.common.mcp.server_pool import MCPServerManager, MCPTool, get_mcp_server_manager
+
+if TYPE_CHECKING:
+    # httpx は初回 HTTP 呼び出し時に import する (アプリ起動時間の短縮)
+    import httpx
+
+# ファンダメンタルズは日中ほぼ変化しないため、既定で 1 時間キャッシュする
+FUNDAMENTALS_CACHE_TTL = 3600.0
+
+
+def fundamentals_cache_key(tool_name: str, ticker: str) -> str:
+    """ファンダメンタルズのキャッシュキー (ワーカー間で共有されるため形式を固定)"""
+    return f"fundamentals:{tool_name}:{ticker}"
+
 
 class FoundryConfig(BaseSettings):
     """
@@ -31,12 +48,70 @@ class FoundryConfig(BaseSettings):
     model_config = ConfigDict(env_file=None)
 
 
+class FoundryHTTPTool:
+    """
+    Foundry Tool Catalog の HTTP ツールクライアント
+
+    レジストリが接続プールを開いていれば (`FoundryToolRegistry.aopen()`) それを共有し、
+    開いていなければ呼び出しごとに一時的なクライアントを使う。
+    """
+
+    def __init__(
+        self,
+        config: FoundryConfig,
+        name: str,
+        cache: CacheBackend | None,
+        registry: "FoundryToolRegistry | None" = None,
+    ):
+        self.name = name
+        self.config = config
+        self.cache = cache
+        self.registry = registry
+
+    async def get_fundamentals(self, ticker: str) -> dict[str, Any]:
+        """Call the Foundry endpoint to get fundamentals for a ticker.
+
+        This is a thin wrapper around an HTTP call using configured env vars.
+        Responses are stored in the shared cache (if configured) so every worker
+        benefits from a single upstream call.
+        Tests may monkeypatch this method to return deterministic data.
+        """
+        cache_key = fundamentals_cache_key(self.name, ticker)
+        if self.cache is not None:
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        url = f"{self.config.foundry_endpoint.rstrip('/')}/tools/{self.name}/fundamentals/{ticker}"
+        headers = {"Authorization": f"Bearer {self.config.foundry_api_key}"}
+        shared = self.registry.http_client if self.registry is not None else None
+        if shared is not None:
+            resp = await shared.get(url, headers=headers)
+            resp.raise_for_status()
+            data = resp.json()
+        else:
+            import httpx
+
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                resp = await client.get(url, headers=headers)
+                resp.raise_for_status()
+                data = resp.json()
+
+        if self.cache is not None:
+            ttl = FUNDAMENTALS_CACHE_TTL
+            policy = self.registry.ttl_policy if self.registry is not None else None
+            if policy is not None:
+                ttl = policy(ticker, ttl)
+            await self.cache.set(cache_key, data, ttl=ttl)
+        return data
+
+
 class FoundryToolRegistry:
     """
     Microsoft Foundry Tool Catalog からツールを管理する汎用レジストリ
 
     Phase 1: Morningstar MCP Server (Foundry Tool Catalog から直接利用)
-    Phase 2: Yahoo Finance (npm MCP Server - カスタムアダプタ経由)
+    Phase 2: Yahoo Finance (npm MCP Server - `config/mcp_servers.json` のサーバープール経由)
     Phase 3: DuckDB, Azure Docs など
 
     使用例:
@@ -45,23 +120,66 @@ class FoundryToolRegistry:
         >>> tools = registry.get_tools_for_agent("Melchior")
     """
 
-    def __init__(self, config: FoundryConfig | None = None):
+    def __init__(
+        self,
+        config: FoundryConfig | None = None,
+        cache: CacheBackend | None = None,
+        mcp_servers: MCPServerManager | None = None,
+    ):
         """
         Initialize the Foundry Tool Registry
 
         Args:
             config: Foundry configuration. If None, loads from environment variables.
+            cache: ツール応答のキャッシュ (例: `get_cache()`)。None の場合はキャッシュしない。
+            mcp_servers: 常駐させる MCP サーバー (例: `get_mcp_server_manager()`)。
+                有効なサーバー名は `get_tool()` で `MCPTool` として取得できる。
         """
         # .envファイルを無視し、os.environのみ参照
         self.config = config or FoundryConfig()
+        self.cache = cache
+        self.mcp_servers = mcp_servers
         self._tool_cache: dict[str, Any] = {}
+        self._http: httpx.AsyncClient | None = None
+        # (ticker, 既定 TTL) -> TTL。決算発表日に合わせて期限を決める場合に設定する
+        self.ttl_policy: Callable[[str, float], float] | None = None
+
+    @property
+    def http_client(self) -> "httpx.AsyncClient | None":
+        """共有 HTTP 接続プール (`aopen()` 前は None)"""
+        return self._http
+
+    async def aopen(self, http_client: "httpx.AsyncClient | None" = None) -> None:
+        """
+        ツール間で共有する HTTP 接続プールを開き、MCP サーバーを起動する (起動時ウォームアップで呼ぶ)
+
+        Args:
+            http_client: 使用するクライアント (テスト用)。None の場合は keep-alive プールを生成。
+        """
+        if self._http is None:
+            import httpx
+
+            self._http = http_client or httpx.AsyncClient(
+                timeout=10.0,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        if self.mcp_servers is not None:
+            await self.mcp_servers.start()
+
+    async def aclose(self) -> None:
+        """共有 HTTP 接続プールを閉じ、MCP サーバーを停止する"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self.mcp_servers is not None:
+            await self.mcp_servers.aclose()
 
     def get_tool(self, tool_name: str) -> Any:
         """
         Foundry Tool Catalog からツールを取得
 
-        Phase 1 では Morningstar のみサポート。
-        Agent Framework が Foundry Portal で設定されたツールを自動的に利用可能にする。
+        Morningstar は Foundry Tool Catalog、それ以外は `config/mcp_servers.json` で
+        有効にした MCP サーバー (常駐プール経由の `MCPTool`)。
 
         Args:
             tool_name: ツール名 (例: "morningstar")
@@ -79,6 +197,11 @@ class FoundryToolRegistry:
         if tool_name in self._tool_cache:
             return self._tool_cache[tool_name]
 
+        if self.mcp_servers is not None and tool_name in self.mcp_servers.names():
+            tool_client = MCPTool(tool_name, self.mcp_servers.pool(tool_name))
+            self._tool_cache[tool_name] = tool_client
+            return tool_client
+
         # Phase 1: Placeholder implementation
         # Agent Framework が Foundry Portal の設定を自動的に読み込むため、
         # ここでは tool_name の検証のみ実施
@@ -88,25 +211,7 @@ class FoundryToolRegistry:
             raise ValueError(f"Tool '{tool_name}' not found")
 
         # Phase 2: Return an HTTP-backed Foundry tool client for integration.
-        class FoundryHTTPTool:
-            def __init__(self, config: FoundryConfig, name: str):
-                self.name = name
-                self.config = config
-
-            async def get_fundamentals(self, ticker: str) -> dict[str, Any]:
-                """Call the Foundry endpoint to get fundamentals for a ticker.
-
-                This is a thin wrapper around an HTTP call using configured env vars.
-                Tests may monkeypatch this method to return deterministic data.
-                """
-                url = f"{self.config.foundry_endpoint.rstrip('/')}/tools/{self.name}/fundamentals/{ticker}"
-                headers = {"Authorization": f"Bearer {self.config.foundry_api_key}"}
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    resp = await client.get(url, headers=headers)
-                    resp.raise_for_status()
-                    return resp.json()
-
-        tool_client = FoundryHTTPTool(self.config, tool_name)
+        tool_client = FoundryHTTPTool(self.config, tool_name, self.cache, registry=self)
         self._tool_cache[tool_name] = tool_client
         return tool_client
 
@@ -120,22 +225,10 @@ class FoundryToolRegistry:
         Returns:
             ツールリスト
 
-        Phase 1 MVP:
-            - Melchior: [morningstar]
-
-        Phase 2:
-            - Balthasar: [morningstar, yahoo-finance, azure-docs]
-            - Casper: [morningstar, yahoo-finance]
+        エージェントとツールの対応は `config/agents.json` (エージェントレジストリ) で宣言する。
+        宣言されていないエージェントは空リスト。
         """
-        # Phase 1: Melchior のみ
-        agent_tool_mapping = {
-            "Melchior": ["morningstar"],
-            # Phase 2 で追加:
-            # "Balthasar": ["morningstar", "yahoo-finance", "azure-docs"],
-            # "Casper": ["morningstar", "yahoo-finance"],
-        }
-
-        tool_names = agent_tool_mapping.get(agent_name, [])
+        tool_names = get_agent_registry().tool_names(agent_name)
         return [self.get_tool(name) for name in tool_names]
 
     def list_available_tools(self) -> list[str]:
@@ -145,8 +238,21 @@ class FoundryToolRegistry:
         Returns:
             ツール名リスト
         """
-        return ["morningstar"]  # Phase 1 MVP
+        mcp_tools = self.mcp_servers.names() if self.mcp_servers is not None else []
+        return ["morningstar", *mcp_tools]
+
+
+@lru_cache(maxsize=1)
+def get_tool_registry() -> FoundryToolRegistry:
+    """プロセス共通のツールレジストリ (共有キャッシュ・MCP サーバープール付き、初回呼び出し時に生成)"""
+    return FoundryToolRegistry(cache=get_cache(), mcp_servers=get_mcp_server_manager())
 
 
 # エクスポート
-__all__ = ["FoundryToolRegistry", "FoundryConfig"]
+__all__ = [
+    "FoundryToolRegistry",
+    "FoundryConfig",
+    "FoundryHTTPTool",
+    "fundamentals_cache_key",
+    "get_tool_registry",
+]
@@ -0,0 +1,709 @@
+"""
+MCP server pool for `config/mcp_servers.json`.
+
+`config/mcp_servers.json` で宣言した MCP サーバーを常駐させ、ツール呼び出しを使い回しの
+セッションで処理します (呼び出しごとに npx などでサーバーを起動すると数秒かかるため)。
+
+    - command: stdio サーバー。長寿命のサブプロセスとして起動し、改行区切りの JSON-RPC で通信する
+    - url: Streamable HTTP サーバー。セッション ID を保持して httpx で POST する
+    - サーバーごとに pool_size 個のセッションを持ち、呼び出しは処理中の少ないセッションへ振り分ける
+    - 1 セッション上で複数の呼び出しを同時に処理する (JSON-RPC の id で応答を対応付ける)
+    - 落ちたサーバーは次の呼び出し時に起動し直す (呼び出し中に落ちた場合は 1 回だけ再試行する)
+
+"_" で始まるキーと `"enabled": false` のサーバーは起動しません。
+MCP の Python SDK には依存せず、必要な範囲 (initialize / tools/list / tools/call) のみ実装しています。
+"""
+
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from pydantic import ConfigDict, Field
+from pydantic_settings import BaseSettings
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parents[3] / "config" / "mcp_servers.json"
+PROTOCOL_VERSION = "2024-11-05"
+CLIENT_INFO = {"name": "stock-magi", "version": "0.1.0"}
+# stdio の 1 メッセージ (1 行) の上限。ツール結果に大きな表が入ることがあるため既定の 64 KiB から広げる
+STDIO_LINE_LIMIT = 16 * 1024 * 1024
+
+
+class MCPError(RuntimeError):
+    """MCP サーバーがエラーを返した (JSON-RPC エラー / isError のツール結果)"""
+
+
+class MCPConnectionError(MCPError):
+    """MCP サーバーとの接続が切れた (プロセス終了・HTTP セッション失効など)"""
+
+
+class MCPSettings(BaseSettings):
+    """
+    MCP サーバープール設定
+
+    環境変数から読み込み:
+        MCP_SERVERS_CONFIG_PATH: サーバー宣言の JSON ファイルパス
+        MCP_POOL_SIZE: サーバーごとのセッション数 (宣言の pool_size が優先)
+        MCP_CALL_TIMEOUT: 1 回の呼び出しのタイムアウト秒数
+        MCP_START_TIMEOUT: 起動 (initialize 完了まで) のタイムアウト秒数
+    """
+
+    mcp_servers_config_path: str = Field(str(DEFAULT_CONFIG_PATH), alias="MCP_SERVERS_CONFIG_PATH")
+    mcp_pool_size: int = Field(2, alias="MCP_POOL_SIZE", ge=1)
+    mcp_call_timeout: float = Field(30.0, alias="MCP_CALL_TIMEOUT", gt=0)
+    mcp_start_timeout: float = Field(60.0, alias="MCP_START_TIMEOUT", gt=0)
+
+    model_config = ConfigDict(env_file=None)
+
+
+class MCPServerConfig(NamedTuple):
+    """MCP サーバーの宣言 (config/mcp_servers.json の 1 エントリ)"""
+
+    name: str
+    command: str | None = None
+    args: tuple[str, ...] = ()
+    env: dict[str, str] = {}
+    url: str | None = None
+    headers: dict[str, str] = {}
+    enabled: bool = True
+    pool_size: int | None = None
+    description: str = ""
+
+
+def load_server_configs(path: str | Path) -> dict[str, MCPServerConfig]:
+    """
+    サーバー宣言の JSON を読み込む
+
+    Raises:
+        ValueError: command と url のどちらも無いサーバーがある
+    """
+    raw = json.loads(Path(path).read_text(encoding="utf-8"))
+    servers = {}
+    for name, entry in raw.items():
+        if name.startswith("_"):
+            continue
+        if not entry.get("command") and not entry.get("url"):
+            raise ValueError(f"MCP server '{name}' needs either 'command' or 'url'")
+        servers[name] = MCPServerConfig(
+            name=name,
+            command=entry.get("command"),
+            args=tuple(entry.get("args", ())),
+            env=dict(entry.get("env", {})),
+            url=entry.get("url"),
+            headers=dict(entry.get("headers", {})),
+            enabled=bool(entry.get("enabled", True)),
+            pool_size=entry.get("pool_size"),
+            description=entry.get("description", ""),
+        )
+    return servers
+
+
+def _result(message: dict[str, Any]) -> Any:
+    """JSON-RPC 応答から result を取り出す (error なら MCPError)"""
+    error = message.get("error")
+    if error is not None:
+        raise MCPError(f"{error.get('code')}: {error.get('message')}")
+    return message.get("result", {})
+
+
+def tool_result_value(result: dict[str, Any]) -> Any:
+    """
+    tools/call の結果を値に変換する
+
+    structuredContent があればそれを、無ければ text コンテンツを連結して返す
+    (JSON として読めれば dict / list にする)。
+    """
+    if result.get("structuredContent") is not None:
+        return result["structuredContent"]
+    texts = [c.get("text", "") for c in result.get("content", []) if c.get("type") == "text"]
+    text = "\n".join(texts)
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+class MCPSession(ABC):
+    """
+    1 つの MCP サーバー接続 (initialize 済みのセッション)
+
+    Args:
+        config: サーバーの宣言
+        call_timeout: 呼び出しの既定タイムアウト秒数
+    """
+
+    def __init__(self, config: MCPServerConfig, call_timeout: float = 30.0):
+        self.config = config
+        self.call_timeout = call_timeout
+        self.server_info: dict[str, Any] = {}
+        self._ids = itertools.count(1)
+
+    @property
+    @abstractmethod
+    def alive(self) -> bool:
+        """呼び出しを受け付けられる状態か"""
+
+    @property
+    @abstractmethod
+    def in_flight(self) -> int:
+        """応答待ちの呼び出し数"""
+
+    @abstractmethod
+    async def _open(self) -> None:
+        """接続を開く (プロセス起動 / HTTP クライアント生成)"""
+
+    @abstractmethod
+    async def request(
+        self, method: str, params: dict[str, Any] | None = None, timeout: float | None = None
+    ) -> Any:
+        """
+        JSON-RPC リクエストを送り、result を返す
+
+        Raises:
+            MCPError: サーバーがエラーを返した
+            MCPConnectionError: 接続が切れた
+            TimeoutError: タイムアウト
+        """
+
+    @abstractmethod
+    async def notify(self, method: str, params: dict[str, Any] | None = None) -> None:
+        """JSON-RPC 通知を送る (応答なし)"""
+
+    @abstractmethod
+    async def aclose(self) -> None:
+        """接続を閉じる (プロセスは終了させる)"""
+
+    async def start(self, timeout: float = 60.0) -> None:
+        """接続を開いて initialize ハンドシェイクを行う"""
+        await self._open()
+        result = await self.request(
+            "initialize",
+            {"protocolVersion": PROTOCOL_VERSION, "capabilities": {}, "clientInfo": CLIENT_INFO},
+            timeout=timeout,
+        )
+        self.server_info = result.get("serverInfo", {})
+        await self.notify("notifications/initialized")
+
+
+class StdioSession(MCPSession):
+    """サブプロセスとして起動した stdio MCP サーバーとのセッション"""
+
+    def __init__(self, config: MCPServerConfig, call_timeout: float = 30.0):
+        super().__init__(config, call_timeout)
+        self._process: asyncio.subprocess.Process | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return (
+            self._process is not None
+            and self._process.returncode is None
+            and bool(self._tasks)
+            and not self._tasks[0].done()
+        )
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def _open(self) -> None:
+        env = {**os.environ, **self.config.env} if self.config.env else None
+        self._process = await asyncio.create_subprocess_exec(
+            self.config.command,
+            *self.config.args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+            limit=STDIO_LINE_LIMIT,
+        )
+        self._tasks = [
+            asyncio.create_task(self._read_loop()),
+            asyncio.create_task(self._drain_stderr()),
+        ]
+
+    async def _send(self, message: dict[str, Any]) -> None:
+        data = json.dumps(message, ensure_ascii=False).encode() + b"\n"
+        try:
+            async with self._write_lock:
+                self._process.stdin.write(data)
+                await self._process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise MCPConnectionError(f"MCP server '{self.config.name}' is not running") from e
+
+    async def request(
+        self, method: str, params: dict[str, Any] | None = None, timeout: float | None = None
+    ) -> Any:
+        if not self.alive:
+            raise MCPConnectionError(f"MCP server '{self.config.name}' is not running")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+            if params is not None:
+                message["params"] = params
+            await self._send(message)
+            return await asyncio.wait_for(future, timeout or self.call_timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def notify(self, method: str, params: dict[str, Any] | None = None) -> None:
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        await self._send(message)
+
+    async def _dispatch(self, message: dict[str, Any]) -> None:
+        if "id" in message and ("result" in message or "error" in message):
+            future = self._pending.get(message["id"])
+            if future is None or future.done():
+                return  # タイムアウト済みの呼び出しへの遅れた応答
+            try:
+                future.set_result(_result(message))
+            except MCPError as e:
+                future.set_exception(e)
+        elif "id" in message and "method" in message:
+            # サーバーからのリクエスト (ping のみ応答し、それ以外は未対応)
+            if message["method"] == "ping":
+                await self._send({"jsonrpc": "2.0", "id": message["id"], "result": {}})
+            else:
+                error = {"code": -32601, "message": f"Method not found: {message['method']}"}
+                await self._send({"jsonrpc": "2.0", "id": message["id"], "error": error})
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                line = await self._process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    logger.debug("MCP %s: non-JSON output: %r", self.config.name, line[:200])
+                    continue
+                if isinstance(message, dict):
+                    await self._dispatch(message)
+        except Exception as e:
+            logger.warning("MCP %s: reader stopped: %s", self.config.name, e)
+        finally:
+            error = MCPConnectionError(f"MCP server '{self.config.name}' exited")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+
+    async def _drain_stderr(self) -> None:
+        # パイプが詰まってサーバーが止まらないよう、stderr は読み捨ててログに流す
+        while line := await self._process.stderr.readline():
+            logger.debug("MCP %s: %s", self.config.name, line.decode(errors="replace").rstrip())
+
+    async def aclose(self) -> None:
+        process = self._process
+        if process is not None and process.returncode is None:
+            with contextlib.suppress(Exception):
+                process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), 2.0)
+            except TimeoutError:
+                process.terminate()
+                try:
+                    await asyncio.wait_for(process.wait(), 2.0)
+                except TimeoutError:
+                    process.kill()
+                    await process.wait()
+        for task in self._tasks:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+
+class HTTPSession(MCPSession):
+    """
+    Streamable HTTP の MCP サーバーとのセッション
+
+    Args:
+        http_client: 使用するクライアント (テスト用)。None の場合は keep-alive プールを生成。
+    """
+
+    def __init__(
+        self,
+        config: MCPServerConfig,
+        call_timeout: float = 30.0,
+        http_client: "httpx.AsyncClient | None" = None,
+    ):
+        super().__init__(config, call_timeout)
+        self._client = http_client
+        self._owns_client = http_client is None
+        self._session_id: str | None = None
+        self._in_flight = 0
+        self._closed = False
+
+    @property
+    def alive(self) -> bool:
+        return self._client is not None and not self._closed
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def _open(self) -> None:
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=10)
+            )
+
+    def _headers(self) -> dict[str, str]:
+        headers = {"Accept": "application/json, text/event-stream", **self.config.headers}
+        if self._session_id is not None:
+            headers["Mcp-Session-Id"] = self._session_id
+        return headers
+
+    async def _post(self, message: dict[str, Any], timeout: float) -> "httpx.Response":
+        import httpx
+
+        if not self.alive:
+            raise MCPConnectionError(f"MCP server '{self.config.name}' session is closed")
+        try:
+            response = await self._client.post(
+                self.config.url, json=message, headers=self._headers(), timeout=timeout
+            )
+        except httpx.TimeoutException as e:
+            raise TimeoutError(f"MCP server '{self.config.name}' timed out") from e
+        except httpx.TransportError as e:
+            raise MCPConnectionError(f"MCP server '{self.config.name}': {e}") from e
+        if response.status_code == 404 and self._session_id is not None:
+            # サーバー側でセッションが失効した (再起動など)。次の呼び出しで作り直す
+            self._closed = True
+            raise MCPConnectionError(f"MCP server '{self.config.name}' session expired")
+        if response.status_code >= 400:
+            raise MCPError(f"MCP server '{self.config.name}' returned HTTP {response.status_code}")
+        session_id = response.headers.get("mcp-session-id")
+        if session_id:
+            self._session_id = session_id
+        return response
+
+    @staticmethod
+    def _messages(response: "httpx.Response") -> list[dict[str, Any]]:
+        """応答本文 (JSON または SSE) の JSON-RPC メッセージ"""
+        if not response.headers.get("content-type", "").startswith("text/event-stream"):
+            body = response.json()
+            return body if isinstance(body, list) else [body]
+        messages, data = [], []
+        for line in [*response.text.splitlines(), ""]:
+            if line.startswith("data:"):
+                data.append(line[5:].strip())
+            elif not line and data:
+                messages.append(json.loads("\n".join(data)))
+                data = []
+        return messages
+
+    async def request(
+        self, method: str, params: dict[str, Any] | None = None, timeout: float | None = None
+    ) -> Any:
+        request_id = next(self._ids)
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        self._in_flight += 1
+        try:
+            response = await self._post(message, timeout or self.call_timeout)
+            for reply in self._messages(response):
+                if reply.get("id") == request_id:
+                    return _result(reply)
+        finally:
+            self._in_flight -= 1
+        raise MCPError(f"MCP server '{self.config.name}' sent no response to {method}")
+
+    async def notify(self, method: str, params: dict[str, Any] | None = None) -> None:
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        await self._post(message, self.call_timeout)
+
+    async def aclose(self) -> None:
+        if self._client is not None and self._session_id is not None and not self._closed:
+            with contextlib.suppress(Exception):
+                await self._client.delete(self.config.url, headers=self._headers(), timeout=2.0)
+        self._closed = True
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+
+
+class MCPServerPool:
+    """
+    1 つの MCP サーバーの常駐セッションのプール
+
+    Args:
+        config: サーバーの宣言
+        size: セッション数 (宣言の pool_size が優先)
+        call_timeout: 呼び出しのタイムアウト秒数
+        start_timeout: 起動のタイムアウト秒数
+    """
+
+    def __init__(
+        self,
+        config: MCPServerConfig,
+        size: int = 2,
+        call_timeout: float = 30.0,
+        start_timeout: float = 60.0,
+    ):
+        self.config = config
+        self.size = max(config.pool_size or size, 1)
+        self.call_timeout = call_timeout
+        self.start_timeout = start_timeout
+        self.calls = 0
+        self.restarts = 0
+        self._sessions: list[MCPSession | None] = [None] * self.size
+        self._locks = [asyncio.Lock() for _ in range(self.size)]
+        self._tools: list[dict[str, Any]] | None = None
+
+    def _new_session(self) -> MCPSession:
+        if self.config.url:
+            return HTTPSession(self.config, self.call_timeout)
+        return StdioSession(self.config, self.call_timeout)
+
+    async def _ensure(self, index: int) -> MCPSession:
+        """index 番目のセッションを返す (未起動・停止済みなら起動する)"""
+        session = self._sessions[index]
+        if session is not None and session.alive:
+            return session
+        async with self._locks[index]:
+            session = self._sessions[index]
+            if session is not None and session.alive:
+                return session
+            if session is not None:
+                self.restarts += 1
+                logger.warning("MCP %s: session %d is down, restarting", self.config.name, index)
+                await session.aclose()
+                self._sessions[index] = None
+            session = self._new_session()
+            try:
+                await session.start(self.start_timeout)
+            except BaseException:
+                await session.aclose()
+                raise
+            self._sessions[index] = session
+            return session
+
+    async def start(self) -> None:
+        """全セッションを起動する (起動時のウォームアップ用)"""
+        await asyncio.gather(*(self._ensure(i) for i in range(self.size)))
+
+    async def _acquire(self) -> MCPSession:
+        """処理中の呼び出しが最も少ないセッション (全て埋まっていれば未起動の枠を起動)"""
+        live = [(s.in_flight, i) for i, s in enumerate(self._sessions) if s is not None and s.alive]
+        if live and (min(live)[0] == 0 or len(live) == self.size):
+            return self._sessions[min(live)[1]]
+        index = next(i for i, s in enumerate(self._sessions) if s is None or not s.alive)
+        return await self._ensure(index)
+
+    async def request(self, method: str, params: dict[str, Any] | None = None) -> Any:
+        """
+        JSON-RPC リクエストをプールのセッションで実行する
+
+        呼び出し中にサーバーが落ちた場合は、起動し直したセッションで 1 回だけ再試行する。
+        """
+        session = await self._acquire()
+        try:
+            return await session.request(method, params)
+        except MCPConnectionError:
+            logger.warning("MCP %s: connection lost during %s, retrying", self.config.name, method)
+        session = await self._acquire()
+        return await session.request(method, params)
+
+    async def call_tool(self, name: str, arguments: dict[str, Any] | None = None) -> dict[str, Any]:
+        """
+        ツールを呼び出して tools/call の結果を返す
+
+        Raises:
+            MCPError: サーバーのエラー / ツールがエラー (isError) を返した
+        """
+        self.calls += 1
+        result = await self.request("tools/call", {"name": name, "arguments": arguments or {}})
+        if result.get("isError"):
+            raise MCPError(
+                f"MCP tool '{self.config.name}/{name}' failed: {tool_result_value(result)}"
+            )
+        return result
+
+    async def list_tools(self) -> list[dict[str, Any]]:
+        """サーバーが提供するツールの一覧 (初回のみ問い合わせる)"""
+        if self._tools is None:
+            tools, cursor = [], None
+            while True:
+                result = await self.request("tools/list", {"cursor": cursor} if cursor else None)
+                tools.extend(result.get("tools", []))
+                cursor = result.get("nextCursor")
+                if not cursor:
+                    break
+            self._tools = tools
+        return self._tools
+
+    def stats(self) -> dict[str, Any]:
+        """{"sessions": 稼働中のセッション数, "in_flight": 処理中, "calls": 累計, "restarts": 再起動回数}"""
+        live = [s for s in self._sessions if s is not None and s.alive]
+        return {
+            "sessions": len(live),
+            "in_flight": sum(s.in_flight for s in live),
+            "calls": self.calls,
+            "restarts": self.restarts,
+        }
+
+    async def aclose(self) -> None:
+        """全セッションを閉じる"""
+        sessions = [s for s in self._sessions if s is not None]
+        self._sessions = [None] * self.size
+        await asyncio.gather(*(s.aclose() for s in sessions), return_exceptions=True)
+
+
+class MCPTool:
+    """
+    FoundryToolRegistry から返す MCP サーバーのツールクライアント
+
+    使用例:
+        >>> tool = get_tool_registry().get_tool("yahoo-finance")
+        >>> quote = await tool.call("get_quote", {"symbol": "7203.T"})
+    """
+
+    def __init__(self, name: str, pool: MCPServerPool):
+        self.name = name
+        self.pool = pool
+
+    async def list_tools(self) -> list[dict[str, Any]]:
+        """サーバーが提供するツールの一覧"""
+        return await self.pool.list_tools()
+
+    async def call(self, tool_name: str, arguments: dict[str, Any] | None = None) -> Any:
+        """ツールを呼び出して結果の値 (`tool_result_value`) を返す"""
+        return tool_result_value(await self.pool.call_tool(tool_name, arguments))
+
+
+class MCPServerManager:
+    """
+    宣言された MCP サーバーのプールを管理する
+
+    プールは初回利用時に作り、`start()` で有効な全サーバーを起動しておける。
+
+    Args:
+        servers: サーバー名 -> 宣言
+        pool_size / call_timeout / start_timeout: `MCPServerPool` の既定値
+    """
+
+    def __init__(
+        self,
+        servers: dict[str, MCPServerConfig],
+        pool_size: int = 2,
+        call_timeout: float = 30.0,
+        start_timeout: float = 60.0,
+    ):
+        self.servers = servers
+        self.pool_size = pool_size
+        self.call_timeout = call_timeout
+        self.start_timeout = start_timeout
+        self._pools: dict[str, MCPServerPool] = {}
+
+    def names(self) -> list[str]:
+        """有効なサーバー名"""
+        return [name for name, config in self.servers.items() if config.enabled]
+
+    def pool(self, name: str) -> MCPServerPool:
+        """
+        サーバーのプールを取得 (初回のみ生成。セッションは呼び出し時に起動)
+
+        Raises:
+            ValueError: 宣言されていない / 無効化されたサーバー
+        """
+        if name not in self._pools:
+            config = self.servers.get(name)
+            if config is None or not config.enabled:
+                raise ValueError(f"MCP server '{name}' not found or disabled")
+            self._pools[name] = MCPServerPool(
+                config, self.pool_size, self.call_timeout, self.start_timeout
+            )
+        return self._pools[name]
+
+    async def start(self) -> dict[str, str]:
+        """
+        有効な全サーバーを起動する
+
+        Returns:
+            起動に失敗したサーバー名 -> エラー内容 (失敗しても他のサーバーは起動する)
+        """
+        names = self.names()
+        results = await asyncio.gather(
+            *(self.pool(name).start() for name in names), return_exceptions=True
+        )
+        errors = {}
+        for name, result in zip(names, results, strict=True):
+            if isinstance(result, BaseException):
+                logger.warning("MCP %s: failed to start: %s", name, result)
+                errors[name] = str(result) or type(result).__name__
+        return errors
+
+    async def call_tool(
+        self, server: str, tool: str, arguments: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        """`server` のツールを呼び出す (`MCPServerPool.call_tool`)"""
+        return await self.pool(server).call_tool(tool, arguments)
+
+    async def aclose(self) -> None:
+        """全サーバーを停止する"""
+        pools, self._pools = list(self._pools.values()), {}
+        await asyncio.gather(*(pool.aclose() for pool in pools))
+
+
+def create_mcp_server_manager(settings: MCPSettings | None = None) -> MCPServerManager:
+    """
+    設定ファイルから MCP サーバーマネージャーを生成 (ファイルが無ければサーバー無し)
+
+    Raises:
+        ValueError: 宣言が不正
+    """
+    settings = settings or MCPSettings()
+    path = Path(settings.mcp_servers_config_path)
+    servers = load_server_configs(path) if path.exists() else {}
+    return MCPServerManager(
+        servers,
+        pool_size=settings.mcp_pool_size,
+        call_timeout=settings.mcp_call_timeout,
+        start_timeout=settings.mcp_start_timeout,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_mcp_server_manager() -> MCPServerManager:
+    """プロセス共通の MCP サーバーマネージャー (初回呼び出し時に設定ファイルから生成)"""
+    return create_mcp_server_manager()
+
+
+__all__ = [
+    "HTTPSession",
+    "MCPConnectionError",
+    "MCPError",
+    "MCPServerConfig",
+    "MCPServerManager",
+    "MCPServerPool",
+    "MCPSession",
+    "MCPSettings",
+    "MCPTool",
+    "StdioSession",
+    "create_mcp_server_manager",
+    "get_mcp_server_manager",
+    "load_server_configs",
+    "tool_result_value",
+]
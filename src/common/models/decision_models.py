@@ -33,11 +33,13 @@ class AgentVote(BaseModel):
         action: 推奨アクション
         confidence: 信頼度 (0.0-1.0)
         reasoning: 判断理由
+        snapshot_id: 判断に使った入力データのスナップショット ID (保存した場合のみ)
     """
     agent_name: str = Field(..., description="エージェント名")
     action: Action = Field(..., description="推奨アクション")
     confidence: float = Field(..., ge=0.0, le=1.0, description="信頼度 (0.0-1.0)")
     reasoning: str = Field(..., min_length=10, description="判断理由 (最低10文字)")
+    snapshot_id: str | None = Field(default=None, description="入力データのスナップショット ID")
 
     @field_validator('confidence')
     @classmethod
@@ -0,0 +1,368 @@
+"""
+Token-bucket rate limiter for upstream API quotas.
+
+上流 API (J-Quants など) のリクエスト上限に合わせてリクエストを平準化します。
+上限を超えそうなリクエストは失敗させずに順番待ち (FIFO) させるため、
+並列度を上げても 429 を受けずにクォータいっぱいまで使い切れます。
+
+    - TokenBucket        : プロセス内 (スレッド・タスク間で共有)
+    - SQLiteTokenBucket  : 同一ホストの複数プロセス (uvicorn / gunicorn ワーカー) で共有
+    - EndpointRateLimiter: 全体の上限 + エンドポイント別の上限をまとめて適用
+
+バケットは「予約」方式: `reserve()` が先にトークンを差し引き (不足分は負の残高 = 借り)、
+呼び出し側は返された秒数だけ待ってからリクエストする。待機者はポーリングせずに
+到着順の時刻に割り当てられるため、プロセスをまたいでも FIFO になる。
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from functools import lru_cache
+from pathlib import Path
+
+from pydantic import ConfigDict, Field
+from pydantic_settings import BaseSettings
+
+# 浮動小数点の丸め誤差で極小の待機を繰り返さないための許容誤差
+_EPSILON = 1e-9
+
+_UNIT_SECONDS = {
+    "s": 1.0,
+    "sec": 1.0,
+    "second": 1.0,
+    "m": 60.0,
+    "min": 60.0,
+    "minute": 60.0,
+    "h": 3600.0,
+    "hour": 3600.0,
+}
+
+
+class RateLimitExceeded(RuntimeError):
+    """待機時間が上限 (max_wait) を超えるため予約しなかった"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limit: retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class RateLimitSettings(BaseSettings):
+    """
+    レートリミット設定
+
+    環境変数から読み込み:
+        RATE_LIMIT_BACKEND: "memory" (プロセス内) / "sqlite" (ホスト内のプロセス間で共有)
+        RATE_LIMIT_SQLITE_PATH: SQLite ファイルパス
+        RATE_LIMIT_DEFAULT: 全リクエスト合計の上限 (例: "60/min"、"@" の後はバースト数)
+        RATE_LIMIT_ENDPOINTS: エンドポイント別の上限 (例: "daily_quotes=30/min,statements=10/min@2")
+        RATE_LIMIT_MAX_WAIT: 1 リクエストの最大待機秒数 (超える場合は RateLimitExceeded)
+    """
+
+    rate_limit_backend: str = Field("memory", alias="RATE_LIMIT_BACKEND")
+    rate_limit_sqlite_path: str = Field("./data/ratelimit.sqlite3", alias="RATE_LIMIT_SQLITE_PATH")
+    rate_limit_default: str = Field("60/min", alias="RATE_LIMIT_DEFAULT")
+    rate_limit_endpoints: str = Field("", alias="RATE_LIMIT_ENDPOINTS")
+    rate_limit_max_wait: float = Field(60.0, alias="RATE_LIMIT_MAX_WAIT")
+
+    model_config = ConfigDict(env_file=None)
+
+    @property
+    def endpoints(self) -> dict[str, str]:
+        pairs = (item.split("=", 1) for item in self.rate_limit_endpoints.split(",") if "=" in item)
+        return {name.strip(): spec.strip() for name, spec in pairs}
+
+
+def parse_rate(spec: str) -> tuple[float, float]:
+    """
+    "N/unit[@burst]" 形式を (トークン/秒, 容量) に変換
+
+    例: "60/min" -> (1.0, 1.0), "120/min@10" -> (2.0, 10.0), "5/s" -> (5.0, 5.0)
+
+    Raises:
+        ValueError: 形式が不正
+    """
+    try:
+        rate_part, _, burst_part = spec.strip().partition("@")
+        count, _, unit = rate_part.partition("/")
+        rate = float(count) / _UNIT_SECONDS[unit.strip().lower() or "s"]
+        capacity = float(burst_part) if burst_part else max(rate, 1.0)
+    except (KeyError, ValueError) as e:
+        raise ValueError(
+            f"Invalid rate spec '{spec}' (expected e.g. '60/min' or '120/min@10')"
+        ) from e
+    if rate <= 0 or capacity <= 0:
+        raise ValueError(f"Invalid rate spec '{spec}' (rate and burst must be positive)")
+    return rate, capacity
+
+
+class RateLimiter(ABC):
+    """予約方式のレートリミッターの共通インターフェース"""
+
+    def __init__(
+        self,
+        max_wait: float | None = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.max_wait = max_wait
+        self._sleep = sleep
+
+    @abstractmethod
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        トークンを予約し、リクエストまでに待つべき秒数を返す (ブロックしない)
+
+        Raises:
+            RateLimitExceeded: 待機が max_wait を超える (この場合は予約しない)
+        """
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """トークンを予約して必要なだけ待機する (非同期)。待機した秒数を返す"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await self._sleep(delay)
+        return delay
+
+    def acquire_sync(self, tokens: float = 1.0) -> float:
+        """`acquire` の同期版 (スレッドプールで動く同期ハンドラ・クライアント用)"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def _check_wait(self, delay: float) -> None:
+        if self.max_wait is not None and delay > self.max_wait:
+            raise RateLimitExceeded(delay)
+
+
+def _reserve(
+    tokens_now: float, updated: float, now: float, rate: float, capacity: float, tokens: float
+) -> tuple[float, float]:
+    """補充後の残高から tokens を差し引き、(新しい残高, 待機秒数) を返す"""
+    available = min(capacity, tokens_now + max(now - updated, 0.0) * rate)
+    remaining = available - tokens
+    delay = -remaining / rate if remaining < -_EPSILON else 0.0
+    return remaining, delay
+
+
+class TokenBucket(RateLimiter):
+    """
+    プロセス内トークンバケット (スレッドセーフ)
+
+    `rate` トークン/秒で補充され、最大 `capacity` トークンまで貯まる。
+
+    使用例:
+        >>> bucket = TokenBucket(rate=2.0, capacity=5)   # 毎秒 2 リクエスト、バースト 5
+        >>> await bucket.acquire()
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        max_wait: float | None = None,
+    ):
+        """
+        Args:
+            rate: 1 秒あたりの補充トークン数 (> 0)
+            capacity: バケット容量 (バースト上限)。None の場合は max(rate, 1)
+            clock: 単調増加時計 (テスト用)
+            sleep: 待機関数 (テスト用)
+            max_wait: 最大待機秒数 (None は無制限)
+
+        Raises:
+            ValueError: rate または capacity が正でない
+        """
+        super().__init__(max_wait, sleep)
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        if self.capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        if tokens > self.capacity:
+            raise ValueError(f"cannot acquire {tokens} tokens (capacity {self.capacity})")
+        with self._lock:
+            now = self._clock()
+            remaining, delay = _reserve(
+                self._tokens, self._updated, now, self.rate, self.capacity, tokens
+            )
+            self._check_wait(delay)
+            self._tokens, self._updated = remaining, now
+        return delay
+
+
+class SQLiteTokenBucket(RateLimiter):
+    """
+    SQLite ファイルで状態を共有するトークンバケット (同一ホストのプロセス間で共有)
+
+    予約は `BEGIN IMMEDIATE` のトランザクション内で行うため、複数ワーカーが同時に
+    予約しても合計レートは上限を超えない。時刻はプロセス間で比較できる壁時計を使う。
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        key: str,
+        rate: float,
+        capacity: float | None = None,
+        max_wait: float | None = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        super().__init__(max_wait, sleep)
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._clock = clock
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        if tokens > self.capacity:
+            raise ValueError(f"cannot acquire {tokens} tokens (capacity {self.capacity})")
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = self._clock()
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (self.key,)
+            ).fetchone()
+            current, updated = row if row else (self.capacity, now)
+            remaining, delay = _reserve(current, updated, now, self.rate, self.capacity, tokens)
+            self._check_wait(delay)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (self.key, remaining, now),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return delay
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        # ロック待ちでイベントループを止めないよう予約はスレッドで行う
+        delay = await asyncio.to_thread(self.reserve, tokens)
+        if delay > 0:
+            await self._sleep(delay)
+        return delay
+
+
+class _EndpointView:
+    """
+    エンドポイント別の上限と全体の上限を順に適用するリミッター
+
+    全体の上限は最後 (エンドポイント側の待機の後) に予約する。先に全体のトークンを
+    予約してからエンドポイント側で待つと、その間に割り当てられた後続の送信時刻と
+    重なり、全体の上限を超えてしまうため。
+    """
+
+    def __init__(self, limiters: list[RateLimiter]):
+        self.limiters = limiters
+
+    async def acquire(self) -> float:
+        waited = 0.0
+        for limiter in self.limiters:
+            waited += await limiter.acquire()
+        return waited
+
+    def acquire_sync(self) -> float:
+        return sum(limiter.acquire_sync() for limiter in self.limiters)
+
+
+class EndpointRateLimiter:
+    """
+    全リクエスト共通の上限 + エンドポイント別の上限
+
+    使用例:
+        >>> limiter = create_rate_limiter()
+        >>> await limiter.bucket("daily_quotes").acquire()
+        >>> limiter.bucket("statements").acquire_sync()
+    """
+
+    def __init__(
+        self,
+        global_limiter: RateLimiter | None,
+        endpoint_limiters: dict[str, RateLimiter] | None = None,
+    ):
+        self.global_limiter = global_limiter
+        self.endpoint_limiters = endpoint_limiters or {}
+
+    def bucket(self, endpoint: str | None = None) -> _EndpointView:
+        limiters = [self.endpoint_limiters[endpoint]] if endpoint in self.endpoint_limiters else []
+        if self.global_limiter is not None:
+            limiters.append(self.global_limiter)
+        return _EndpointView(limiters)
+
+
+def create_rate_limiter(settings: RateLimitSettings | None = None) -> EndpointRateLimiter:
+    """
+    設定に応じたレートリミッターを生成
+
+    Raises:
+        ValueError: 未知の RATE_LIMIT_BACKEND または不正なレート指定
+    """
+    settings = settings or RateLimitSettings()
+    backend = settings.rate_limit_backend.lower()
+    max_wait = settings.rate_limit_max_wait
+
+    def build(key: str, spec: str) -> RateLimiter:
+        rate, capacity = parse_rate(spec)
+        if backend == "memory":
+            return TokenBucket(rate, capacity, max_wait=max_wait)
+        if backend == "sqlite":
+            return SQLiteTokenBucket(
+                settings.rate_limit_sqlite_path, key, rate, capacity, max_wait=max_wait
+            )
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{settings.rate_limit_backend}'")
+
+    global_limiter = (
+        build("*", settings.rate_limit_default) if settings.rate_limit_default else None
+    )
+    endpoint_limiters = {name: build(name, spec) for name, spec in settings.endpoints.items()}
+    return EndpointRateLimiter(global_limiter, endpoint_limiters)
+
+
+@lru_cache(maxsize=1)
+def get_rate_limiter() -> EndpointRateLimiter:
+    """プロセス共通のレートリミッター (環境変数から初回生成)"""
+    return create_rate_limiter()
+
+
+__all__ = [
+    "EndpointRateLimiter",
+    "RateLimitExceeded",
+    "RateLimitSettings",
+    "RateLimiter",
+    "SQLiteTokenBucket",
+    "TokenBucket",
+    "create_rate_limiter",
+    "get_rate_limiter",
+    "parse_rate",
+]
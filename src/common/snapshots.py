@@ -0,0 +1,280 @@
+"""
+Content-addressed snapshot store for agent input data.
+
+エージェントが判定に使った入力 (`market_data` など) をそのまま保存し、判定の再現や
+バックテストの検証に使えるようにします。
+
+    - スナップショット ID は正規化した JSON (キー順・区切りを固定) の SHA-256
+    - 本文は zlib で圧縮して保存し、同じ内容は 1 回しか書かない (追記のみ・上書きなし)
+    - 直近に書いた ID はプロセス内で覚えておき、同じ入力が続く間はストアにアクセスしない
+
+    - sqlite: 同一ホストのワーカー間で共有するローカルファイル (WAL モード、既定)
+    - memory: プロセス内 (開発・テスト用。件数に上限があり、ワーカー間で共有されない)
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from pydantic import ConfigDict, Field
+from pydantic_settings import BaseSettings
+
+
+class SnapshotSettings(BaseSettings):
+    """
+    スナップショットストア設定
+
+    環境変数から読み込み:
+        SNAPSHOT_BACKEND: "sqlite" / "memory" / "none" (保存しない)
+        SNAPSHOT_SQLITE_PATH: SQLite ファイルパス
+        SNAPSHOT_COMPRESS_LEVEL: zlib の圧縮レベル (1-9)
+        SNAPSHOT_MEMORY_MAX_ENTRIES: memory で保持する件数 (超えたら古いものから消す)
+    """
+
+    snapshot_backend: str = Field("sqlite", alias="SNAPSHOT_BACKEND")
+    snapshot_sqlite_path: str = Field("./data/snapshots.sqlite3", alias="SNAPSHOT_SQLITE_PATH")
+    snapshot_compress_level: int = Field(6, alias="SNAPSHOT_COMPRESS_LEVEL", ge=1, le=9)
+    snapshot_memory_max_entries: int = Field(10_000, alias="SNAPSHOT_MEMORY_MAX_ENTRIES", ge=1)
+
+    model_config = ConfigDict(env_file=None)
+
+
+def canonical_json(payload: Any) -> bytes:
+    """キー順と区切り文字を固定した JSON (同じ内容なら常に同じバイト列)"""
+    return json.dumps(
+        payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str
+    ).encode()
+
+
+def snapshot_id(payload: Any) -> str:
+    """スナップショット ID (正規化 JSON の SHA-256、16 進 64 文字)"""
+    return hashlib.sha256(canonical_json(payload)).hexdigest()
+
+
+class SnapshotStore(ABC):
+    """
+    スナップショットストアの共通インターフェース (put / get は非同期)
+
+    Args:
+        compress_level: zlib の圧縮レベル
+        known_ids: 書き込み済みとして覚えておく ID の数 (重複書き込みの省略用)
+    """
+
+    def __init__(self, compress_level: int = 6, known_ids: int = 4096):
+        self.compress_level = compress_level
+        self._known: OrderedDict[str, None] = OrderedDict()
+        self._known_max = known_ids
+        self._lock = threading.Lock()
+
+    def _is_known(self, key: str) -> bool:
+        """このプロセスで書き込み済みの ID か"""
+        with self._lock:
+            if key in self._known:
+                self._known.move_to_end(key)
+                return True
+            return False
+
+    def _remember(self, key: str) -> None:
+        with self._lock:
+            self._known[key] = None
+            if len(self._known) > self._known_max:
+                self._known.popitem(last=False)
+
+    @abstractmethod
+    def _insert(self, key: str, data: bytes, size: int) -> None:
+        """圧縮済みの本文を保存する (同じ ID が既にあれば何もしない)"""
+
+    @abstractmethod
+    def _select(self, key: str) -> bytes | None:
+        """圧縮済みの本文を返す (無ければ None)"""
+
+    @abstractmethod
+    def stats(self) -> dict[str, int]:
+        """{"count": 件数, "raw_bytes": 圧縮前の合計, "stored_bytes": 圧縮後の合計}"""
+
+    def put_sync(self, payload: Any) -> str:
+        """
+        スナップショットを保存して ID を返す (同じ内容は再保存しない)
+
+        Raises:
+            TypeError: JSON に変換できない値を含む
+        """
+        raw = canonical_json(payload)
+        key = hashlib.sha256(raw).hexdigest()
+        if not self._is_known(key):
+            self._insert(key, zlib.compress(raw, self.compress_level), len(raw))
+            self._remember(key)
+        return key
+
+    def get_sync(self, key: str) -> Any | None:
+        """ID からスナップショットを復元する (無ければ None)"""
+        data = self._select(key)
+        return None if data is None else json.loads(zlib.decompress(data))
+
+    @abstractmethod
+    async def put(self, payload: Any) -> str:
+        """`put_sync` の非同期版"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Any | None:
+        """`get_sync` の非同期版"""
+
+
+class InMemorySnapshotStore(SnapshotStore):
+    """
+    プロセス内のスナップショットストア (開発・テスト用、ワーカー間で共有されない)
+
+    max_entries 件を超えたら古いものから消す (消えた ID の取得は None)。
+
+    Args:
+        max_entries: 保持する件数
+    """
+
+    def __init__(self, compress_level: int = 6, known_ids: int = 4096, max_entries: int = 10_000):
+        super().__init__(compress_level, known_ids)
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[bytes, int]] = OrderedDict()
+
+    def _insert(self, key: str, data: bytes, size: int) -> None:
+        with self._lock:
+            if key in self._data:
+                return
+            self._data[key] = (data, size)
+            while len(self._data) > self.max_entries:
+                evicted, _ = self._data.popitem(last=False)
+                self._known.pop(evicted, None)
+
+    def _select(self, key: str) -> bytes | None:
+        entry = self._data.get(key)
+        return None if entry is None else entry[0]
+
+    def stats(self) -> dict[str, int]:
+        entries = list(self._data.values())
+        return {
+            "count": len(entries),
+            "raw_bytes": sum(size for _, size in entries),
+            "stored_bytes": sum(len(data) for data, _ in entries),
+        }
+
+    async def put(self, payload: Any) -> str:
+        return self.put_sync(payload)
+
+    async def get(self, key: str) -> Any | None:
+        return self.get_sync(key)
+
+
+class SQLiteSnapshotStore(SnapshotStore):
+    """
+    SQLite ファイルによるワーカー間共有のスナップショットストア
+
+    `INSERT OR IGNORE` で追記するため、複数ワーカーが同じ内容を同時に保存しても 1 行になる。
+    接続はスレッドごとに遅延生成し、I/O は `asyncio.to_thread` でイベントループ外で行う。
+    """
+
+    def __init__(self, path: str | Path, compress_level: int = 6, known_ids: int = 4096):
+        super().__init__(compress_level, known_ids)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "id TEXT PRIMARY KEY, created_at REAL NOT NULL, size INTEGER NOT NULL, "
+                "data BLOB NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _insert(self, key: str, data: bytes, size: int) -> None:
+        self._conn().execute(
+            "INSERT OR IGNORE INTO snapshots (id, created_at, size, data) VALUES (?, ?, ?, ?)",
+            (key, time.time(), size, data),
+        )
+
+    def _select(self, key: str) -> bytes | None:
+        row = self._conn().execute("SELECT data FROM snapshots WHERE id = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def stats(self) -> dict[str, int]:
+        count, raw, stored = (
+            self._conn()
+            .execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) "
+                "FROM snapshots"
+            )
+            .fetchone()
+        )
+        return {"count": count, "raw_bytes": raw, "stored_bytes": stored}
+
+    async def put(self, payload: Any) -> str:
+        raw = canonical_json(payload)
+        key = hashlib.sha256(raw).hexdigest()
+        # 既知の ID はスレッドに渡さずに返す (高頻度の同一入力でストアにアクセスしない)
+        if self._is_known(key):
+            return key
+        data = zlib.compress(raw, self.compress_level)
+        await asyncio.to_thread(self._insert, key, data, len(raw))
+        self._remember(key)
+        return key
+
+    async def get(self, key: str) -> Any | None:
+        data = await asyncio.to_thread(self._select, key)
+        return None if data is None else json.loads(zlib.decompress(data))
+
+
+def create_snapshot_store(settings: SnapshotSettings | None = None) -> SnapshotStore | None:
+    """
+    設定に応じたスナップショットストアを生成
+
+    Returns:
+        SnapshotStore (SNAPSHOT_BACKEND=none の場合は None)
+
+    Raises:
+        ValueError: 未知の SNAPSHOT_BACKEND
+    """
+    settings = settings or SnapshotSettings()
+    backend = settings.snapshot_backend.lower()
+    level = settings.snapshot_compress_level
+
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return InMemorySnapshotStore(
+            compress_level=level, max_entries=settings.snapshot_memory_max_entries
+        )
+    if backend == "sqlite":
+        return SQLiteSnapshotStore(settings.snapshot_sqlite_path, compress_level=level)
+    raise ValueError(f"Unknown SNAPSHOT_BACKEND '{settings.snapshot_backend}'")
+
+
+@lru_cache(maxsize=1)
+def get_snapshot_store() -> SnapshotStore | None:
+    """プロセス共通のスナップショットストア (環境変数から初回生成)"""
+    return create_snapshot_store()
+
+
+__all__ = [
+    "InMemorySnapshotStore",
+    "SQLiteSnapshotStore",
+    "SnapshotSettings",
+    "SnapshotStore",
+    "canonical_json",
+    "create_snapshot_store",
+    "get_snapshot_store",
+    "snapshot_id",
+]
@@ -4,13 +4,20 @@ Stock MAGI System - FastAPI Application
 Microsoft Agent Framework + Foundry を使用した株式分析 API
 """
 
+import asyncio
+import contextlib
 import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from src.common.audit import get_audit_log
+from src.common.mcp import get_tool_registry
+from src.stock_magi.announcements import start_announcement_invalidation
 from src.stock_magi.api import router
+from src.stock_magi.mcp_server import router as mcp_router
+from src.stock_magi.warmup import ReadinessState, run_warmup
 
 # ロギング設定
 logging.basicConfig(
@@ -25,8 +32,10 @@ async def lifespan(app: FastAPI):
     """
     FastAPI lifespan イベント
 
-    起動時: ロギング、初期化処理
-    終了時: クリーンアップ処理
+    起動時: ロギング、ウォームアップ (バックグラウンド実行、完了後に /api/ready が 200)、
+            決算発表予定によるキャッシュ失効 (ANNOUNCEMENT_INVALIDATION=true の場合)、
+            監査ログの書き込みタスク
+    終了時: クリーンアップ処理 (監査ログの残りを書き込み、接続プールをクローズ)
     """
     logger.info("🚀 Stock MAGI System starting...")
     logger.info("📊 Phase 1 MVP - Melchior agent + Morningstar tool")
@@ -35,9 +44,26 @@ async def lifespan(app: FastAPI):
     # - DevUI 起動 (visual debugging)
     # - Foundry 接続確認
 
+    # /api/health は即応答させつつ、ウォームアップ完了まで /api/ready は 503 を返す
+    app.state.readiness = ReadinessState()
+    warmup_task = asyncio.create_task(run_warmup(app.state.readiness))
+    announcement_task = start_announcement_invalidation()
+    audit = get_audit_log()
+    if audit is not None:
+        audit.start()
+
     yield
 
     logger.info("🛑 Stock MAGI System shutting down...")
+    for task in (warmup_task, announcement_task):
+        if task is not None and not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    if audit is not None:
+        await audit.close()
+    if get_tool_registry.cache_info().currsize:
+        await get_tool_registry().aclose()
 
 
 # FastAPI アプリケーション
@@ -61,6 +87,8 @@ app.add_middleware(
 
 # ルーター登録
 app.include_router(router)
+# MCP (Streamable HTTP): API と同じプロセスのキャッシュ・接続プールを共有する
+app.include_router(mcp_router)
 
 
 # ルートエンドポイント
@@ -78,7 +106,12 @@ async def root():
         "description": "MAGI システム inspired 株式分析 API",
         "endpoints": {
             "analyze": "POST /api/analyze",
+            "agents": "GET /api/agents",
+            "snapshot": "GET /api/snapshots/{snapshot_id}",
+            "audit": "GET /api/audit",
+            "mcp": "POST /mcp",
             "health": "GET /api/health",
+            "ready": "GET /api/ready",
             "docs": "GET /docs"
         },
         "phase": "Phase 1 - Melchior agent + Morningstar tool (Foundry Tool Catalog)",
@@ -87,6 +120,7 @@ async def root():
 
 
 if __name__ == "__main__":
+    # 開発用ランナー (単一プロセス + reload)。本番は `python -m src.server` を使用する。
     import uvicorn
 
     uvicorn.run(
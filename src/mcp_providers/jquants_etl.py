@@ -0,0 +1,349 @@
+"""
+J-Quants 夜間 ETL
+
+    python -m src.mcp_providers.jquants_etl --start 2024-01-01 --end 2024-01-31
+    python -m src.mcp_providers.jquants_etl --datasets prices,statements --plan standard
+
+株価・財務・投資部門別売買・信用残・空売り・決算発表予定の各エンドポイントを
+並列に取得し、`ParquetStore` に日付パーティションとして保存します。
+
+- 全リクエストは 1 つのトークンバケットを共有し、契約プランのレート上限に収める
+  (RATE_LIMIT_BACKEND=sqlite なら jquants_mcp のワーカーとも上限を共有し、
+  RATE_LIMIT_ENDPOINTS のエンドポイント別上限も適用される)
+- 既存パーティションはスキップするため、クラッシュ後は同じコマンドで続きから再開できる
+- 直近の日 (`--empty-final-days` 日以内) の 0 件の応答は未公開の可能性があるため保存しない
+  (取得済みとして記録せず、次回の実行で取り直す)。古い日の 0 件は祝日として空パーティションを保存する
+- 終了時にエンドポイント別のスループット (行数・ページ数・行/秒) を表示する
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections.abc import AsyncIterator, Callable
+from datetime import date, timedelta
+from typing import Any, NamedTuple
+
+from src.common.rate_limit import EndpointRateLimiter, RateLimitSettings, create_rate_limiter
+from src.mcp_providers.jquants_store import ParquetStore
+
+logger = logging.getLogger(__name__)
+
+# 契約プラン別のリクエスト上限 (リクエスト/分)。契約内容に合わせて --rate-per-min で上書きする
+PLAN_RATE_LIMITS: dict[str, float] = {
+    "free": 5.0,
+    "light": 60.0,
+    "standard": 120.0,
+    "premium": 500.0,
+}
+
+# 0 件の応答を確定 (祝日など) とみなすまでの日数。これより新しい日の 0 件は保存しない
+DEFAULT_EMPTY_FINAL_DAYS = 7
+
+# 契約プラン別のデータ提供の遅延 (日)。Free プランは 12 週間遅れ
+PLAN_DATA_DELAY_DAYS: dict[str, int] = {"free": 84}
+
+# (エンドポイントキー, クエリ) -> ページごとのレコード
+PageFetcher = Callable[[str, dict[str, Any]], AsyncIterator[list[dict]]]
+
+
+def _yyyymmdd(day: date) -> str:
+    return day.strftime("%Y%m%d")
+
+
+def _by_date(day: date) -> dict[str, Any]:
+    return {"date": _yyyymmdd(day)}
+
+
+def _by_range(day: date) -> dict[str, Any]:
+    return {"from": _yyyymmdd(day), "to": _yyyymmdd(day)}
+
+
+def _by_disclosed_date(day: date) -> dict[str, Any]:
+    return {"disclosed_date": _yyyymmdd(day)}
+
+
+def _no_params(day: date) -> dict[str, Any]:
+    return {}
+
+
+class EtlDataset(NamedTuple):
+    """
+    ETL 対象データセット
+
+    Attributes:
+        endpoint: `sample.pagination.ENDPOINTS` のキー
+        params: パーティション日付からクエリを作る関数
+        snapshot: True の場合は期間最終日のみ取得 (日付指定のできないエンドポイント)
+    """
+
+    endpoint: str
+    params: Callable[[date], dict[str, Any]]
+    snapshot: bool = False
+
+
+ETL_DATASETS: dict[str, EtlDataset] = {
+    "prices": EtlDataset("daily_quotes", _by_date),
+    "statements": EtlDataset("statements", _by_date),
+    "trades_spec": EtlDataset("trades_spec", _by_range),
+    "weekly_margin_interest": EtlDataset("weekly_margin_interest", _by_date),
+    "short_selling": EtlDataset("short_selling", _by_date),
+    "short_selling_positions": EtlDataset("short_selling_positions", _by_disclosed_date),
+    "announcement": EtlDataset("announcement", _no_params, snapshot=True),
+}
+
+
+class EndpointStats:
+    """データセット別の取得実績"""
+
+    def __init__(self, dataset: str):
+        self.dataset = dataset
+        self.partitions = 0
+        self.skipped = 0
+        self.failed = 0
+        # 直近の日で 0 件だったため保存しなかったパーティション
+        self.deferred = 0
+        self.rows = 0
+        self.pages = 0
+        self.busy_seconds = 0.0
+        self.errors: list[str] = []
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.busy_seconds if self.busy_seconds else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "dataset": self.dataset,
+            "partitions": self.partitions,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "deferred": self.deferred,
+            "rows": self.rows,
+            "pages": self.pages,
+            "seconds": round(self.busy_seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "errors": self.errors[:5],
+        }
+
+
+def business_days(start: date, end: date) -> list[date]:
+    """start〜end (両端含む) の平日 (祝日は空パーティションとして保存される)"""
+    days = []
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def plan_jobs(datasets: list[str], days: list[date]) -> list[tuple[str, date]]:
+    """(データセット, 日付) のジョブ一覧。日付順に各データセットを交互に並べる"""
+    jobs = []
+    for day in days:
+        for name in datasets:
+            if ETL_DATASETS[name].snapshot and day != days[-1]:
+                continue
+            jobs.append((name, day))
+    return jobs
+
+
+async def _run_job(
+    fetch: PageFetcher,
+    store: ParquetStore,
+    name: str,
+    day: date,
+    stats: EndpointStats,
+    final_until: date,
+) -> None:
+    spec = ETL_DATASETS[name]
+    started = time.perf_counter()
+    records: list[dict] = []
+    pages = 0
+    try:
+        async for batch in fetch(spec.endpoint, spec.params(day)):
+            records.extend(batch)
+            pages += 1
+        if not records and day > final_until:
+            # 未公開・配信遅延の可能性があるため取得済みにしない (次回の実行で取り直す)
+            stats.deferred += 1
+            stats.pages += pages
+            logger.info("ETL %s %s returned no rows yet; not marking as fetched", name, day)
+            return
+        rows = await asyncio.to_thread(store.write_partition, name, day, records)
+    except Exception as e:
+        stats.failed += 1
+        stats.errors.append(f"{day.isoformat()}: {e}")
+        logger.warning("ETL %s %s failed: %s", name, day, e)
+        return
+    finally:
+        stats.busy_seconds += time.perf_counter() - started
+    stats.partitions += 1
+    stats.rows += rows
+    stats.pages += pages
+
+
+async def run_etl(
+    fetch: PageFetcher,
+    store: ParquetStore,
+    datasets: list[str],
+    days: list[date],
+    concurrency: int = 4,
+    empty_final_days: int = DEFAULT_EMPTY_FINAL_DAYS,
+    today: date | None = None,
+) -> dict[str, EndpointStats]:
+    """
+    データセット × 日付のパーティションを並列に取得して保存
+
+    Args:
+        fetch: ページ取得関数 (レートリミットは fetch 側で適用する)
+        store: 保存先
+        datasets: `ETL_DATASETS` のキー
+        days: パーティション日付 (昇順)
+        concurrency: 同時に取得するパーティション数
+        empty_final_days: 0 件の応答を確定とみなすまでの日数 (これより新しい日の 0 件は保存しない)
+        today: 基準日 (None は今日)
+
+    Returns:
+        データセット別の実績
+    """
+    unknown = [name for name in datasets if name not in ETL_DATASETS]
+    if unknown:
+        raise ValueError(f"Unknown datasets: {unknown}")
+
+    stats = {name: EndpointStats(name) for name in datasets}
+    final_until = (today or date.today()) - timedelta(days=max(empty_final_days, 0))
+    queue: asyncio.Queue[tuple[str, date]] = asyncio.Queue()
+    for name, day in plan_jobs(datasets, days):
+        if store.has_partition(name, day):
+            stats[name].skipped += 1
+        else:
+            queue.put_nowait((name, day))
+
+    async def worker() -> None:
+        while True:
+            try:
+                name, day = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await _run_job(fetch, store, name, day, stats[name], final_until)
+
+    await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+    return stats
+
+
+def plan_rate_limiter(rate_per_min: float, burst: int = 1) -> EndpointRateLimiter:
+    """契約プランのレートを全体上限とするリミッター (バックエンド・エンドポイント別上限は環境変数)"""
+    settings = RateLimitSettings().model_copy(
+        update={"rate_limit_default": f"{rate_per_min}/min@{max(burst, 1)}"}
+    )
+    return create_rate_limiter(settings)
+
+
+def client_fetcher(client: Any, http_client: Any, limiter: EndpointRateLimiter) -> PageFetcher:
+    """`JQuantsAPIClient.aiter_records` を共有 HTTP プールとレートリミッター付きで使う fetch"""
+
+    def fetch(endpoint: str, params: dict[str, Any]) -> AsyncIterator[list[dict]]:
+        return client.aiter_records(
+            endpoint, params, http_client=http_client, limiter=limiter.bucket(endpoint)
+        )
+
+    return fetch
+
+
+def _print_stats(stats: dict[str, EndpointStats], elapsed: float) -> None:
+    print(
+        f"{'dataset':<26}{'parts':>7}{'skip':>6}{'fail':>6}{'defer':>7}"
+        f"{'rows':>10}{'pages':>7}{'rows/s':>10}"
+    )
+    for s in stats.values():
+        print(
+            f"{s.dataset:<26}{s.partitions:>7}{s.skipped:>6}{s.failed:>6}{s.deferred:>7}"
+            f"{s.rows:>10}{s.pages:>7}{s.rows_per_second:>10.1f}"
+        )
+    total_rows = sum(s.rows for s in stats.values())
+    print(f"total: {total_rows} rows in {elapsed:.1f}s")
+
+
+async def _main_async(args: argparse.Namespace) -> int:
+    import httpx
+
+    from sample.client import JQuantsAPIClient
+
+    rate_per_min = args.rate_per_min or PLAN_RATE_LIMITS[args.plan]
+    limiter = plan_rate_limiter(rate_per_min, burst=args.concurrency)
+    store = ParquetStore(args.root)
+    datasets = [d.strip() for d in args.datasets.split(",") if d.strip()]
+    days = business_days(args.start, args.end)
+    empty_final_days = args.empty_final_days
+    if empty_final_days is None:
+        empty_final_days = DEFAULT_EMPTY_FINAL_DAYS + PLAN_DATA_DELAY_DAYS.get(args.plan, 0)
+
+    client = await asyncio.to_thread(JQuantsAPIClient)
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=60.0, limits=limits) as http_client:
+        stats = await run_etl(
+            client_fetcher(client, http_client, limiter),
+            store,
+            datasets,
+            days,
+            args.concurrency,
+            empty_final_days=empty_final_days,
+        )
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps([s.as_dict() for s in stats.values()], ensure_ascii=False, indent=2))
+    else:
+        _print_stats(stats, elapsed)
+    return 1 if any(s.failed for s in stats.values()) else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Fetch J-Quants datasets into partitioned Parquet")
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--datasets", default=",".join(ETL_DATASETS))
+    parser.add_argument("--root", default=None, help="保存先 (既定: JQUANTS_STORE_ROOT)")
+    parser.add_argument(
+        "--plan", choices=sorted(PLAN_RATE_LIMITS), default=os.environ.get("JQUANTS_PLAN", "light")
+    )
+    parser.add_argument("--rate-per-min", type=float, default=None, help="プラン既定値を上書き")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--empty-final-days",
+        type=int,
+        default=None,
+        help="0 件の応答を確定とみなすまでの日数 (既定: 7 日 + プランの配信遅延)",
+    )
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    return asyncio.run(_main_async(args))
+
+
+__all__ = [
+    "DEFAULT_EMPTY_FINAL_DAYS",
+    "ETL_DATASETS",
+    "EndpointStats",
+    "EtlDataset",
+    "PLAN_DATA_DELAY_DAYS",
+    "PLAN_RATE_LIMITS",
+    "business_days",
+    "client_fetcher",
+    "plan_jobs",
+    "plan_rate_limiter",
+    "run_etl",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
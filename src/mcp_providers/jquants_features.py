@@ -0,0 +1,349 @@
+"""
+Precomputed margin-interest / short-position features per ticker.
+
+    python -m src.mcp_providers.jquants_features                 # 保存済みデータから再計算
+    python -m src.mcp_providers.jquants_features --as-of 2024-06-28 --json
+
+ETL / 差分同期で保存した信用取引週末残高 (`weekly_margin_interest`) と空売り残高報告
+(`short_selling_positions`) から銘柄別の需給特徴量を計算し、SQLite の特徴量テーブル
+(主キー = 銘柄コード) に保存します。合議時は 1 銘柄 1 回の主キー参照で済み、
+LLM を使わない需給リスクシグナルとして Casper などが利用できます。
+
+特徴量:
+    - 信用買い残 / 売り残、信用倍率とその 4 週間の変化、買い残の前週比
+    - 買い残 / 売り残の z スコア (過去 26 週)
+    - 空売り残高報告の合計比率 (発行済株式比)・報告者数と 4 週間の変化
+    - signal: 上記を合成した -1.0 (需給悪化) 〜 +1.0 (需給良好)
+"""
+
+import argparse
+import math
+import os
+import sqlite3
+import sys
+import threading
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from src.mcp_providers.jquants_store import ParquetStore
+
+DEFAULT_FEATURE_DB = "./data/jquants_features.sqlite3"
+
+# z スコアの計算期間 (週) と変化を見る期間
+ZSCORE_WEEKS = 26
+CHANGE_WEEKS = 4
+
+# 空売り残高の報告義務 (発行済株式の 0.5%) 未満は解消報告として除外する
+SHORT_REPORT_THRESHOLD = 0.005
+
+FEATURE_COLUMNS = (
+    "margin_date",
+    "long_margin",
+    "short_margin",
+    "margin_ratio",
+    "margin_ratio_change_4w",
+    "long_margin_change_1w",
+    "long_margin_z",
+    "short_margin_z",
+    "short_date",
+    "short_ratio",
+    "short_ratio_change_4w",
+    "short_holders",
+    "signal",
+)
+TEXT_COLUMNS = ("margin_date", "short_date")
+
+
+def feature_db_path() -> Path:
+    """特徴量 DB のパス (環境変数 JQUANTS_FEATURE_DB で上書き可能)"""
+    return Path(os.environ.get("JQUANTS_FEATURE_DB", DEFAULT_FEATURE_DB))
+
+
+def _zscore(values: Any) -> float:
+    """最後の値の z スコア (標準偏差 0・データ不足は NaN)"""
+    values = values.dropna()
+    if len(values) < 3:
+        return math.nan
+    std = values.std(ddof=0)
+    return float((values.iloc[-1] - values.mean()) / std) if std > 0 else math.nan
+
+
+def margin_features(df: Any) -> Any:
+    """
+    信用取引週末残高から銘柄別の特徴量を計算
+
+    Args:
+        df: Code / Date / LongMarginTradeVolume / ShortMarginTradeVolume を持つ DataFrame
+
+    Returns:
+        index = Code の DataFrame
+    """
+    import pandas as pd
+
+    columns = ["margin_date", *FEATURE_COLUMNS[1:8]]
+    if df.empty:
+        return pd.DataFrame(columns=columns).rename_axis("Code")
+
+    df = df.assign(
+        Code=df["Code"].astype(str),
+        Date=pd.to_datetime(df["Date"]),
+        long=pd.to_numeric(df["LongMarginTradeVolume"], errors="coerce"),
+        short=pd.to_numeric(df["ShortMarginTradeVolume"], errors="coerce"),
+    ).sort_values(["Code", "Date"])
+
+    rows = {}
+    for code, group in df.groupby("Code", sort=True):
+        group = group.drop_duplicates("Date", keep="last").tail(ZSCORE_WEEKS)
+        ratio = group["long"] / group["short"].where(group["short"] > 0)
+        long_margin, short_margin = group["long"].iloc[-1], group["short"].iloc[-1]
+        previous = group["long"].iloc[-2] if len(group) >= 2 else math.nan
+        rows[code] = {
+            "margin_date": group["Date"].iloc[-1].date().isoformat(),
+            "long_margin": float(long_margin),
+            "short_margin": float(short_margin),
+            "margin_ratio": float(ratio.iloc[-1]),
+            "margin_ratio_change_4w": (
+                float(ratio.iloc[-1] - ratio.iloc[-1 - CHANGE_WEEKS])
+                if len(ratio) > CHANGE_WEEKS
+                else math.nan
+            ),
+            "long_margin_change_1w": (
+                float(long_margin / previous - 1.0) if previous and previous > 0 else math.nan
+            ),
+            "long_margin_z": _zscore(group["long"]),
+            "short_margin_z": _zscore(group["short"]),
+        }
+    return pd.DataFrame.from_dict(rows, orient="index", columns=columns).rename_axis("Code")
+
+
+def _short_totals(df: Any, as_of: Any) -> Any:
+    """as_of 時点の報告者ごとの最新残高を合計 (銘柄別の比率と報告者数)"""
+    latest = (
+        df[df["CalculatedDate"] <= as_of]
+        .sort_values("CalculatedDate")
+        .drop_duplicates(["Code", "ShortSellerName"], keep="last")
+    )
+    latest = latest[latest["ratio"] >= SHORT_REPORT_THRESHOLD]
+    return latest.groupby("Code").agg(
+        short_ratio=("ratio", "sum"),
+        short_holders=("ratio", "size"),
+        short_date=("CalculatedDate", "max"),
+    )
+
+
+def short_position_features(df: Any, as_of: date) -> Any:
+    """
+    空売り残高報告から銘柄別の特徴量を計算
+
+    Args:
+        df: Code / CalculatedDate / ShortSellerName / ShortPositionsToSharesOutstandingRatio
+        as_of: 基準日
+
+    Returns:
+        index = Code の DataFrame (short_date, short_ratio, short_ratio_change_4w, short_holders)
+    """
+    import pandas as pd
+
+    columns = ["short_date", "short_ratio", "short_ratio_change_4w", "short_holders"]
+    if df.empty:
+        return pd.DataFrame(columns=columns).rename_axis("Code")
+
+    df = df.assign(
+        Code=df["Code"].astype(str),
+        CalculatedDate=pd.to_datetime(df["CalculatedDate"]),
+        ratio=pd.to_numeric(df["ShortPositionsToSharesOutstandingRatio"], errors="coerce"),
+    )
+    now = _short_totals(df, pd.Timestamp(as_of))
+    before = _short_totals(df, pd.Timestamp(as_of - timedelta(weeks=CHANGE_WEEKS)))
+    codes = now.index.union(before.index)
+    now = now.reindex(codes)
+    previous_ratio = before["short_ratio"].reindex(codes).fillna(0.0)
+    result = pd.DataFrame(
+        {
+            "short_date": now["short_date"].map(
+                lambda d: d.date().isoformat() if pd.notna(d) else None
+            ),
+            "short_ratio": now["short_ratio"].fillna(0.0),
+            "short_ratio_change_4w": now["short_ratio"].fillna(0.0) - previous_ratio,
+            "short_holders": now["short_holders"].fillna(0).astype(int),
+        },
+        index=codes,
+    )
+    return result.rename_axis("Code")
+
+
+def _component(value: Any, scale: float) -> float:
+    return 0.0 if value is None or math.isnan(value) else math.tanh(value / scale)
+
+
+def feature_signal(row: dict[str, Any]) -> float:
+    """
+    需給特徴量を -1.0 (需給悪化) 〜 +1.0 (需給良好) に合成
+
+    - 買い残の急増 (将来の売り圧力) はマイナス
+    - 売り残の増加 (将来の買い戻し) はプラス
+    - 空売り残高報告の比率上昇 (機関投資家の売り) はマイナス
+    """
+    score = (
+        -0.4 * _component(row.get("long_margin_z"), 2.0)
+        + 0.3 * _component(row.get("short_margin_z"), 2.0)
+        - 0.3 * _component(row.get("short_ratio_change_4w"), 0.01)
+    )
+    return round(max(-1.0, min(1.0, score)), 4)
+
+
+def build_features(
+    store: ParquetStore, as_of: date | None = None, weeks: int = ZSCORE_WEEKS
+) -> Any:
+    """
+    保存済みの信用残・空売り残高から特徴量テーブルを作成
+
+    Returns:
+        index = Code、列 = FEATURE_COLUMNS の DataFrame
+    """
+    as_of = as_of or date.today()
+    start = as_of - timedelta(weeks=weeks + 1)
+    margin = store.read(
+        "weekly_margin_interest",
+        start,
+        as_of,
+        columns=["Code", "Date", "LongMarginTradeVolume", "ShortMarginTradeVolume"],
+    )
+    shorts = store.read(
+        "short_selling_positions",
+        start,
+        as_of,
+        columns=[
+            "Code",
+            "CalculatedDate",
+            "ShortSellerName",
+            "ShortPositionsToSharesOutstandingRatio",
+        ],
+    )
+    required = {"Code", "Date", "LongMarginTradeVolume", "ShortMarginTradeVolume"}
+    margin_table = margin_features(margin if required <= set(margin.columns) else margin.iloc[0:0])
+    short_table = short_position_features(
+        shorts if "ShortPositionsToSharesOutstandingRatio" in shorts.columns else shorts.iloc[0:0],
+        as_of,
+    )
+    table = margin_table.join(short_table, how="outer")
+    table = table.reindex(columns=FEATURE_COLUMNS[:-1])
+    table["signal"] = [feature_signal(row) for row in table.to_dict(orient="records")]
+    return table
+
+
+class FeatureStore:
+    """
+    銘柄別特徴量の SQLite テーブル (主キー = 銘柄コード)
+
+    `replace` は 1 トランザクションで全件を入れ替えるため、読み手は常に完全な世代を見る。
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path is not None else feature_db_path()
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = ", ".join(
+                f"{c} TEXT" if c in TEXT_COLUMNS else f"{c} REAL" for c in FEATURE_COLUMNS
+            )
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS features (code TEXT PRIMARY KEY, as_of TEXT, {columns})"
+            )
+            self._local.conn = conn
+        return conn
+
+    def replace(self, table: Any, as_of: date) -> int:
+        """
+        特徴量テーブルを入れ替える
+
+        Returns:
+            保存した銘柄数
+        """
+        names = ", ".join(("code", "as_of", *FEATURE_COLUMNS))
+        placeholders = ", ".join("?" * (len(FEATURE_COLUMNS) + 2))
+        rows = [
+            (str(code), as_of.isoformat(), *(_sql_value(record.get(c)) for c in FEATURE_COLUMNS))
+            for code, record in zip(table.index, table.to_dict(orient="records"), strict=True)
+        ]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM features")
+            conn.executemany(f"INSERT INTO features ({names}) VALUES ({placeholders})", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def get(self, ticker: str) -> dict[str, Any] | None:
+        """1 銘柄の特徴量 ("7203.T" / "7203" / "72030" のいずれでも可、無ければ None)"""
+        from src.mcp_providers.jquants_history import normalize_code
+
+        conn = self._conn()
+        conn.row_factory = sqlite3.Row
+        for code in normalize_code(ticker):
+            row = conn.execute("SELECT * FROM features WHERE code = ?", (code,)).fetchone()
+            if row is not None:
+                return dict(row)
+        return None
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM features").fetchone()[0]
+
+
+def _sql_value(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, "item"):  # numpy のスカラー
+        return _sql_value(value.item())
+    return value
+
+
+@lru_cache(maxsize=1)
+def get_feature_store() -> FeatureStore:
+    """アプリ全体で共有する FeatureStore (シングルトン)"""
+    return FeatureStore()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Precompute margin / short-selling features")
+    parser.add_argument("--root", default=None, help="保存先 (既定: JQUANTS_STORE_ROOT)")
+    parser.add_argument("--db", default=None, help="特徴量 DB (既定: JQUANTS_FEATURE_DB)")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None)
+    parser.add_argument("--json", action="store_true", help="特徴量を JSON で出力")
+    args = parser.parse_args(argv)
+
+    as_of = args.as_of or date.today()
+    table = build_features(ParquetStore(args.root), as_of)
+    count = FeatureStore(args.db).replace(table, as_of)
+    if args.json:
+        print(table.reset_index().to_json(orient="records", force_ascii=False))
+    else:
+        print(f"saved features for {count} codes (as_of={as_of})")
+    return 0
+
+
+__all__ = [
+    "FEATURE_COLUMNS",
+    "FeatureStore",
+    "build_features",
+    "feature_signal",
+    "get_feature_store",
+    "margin_features",
+    "short_position_features",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Historical OHLCV queries over the local J-Quants price store.
+
+ETL / 差分同期で保存した `prices` データセット (daily_quotes) から、任意期間・複数銘柄の
+株価を読み出し、サーバー側で週足・月足へ集約します。上流 API は呼びません。
+
+    - 日付パーティションの絞り込みと銘柄フィルタは Parquet 読み込み時に適用 (行グループ単位で除外)
+    - 必要な列だけを読む (列の射影)
+    - 週足 (W: 金曜締め) / 月足 (M: 月末締め) は銘柄ごとに OHLC + 出来高合計で集約
+"""
+
+from datetime import date
+from typing import Any
+
+from src.mcp_providers.jquants_store import ParquetStore
+
+PRICE_DATASET = "prices"
+KEY_COLUMNS = ("Code", "Date")
+
+# リサンプル間隔 -> pandas の頻度
+INTERVALS = {"D": None, "W": "W-FRI", "M": "ME"}
+
+
+def normalize_code(ticker: str) -> list[str]:
+    """
+    "7203.T" / "7203" / "72030" を J-Quants の Code 候補に変換
+
+    J-Quants の Code は 5 桁 (末尾はチェック用の 0) のため 4 桁と両方で照合する。
+    """
+    code = str(ticker).split(".")[0].strip()
+    if len(code) == 4:
+        return [code, code + "0"]
+    if len(code) == 5 and code.endswith("0"):
+        return [code, code[:4]]
+    return [code]
+
+
+def _aggregation(column: str) -> str:
+    """列名から集約方法を決める (Open 系: first, High 系: max, Low 系: min, Close 系: last, 量: sum)"""
+    name = column.removeprefix("Adjustment")
+    if name == "Open":
+        return "first"
+    if name == "High":
+        return "max"
+    if name == "Low":
+        return "min"
+    if name in ("Volume", "TurnoverValue"):
+        return "sum"
+    return "last"
+
+
+def resample_ohlcv(df: Any, interval: str) -> Any:
+    """
+    日足の DataFrame (Code, Date, 価格列...) を週足・月足に集約
+
+    Args:
+        df: `Date` が datetime64 の DataFrame
+        interval: "D" / "W" / "M"
+
+    Returns:
+        集約後の DataFrame (`Date` は各期間の最終取引日)
+    """
+    freq = INTERVALS[interval]
+    if freq is None or df.empty:
+        return df
+
+    value_columns = [c for c in df.columns if c not in KEY_COLUMNS]
+    agg = {c: _aggregation(c) for c in value_columns}
+    agg["Date"] = "last"  # 期間ラベルではなく実際の最終取引日を返す
+    grouped = (
+        df.set_index(df["Date"])
+        .groupby("Code")
+        .resample(freq, include_groups=False)
+        .agg(agg)
+        .dropna(subset=["Date"])
+        .reset_index(level="Code")
+        .reset_index(drop=True)
+    )
+    return grouped[[c for c in df.columns if c in grouped.columns]]
+
+
+def load_history(
+    store: ParquetStore,
+    tickers: list[str],
+    start: date | None = None,
+    end: date | None = None,
+    interval: str = "D",
+    columns: list[str] | None = None,
+) -> Any:
+    """
+    ローカルストアから複数銘柄の株価履歴を読み出す
+
+    Args:
+        store: 株価を保存した ParquetStore
+        tickers: 銘柄 (例: ["7203.T", "6758"])
+        start / end: 期間 (両端含む)
+        interval: "D" (日足) / "W" (週足) / "M" (月足)
+        columns: 返す価格列 (None は全列。Code / Date は常に含む)
+
+    Returns:
+        pandas.DataFrame (Code, Date 昇順)
+
+    Raises:
+        ValueError: 未知の interval
+    """
+    import pandas as pd
+
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown interval '{interval}' (expected one of {list(INTERVALS)})")
+
+    codes = sorted({c for t in tickers for c in normalize_code(t)})
+    read_columns = (
+        None if columns is None else [*KEY_COLUMNS, *(c for c in columns if c not in KEY_COLUMNS)]
+    )
+    table = store.read_table(
+        PRICE_DATASET, start, end, columns=read_columns, filters={"Code": codes}
+    )
+    df = table.to_pandas()
+    if df.empty:
+        return pd.DataFrame(columns=read_columns or list(KEY_COLUMNS))
+
+    df["Date"] = pd.to_datetime(df["Date"])
+    df = df.sort_values(["Code", "Date"], ignore_index=True)
+    return resample_ohlcv(df, interval)
+
+
+__all__ = ["INTERVALS", "load_history", "normalize_code", "resample_ohlcv"]
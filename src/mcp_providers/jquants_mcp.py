@@ -1,21 +1,72 @@
 import importlib
+import json
+import logging
+import math
 import os
+import sys
+import threading
 import traceback
-from datetime import datetime, timedelta
-from typing import Any
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Literal
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.middleware.gzip import GZipMiddleware
 
-# Prefer to use the official jquantsapi client when available, otherwise fall back to sample.client
-try:
-    jquantsapi = importlib.import_module("jquantsapi")
-except Exception:
-    jquantsapi = None
+from src.common.rate_limit import RateLimitExceeded, get_rate_limiter
+from src.mcp_providers.jquants_features import get_feature_store
+from src.mcp_providers.jquants_history import load_history
+from src.mcp_providers.jquants_store import ParquetStore
 
-try:
-    from sample.client import JQuantsAPIClient  # fallback
-except Exception:
-    JQuantsAPIClient = None
+logger = logging.getLogger(__name__)
+
+# jquantsapi / sample.client / pandas は import に数百 ms かかるため、モジュール import 時ではなく
+# 初回利用時に読み込む (scale-to-zero 環境のコールドスタート短縮)。
+# JQUANTS_PRELOAD_IMPORTS=true の場合は起動直後にバックグラウンドスレッドで先読みする。
+HEAVY_IMPORTS = ("jquantsapi", "sample.client", "pandas")
+
+
+@lru_cache(maxsize=1)
+def _jquantsapi() -> Any | None:
+    """公式 jquantsapi モジュール (未インストールなら None)"""
+    try:
+        return importlib.import_module("jquantsapi")
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=1)
+def _fallback_client_class() -> Any | None:
+    """フォールバック用の sample.client.JQuantsAPIClient (読み込めなければ None)"""
+    try:
+        from sample.client import JQuantsAPIClient
+    except Exception:
+        return None
+    return JQuantsAPIClient
+
+
+def _is_dataframe(obj: Any) -> bool:
+    """pandas を import せずに DataFrame か判定 (未 import なら DataFrame はあり得ない)"""
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(obj, pd.DataFrame)
+
+
+def preload_heavy_imports() -> threading.Thread:
+    """重い依存をデーモンスレッドで先読みし、初回リクエストの待ち時間を隠す"""
+
+    def _run() -> None:
+        _jquantsapi()
+        _fallback_client_class()
+        try:
+            importlib.import_module("pandas")
+        except Exception:
+            pass
+        logger.info("jquants_mcp: heavy imports preloaded")
+
+    thread = threading.Thread(target=_run, name="jquants-preload", daemon=True)
+    thread.start()
+    return thread
 
 
 def _load_project_dotenv():
@@ -46,10 +97,24 @@ def _load_project_dotenv():
 # Load .env at import time so uvicorn process inherits credentials from project root
 _load_project_dotenv()
 
-app = FastAPI(title="JQuants MCP PoC")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.environ.get("JQUANTS_PRELOAD_IMPORTS", "").lower() in ("1", "true", "yes"):
+        preload_heavy_imports()
+    yield
 
-def _build_jquants_client() -> JQuantsAPIClient:
+
+app = FastAPI(title="JQuants MCP PoC", lifespan=lifespan)
+# 履歴データなど大きな JSON は Accept-Encoding: gzip のクライアントに圧縮して返す
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# /tools/jquants/history で一度に指定できる銘柄数の上限
+MAX_HISTORY_TICKERS = 100
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _build_jquants_client() -> Any:
     """Construct JQuantsAPIClient using available env settings.
 
     Priority: JQUANTS_REFRESH_TOKEN -> (JQUANTS_MAIL_ADDRESS + JQUANTS_PASSWORD) -> raise
@@ -63,6 +128,7 @@ def _build_jquants_client() -> JQuantsAPIClient:
     password = os.environ.get("JQUANTS_PASSWORD") or os.environ.get("JQUANTS_API_PASSWORD")
 
     # If official client is available, prefer it
+    jquantsapi = _jquantsapi()
     if jquantsapi is not None:
         # prefer direct constructor with mail/password if provided
         if mail and password:
@@ -85,6 +151,7 @@ def _build_jquants_client() -> JQuantsAPIClient:
                 print(f"jquantsapi.Client(refresh) init failed: {e}")
 
     # Fallback to sample client if present
+    JQuantsAPIClient = _fallback_client_class()
     if JQuantsAPIClient is not None:
         if refresh:
             return JQuantsAPIClient(refresh_token=refresh)
@@ -135,6 +202,16 @@ def get_price(ticker: str) -> Any:
     start = yesterday.strftime("%Y%m%d")
     end = today.strftime("%Y%m%d")
 
+    # ワーカー間で共有するレートリミッターで順番待ちする (上限超過で 429 を受けないように)
+    try:
+        get_rate_limiter().bucket("daily_quotes").acquire_sync()
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        ) from e
+
     _data_exc = None
     try:
         # normalize calls across different client implementations
@@ -189,16 +266,20 @@ def get_price(ticker: str) -> Any:
         except Exception:
             pass
     if _data_exc:
+        upstream = getattr(_data_exc, "response", None)
+        if getattr(upstream, "status_code", None) == 429:
+            retry_after = upstream.headers.get("Retry-After", "1")
+            raise HTTPException(
+                status_code=429, detail=detail, headers={"Retry-After": retry_after}
+            ) from _data_exc
         raise HTTPException(status_code=502, detail=detail) from _data_exc
 
     # Try to extract a numeric price in a best-effort way
     price = None
     raw = data
     try:
-        # If pandas DataFrame
-        import pandas as pd
-
-        if isinstance(data, pd.DataFrame):
+        # If pandas DataFrame (クライアントが DataFrame を返した場合のみ pandas は import 済み)
+        if _is_dataframe(data):
             if not data.empty:
                 # common column names: Close, close, AdjClose, adjClose, price
                 for col in ["Close", "close", "AdjClose", "adjClose", "price"]:
@@ -217,18 +298,78 @@ def get_price(ticker: str) -> Any:
         price = None
 
     # Ensure raw is JSON-serializable (convert pandas DataFrame to records)
-    try:
-        import pandas as pd
-
-        if isinstance(raw, pd.DataFrame):
-            raw = raw.tail(20).to_dict(orient="records")
-    except Exception:
-        pass
+    if _is_dataframe(raw):
+        raw = raw.tail(20).to_dict(orient="records")
 
     result = {"ticker": ticker, "price": price, "raw": raw}
     return result
 
 
+@app.get("/tools/jquants/history")
+def get_history(
+    tickers: str = Query(..., description="銘柄のカンマ区切り (例: 7203.T,6758.T)"),
+    start: date | None = None,
+    end: date | None = None,
+    interval: Literal["D", "W", "M"] = "D",
+    columns: str | None = Query(None, description="返す列のカンマ区切り (例: Open,Close)"),
+    format: Literal["json", "arrow"] = "json",
+) -> Response:
+    """Return historical OHLCV for several tickers from the local price store.
+
+    Data is served from the ETL / delta-sync Parquet store (no upstream calls),
+    optionally resampled to weekly (`W`) or monthly (`M`) bars and projected to
+    the requested columns. `format=arrow` returns an Arrow IPC stream; JSON is
+    gzip-compressed for clients that send `Accept-Encoding: gzip`.
+    """
+    ticker_list = [t.strip() for t in tickers.split(",") if t.strip()]
+    if not ticker_list or len(ticker_list) > MAX_HISTORY_TICKERS:
+        raise HTTPException(status_code=400, detail=f"specify 1-{MAX_HISTORY_TICKERS} tickers")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+    column_list = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+
+    df = load_history(ParquetStore(), ticker_list, start, end, interval, column_list)
+
+    if format == "arrow":
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_STREAM_MEDIA_TYPE)
+
+    if not df.empty:
+        df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
+    header = {
+        "tickers": ticker_list,
+        "interval": interval,
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None,
+        "columns": list(df.columns),
+        "count": len(df),
+    }
+    # 大きな結果を jsonable_encoder に通さず、pandas で直接シリアライズする
+    body = json.dumps(header)[:-1] + ', "data": ' + df.to_json(orient="records") + "}"
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/tools/jquants/features/{ticker}")
+def get_features(ticker: str) -> dict[str, Any]:
+    """Return precomputed margin-interest / short-position features for a ticker.
+
+    Features are built offline by `python -m src.mcp_providers.jquants_features`
+    and served with a single primary-key lookup (no upstream calls).
+    """
+    try:
+        features = get_feature_store().get(ticker)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"feature store unavailable: {e}") from e
+    if features is None:
+        raise HTTPException(status_code=404, detail=f"no features for {ticker}")
+    return {"ticker": ticker, "features": features}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,193 @@
+"""
+Partitioned Parquet store for J-Quants datasets.
+
+J-Quants から取得したデータを日付パーティション単位で保存します。
+
+    <root>/<dataset>/date=YYYY-MM-DD/part-0.parquet
+
+- 書き込みは一時ファイルに書いてから `os.replace` するためアトミック
+  (クラッシュしても中途半端なパーティションは残らず、再実行時に作り直される)
+- 存在するパーティションは取得済みとみなす (ETL の再開に使用)
+- `merge_partition` / `merge_table` は自然キーで重複排除しながら追記する
+  (差分同期で取得した行のうち新規・更新分だけが書き込まれる)
+- pyarrow / pandas は利用時に import する
+"""
+
+import os
+from collections.abc import Iterable
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+DEFAULT_STORE_ROOT = "./data/jquants"
+PART_FILE = "part-0.parquet"
+CURRENT_FILE = "current.parquet"
+
+
+def store_root() -> Path:
+    """保存先ルート (環境変数 JQUANTS_STORE_ROOT で上書き可能)"""
+    return Path(os.environ.get("JQUANTS_STORE_ROOT", DEFAULT_STORE_ROOT))
+
+
+class ParquetStore:
+    """
+    データセット × 日付パーティションの Parquet ストア
+
+    使用例:
+        >>> store = ParquetStore("./data/jquants")
+        >>> store.write_partition("daily_quotes", date(2024, 1, 4), records)
+        >>> df = store.read("daily_quotes", date(2024, 1, 1), date(2024, 1, 31))
+    """
+
+    def __init__(self, root: str | Path | None = None):
+        self.root = Path(root) if root is not None else store_root()
+
+    def partition_dir(self, dataset: str, day: date) -> Path:
+        return self.root / dataset / f"date={day.isoformat()}"
+
+    def partition_path(self, dataset: str, day: date) -> Path:
+        return self.partition_dir(dataset, day) / PART_FILE
+
+    def has_partition(self, dataset: str, day: date) -> bool:
+        return self.partition_path(dataset, day).exists()
+
+    def partitions(self, dataset: str) -> list[date]:
+        """保存済みパーティションの日付 (昇順)"""
+        base = self.root / dataset
+        if not base.exists():
+            return []
+        days = [
+            date.fromisoformat(p.name.removeprefix("date="))
+            for p in base.glob("date=*")
+            if (p / PART_FILE).exists()
+        ]
+        return sorted(days)
+
+    def write_partition(self, dataset: str, day: date, records: Iterable[dict[str, Any]]) -> int:
+        """
+        1 パーティション分のレコードをアトミックに書き込む (既存は置き換え)
+
+        レコードが 0 件でも空のパーティションを書き、取得済みであることを記録する。
+
+        Returns:
+            書き込んだ行数
+        """
+        import pyarrow as pa
+
+        table = pa.Table.from_pylist(list(records))
+        _write_atomic(table, self.partition_path(dataset, day))
+        return table.num_rows
+
+    def merge_partition(
+        self, dataset: str, day: date, records: Iterable[dict[str, Any]], keys: Iterable[str]
+    ) -> int:
+        """
+        パーティションへレコードをマージ (自然キーが同じ行は新しい値で置き換え)
+
+        Returns:
+            新規・更新された行数 (0 の場合はファイルを書き換えない)
+        """
+        return _merge_into(self.partition_path(dataset, day), records, list(keys))
+
+    def merge_table(
+        self, dataset: str, records: Iterable[dict[str, Any]], keys: Iterable[str]
+    ) -> int:
+        """
+        パーティションを持たない最新スナップショット (例: 銘柄一覧) へマージ
+
+        Returns:
+            新規・更新された行数
+        """
+        return _merge_into(self.root / dataset / CURRENT_FILE, records, list(keys))
+
+    def read_current(self, dataset: str):
+        """`merge_table` で保存したスナップショットを DataFrame で返す (無ければ空)"""
+        import pandas as pd
+        import pyarrow.parquet as pq
+
+        path = self.root / dataset / CURRENT_FILE
+        return pq.read_table(path).to_pandas() if path.exists() else pd.DataFrame()
+
+    def read_table(
+        self,
+        dataset: str,
+        start: date | None = None,
+        end: date | None = None,
+        columns: list[str] | None = None,
+        filters: dict[str, list[Any]] | None = None,
+    ):
+        """
+        期間内のパーティションを 1 つの pyarrow.Table として読む
+
+        Args:
+            dataset: データセット名
+            start / end: 期間 (両端を含む、None は無制限)
+            columns: 読み込む列 (None は全列、存在しない列は無視)
+            filters: 列 -> 許可する値 (例: {"Code": ["72030"]})。読み込み時に行グループ単位で適用
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tables = []
+        for day in self.partitions(dataset):
+            if (start and day < start) or (end and day > end):
+                continue
+            path = self.partition_path(dataset, day)
+            if pq.read_metadata(path).num_rows == 0:
+                continue
+            available = set(pq.read_schema(path).names)
+            if filters and not set(filters) <= available:
+                continue
+            table = pq.read_table(
+                path,
+                columns=None if columns is None else [c for c in columns if c in available],
+                filters=[(c, "in", list(v)) for c, v in filters.items()] if filters else None,
+            )
+            tables.append(table)
+        if not tables:
+            return pa.table({})
+        return pa.concat_tables(tables, promote_options="default")
+
+    def read(self, dataset: str, start: date | None = None, end: date | None = None, columns=None):
+        """`read_table` の結果を pandas.DataFrame で返す"""
+        return self.read_table(dataset, start, end, columns).to_pandas()
+
+
+def _write_atomic(table: Any, path: Path) -> None:
+    """一時ファイルに書いてから置き換える (読み手は常に完全なファイルを見る)"""
+    import pyarrow.parquet as pq
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def _merge_into(path: Path, records: Iterable[dict[str, Any]], keys: list[str]) -> int:
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    incoming = pd.DataFrame(list(records))
+    if incoming.empty:
+        if not path.exists():
+            _write_atomic(pa.table({}), path)
+        return 0
+
+    if path.exists() and pq.read_metadata(path).num_rows > 0:
+        existing = pq.read_table(path).to_pandas()
+        combined = pd.concat([existing, incoming], ignore_index=True)
+    else:
+        existing, combined = None, incoming
+
+    # 完全に同一の行は捨て、残りを自然キーで重複排除 (後勝ち = 訂正値で置き換え)
+    combined = combined.drop_duplicates(keep="first", ignore_index=True)
+    changed = len(combined) - (len(existing) if existing is not None else 0)
+    if changed == 0:
+        return 0
+    combined = combined.drop_duplicates(subset=keys, keep="last", ignore_index=True)
+    _write_atomic(pa.Table.from_pandas(combined, preserve_index=False), path)
+    return changed
+
+
+__all__ = ["DEFAULT_STORE_ROOT", "ParquetStore", "store_root"]
@@ -0,0 +1,340 @@
+"""
+J-Quants 差分同期 (ウォーターマーク方式)
+
+    python -m src.mcp_providers.jquants_sync                         # 全データセット・全銘柄
+    python -m src.mcp_providers.jquants_sync --datasets statements --codes 7203,6758
+
+`get_statements(code=None)` や `get_stock_list()` のように毎回全件を取り直す代わりに、
+データセット (必要に応じて銘柄) ごとに「保存済みの最新日付」= ウォーターマークを記録し、
+その日以降のデータだけを取得して `ParquetStore` へ自然キーで重複排除しながらマージします。
+日次更新では新規・訂正された行だけが書き込まれます。ウォーターマークの日は毎回取り直すため、
+同日中に後から公開された開示 (決算短信の多くは 15 時以降) も次回の同期で取り込まれます。
+
+取得範囲の決め方 (エンドポイントの仕様による):
+    - range   : 銘柄指定時は from / to でウォーターマークの日〜今日を 1 クエリで取得、
+                全銘柄は date= で未取得の営業日を 1 日ずつ取得 (株価・信用残。code か date が必須)
+    - by_date : date= で未取得の営業日を 1 日ずつ取得 (財務。銘柄指定時は code= の結果を日付で絞る)
+    - snapshot: 最新スナップショットを取得し現在テーブルにマージ (銘柄一覧)
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from src.mcp_providers.jquants_etl import (
+    PLAN_RATE_LIMITS,
+    PageFetcher,
+    business_days,
+    client_fetcher,
+    plan_rate_limiter,
+)
+from src.mcp_providers.jquants_store import ParquetStore
+
+logger = logging.getLogger(__name__)
+
+# ウォーターマークが無い (初回) 場合に遡る日数
+DEFAULT_LOOKBACK_DAYS = 365
+WATERMARK_FILE = "_watermarks.json"
+
+
+class SyncDataset(NamedTuple):
+    """
+    差分同期の対象データセット
+
+    Attributes:
+        endpoint: `sample.pagination.ENDPOINTS` のキー
+        date_column: ウォーターマークに使う日付列
+        natural_keys: 重複排除に使う自然キー
+        mode: "range" / "by_date" / "snapshot"
+    """
+
+    endpoint: str
+    date_column: str
+    natural_keys: tuple[str, ...]
+    mode: str
+
+
+SYNC_DATASETS: dict[str, SyncDataset] = {
+    "prices": SyncDataset("daily_quotes", "Date", ("Code", "Date"), "range"),
+    "weekly_margin_interest": SyncDataset(
+        "weekly_margin_interest", "Date", ("Code", "Date"), "range"
+    ),
+    "statements": SyncDataset("statements", "DisclosedDate", ("DisclosedNumber",), "by_date"),
+    "listed_info": SyncDataset("listed_info", "Date", ("Code",), "snapshot"),
+}
+
+
+class WatermarkStore:
+    """
+    (データセット, 銘柄) ごとの同期済み最新日付を JSON ファイルに保存
+
+    キーは "dataset" (全銘柄) または "dataset:code"。書き込みはアトミック。
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._marks: dict[str, str] = {}
+        if self.path.exists():
+            self._marks = json.loads(self.path.read_text())
+
+    @staticmethod
+    def key(dataset: str, code: str | None = None) -> str:
+        return f"{dataset}:{code}" if code else dataset
+
+    def get(self, dataset: str, code: str | None = None) -> date | None:
+        value = self._marks.get(self.key(dataset, code))
+        return date.fromisoformat(value) if value else None
+
+    def set(self, dataset: str, day: date, code: str | None = None) -> None:
+        self._marks[self.key(dataset, code)] = day.isoformat()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self._marks, indent=2, sort_keys=True))
+        os.replace(tmp, self.path)
+
+    def as_dict(self) -> dict[str, str]:
+        return dict(self._marks)
+
+
+class SyncResult(NamedTuple):
+    """1 回の同期結果"""
+
+    dataset: str
+    code: str | None
+    since: date | None
+    watermark: date | None
+    fetched: int
+    written: int
+    requests: int
+    seconds: float
+
+
+def _yyyymmdd(day: date) -> str:
+    return day.strftime("%Y%m%d")
+
+
+def _parse_day(value: Any) -> date | None:
+    """J-Quants の日付 ("2024-01-04" / "20240104") を date に変換"""
+    if not value:
+        return None
+    text = str(value)[:10]
+    try:
+        return (
+            date.fromisoformat(text)
+            if "-" in text
+            else date(int(text[:4]), int(text[4:6]), int(text[6:8]))
+        )
+    except ValueError:
+        return None
+
+
+class DeltaSync:
+    """
+    ウォーターマーク方式の差分同期
+
+    使用例:
+        >>> sync = DeltaSync(fetch, ParquetStore())
+        >>> await sync.sync("statements")                # 全銘柄: 未取得日だけ取得
+        >>> await sync.sync("prices", code="7203")       # 銘柄別のウォーターマーク
+    """
+
+    def __init__(
+        self,
+        fetch: PageFetcher,
+        store: ParquetStore,
+        watermarks: WatermarkStore | None = None,
+        lookback_days: int = DEFAULT_LOOKBACK_DAYS,
+    ):
+        self.fetch = fetch
+        self.store = store
+        self.watermarks = watermarks or WatermarkStore(store.root / WATERMARK_FILE)
+        self.lookback_days = lookback_days
+
+    async def _collect(self, endpoint: str, params: dict[str, Any]) -> tuple[list[dict], int]:
+        records: list[dict] = []
+        pages = 0
+        async for batch in self.fetch(endpoint, params):
+            records.extend(batch)
+            pages += 1
+        return records, pages
+
+    def _queries(
+        self, spec: SyncDataset, since: date, today: date, code: str | None
+    ) -> list[dict[str, Any]]:
+        base = {"code": code} if code else {}
+        if spec.mode == "snapshot":
+            return [base]
+        if code:
+            # range: code= と from / to で期間を 1 クエリ
+            # by_date: code= で全期間 (日付は取得後に絞る)
+            if spec.mode == "range":
+                return [{**base, "from": _yyyymmdd(since), "to": _yyyymmdd(today)}]
+            return [base]
+        # 全銘柄: エンドポイントが code か date を必須とするため日ごとに取得
+        return [{"date": _yyyymmdd(day)} for day in business_days(since, today)]
+
+    def _merge(self, name: str, spec: SyncDataset, records: list[dict]) -> int:
+        if spec.mode == "snapshot":
+            return self.store.merge_table(name, records, spec.natural_keys)
+        by_day: dict[date, list[dict]] = {}
+        for record in records:
+            day = _parse_day(record.get(spec.date_column))
+            if day is not None:
+                by_day.setdefault(day, []).append(record)
+        return sum(
+            self.store.merge_partition(name, day, rows, spec.natural_keys)
+            for day, rows in sorted(by_day.items())
+        )
+
+    async def sync(
+        self, name: str, code: str | None = None, today: date | None = None
+    ) -> SyncResult:
+        """
+        1 データセット (と銘柄) を差分同期
+
+        Args:
+            name: `SYNC_DATASETS` のキー
+            code: 銘柄コード (None は全銘柄)
+            today: 同期の終端日 (テスト用、既定は今日)
+
+        Returns:
+            SyncResult (written は新規・訂正で書き込んだ行数)
+        """
+        spec = SYNC_DATASETS[name]
+        today = today or date.today()
+        watermark = self.watermarks.get(name, code)
+        # ウォーターマークの日自体から取り直す (同日中の後発の開示・訂正を取りこぼさないため。
+        # 取得済みの行は自然キーの重複排除で書き込まれない)
+        since = watermark or today - timedelta(days=self.lookback_days)
+        started = time.perf_counter()
+
+        if spec.mode != "snapshot" and since > today:
+            return SyncResult(name, code, since, watermark, 0, 0, 0, 0.0)
+
+        records: list[dict] = []
+        requests = 0
+        for params in self._queries(spec, since, today, code):
+            batch, pages = await self._collect(spec.endpoint, params)
+            records.extend(batch)
+            requests += pages
+
+        if spec.mode != "snapshot":
+            # 範囲指定できないクエリ (code= の全期間) の結果もウォーターマークの日以降に絞る
+            records = [
+                r for r in records if (d := _parse_day(r.get(spec.date_column))) and d >= since
+            ]
+        written = await asyncio.to_thread(self._merge, name, spec, records)
+
+        # データが公開済みの最新日付まで進める (その日は次回も取り直す)
+        if spec.mode == "snapshot":
+            newest = today
+        else:
+            newest = max(
+                (d for r in records if (d := _parse_day(r.get(spec.date_column)))), default=None
+            )
+        if newest is not None and (watermark is None or newest > watermark):
+            self.watermarks.set(name, newest, code)
+            watermark = newest
+
+        return SyncResult(
+            name,
+            code,
+            since,
+            watermark,
+            len(records),
+            written,
+            requests,
+            time.perf_counter() - started,
+        )
+
+    async def sync_many(
+        self,
+        names: list[str],
+        codes: list[str] | None = None,
+        concurrency: int = 4,
+        today: date | None = None,
+    ) -> list[SyncResult]:
+        """
+        複数データセット × 銘柄を並列に差分同期
+
+        同じデータセットのパーティションを同時に書き換えないよう、データセット内は逐次実行する。
+        """
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def run_dataset(name: str) -> list[SyncResult]:
+            results = []
+            for code in codes or [None]:
+                async with semaphore:
+                    results.append(await self.sync(name, code, today))
+            return results
+
+        grouped = await asyncio.gather(*(run_dataset(name) for name in names))
+        return [result for results in grouped for result in results]
+
+
+async def _main_async(args: argparse.Namespace) -> int:
+    import httpx
+
+    from sample.client import JQuantsAPIClient
+
+    rate_per_min = args.rate_per_min or PLAN_RATE_LIMITS[args.plan]
+    limiter = plan_rate_limiter(rate_per_min, burst=args.concurrency)
+    names = [d.strip() for d in args.datasets.split(",") if d.strip()]
+    unknown = [n for n in names if n not in SYNC_DATASETS]
+    if unknown:
+        raise SystemExit(f"Unknown datasets: {unknown}")
+    codes = [c.strip() for c in args.codes.split(",") if c.strip()] or None
+
+    client = await asyncio.to_thread(JQuantsAPIClient)
+    async with httpx.AsyncClient(timeout=60.0) as http_client:
+        sync = DeltaSync(
+            client_fetcher(client, http_client, limiter),
+            ParquetStore(args.root),
+            lookback_days=args.lookback_days,
+        )
+        results = await sync.sync_many(names, codes, args.concurrency)
+
+    for r in results:
+        target = f"{r.dataset}:{r.code}" if r.code else r.dataset
+        print(
+            f"{target:<32} since={r.since} watermark={r.watermark} "
+            f"fetched={r.fetched} written={r.written} requests={r.requests} ({r.seconds:.1f}s)"
+        )
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Incrementally sync J-Quants datasets")
+    parser.add_argument("--datasets", default=",".join(SYNC_DATASETS))
+    parser.add_argument("--codes", default="", help="銘柄コードのカンマ区切り (空は全銘柄)")
+    parser.add_argument("--root", default=None, help="保存先 (既定: JQUANTS_STORE_ROOT)")
+    parser.add_argument("--lookback-days", type=int, default=DEFAULT_LOOKBACK_DAYS)
+    parser.add_argument(
+        "--plan", choices=sorted(PLAN_RATE_LIMITS), default=os.environ.get("JQUANTS_PLAN", "light")
+    )
+    parser.add_argument("--rate-per-min", type=float, default=None)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    return asyncio.run(_main_async(args))
+
+
+__all__ = [
+    "DeltaSync",
+    "SYNC_DATASETS",
+    "SyncDataset",
+    "SyncResult",
+    "WatermarkStore",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Stock MAGI System - 本番用サーバーランナー
+
+    python -m src.server
+
+- gunicorn がインストールされていれば `gunicorn.conf.py` (UvicornWorker, preload_app,
+  graceful shutdown) で起動する
+- 無ければ uvicorn のマルチプロセスモードで同じワーカー数を起動する
+
+ワーカー数は WEB_CONCURRENCY が未設定なら利用可能な CPU コア数から決める。
+ワーカー間でキャッシュを共有するには CACHE_BACKEND=sqlite または redis を設定すること。
+"""
+
+import importlib.util
+import logging
+import os
+import shutil
+import sys
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+APP_PATH = "src.main:app"
+GUNICORN_CONFIG = Path(__file__).resolve().parents[1] / "gunicorn.conf.py"
+
+
+def available_cpus() -> int:
+    """コンテナの CPU 割り当て (affinity) を考慮したコア数"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count() -> int:
+    """WEB_CONCURRENCY があればそれを、無ければ CPU コア数をワーカー数とする"""
+    configured = os.environ.get("WEB_CONCURRENCY")
+    if configured:
+        return max(int(configured), 1)
+    return max(available_cpus(), 1)
+
+
+def main() -> None:
+    host = os.environ.get("HOST", "0.0.0.0")
+    port = int(os.environ.get("PORT", 8000))
+
+    gunicorn = shutil.which("gunicorn")
+    if gunicorn and importlib.util.find_spec("gunicorn") is not None:
+        os.execv(gunicorn, [gunicorn, "--config", str(GUNICORN_CONFIG), APP_PATH])
+
+    import uvicorn
+
+    logger.warning("gunicorn not installed; falling back to uvicorn multi-process workers")
+    uvicorn.run(
+        APP_PATH,
+        host=host,
+        port=port,
+        workers=worker_count(),
+        timeout_graceful_shutdown=int(os.environ.get("GRACEFUL_TIMEOUT", 30)),
+        log_level=os.environ.get("LOG_LEVEL", "info").lower(),
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
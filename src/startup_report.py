@@ -0,0 +1,174 @@
+"""
+Stock MAGI System - 起動時間 (import 時間) レポート
+
+    python -m src.startup_report                      # src.main と jquants_mcp を計測
+    python -m src.startup_report src.main --top 15    # 上位 15 モジュールを表示
+    python -m src.startup_report --json --budget-ms 1000
+
+各モジュールを新しいインタープリタで `python -X importtime` 付きで import し、
+次を集計して表示します (scale-to-zero コンテナのコールドスタート追跡用)。
+
+    - インタープリタ起動を含むプロセス全体の壁時計時間
+    - 対象モジュールの import 時間
+    - トップレベルパッケージ別の import 時間 (self 時間の合計)
+    - 累積時間の大きいモジュール
+
+`--budget-ms` を指定すると、いずれかのモジュールの import 時間が予算を超えた場合に
+終了コード 1 を返す (CI での退行検知用)。
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, NamedTuple
+
+DEFAULT_MODULES = ("src.main", "src.mcp_providers.jquants_mcp")
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+class ImportRecord(NamedTuple):
+    """`-X importtime` の 1 行 (時間はマイクロ秒)"""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+class StartupReport(NamedTuple):
+    """1 モジュール分の計測結果"""
+
+    module: str
+    process_ms: float
+    import_ms: float
+    records: list[ImportRecord]
+
+
+def parse_importtime(output: str) -> list[ImportRecord]:
+    """
+    `-X importtime` の stderr 出力をパース
+
+    Args:
+        output: stderr の文字列 (importtime 以外の行は無視)
+
+    Returns:
+        ImportRecord のリスト (出力順)
+    """
+    records: list[ImportRecord] = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3:
+            continue
+        self_str, cumulative_str, name = parts
+        try:
+            self_us, cumulative_us = int(self_str), int(cumulative_str)
+        except ValueError:
+            continue  # ヘッダ行 ("self [us] | cumulative | imported package")
+        stripped = name.lstrip(" ")
+        depth = (len(name) - len(stripped) - 1) // 2
+        records.append(ImportRecord(stripped.strip(), self_us, cumulative_us, depth))
+    return records
+
+
+def summarize_by_package(records: list[ImportRecord]) -> dict[str, int]:
+    """
+    トップレベルパッケージ別の self 時間合計 (降順)
+
+    `src` 配下はサブパッケージ単位 (例: `src.common`) で集計する。
+    """
+    totals: dict[str, int] = {}
+    for record in records:
+        parts = record.module.split(".")
+        key = ".".join(parts[:2]) if parts[0] == "src" and len(parts) > 1 else parts[0]
+        totals[key] = totals.get(key, 0) + record.self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def measure(module: str, python: str = sys.executable) -> StartupReport:
+    """
+    新しいインタープリタで module を import し、import 時間を計測
+
+    Raises:
+        RuntimeError: import に失敗した場合
+    """
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    process_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    records = parse_importtime(proc.stderr)
+    target = next((r for r in reversed(records) if r.module == module), None)
+    import_ms = target.cumulative_us / 1000 if target else 0.0
+    return StartupReport(module, round(process_ms, 1), round(import_ms, 1), records)
+
+
+def report_as_dict(report: StartupReport, top: int = 10) -> dict[str, Any]:
+    """JSON 出力用の辞書 (時間はミリ秒)"""
+    slowest = sorted(report.records, key=lambda r: r.cumulative_us, reverse=True)
+    return {
+        "module": report.module,
+        "process_ms": report.process_ms,
+        "import_ms": report.import_ms,
+        "packages_ms": {
+            name: round(us / 1000, 1)
+            for name, us in list(summarize_by_package(report.records).items())[:top]
+        },
+        "slowest_modules_ms": {r.module: round(r.cumulative_us / 1000, 1) for r in slowest[:top]},
+    }
+
+
+def _print_report(report: StartupReport, top: int) -> None:
+    data = report_as_dict(report, top)
+    print(f"== {report.module}")
+    print(f"   process (incl. interpreter): {report.process_ms:8.1f} ms")
+    print(f"   import {report.module}: {report.import_ms:8.1f} ms")
+    print("   by package (self time):")
+    for name, ms in data["packages_ms"].items():
+        print(f"     {ms:8.1f} ms  {name}")
+    print("   slowest modules (cumulative):")
+    for name, ms in data["slowest_modules_ms"].items():
+        print(f"     {ms:8.1f} ms  {name}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Report cold-start import time per package")
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_MODULES))
+    parser.add_argument("--top", type=int, default=10, help="表示する上位件数")
+    parser.add_argument("--json", action="store_true", help="JSON で出力")
+    parser.add_argument(
+        "--budget-ms", type=float, default=None, help="import 時間の予算 (超過で終了コード 1)"
+    )
+    args = parser.parse_args(argv)
+
+    reports = [measure(module) for module in args.modules]
+    if args.json:
+        print(json.dumps([report_as_dict(r, args.top) for r in reports], indent=2))
+    else:
+        for report in reports:
+            _print_report(report, args.top)
+
+    if args.budget_ms is not None:
+        over = [r for r in reports if r.import_ms > args.budget_ms]
+        for r in over:
+            print(
+                f"❌ {r.module}: {r.import_ms:.1f} ms exceeds budget {args.budget_ms:.1f} ms",
+                file=sys.stderr,
+            )
+        return 1 if over else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
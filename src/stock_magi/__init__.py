@@ -1,12 +1,38 @@
-"""Stock MAGI system package"""
+"""Stock MAGI system package
+
+サブモジュールは属性への初回アクセス時に読み込む (PEP 562)。
+`src.stock_magi.warmup` などを import しただけでは全エージェントを読み込まない。
+"""
+
+import importlib
+from typing import Any
+
+_LAZY_EXPORTS = {
+    "BalthasarAgent": ".agents",
+    "create_balthasar_agent": ".agents",
+    "CasperAgent": ".agents",
+    "create_casper_agent": ".agents",
+    "MelchiorAgent": ".agents",
+    "create_melchior_agent": ".agents",
+    "MELCHIOR_SYSTEM_MESSAGE": ".prompts",
+    "create_melchior_analysis_prompt": ".prompts",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
 
-from .agents import MelchiorAgent, create_melchior_agent
-from .prompts import (
-    MELCHIOR_SYSTEM_MESSAGE,
-    create_melchior_analysis_prompt,
-)
 
 __all__ = [
+    "BalthasarAgent",
+    "create_balthasar_agent",
+    "CasperAgent",
+    "create_casper_agent",
     "MelchiorAgent",
     "create_melchior_agent",
     "MELCHIOR_SYSTEM_MESSAGE",
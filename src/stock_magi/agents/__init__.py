@@ -1,5 +1,36 @@
-"""Stock MAGI agents package"""
+"""Stock MAGI agents package
 
-from .melchior_agent import MelchiorAgent, create_melchior_agent
+各エージェントは属性への初回アクセス時に読み込む (PEP 562)。
+使わないエージェントの依存を起動時に import しないため。
+"""
 
-__all__ = ["MelchiorAgent", "create_melchior_agent"]
+import importlib
+from typing import Any
+
+_LAZY_EXPORTS = {
+    "BalthasarAgent": ".balthasar_agent",
+    "create_balthasar_agent": ".balthasar_agent",
+    "CasperAgent": ".casper_agent",
+    "create_casper_agent": ".casper_agent",
+    "MelchiorAgent": ".melchior_agent",
+    "create_melchior_agent": ".melchior_agent",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+__all__ = [
+    "BalthasarAgent",
+    "CasperAgent",
+    "MelchiorAgent",
+    "create_balthasar_agent",
+    "create_casper_agent",
+    "create_melchior_agent",
+]
@@ -0,0 +1,232 @@
+"""
+Balthasar Agent: テクニカル分析専門エージェント
+
+J-Quants の株価 (ローカル Parquet ストア) から NumPy でテクニカル指標を計算し、
+BUY/SELL/HOLD を判定します。`ReusableConsensusOrchestrator` の agents に
+そのまま追加できます (`name` と async `analyze(ticker)` を持つ)。
+
+全銘柄をまとめて評価する場合は `universe_snapshot` で事前計算した表、または
+`IndicatorStateStore` (日次で漸化更新される永続化済みの指標状態) を渡すと、
+銘柄ごとの読み込み・計算を省略できます (指標の参照は定数時間)。
+"""
+
+import asyncio
+import math
+from collections.abc import Callable
+from datetime import date, timedelta
+from typing import Any
+
+from ..prompts.stock_analysis_prompts import create_balthasar_analysis_prompt
+
+# 指標計算に読み込む期間 (MACD / RSI の初期値の影響が十分小さくなる長さ)
+DEFAULT_LOOKBACK_DAYS = 400
+
+# RSI の過熱 / 売られすぎの閾値
+RSI_OVERBOUGHT = 70.0
+RSI_OVERSOLD = 30.0
+
+
+def _default_price_loader(ticker: str) -> Any:
+    """ローカルの ParquetStore から直近 DEFAULT_LOOKBACK_DAYS 日分の日足を読む"""
+    from src.mcp_providers.jquants_history import load_history
+    from src.mcp_providers.jquants_store import ParquetStore
+
+    start = date.today() - timedelta(days=DEFAULT_LOOKBACK_DAYS)
+    return load_history(ParquetStore(), [ticker], start=start)
+
+
+def score_indicators(values: dict[str, float]) -> tuple[str, float, list[str]]:
+    """
+    最新の指標値からテクニカル判定を行う
+
+    トレンド (終値 vs SMA, MACD ヒストグラム) とオシレーター (RSI, ボリンジャーバンド) の
+    シグナルを ±1 で合算し、+2 以上で BUY、-2 以下で SELL とする。
+
+    Args:
+        values: close / sma / macd_hist / rsi / bb_upper / bb_lower などの最新値
+
+    Returns:
+        (action, confidence, 根拠の一覧)
+    """
+
+    def has(name: str) -> bool:
+        value = values.get(name)
+        return isinstance(value, int | float) and not math.isnan(value)
+
+    score = 0
+    reasons: list[str] = []
+    close = values.get("close")
+
+    if has("close") and has("sma"):
+        above = close > values["sma"]
+        score += 1 if above else -1
+        reasons.append(f"終値 {close:.1f} は SMA {values['sma']:.1f} の{'上' if above else '下'}")
+    if has("macd_hist"):
+        positive = values["macd_hist"] > 0
+        score += 1 if positive else -1
+        reasons.append(f"MACD ヒストグラム {values['macd_hist']:+.2f}")
+    if has("rsi"):
+        if values["rsi"] >= RSI_OVERBOUGHT:
+            score -= 1
+            reasons.append(f"RSI {values['rsi']:.1f} (過熱)")
+        elif values["rsi"] <= RSI_OVERSOLD:
+            score += 1
+            reasons.append(f"RSI {values['rsi']:.1f} (売られすぎ)")
+        else:
+            reasons.append(f"RSI {values['rsi']:.1f}")
+    if has("close") and has("bb_upper") and has("bb_lower"):
+        if close > values["bb_upper"]:
+            score -= 1
+            reasons.append("ボリンジャーバンド上限を上回る")
+        elif close < values["bb_lower"]:
+            score += 1
+            reasons.append("ボリンジャーバンド下限を下回る")
+    if has("close") and has("atr") and close:
+        reasons.append(f"ATR/終値 {values['atr'] / close:.1%}")
+    if has("poc"):
+        reasons.append(f"価格帯別出来高の最大価格帯 {values['poc']:.1f}")
+
+    if score >= 2:
+        action = "BUY"
+    elif score <= -2:
+        action = "SELL"
+    else:
+        action = "HOLD"
+    confidence = min(0.5 + 0.1 * abs(score), 0.9)
+    return action, confidence, reasons
+
+
+class BalthasarAgent:
+    """
+    Balthasar エージェント - テクニカル分析専門
+
+    - 株価は `price_loader(ticker)` (既定: ローカル ParquetStore) から取得
+    - 指標は `src.stock_magi.indicators` で NumPy により一括計算
+    - LLM クライアントがあれば指標をプロンプトに渡して判定、無ければルールベースで判定
+    """
+
+    def __init__(
+        self,
+        price_loader: Callable[[str], Any] | None = None,
+        llm_client: Any | None = None,
+        snapshot: Any | None = None,
+        params: Any | None = None,
+        state_store: Any | None = None,
+    ):
+        """
+        Initialize Balthasar agent
+
+        Args:
+            price_loader: 銘柄 -> `load_history` 形式の DataFrame を返す関数
+            llm_client: `analyze(key, prompt)` を持つ LLM クライアント。None はルールベース判定のみ
+            snapshot: `universe_snapshot` の結果 (index = Code)。含まれる銘柄は再計算しない
+            params: `IndicatorParams` (None は既定値)
+            state_store: `IndicatorStateStore`。保存済みの銘柄は状態から最新値を参照する
+        """
+        self.name = "Balthasar"
+        self.role = "テクニカル分析"
+        self.price_loader = price_loader or _default_price_loader
+        self.llm_client = llm_client
+        self.snapshot = snapshot
+        self.params = params
+        self.state_store = state_store
+
+    def _snapshot_row(self, ticker: str) -> dict[str, float] | None:
+        if self.snapshot is None:
+            return None
+        from src.mcp_providers.jquants_history import normalize_code
+
+        for code in normalize_code(ticker):
+            if code in self.snapshot.index:
+                return self.snapshot.loc[code].to_dict()
+        return None
+
+    def _compute(self, ticker: str) -> dict[str, float] | None:
+        """銘柄の株価を読み込み、最新の指標値を返す (データが無ければ None)"""
+        row = self._snapshot_row(ticker)
+        if row is not None:
+            return row
+        if self.state_store is not None and self.state_store.exists():
+            row = self.state_store.lookup(ticker)
+            if row is not None:
+                return row
+
+        from src.stock_magi.indicators import universe_snapshot
+
+        df = self.price_loader(ticker)
+        if df is None or len(df) == 0:
+            return None
+        snapshot = universe_snapshot(df, self.params)
+        return snapshot.iloc[-1].to_dict()
+
+    async def analyze(self, ticker: str) -> dict[str, Any]:
+        """
+        銘柄を分析し、投資判断を返す
+
+        Args:
+            ticker: 銘柄コード (例: "7203.T")
+
+        Returns:
+            {
+                "action": "BUY/SELL/HOLD",
+                "confidence": 0.0-1.0,
+                "reasoning": "分析根拠"
+            }
+        """
+        try:
+            # Parquet の読み込みと指標計算はイベントループを塞がないようスレッドで実行
+            values = await asyncio.to_thread(self._compute, ticker)
+        except Exception:
+            return {"action": "HOLD", "confidence": 0.0, "reasoning": "price data unavailable"}
+
+        if values is None:
+            return {
+                "action": "HOLD",
+                "confidence": 0.0,
+                "reasoning": f"{ticker} の株価データがローカルストアにありません。",
+            }
+
+        if self.llm_client is not None:
+            prompt = create_balthasar_analysis_prompt(ticker, values)
+            try:
+                return await self.llm_client.analyze(ticker, prompt)
+            except Exception:
+                pass
+
+        action, confidence, reasons = score_indicators(values)
+        return {
+            "action": action,
+            "confidence": confidence,
+            "reasoning": f"{ticker} のテクニカル分析: " + "、".join(reasons),
+        }
+
+
+def create_balthasar_agent(
+    price_loader: Callable[[str], Any] | None = None,
+    llm_client: Any | None = None,
+    snapshot: Any | None = None,
+    state_store: Any | None = None,
+) -> BalthasarAgent:
+    """
+    Balthasar エージェントを作成 (Factory function)
+
+    Args:
+        price_loader: 銘柄 -> 日足 DataFrame (None はローカル ParquetStore)
+        llm_client: 任意の LLM クライアント
+        snapshot: 全銘柄分の事前計算済み指標 (`universe_snapshot`)
+        state_store: 永続化済みの指標状態 (`IndicatorStateStore`)
+
+    Returns:
+        BalthasarAgent インスタンス
+
+    使用例:
+        >>> balthasar = create_balthasar_agent()
+        >>> orchestrator = ReusableConsensusOrchestrator(agents=[melchior, balthasar])
+        >>> decision = await orchestrator.reach_consensus({"ticker": "7203.T"})
+    """
+    return BalthasarAgent(
+        price_loader, llm_client=llm_client, snapshot=snapshot, state_store=state_store
+    )
+
+
+__all__ = ["BalthasarAgent", "create_balthasar_agent", "score_indicators"]
@@ -0,0 +1,236 @@
+"""
+Casper Agent: センチメント分析専門エージェント
+
+ニュース見出し・適時開示などの文書をローカル (CPU のみ) のスコアラーでバッチ評価し、
+BUY/SELL/HOLD を判定します。文書スコアは `DocumentScoreCache` で本文単位に
+重複排除されるため、同じ記事は何銘柄で言及されても 1 回しか評価されません。
+
+`feature_store` (事前計算した信用残・空売り残高の特徴量) を渡すと、LLM を使わない
+需給シグナルを文書スコアと合成します。
+
+`ReusableConsensusOrchestrator` の 3 番目の投票者としてそのまま追加できます。
+"""
+
+import asyncio
+import inspect
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from ..prompts.stock_analysis_prompts import create_casper_analysis_prompt
+from ..sentiment import Document, DocumentScoreCache, document_id, get_document_score_cache
+
+# 平均スコアがこの値を超えると BUY / SELL
+SENTIMENT_THRESHOLD = 0.25
+
+# 信頼度を上げるのに必要な「中立でない」文書数
+FULL_COVERAGE_DOCUMENTS = 3
+
+# 文書がある場合に需給シグナルへ割り当てる重み
+FEATURE_WEIGHT = 0.3
+
+DocumentSource = Callable[[str], Any]
+
+
+def _as_document(item: Any) -> Document:
+    if isinstance(item, Document):
+        return item
+    if isinstance(item, str):
+        return Document(item)
+    if isinstance(item, dict):
+        return Document(
+            str(item.get("text") or item.get("title") or item.get("headline") or ""),
+            source=str(item.get("source") or ""),
+            published=item.get("published"),
+            url=item.get("url"),
+        )
+    raise TypeError(f"unsupported document type: {type(item).__name__}")
+
+
+def summarize_scores(scores: list[float]) -> tuple[str, float, float]:
+    """
+    文書スコアの一覧から判定する
+
+    Returns:
+        (action, confidence, 平均スコア)
+    """
+    if not scores:
+        return "HOLD", 0.0, 0.0
+    mean = sum(scores) / len(scores)
+    opinionated = sum(1 for s in scores if s != 0.0)
+    coverage = min(opinionated / FULL_COVERAGE_DOCUMENTS, 1.0)
+    if mean >= SENTIMENT_THRESHOLD:
+        action = "BUY"
+    elif mean <= -SENTIMENT_THRESHOLD:
+        action = "SELL"
+    else:
+        action = "HOLD"
+    confidence = min(0.5 + 0.4 * abs(mean) * coverage, 0.9) if opinionated else 0.5
+    return action, round(confidence, 3), mean
+
+
+def _describe_features(features: dict[str, Any]) -> str:
+    parts = [f"需給シグナル {features['signal']:+.2f}"]
+    if features.get("margin_ratio") is not None:
+        parts.append(f"信用倍率 {features['margin_ratio']:.2f}")
+    if features.get("short_ratio") is not None:
+        parts.append(f"空売り比率 {features['short_ratio']:.2%}")
+    return "、".join(parts)
+
+
+class CasperAgent:
+    """
+    Casper エージェント - センチメント分析専門
+
+    - 文書は `document_source(ticker)` (同期・非同期どちらも可) から取得
+    - スコアは `DocumentScoreCache` (既定はプロセス共有のシングルトン) で重複排除・バッチ評価
+    - LLM クライアントがあればスコア付きの文書をプロンプトに渡して判定、無ければ平均スコアで判定
+    - `feature_store` があれば事前計算済みの需給シグナル (主キー参照 1 回) を合成
+    """
+
+    def __init__(
+        self,
+        document_source: DocumentSource | None = None,
+        score_cache: DocumentScoreCache | None = None,
+        llm_client: Any | None = None,
+        max_documents: int = 50,
+        feature_store: Any | None = None,
+    ):
+        """
+        Initialize Casper agent
+
+        Args:
+            document_source: 銘柄 -> 文書 (Document / str / {"text": ...}) の一覧を返す関数
+            score_cache: 文書スコアキャッシュ (None は `get_document_score_cache()`)
+            llm_client: `analyze(key, prompt)` を持つ LLM クライアント
+            max_documents: 1 銘柄あたりに評価する文書数の上限 (新しい順に渡すこと)
+            feature_store: `get(ticker)` で需給特徴量を返すストア
+                (`src.mcp_providers.jquants_features.FeatureStore`)
+        """
+        self.name = "Casper"
+        self.role = "センチメント分析"
+        self.document_source = document_source
+        self.score_cache = score_cache or get_document_score_cache()
+        self.llm_client = llm_client
+        self.max_documents = max_documents
+        self.feature_store = feature_store
+
+    async def _documents(self, ticker: str) -> list[Document]:
+        if self.document_source is None:
+            return []
+        items = self.document_source(ticker)
+        if inspect.isawaitable(items):
+            items = await items
+        documents: Iterable[Any] = items or []
+        return [_as_document(item) for item in documents][: self.max_documents]
+
+    async def _features(self, ticker: str) -> dict[str, Any] | None:
+        if self.feature_store is None:
+            return None
+        try:
+            features = await asyncio.to_thread(self.feature_store.get, ticker)
+        except Exception:
+            return None
+        if not features or features.get("signal") is None:
+            return None
+        return features
+
+    async def analyze(self, ticker: str) -> dict[str, Any]:
+        """
+        銘柄を分析し、投資判断を返す
+
+        Args:
+            ticker: 銘柄コード (例: "7203.T")
+
+        Returns:
+            {
+                "action": "BUY/SELL/HOLD",
+                "confidence": 0.0-1.0,
+                "reasoning": "分析根拠"
+            }
+        """
+        try:
+            documents = [d for d in await self._documents(ticker) if d.text.strip()]
+            scores = await self.score_cache.score_documents(documents) if documents else {}
+        except Exception:
+            return {"action": "HOLD", "confidence": 0.0, "reasoning": "document source failed"}
+        features = await self._features(ticker)
+
+        if not documents and features is not None:
+            action, confidence, _ = summarize_scores([features["signal"]])
+            return {
+                "action": action,
+                "confidence": round(min(confidence, 0.6), 3),
+                "reasoning": (
+                    f"{ticker} のニュース・開示文書はありません。{_describe_features(features)}。"
+                ),
+            }
+
+        if not documents:
+            return {
+                "action": "HOLD",
+                "confidence": 0.0,
+                "reasoning": f"{ticker} に関するニュース・開示文書がありません。",
+            }
+
+        scored = [
+            {
+                "text": doc.text,
+                "score": scores[document_id(doc.text)],
+                "source": doc.source,
+                "published": doc.published,
+            }
+            for doc in documents
+        ]
+
+        if self.llm_client is not None:
+            prompt = create_casper_analysis_prompt(ticker, scored)
+            try:
+                return await self.llm_client.analyze(ticker, prompt)
+            except Exception:
+                pass
+
+        action, confidence, mean = summarize_scores([doc["score"] for doc in scored])
+        strongest = sorted(scored, key=lambda d: abs(d["score"]), reverse=True)[:3]
+        quotes = "、".join(f"「{d['text'][:40]}」({d['score']:+.2f})" for d in strongest)
+        reasoning = (
+            f"{ticker} のセンチメント分析: 文書 {len(scored)} 件の平均スコア {mean:+.2f}。"
+            f"主な材料: {quotes}"
+        )
+        if features is not None:
+            blended = (1 - FEATURE_WEIGHT) * mean + FEATURE_WEIGHT * features["signal"]
+            action, _, _ = summarize_scores([blended])
+            reasoning += f"。{_describe_features(features)} を加味した合成スコア {blended:+.2f}"
+        return {"action": action, "confidence": confidence, "reasoning": reasoning}
+
+
+def create_casper_agent(
+    document_source: DocumentSource | None = None,
+    score_cache: DocumentScoreCache | None = None,
+    llm_client: Any | None = None,
+    feature_store: Any | None = None,
+) -> CasperAgent:
+    """
+    Casper エージェントを作成 (Factory function)
+
+    Args:
+        document_source: 銘柄 -> 文書一覧 (ニュース API や適時開示の取得関数)
+        score_cache: 文書スコアキャッシュ (None はプロセス共有のシングルトン)
+        llm_client: 任意の LLM クライアント
+        feature_store: 需給特徴量ストア (`get_feature_store()` など)
+
+    Returns:
+        CasperAgent インスタンス
+
+    使用例:
+        >>> casper = create_casper_agent(document_source=fetch_headlines)
+        >>> orchestrator = ReusableConsensusOrchestrator(agents=[melchior, balthasar, casper])
+    """
+    return CasperAgent(
+        document_source,
+        score_cache=score_cache,
+        llm_client=llm_client,
+        feature_store=feature_store,
+    )
+
+
+__all__ = ["CasperAgent", "create_casper_agent", "summarize_scores"]
@@ -6,12 +6,89 @@ Phase 1 では Morningstar MCP Server (Foundry Tool Catalog) を使用。
 """
 
 import inspect
+import logging
+import math
 from typing import Any
 
+from src.common.data_gathering import DataGatheringError
+
 from ..prompts.stock_analysis_prompts import (
     create_melchior_analysis_prompt,
 )
 
+logger = logging.getLogger(__name__)
+
+# バリュエーション判定の閾値 (PER / PBR は倍、ROE は比率)
+PER_CHEAP = 12.0
+PER_EXPENSIVE = 30.0
+PBR_CHEAP = 1.0
+PBR_EXPENSIVE = 4.0
+ROE_STRONG = 0.10
+ROE_WEAK = 0.03
+
+
+def score_fundamentals(data: dict[str, Any]) -> tuple[str, float, list[str]]:
+    """
+    PER / PBR / ROE からファンダメンタルズ判定を行う
+
+    割安 (低 PER・低 PBR)・高 ROE を +1、割高・低 ROE・赤字を -1 として合算し、
+    +2 以上で BUY、-2 以下で SELL とする。
+
+    Args:
+        data: per / pbr / roe (None・NaN は判定に使わない)。eps が負なら赤字とみなす
+
+    Returns:
+        (action, confidence, 根拠の一覧)
+    """
+
+    def value(name: str) -> float | None:
+        v = data.get(name)
+        return float(v) if isinstance(v, int | float) and not math.isnan(v) else None
+
+    score = 0
+    reasons: list[str] = []
+    per, pbr, roe, eps = value("per"), value("pbr"), value("roe"), value("eps")
+
+    if eps is not None and eps <= 0:
+        score -= 1
+        reasons.append(f"EPS {eps:.1f} (赤字)")
+    elif per is not None:
+        if per <= PER_CHEAP:
+            score += 1
+            reasons.append(f"PER {per:.1f} 倍 (割安)")
+        elif per >= PER_EXPENSIVE:
+            score -= 1
+            reasons.append(f"PER {per:.1f} 倍 (割高)")
+        else:
+            reasons.append(f"PER {per:.1f} 倍")
+    if pbr is not None:
+        if pbr <= PBR_CHEAP:
+            score += 1
+            reasons.append(f"PBR {pbr:.2f} 倍 (解散価値以下)")
+        elif pbr >= PBR_EXPENSIVE:
+            score -= 1
+            reasons.append(f"PBR {pbr:.2f} 倍 (割高)")
+        else:
+            reasons.append(f"PBR {pbr:.2f} 倍")
+    if roe is not None:
+        if roe >= ROE_STRONG:
+            score += 1
+            reasons.append(f"ROE {roe:.1%} (高収益)")
+        elif roe < ROE_WEAK:
+            score -= 1
+            reasons.append(f"ROE {roe:.1%} (低収益)")
+        else:
+            reasons.append(f"ROE {roe:.1%}")
+
+    if score >= 2:
+        action = "BUY"
+    elif score <= -2:
+        action = "SELL"
+    else:
+        action = "HOLD"
+    confidence = min(0.5 + 0.1 * abs(score), 0.9)
+    return action, confidence, reasons
+
 
 class MelchiorAgent:
     """
@@ -28,12 +105,18 @@ class MelchiorAgent:
         - 履歴管理とコンテキスト保持
     """
 
-    def __init__(self, foundry_tool: Any):
+    def __init__(
+        self, foundry_tool: Any, llm_client: Any | None = None, snapshot_store: Any | None = None
+    ):
         """
         Initialize Melchior agent
 
         Args:
             foundry_tool: Foundry Tool Catalog から取得した Morningstar tool
+            llm_client: `analyze(key, prompt)` を持つ LLM クライアント
+                (例: `BatchedChatClient`)。None の場合はヒューリスティック判定のみ。
+            snapshot_store: `SnapshotStore`。指定すると取得した market_data を保存し、
+                判定結果に `snapshot_id` を付ける
 
         Phase 1: モック実装
         Phase 2: Agent Framework の Agent クラスで実装
@@ -41,6 +124,11 @@ class MelchiorAgent:
         self.name = "Melchior"
         self.role = "ファンダメンタルズ分析"
         self.foundry_tool = foundry_tool
+        self.llm_client = llm_client
+        self.snapshot_store = snapshot_store
+        # 複数ソースの同時取得 (エージェントレジストリが config/agents.json の data から設定)
+        self.data_requirements: tuple[Any, ...] = ()
+        self.data_gatherer: Any | None = None
 
         # Phase 2 で Agent Framework 統合
         # from agent_framework import Agent
@@ -74,6 +162,23 @@ class MelchiorAgent:
             - Tool calling で実際の Morningstar データ取得
             - LLM による動的判断
         """
+        if self.data_requirements and self.data_gatherer is not None:
+            # 宣言された全ソースを同時に取得し、1 つの market_data にまとめる
+            # (required でないソースの失敗は残りのソースで判定する)
+            try:
+                gathered = await self.data_gatherer.gather(ticker, self.data_requirements)
+            except DataGatheringError as e:
+                gathered = e.result
+            else:
+                if gathered.data:
+                    return await self._decide(ticker, gathered.merged())
+            missing = ", ".join(gathered.missing)
+            return {
+                "action": "HOLD",
+                "confidence": 0.0,
+                "reasoning": f"Data unavailable: {missing}",
+            }
+
         # If a Foundry tool client exists and exposes an async `get_fundamentals`, use it.
         gf = getattr(self.foundry_tool, "get_fundamentals", None)
         if gf is not None and inspect.iscoroutinefunction(gf):
@@ -81,34 +186,76 @@ class MelchiorAgent:
                 market_data = await gf(ticker)
             except Exception:
                 return {"action": "HOLD", "confidence": 0.0, "reasoning": "Foundry call failed"}
+            return await self._decide(ticker, market_data)
+
+        return self._mock(ticker)
+
+    async def _decide(self, ticker: str, market_data: Any) -> dict[str, Any]:
+        """market_data から判定し、スナップショット ID を付けて返す"""
+        result = await self._judge(ticker, market_data) or self._mock(ticker)
+        snapshot = await self._snapshot(market_data)
+        if snapshot and isinstance(result, dict):
+            return {**result, "snapshot_id": snapshot}
+        return result
 
-            # Prompt still generated for future LLM integration
-            _analysis_prompt = create_melchior_analysis_prompt(ticker, market_data)
-
-            # Simple heuristic mapping from foundry output to action
-            rec = market_data.get("recommendation") if isinstance(market_data, dict) else None
-            if isinstance(rec, str):
-                if rec.lower() in ("buy", "strong_buy"):
-                    return {
-                        "action": "BUY",
-                        "confidence": 0.8,
-                        "reasoning": f"Foundry recommendation: {rec}",
-                    }
-                if rec.lower() in ("sell", "strong_sell"):
-                    return {
-                        "action": "SELL",
-                        "confidence": 0.8,
-                        "reasoning": f"Foundry recommendation: {rec}",
-                    }
-
-            fair = market_data.get("fair_value")
-            price = market_data.get("price")
-            if isinstance(fair, int | float) and isinstance(price, int | float):
-                if fair > price:
-                    return {"action": "BUY", "confidence": 0.7, "reasoning": "fair_value > price"}
-                if fair < price:
-                    return {"action": "SELL", "confidence": 0.7, "reasoning": "fair_value < price"}
+    async def _snapshot(self, market_data: Any) -> str | None:
+        """判定に使った market_data をスナップショットストアに保存して ID を返す"""
+        if self.snapshot_store is None:
+            return None
+        try:
+            return await self.snapshot_store.put(market_data)
+        except Exception:
+            # 保存の失敗で判定自体は失敗させない
+            return None
+
+    async def _judge(self, ticker: str, market_data: Any) -> dict[str, Any] | None:
+        """取得した market_data から判定する (判定材料が無ければ None)"""
+        analysis_prompt = create_melchior_analysis_prompt(ticker, market_data)
+
+        # LLM client (batched across concurrent tickers) takes precedence over heuristics
+        if self.llm_client is not None:
+            try:
+                return await self.llm_client.analyze(ticker, analysis_prompt)
+            except Exception as e:
+                # LLM の障害時はヒューリスティック判定にフォールバックする
+                logger.warning("Melchior LLM call failed for %s: %s", ticker, e)
+
+        # Simple heuristic mapping from foundry output to action
+        rec = market_data.get("recommendation") if isinstance(market_data, dict) else None
+        if isinstance(rec, str):
+            if rec.lower() in ("buy", "strong_buy"):
+                return {
+                    "action": "BUY",
+                    "confidence": 0.8,
+                    "reasoning": f"Foundry recommendation: {rec}",
+                }
+            if rec.lower() in ("sell", "strong_sell"):
+                return {
+                    "action": "SELL",
+                    "confidence": 0.8,
+                    "reasoning": f"Foundry recommendation: {rec}",
+                }
+
+        fair = market_data.get("fair_value")
+        price = market_data.get("price")
+        if isinstance(fair, int | float) and isinstance(price, int | float):
+            if fair > price:
+                return {"action": "BUY", "confidence": 0.7, "reasoning": "fair_value > price"}
+            if fair < price:
+                return {"action": "SELL", "confidence": 0.7, "reasoning": "fair_value < price"}
+
+        # ローカルの決算データ (PER / PBR / ROE) によるバリュエーション判定
+        if any(key in market_data for key in ("per", "pbr", "roe")):
+            action, confidence, reasons = score_fundamentals(market_data)
+            summary = "、".join(reasons or ["データ不足"])
+            return {
+                "action": action,
+                "confidence": confidence,
+                "reasoning": f"{ticker} のバリュエーション: {summary}",
+            }
+        return None
 
+    def _mock(self, ticker: str) -> dict[str, Any]:
         # Fallback Phase 1 mock response
         _analysis_prompt = create_melchior_analysis_prompt(ticker, {"ticker": ticker})
         return {
@@ -118,12 +265,16 @@ class MelchiorAgent:
         }
 
 
-def create_melchior_agent(foundry_tool: Any) -> MelchiorAgent:
+def create_melchior_agent(
+    foundry_tool: Any, llm_client: Any | None = None, snapshot_store: Any | None = None
+) -> MelchiorAgent:
     """
     Melchior エージェントを作成 (Factory function)
 
     Args:
         foundry_tool: Foundry Tool Catalog から取得した Morningstar tool
+        llm_client: 任意の LLM クライアント (スクリーニング時は `BatchedChatClient` を共有)
+        snapshot_store: 入力データを保存する `SnapshotStore` (API では `get_snapshot_store()`)
 
     Returns:
         MelchiorAgent インスタンス
@@ -135,7 +286,7 @@ def create_melchior_agent(foundry_tool: Any) -> MelchiorAgent:
         >>> melchior = create_melchior_agent(morningstar_tool)
         >>> result = await melchior.analyze("7203.T")
     """
-    return MelchiorAgent(foundry_tool)
+    return MelchiorAgent(foundry_tool, llm_client=llm_client, snapshot_store=snapshot_store)
 
 
-__all__ = ["MelchiorAgent", "create_melchior_agent"]
+__all__ = ["MelchiorAgent", "create_melchior_agent", "score_fundamentals"]
@@ -0,0 +1,184 @@
+"""
+Shared stock analysis service.
+
+合議による銘柄分析の処理をまとめたもので、REST API (`/api/analyze`) と MCP サーバー
+(`src.stock_magi.mcp_server`) が共有します。同じプロセスで動かす場合は、ツールレジストリ
+(キャッシュ・HTTP 接続プール)、エージェントレジストリ、監査ログもプロセス共通のものを使います。
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Any
+
+from src.common.agent_registry import AgentRegistry, get_agent_registry
+from src.common.audit import AuditLog, get_audit_log
+from src.common.cache import get_cache
+from src.common.consensus import ReusableConsensusOrchestrator
+from src.common.data_gathering import RequestDataContext
+from src.common.mcp import FoundryToolRegistry, get_tool_registry
+from src.common.models import AgentVote
+from src.stock_magi.announcements import (
+    decision_cache_key,
+    get_announcement_schedule,
+    get_announcement_settings,
+)
+
+# 投票ごとのコールバック (銘柄, 投票の内容)。途中経過の配信に使う
+VoteCallback = Callable[[str, dict[str, Any]], Awaitable[None]]
+
+DEFAULT_BATCH_CONCURRENCY = 8
+
+
+def vote_entry(vote: AgentVote) -> dict[str, Any]:
+    """投票をレスポンスの reasoning の 1 要素に変換する"""
+    return {
+        "agent": vote.agent_name,
+        "action": vote.action.value,
+        "confidence": vote.confidence,
+        "reasoning": vote.reasoning,
+        "snapshot_id": vote.snapshot_id,
+    }
+
+
+class AnalysisService:
+    """
+    銘柄分析 (エージェントの合議) サービス
+
+    Args:
+        tool_registry: ツールの取得元 (None はプロセス共通のレジストリ)
+        agent_registry: エージェントの取得元 (None はプロセス共通のレジストリ)
+        audit_log: 合議結果の記録先 (None は記録しない)
+        decision_cache_ttl: 合議結果のキャッシュ秒数 (None は DECISION_CACHE_TTL)
+    """
+
+    def __init__(
+        self,
+        tool_registry: FoundryToolRegistry | None = None,
+        agent_registry: AgentRegistry | None = None,
+        audit_log: AuditLog | None = None,
+        decision_cache_ttl: float | None = None,
+    ):
+        self.tool_registry = tool_registry or get_tool_registry()
+        self.agent_registry = agent_registry or get_agent_registry()
+        self.audit_log = audit_log
+        if decision_cache_ttl is None:
+            decision_cache_ttl = get_announcement_settings().decision_cache_ttl
+        self.decision_cache_ttl = decision_cache_ttl
+
+    async def analyze(
+        self,
+        ticker: str,
+        agents: Sequence[str] | None = None,
+        on_vote: VoteCallback | None = None,
+    ) -> dict[str, Any]:
+        """
+        1 銘柄を合議で分析する
+
+        先頭エージェントの分析失敗は例外として呼び出し元に返す
+        (2 番目以降のエージェントの失敗は HOLD 票として扱う)。
+
+        Args:
+            ticker: 銘柄コード
+            agents: 合議パネル (None は default_panel)
+            on_vote: 投票が出るたびに呼ぶコールバック (キャッシュ済みの結果でも全投票を渡す)
+
+        Returns:
+            AnalyzeResponse と同じ形の dict (JSON に変換可能)
+
+        Raises:
+            ValueError: 宣言されていない / 無効化されたエージェント
+        """
+        panel = self.agent_registry.resolve_panel(agents)
+        # キャッシュキーは銘柄のみのため、既定パネル以外の結果は保存しない
+        cacheable = self.decision_cache_ttl > 0 and panel == self.agent_registry.default_panel
+        cache = (self.tool_registry.cache or get_cache()) if cacheable else None
+        if cache is not None:
+            cached = await cache.get(decision_cache_key(ticker))
+            if cached is not None:
+                if on_vote is not None:
+                    for entry in cached.get("reasoning") or []:
+                        await on_vote(ticker, entry)
+                # 表記の違う銘柄で保存された結果でも、要求された表記で返す
+                return {**cached, "ticker": ticker}
+
+        # 1. パネルのエージェントを取得 (初回のみツールとともに生成)
+        members = self.agent_registry.panel(panel, self.tool_registry)
+
+        async def forward(vote: AgentVote) -> None:
+            await on_vote(ticker, vote_entry(vote))
+
+        # 合議全体で 1 つのデータコンテキストを使い、全エージェントの入力を 1 回ずつ同時に取得する
+        with RequestDataContext.scope() as data_context:
+            data_context.prefetch(ticker, members)
+
+            # 2. 先頭エージェントの分析
+            analysis_result = await members[0].analyze(ticker)
+
+            # 3. Consensus Orchestrator で合議 (残りのエージェントはここで分析)
+            orchestrator = ReusableConsensusOrchestrator(agents=members, voting_strategy="majority")
+            decision = await orchestrator.reach_consensus(
+                input_context={"ticker": ticker, "analysis_result": analysis_result},
+                on_vote=forward if on_vote is not None else None,
+            )
+
+        result = {
+            "ticker": ticker,
+            "final_action": decision.final_action.value,
+            "confidence": decision.weighted_confidence,
+            "summary": decision.summary,
+            "reasoning": [vote_entry(vote) for vote in decision.votes],
+            "has_conflict": decision.has_conflict,
+            "snapshot_ids": {v.agent_name: v.snapshot_id for v in decision.votes if v.snapshot_id},
+        }
+
+        if self.audit_log is not None:
+            await self.audit_log.record(ticker, decision)
+
+        if cache is not None:
+            ttl = get_announcement_schedule().ttl(ticker, self.decision_cache_ttl)
+            await cache.set(decision_cache_key(ticker), result, ttl=ttl)
+        return result
+
+    async def analyze_many(
+        self,
+        tickers: Sequence[str],
+        agents: Sequence[str] | None = None,
+        on_vote: VoteCallback | None = None,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ) -> list[dict[str, Any]]:
+        """
+        複数銘柄を並行に分析する (同時実行数は concurrency まで)
+
+        銘柄ごとの失敗は {"ticker": ..., "error": ...} として結果に含め、他の銘柄は続ける。
+
+        Returns:
+            tickers と同じ順の結果
+
+        Raises:
+            ValueError: 宣言されていない / 無効化されたエージェント (分析を始める前に検証)
+        """
+        panel = self.agent_registry.resolve_panel(agents)
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def run(ticker: str) -> dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await self.analyze(ticker, panel, on_vote)
+                except Exception as e:
+                    return {"ticker": ticker, "error": str(e)}
+
+        return list(await asyncio.gather(*(run(t) for t in tickers)))
+
+
+def default_analysis_service() -> AnalysisService:
+    """プロセス共通のレジストリと監査ログを使う AnalysisService"""
+    return AnalysisService(get_tool_registry(), get_agent_registry(), get_audit_log())
+
+
+__all__ = [
+    "AnalysisService",
+    "DEFAULT_BATCH_CONCURRENCY",
+    "VoteCallback",
+    "default_analysis_service",
+    "vote_entry",
+]
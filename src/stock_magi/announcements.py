@@ -0,0 +1,374 @@
+"""
+Earnings-announcement-aware cache invalidation.
+
+ファンダメンタルズや合議結果は固定 TTL ではなく「決算が発表されたとき」に古くなります。
+夜間 ETL が保存した J-Quants の決算発表予定 (`announcement`) から銘柄別の発表時刻表を作り、
+次のように使います。
+
+    - TTL の上限: キャッシュの期限を次回の発表時刻で打ち切る
+      (どのワーカー・ホストが書いた値も発表時刻に失効する)
+    - 発表時刻: `AnnouncementInvalidator` が該当銘柄のキーを削除し、
+      少し待ってからファンダメンタルズを事前取得する
+    - 発表直後 (settle 期間): 開示の反映が遅れることがあるため短い TTL を使う
+
+発表予定の無い期間は長い TTL (`FUNDAMENTALS_LONG_TTL`) を安全に使えます。
+"""
+
+import asyncio
+import bisect
+import heapq
+import logging
+import time as time_module
+from collections.abc import Callable, Iterable
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from pydantic import ConfigDict, Field
+from pydantic_settings import BaseSettings
+
+from src.common.cache import CacheBackend, get_cache
+from src.common.mcp import FoundryToolRegistry, get_tool_registry
+from src.common.mcp.foundry_tool_registry import fundamentals_cache_key
+
+logger = logging.getLogger(__name__)
+
+JST = ZoneInfo("Asia/Tokyo")
+
+
+class AnnouncementSettings(BaseSettings):
+    """
+    決算発表連動キャッシュの設定
+
+    環境変数から読み込み:
+        ANNOUNCEMENT_INVALIDATION: 発表予定による失効・事前取得を有効にするか
+        ANNOUNCEMENT_TIME: 発表時刻 (JST, "HH:MM")。予定データに時刻が無いため大引け後を既定とする
+        ANNOUNCEMENT_PREFETCH_DELAY: 発表時刻から事前取得までの秒数
+        ANNOUNCEMENT_SETTLE: 発表後に短い TTL を使う秒数
+        ANNOUNCEMENT_RELOAD_INTERVAL: 発表予定を読み直す間隔 (秒)
+        FUNDAMENTALS_LONG_TTL: 有効時のファンダメンタルズ TTL 秒数 (次回発表時刻で打ち切る)
+        DECISION_CACHE_TTL: 合議結果のキャッシュ TTL 秒数 (0 はキャッシュしない)
+    """
+
+    announcement_invalidation: bool = Field(False, alias="ANNOUNCEMENT_INVALIDATION")
+    announcement_time: str = Field("15:30", alias="ANNOUNCEMENT_TIME")
+    announcement_prefetch_delay: float = Field(1800.0, alias="ANNOUNCEMENT_PREFETCH_DELAY")
+    announcement_settle: float = Field(21600.0, alias="ANNOUNCEMENT_SETTLE")
+    announcement_reload_interval: float = Field(3600.0, alias="ANNOUNCEMENT_RELOAD_INTERVAL")
+    fundamentals_long_ttl: float = Field(7 * 86400.0, alias="FUNDAMENTALS_LONG_TTL")
+    decision_cache_ttl: float = Field(0.0, alias="DECISION_CACHE_TTL")
+
+    model_config = ConfigDict(env_file=None)
+
+    @property
+    def publish_time(self) -> time:
+        return time.fromisoformat(self.announcement_time)
+
+
+def decision_cache_key(ticker: str) -> str:
+    """
+    合議結果のキャッシュキー (ワーカー間で共有されるため形式を固定)
+
+    銘柄表記は 4 桁のコードに揃える ("7203.T" / "7203.t" / "7203.TSE" / "72030" は同じキー)。
+    発表時の削除が表記ゆれで漏れないようにするため。
+    """
+    return f"decision:{_code(ticker)}"
+
+
+def _code(ticker: str) -> str:
+    """銘柄表記を 4 桁のコードに揃える ("7203.T" / "72030" -> "7203")"""
+    code = str(ticker).split(".")[0].strip().upper()
+    return code[:4] if len(code) == 5 and code.endswith("0") else code
+
+
+def ticker_variants(ticker: str) -> list[str]:
+    """キャッシュキーに使われうる銘柄表記 ("7203.T", "7203", "72030")"""
+    code = _code(ticker)
+    return [f"{code}.T", code, code + "0"]
+
+
+def _as_date(value: Any) -> date | None:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+class AnnouncementSchedule:
+    """
+    銘柄別の決算発表時刻表 (JST)
+
+    使用例:
+        >>> schedule = AnnouncementSchedule.from_records([{"Code": "72030", "Date": "2024-08-01"}])
+        >>> ttl = schedule.ttl("7203.T", 7 * 86400)   # 次回発表までの秒数で打ち切った TTL
+    """
+
+    def __init__(
+        self, announcements: dict[str, list[datetime]] | None = None, settle_s: float = 21600.0
+    ):
+        self.settle_s = settle_s
+        self._by_code = {code: sorted(times) for code, times in (announcements or {}).items()}
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[dict[str, Any]],
+        publish_time: time = time(15, 30),
+        settle_s: float = 21600.0,
+    ) -> "AnnouncementSchedule":
+        """J-Quants `announcement` の行 (Code / Date) から作成。日付が未定の行は無視する"""
+        by_code: dict[str, set[datetime]] = {}
+        for record in records:
+            day = _as_date(record.get("Date"))
+            if record.get("Code") is None or day is None:
+                continue
+            at = datetime.combine(day, publish_time, tzinfo=JST)
+            by_code.setdefault(_code(record["Code"]), set()).add(at)
+        return cls({code: list(times) for code, times in by_code.items()}, settle_s)
+
+    def replace(self, other: "AnnouncementSchedule") -> None:
+        """読み直した予定で置き換える (共有インスタンスを参照している TTL 関数もそのまま使える)"""
+        self._by_code = other._by_code
+        self.settle_s = other.settle_s
+
+    def __len__(self) -> int:
+        return len(self._by_code)
+
+    def next_announcement(self, ticker: str, now: datetime | None = None) -> datetime | None:
+        """now より後の直近の発表時刻 (無ければ None)"""
+        times = self._by_code.get(_code(ticker), [])
+        i = bisect.bisect_right(times, now or datetime.now(JST))
+        return times[i] if i < len(times) else None
+
+    def last_announcement(self, ticker: str, now: datetime | None = None) -> datetime | None:
+        """now 以前の直近の発表時刻 (無ければ None)"""
+        times = self._by_code.get(_code(ticker), [])
+        i = bisect.bisect_right(times, now or datetime.now(JST))
+        return times[i - 1] if i else None
+
+    def ttl(
+        self,
+        ticker: str,
+        default_ttl: float,
+        now: datetime | None = None,
+        short_ttl: float | None = None,
+    ) -> float:
+        """
+        発表予定を考慮した TTL 秒数
+
+        Args:
+            ticker: 銘柄コード
+            default_ttl: 発表予定が無い場合の TTL (0 は無期限)
+            now: 基準時刻 (テスト用)
+            short_ttl: 発表直後 (settle 期間) に使う TTL
+
+        Returns:
+            次回発表までに失効する TTL (最小 1 秒)
+        """
+        now = now or datetime.now(JST)
+        last = self.last_announcement(ticker, now)
+        if short_ttl is not None and last is not None:
+            if (now - last).total_seconds() < self.settle_s:
+                default_ttl = min(default_ttl, short_ttl) if default_ttl else short_ttl
+        upcoming = self.next_announcement(ticker, now)
+        if upcoming is not None:
+            until = (upcoming - now).total_seconds()
+            if not default_ttl or until < default_ttl:
+                return max(until, 1.0)
+        return default_ttl
+
+    def events(self, start: datetime, end: datetime) -> list[tuple[datetime, str]]:
+        """start < 発表時刻 <= end の (発表時刻, 銘柄コード) を時刻順に返す"""
+        found = []
+        for code, times in self._by_code.items():
+            lo = bisect.bisect_right(times, start)
+            hi = bisect.bisect_right(times, end)
+            found.extend((at, code) for at in times[lo:hi])
+        return sorted(found)
+
+
+def load_announcement_schedule(
+    store: Any | None = None,
+    publish_time: time = time(15, 30),
+    settle_s: float = 21600.0,
+    lookback_days: int = 14,
+) -> AnnouncementSchedule:
+    """
+    ETL が保存した `announcement` スナップショットから発表予定を読み込む
+
+    Args:
+        store: ParquetStore (None は JQUANTS_STORE_ROOT)
+        lookback_days: 読み込むパーティションの日数 (発表直後の settle 判定のため過去分も読む)
+    """
+    from src.mcp_providers.jquants_store import ParquetStore
+
+    store = store or ParquetStore()
+    df = store.read("announcement", date.today() - timedelta(days=lookback_days), None)
+    if df.empty or not {"Code", "Date"} <= set(df.columns):
+        return AnnouncementSchedule(settle_s=settle_s)
+    return AnnouncementSchedule.from_records(
+        df[["Code", "Date"]].to_dict(orient="records"), publish_time, settle_s
+    )
+
+
+@lru_cache(maxsize=1)
+def get_announcement_settings() -> AnnouncementSettings:
+    """プロセス共通の設定 (環境変数から初回生成)"""
+    return AnnouncementSettings()
+
+
+@lru_cache(maxsize=1)
+def get_announcement_schedule() -> AnnouncementSchedule:
+    """プロセス共通の発表予定 (起動時は空。`AnnouncementInvalidator` が読み込み・更新する)"""
+    return AnnouncementSchedule(settle_s=get_announcement_settings().announcement_settle)
+
+
+class AnnouncementInvalidator:
+    """
+    発表時刻にキャッシュを削除し、`prefetch_delay` 秒後にファンダメンタルズを事前取得する
+
+    複数ワーカーで動かしても削除は冪等で、事前取得は既にキャッシュがあれば行わない。
+    """
+
+    def __init__(
+        self,
+        cache: CacheBackend,
+        schedule: AnnouncementSchedule,
+        tool: Any | None = None,
+        prefetch_delay: float = 1800.0,
+        loader: Callable[[], AnnouncementSchedule] | None = None,
+        reload_interval: float = 3600.0,
+        now: datetime | None = None,
+    ):
+        """
+        Args:
+            cache: 削除対象のキャッシュ
+            schedule: 発表予定 (loader があれば定期的に置き換える)
+            tool: `get_fundamentals(ticker)` を持つツール (None は事前取得しない)
+            prefetch_delay: 発表時刻から事前取得までの秒数
+            loader: 発表予定を読み直す関数 (同期、スレッドで実行)
+            reload_interval: 読み直しの間隔 (秒)
+            now: 処理開始時刻 (これより前の発表は処理しない)
+        """
+        self.cache = cache
+        self.schedule = schedule
+        self.tool = tool
+        self.prefetch_delay = prefetch_delay
+        self.loader = loader
+        self.reload_interval = reload_interval
+        self._cursor = now or datetime.now(JST)
+        self._prefetch: list[tuple[datetime, str]] = []
+        self.evicted = 0
+        self.prefetched = 0
+
+    def keys_for(self, code: str) -> list[str]:
+        """発表で古くなるキャッシュキー (ファンダメンタルズ・合議結果)"""
+        keys = []
+        if self.tool is not None:
+            for ticker in ticker_variants(code):
+                keys.append(fundamentals_cache_key(self.tool.name, ticker))
+        keys.append(decision_cache_key(code))
+        return keys
+
+    async def _prefetch_one(self, code: str) -> None:
+        ticker = f"{code}.T"
+        # 他のワーカーが取得済みなら上流を呼ばない
+        if await self.cache.get(fundamentals_cache_key(self.tool.name, ticker)) is not None:
+            return
+        try:
+            await self.tool.get_fundamentals(ticker)
+            self.prefetched += 1
+        except Exception as e:
+            logger.warning("Prefetch after announcement failed for %s: %s", ticker, e)
+
+    async def tick(self, now: datetime | None = None) -> None:
+        """now までに到来した発表・事前取得を処理する"""
+        now = now or datetime.now(JST)
+        for at, code in self.schedule.events(self._cursor, now):
+            for key in self.keys_for(code):
+                await self.cache.delete(key)
+            self.evicted += 1
+            if self.tool is not None:
+                heapq.heappush(self._prefetch, (at + timedelta(seconds=self.prefetch_delay), code))
+        self._cursor = max(self._cursor, now)
+        while self._prefetch and self._prefetch[0][0] <= now:
+            _, code = heapq.heappop(self._prefetch)
+            await self._prefetch_one(code)
+
+    def seconds_until_next(self, now: datetime | None = None) -> float:
+        """次に処理が必要になるまでの秒数 (読み直し間隔が上限)"""
+        now = now or datetime.now(JST)
+        wakeups = [now + timedelta(seconds=self.reload_interval)]
+        upcoming = self.schedule.events(self._cursor, wakeups[0])
+        if upcoming:
+            wakeups.append(upcoming[0][0])
+        if self._prefetch:
+            wakeups.append(self._prefetch[0][0])
+        return max((min(wakeups) - now).total_seconds(), 0.0)
+
+    async def run(self) -> None:
+        """キャンセルされるまで発表予定の読み直しと失効・事前取得を続ける"""
+        next_reload = 0.0
+        while True:
+            if self.loader is not None and time_module.monotonic() >= next_reload:
+                try:
+                    self.schedule.replace(await asyncio.to_thread(self.loader))
+                except Exception as e:
+                    logger.warning("Failed to load announcement schedule: %s", e)
+                next_reload = time_module.monotonic() + self.reload_interval
+            await self.tick()
+            await asyncio.sleep(self.seconds_until_next())
+
+
+def start_announcement_invalidation(
+    registry: FoundryToolRegistry | None = None,
+    settings: AnnouncementSettings | None = None,
+) -> "asyncio.Task[None] | None":
+    """
+    発表予定による失効・事前取得をバックグラウンドで開始する (FastAPI lifespan から呼ぶ)
+
+    ファンダメンタルズの TTL を `FUNDAMENTALS_LONG_TTL` (次回発表時刻で打ち切り) に切り替える。
+
+    Returns:
+        実行中のタスク (ANNOUNCEMENT_INVALIDATION=false の場合は None)
+    """
+    settings = settings or get_announcement_settings()
+    if not settings.announcement_invalidation:
+        return None
+
+    registry = registry or get_tool_registry()
+    schedule = get_announcement_schedule()
+
+    def ttl_policy(ticker: str, ttl: float) -> float:
+        return schedule.ttl(ticker, settings.fundamentals_long_ttl, short_ttl=ttl)
+
+    registry.ttl_policy = ttl_policy
+    invalidator = AnnouncementInvalidator(
+        registry.cache or get_cache(),
+        schedule,
+        tool=registry.get_tool("morningstar"),
+        prefetch_delay=settings.announcement_prefetch_delay,
+        loader=lambda: load_announcement_schedule(
+            publish_time=settings.publish_time, settle_s=settings.announcement_settle
+        ),
+        reload_interval=settings.announcement_reload_interval,
+    )
+    return asyncio.create_task(invalidator.run())
+
+
+__all__ = [
+    "AnnouncementInvalidator",
+    "AnnouncementSchedule",
+    "AnnouncementSettings",
+    "decision_cache_key",
+    "get_announcement_schedule",
+    "get_announcement_settings",
+    "load_announcement_schedule",
+    "start_announcement_invalidation",
+    "ticker_variants",
+]
@@ -4,13 +4,19 @@ FastAPI endpoints for Stock MAGI system.
 POST /api/analyze - 銘柄分析エンドポイント
 """
 
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 
-from src.common.consensus import ReusableConsensusOrchestrator
-from src.common.mcp import FoundryToolRegistry
-from src.common.models import Action, FinalDecision
-from src.stock_magi.agents import create_melchior_agent
+from src.common.agent_registry import get_agent_registry
+from src.common.audit import get_audit_log
+from src.common.mcp import get_tool_registry
+from src.common.models import Action
+from src.common.snapshots import get_snapshot_store
+from src.stock_magi.analysis import AnalysisService
 
 router = APIRouter(prefix="/api", tags=["analysis"])
 
@@ -20,6 +26,11 @@ class AnalyzeRequest(BaseModel):
 
     ticker: str = Field(..., description="銘柄コード (例: '7203.T' for Toyota)", min_length=1)
     include_reasoning: bool = Field(default=True, description="推論プロセスを含めるか")
+    agents: list[str] | None = Field(
+        default=None,
+        description="合議に参加させるエージェント (例: ['melchior', 'balthasar'])。"
+        "省略時は config/agents.json の default_panel",
+    )
 
 
 class AnalyzeResponse(BaseModel):
@@ -31,6 +42,30 @@ class AnalyzeResponse(BaseModel):
     summary: str
     reasoning: list[dict] | None = None
     has_conflict: bool
+    snapshot_ids: dict[str, str] = Field(
+        default_factory=dict, description="エージェント名 -> 入力データのスナップショット ID"
+    )
+
+
+class SnapshotResponse(BaseModel):
+    """スナップショット取得レスポンス"""
+
+    snapshot_id: str
+    data: Any
+
+
+class AgentsResponse(BaseModel):
+    """選択可能なエージェント一覧レスポンス"""
+
+    default_panel: list[str]
+    agents: dict[str, dict[str, Any]]
+
+
+class AuditResponse(BaseModel):
+    """監査ログ検索レスポンス"""
+
+    count: int
+    records: list[dict[str, Any]]
 
 
 @router.post("/analyze", response_model=AnalyzeResponse)
@@ -38,15 +73,16 @@ async def analyze_stock(request: AnalyzeRequest) -> AnalyzeResponse:
     """
     銘柄を分析し、投資判断を返す
 
-    Phase 1 実装:
-        - Melchior エージェントのみ (単一エージェント)
-        - Morningstar tool (Foundry Tool Catalog)
-        - モック投票による合議
+    分析は `AnalysisService` (MCP サーバーと共通) で行う。
+    合議パネルは `request.agents` で選ぶ (省略時は config/agents.json の default_panel)。
+    エージェントとツールはエージェントレジストリがプロセス内で 1 回だけ生成し、使い回す。
+
+    DECISION_CACHE_TTL > 0 の場合は合議結果を共有キャッシュに保存する
+    (期限は次回の決算発表時刻で打ち切る。既定パネルの結果のみ)。
 
-    Phase 2 拡張予定:
-        - Balthasar, Casper エージェント追加
-        - 実際の Agent Framework 統合
-        - 加重投票
+    エージェントが判定に使った入力データはスナップショットストアに保存し、
+    `snapshot_ids` の ID を `GET /api/snapshots/{snapshot_id}` で参照できる。
+    合議結果は監査ログのキューに積み、バックグラウンドでまとめて保存する。
 
     Args:
         request: 分析リクエスト
@@ -55,52 +91,86 @@ async def analyze_stock(request: AnalyzeRequest) -> AnalyzeResponse:
         分析結果 (FinalDecision)
 
     Raises:
-        HTTPException: 分析失敗時
+        HTTPException: 未知のエージェント指定 (400) / 分析失敗時 (500)
     """
     try:
-        # 1. Foundry Tool Registry から Morningstar tool を取得
-        registry = FoundryToolRegistry()
-        morningstar_tool = registry.get_tool("morningstar")
+        # レジストリの生成 (設定の読み込み) の失敗も 500 の JSON で返す
+        service = AnalysisService(get_tool_registry(), get_agent_registry(), get_audit_log())
+        try:
+            panel = service.agent_registry.resolve_panel(request.agents)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        response = AnalyzeResponse(**await service.analyze(request.ticker, panel))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"分析中にエラーが発生しました: {str(e)}"
+        ) from e
 
-        # 2. Melchior エージェントを作成
-        melchior = create_melchior_agent(morningstar_tool)
+    if not request.include_reasoning:
+        response.reasoning = None
+    return response
 
-        # 3. Phase 1: 単一エージェント分析 (Phase 2 で複数エージェント合議)
-        analysis_result = await melchior.analyze(request.ticker)
 
-        # 4. Consensus Orchestrator で合議 (Phase 1: モック投票)
-        orchestrator = ReusableConsensusOrchestrator(agents=[melchior], voting_strategy="majority")
+@router.get("/snapshots/{snapshot_id}", response_model=SnapshotResponse)
+async def get_snapshot(snapshot_id: str) -> SnapshotResponse:
+    """
+    判定に使われた入力データをスナップショット ID から取得する
 
-        decision: FinalDecision = await orchestrator.reach_consensus(
-            input_context={"ticker": request.ticker, "analysis_result": analysis_result}
-        )
+    Args:
+        snapshot_id: `/api/analyze` の `snapshot_ids` に含まれる ID
 
-        # 5. レスポンスを構築
-        response = AnalyzeResponse(
-            ticker=request.ticker,
-            final_action=decision.final_action,
-            confidence=decision.weighted_confidence,
-            summary=decision.summary,
-            reasoning=[
-                {
-                    "agent": vote.agent_name,
-                    "action": vote.action.value,
-                    "confidence": vote.confidence,
-                    "reasoning": vote.reasoning,
-                }
-                for vote in decision.votes
-            ]
-            if request.include_reasoning
-            else None,
-            has_conflict=decision.has_conflict,
-        )
+    Returns:
+        {"snapshot_id": ..., "data": 保存時の market_data}
 
-        return response
+    Raises:
+        HTTPException: スナップショットストアが無効 (404) / 該当する ID が無い (404)
+    """
+    store = get_snapshot_store()
+    data = await store.get(snapshot_id) if store is not None else None
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"snapshot not found: {snapshot_id}")
+    return SnapshotResponse(snapshot_id=snapshot_id, data=data)
 
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"分析中にエラーが発生しました: {str(e)}"
-        ) from e
+
+@router.get("/agents", response_model=AgentsResponse)
+async def list_agents() -> AgentsResponse:
+    """
+    `/api/analyze` の `agents` に指定できるエージェントの一覧
+
+    Returns:
+        {"default_panel": [...], "agents": {名前: {"tools", "data", "description"}}}
+    """
+    return AgentsResponse(**get_agent_registry().describe())
+
+
+@router.get("/audit", response_model=AuditResponse)
+async def query_audit(
+    ticker: str | None = Query(default=None, description="銘柄コード (記録時の表記)"),
+    start: datetime | None = Query(default=None, description="期間の開始 (ISO 8601)"),
+    end: datetime | None = Query(default=None, description="期間の終了 (ISO 8601)"),
+    limit: int = Query(default=100, ge=1, le=10000),
+) -> AuditResponse:
+    """
+    監査ログ (記録済みの合議結果) を新しい順に検索する
+
+    Args:
+        ticker: 銘柄 (省略時は全銘柄)
+        start / end: 期間 (両端含む。タイムゾーン無しは UTC)
+        limit: 最大件数
+
+    Returns:
+        {"count": 件数, "records": [...]}
+
+    Raises:
+        HTTPException: 監査ログが無効 (AUDIT_BACKEND=none) の場合は 404
+    """
+    audit = get_audit_log()
+    if audit is None:
+        raise HTTPException(status_code=404, detail="audit log is disabled")
+    records = await audit.query(ticker=ticker, start=start, end=end, limit=limit)
+    return AuditResponse(count=len(records), records=records)
 
 
 @router.get("/health")
@@ -114,4 +184,38 @@ async def health_check():
     return {"status": "ok"}
 
 
-__all__ = ["router", "AnalyzeRequest", "AnalyzeResponse"]
+@router.get("/ready")
+async def readiness_check(request: Request):
+    """
+    レディネスチェックエンドポイント (起動ウォームアップ完了後に 200)
+
+    `/api/health` (liveness) と異なり、ツールクライアント生成・接続プール・
+    ウォッチリストのキャッシュ事前取得が終わるまでは 503 を返す。
+
+    監査ログが書き込めずレコードを退避している間は status を "degraded" にする
+    (レコードは書き戻すまで保持しているため、リクエストの受け付けは止めない)。
+
+    Returns:
+        {"status": "ready" | "degraded" | "starting", "warmup": {...}, "audit": {...} | None}
+    """
+    readiness = getattr(request.app.state, "readiness", None)
+    audit = get_audit_log()
+    audit_status = audit.status() if audit is not None else None
+    if readiness is None or not readiness.ready:
+        detail = readiness.as_dict() if readiness is not None else {}
+        return JSONResponse(
+            status_code=503,
+            content={"status": "starting", "warmup": detail, "audit": audit_status},
+        )
+    status = "ready" if audit_status is None or audit_status["ok"] else "degraded"
+    return {"status": status, "warmup": readiness.as_dict(), "audit": audit_status}
+
+
+__all__ = [
+    "router",
+    "AgentsResponse",
+    "AnalyzeRequest",
+    "AnalyzeResponse",
+    "AuditResponse",
+    "SnapshotResponse",
+]
@@ -0,0 +1,565 @@
+"""
+Walk-forward backtest of consensus decisions over the local J-Quants store.
+
+    python -m src.stock_magi.backtest --start 2015-01-01 --end 2024-12-31
+    python -m src.stock_magi.backtest --tickers 7203,6758 --long-only --cost-bps 10
+    python -m src.stock_magi.backtest --agents balthasar --output daily.csv --json
+
+`ReusableConsensusOrchestrator` の判定 (Melchior のバリュエーション・Balthasar の
+テクニカル・多数決) を過去の各営業日について再現し、翌営業日以降のリターンで評価します。
+銘柄 × 日ごとにエージェントを呼ぶ代わりに、同じ判定ルール (`score_fundamentals` /
+`score_indicators`) を (銘柄数, 営業日数) の配列に対して一括で適用します。
+
+    - 判定は各営業日の終値時点で得られる情報だけを使う (point-in-time)
+        - リターンとテクニカル指標は分割・併合を調整した株価で計算する
+          (PER / PBR は EPS / BPS と同じ基準の調整前の終値で計算する)
+        - テクニカル指標は過去の足だけから計算する漸化式 (`compute_indicators`)
+        - 決算短信は開示日の翌日から使い、開示日ごとの EPS / BPS を前方補完する
+    - 判定日の終値で建て、翌営業日の終値までのリターンを等金額で合算する
+      (BUY は買い、SELL は空売り。`--long-only` では SELL は持たない)
+    - 期間を `--window-days` (既定 365 日) ごとに分けてプロセスプールで並列処理する
+      (各ワーカーは指標の初期値の影響を消すため DEFAULT_LOOKBACK_DAYS 日前から読み込む)
+
+Casper の需給特徴量は最新のスナップショットしか保存していないため対象外です。
+numpy / pandas / pyarrow が必要です。
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from src.mcp_providers.jquants_history import load_history, normalize_code
+from src.mcp_providers.jquants_store import ParquetStore
+from src.stock_magi.agents.balthasar_agent import (
+    DEFAULT_LOOKBACK_DAYS,
+    RSI_OVERBOUGHT,
+    RSI_OVERSOLD,
+)
+from src.stock_magi.agents.melchior_agent import (
+    PBR_CHEAP,
+    PBR_EXPENSIVE,
+    PER_CHEAP,
+    PER_EXPENSIVE,
+    ROE_STRONG,
+    ROE_WEAK,
+)
+from src.stock_magi.indicators import (
+    IndicatorParams,
+    compute_indicators,
+    ohlcv_matrix,
+    split_adjusted,
+)
+from src.stock_magi.screen import STATEMENT_LOOKBACK_DAYS, _read_statements, statement_values
+
+AGENT_NAMES = ("melchior", "balthasar")
+DEFAULT_WINDOW_DAYS = 365
+TRADING_DAYS_PER_YEAR = 252
+
+# 判定の符号 (配列上の表現)
+BUY, HOLD, SELL = 1, 0, -1
+
+
+def _decide(score: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """合算スコアから (判定, 信頼度) を求める (+2 以上で BUY、-2 以下で SELL)"""
+    action = np.where(score >= 2, BUY, np.where(score <= -2, SELL, HOLD)).astype(np.int8)
+    return action, np.minimum(0.5 + 0.1 * np.abs(score), 0.9)
+
+
+def _ffill(x: np.ndarray) -> np.ndarray:
+    """最終軸方向に直前の有効値で埋める (先頭の欠損は NaN のまま)"""
+    valid = ~np.isnan(x)
+    index = np.where(valid, np.arange(x.shape[1]), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    return np.take_along_axis(x, index, axis=1)
+
+
+def technical_signals(
+    high: np.ndarray, low: np.ndarray, close: np.ndarray, params: IndicatorParams | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    全銘柄・全営業日の Balthasar の判定 (`score_indicators` と同じルール)
+
+    Args:
+        high / low / close: (銘柄数, 本数) の配列 (取引の無い日は NaN)
+        params: 指標のパラメータ
+
+    Returns:
+        (判定 (BUY=1 / HOLD=0 / SELL=-1), 信頼度) の (銘柄数, 本数) の配列
+    """
+    series, _ = compute_indicators(high, low, close, params)
+    # エージェントはスナップショットの直近の有効な終値を使う
+    c = _ffill(np.asarray(close, dtype=np.float64))
+    sma, hist, rsi = series["sma"], series["macd_hist"], series["rsi"]
+    upper, lower = series["bb_upper"], series["bb_lower"]
+
+    trend = ~np.isnan(c) & ~np.isnan(sma)
+    score = np.where(trend, np.where(c > sma, 1, -1), 0)
+    score += np.where(np.isnan(hist), 0, np.where(hist > 0, 1, -1))
+    score += (rsi <= RSI_OVERSOLD).astype(int) - (rsi >= RSI_OVERBOUGHT)
+    band = ~np.isnan(c) & ~np.isnan(upper) & ~np.isnan(lower)
+    score += np.where(band, (c < lower).astype(int) - (c > upper), 0)
+    return _decide(score)
+
+
+def fundamental_signals(
+    eps: np.ndarray, bps: np.ndarray, close: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    全銘柄・全営業日の Melchior の判定 (`score_fundamentals` と同じルール)
+
+    Args:
+        eps / bps: その日までに開示済みの 1 株当たり利益・純資産 (銘柄数, 本数)
+        close: 終値 (取引の無い日は直前の終値を使う)
+
+    Returns:
+        (判定, 信頼度) の (銘柄数, 本数) の配列
+    """
+    c = _ffill(np.asarray(close, dtype=np.float64))
+    book = np.where(bps > 0, bps, np.nan)
+    per = c / np.where(eps > 0, eps, np.nan)
+    pbr = c / book
+    roe = eps / book
+
+    score = np.where(eps <= 0, -1, (per <= PER_CHEAP).astype(int) - (per >= PER_EXPENSIVE))
+    score += (pbr <= PBR_CHEAP).astype(int) - (pbr >= PBR_EXPENSIVE)
+    score += (roe >= ROE_STRONG).astype(int) - (roe < ROE_WEAK)
+    return _decide(score)
+
+
+def point_in_time_statements(
+    statements: Any, codes: list[str], dates: Any, lookback_days: int = STATEMENT_LOOKBACK_DAYS
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    各営業日の時点で開示済みの最新の決算短信から EPS / BPS を並べる
+
+    開示日当日は使わず (引け後の開示が多いため)、翌日以降の営業日に反映する。
+    開示から lookback_days 日を超えた値は使わない (スクリーニングと同じ扱い)。
+
+    Args:
+        statements: J-Quants `statements` の DataFrame (LocalCode または Code、DisclosedDate)
+        codes: 行に対応する銘柄コード (株価の Code)
+        dates: 列に対応する営業日 (DatetimeIndex)
+
+    Returns:
+        (eps, bps) の (銘柄数, 営業日数) の配列 (未開示は NaN)
+    """
+    import pandas as pd
+
+    shape = (len(codes), len(dates))
+    empty = (np.full(shape, np.nan), np.full(shape, np.nan))
+    code_column = "LocalCode" if "LocalCode" in statements.columns else "Code"
+    if statements.empty or code_column not in statements.columns or not len(dates):
+        return empty
+
+    lookup = {c: code for code in codes for c in normalize_code(code)}
+    df = statements.assign(
+        Code=statements[code_column].astype(str).map(lookup),
+        _disclosed=pd.to_datetime(statements.get("DisclosedDate"), errors="coerce"),
+    ).dropna(subset=["Code", "_disclosed"])
+    if df.empty:
+        return empty
+    sort_keys = [c for c in ("DisclosedDate", "DisclosedTime") if c in df.columns]
+    df = df.sort_values(sort_keys, kind="stable").reset_index(drop=True)
+    eps, bps = statement_values(df)
+
+    # 行番号を (反映日, 銘柄) に並べて前方補完し、最新の開示の値を引く
+    effective = df["_disclosed"] + pd.Timedelta(days=1)
+    rows = (
+        pd.DataFrame({"Code": df["Code"], "effective": effective, "row": df.index})
+        .drop_duplicates(["effective", "Code"], keep="last")
+        .pivot(index="effective", columns="Code", values="row")
+    )
+    index = rows.index.union(dates)
+    rows = rows.reindex(index).ffill().reindex(dates).reindex(columns=codes)
+    position = rows.to_numpy(dtype=np.float64).T
+    known = ~np.isnan(position)
+    take = np.where(known, position, 0).astype(np.int64)
+
+    disclosed = df["_disclosed"].to_numpy(dtype="datetime64[D]")[take]
+    age = np.asarray(dates, dtype="datetime64[D]")[None, :] - disclosed
+    known &= age <= np.timedelta64(lookback_days, "D")
+    values = [np.where(known, s.to_numpy(dtype=np.float64)[take], np.nan) for s in (eps, bps)]
+    return values[0], values[1]
+
+
+def majority_vote(actions: list[np.ndarray]) -> np.ndarray:
+    """
+    エージェントごとの判定を多数決で合議する (`ReusableConsensusOrchestrator` と同じ規則)
+
+    同数の場合は先に投票したエージェントの判定を採る。
+
+    Args:
+        actions: エージェント順の判定 (同じ形の配列)
+
+    Returns:
+        合議結果の判定
+    """
+    counts = [sum((a == b).astype(np.int8) for b in actions) for a in actions]
+    best = np.maximum.reduce(counts)
+    result = np.full(actions[0].shape, HOLD, dtype=np.int8)
+    decided = np.zeros(actions[0].shape, dtype=bool)
+    for action, count in zip(actions, counts, strict=True):
+        pick = ~decided & (count == best)
+        result[pick] = action[pick]
+        decided |= pick
+    return result
+
+
+class WindowSignals(NamedTuple):
+    """
+    1 期間分の価格と判定 (列は読み込んだ全営業日、指標の助走期間を含む)
+
+    close は分割・併合を調整した終値 (リターンの計算に使う)。
+    """
+
+    codes: list[str]
+    dates: Any
+    close: np.ndarray
+    decisions: np.ndarray
+    votes: dict[str, np.ndarray]
+
+
+def _read_prices(store: ParquetStore, codes: list[str] | None, start: date, end: date) -> Any:
+    import pandas as pd
+
+    columns = ["High", "Low", "Close", "AdjustmentFactor"]
+    if codes:
+        return load_history(store, codes, start=start, end=end, columns=columns)
+    df = store.read("prices", start, end, columns=["Code", "Date", *columns])
+    if df.empty:
+        return df
+    return df.assign(Code=df["Code"].astype(str), Date=pd.to_datetime(df["Date"]))
+
+
+def _load_statements(store: ParquetStore, codes: list[str] | None, start: date, end: date) -> Any:
+    if not codes:
+        return store.read("statements", start, end)
+    return _read_statements(
+        store, sorted({c for t in codes for c in normalize_code(t)}), start, end
+    )
+
+
+def window_signals(
+    store: ParquetStore,
+    codes: list[str] | None,
+    start: date,
+    end: date,
+    agents: tuple[str, ...] = AGENT_NAMES,
+) -> WindowSignals | None:
+    """
+    start〜end の株価・決算を読み、全銘柄・全営業日の判定を計算する
+
+    Args:
+        store: 株価・決算を保存した ParquetStore
+        codes: 対象銘柄 (None は株価のある全銘柄)
+        start / end: 読み込む期間 (指標の助走期間を含めて呼び出し側で決める)
+        agents: 合議に参加するエージェント (投票順)
+
+    Returns:
+        WindowSignals (株価が無ければ None)
+    """
+    prices = _read_prices(store, codes, start, end)
+    if prices.empty:
+        return None
+    price_codes, dates, arrays = ohlcv_matrix(prices)
+    adjusted = split_adjusted(arrays)
+
+    votes: dict[str, np.ndarray] = {}
+    for agent in agents:
+        if agent == "melchior":
+            statements = _load_statements(
+                store, codes, start - timedelta(days=STATEMENT_LOOKBACK_DAYS), end
+            )
+            eps, bps = point_in_time_statements(statements, price_codes, dates)
+            # EPS / BPS は開示時点の株数基準なので調整前の終値と比べる
+            votes[agent] = fundamental_signals(eps, bps, arrays["Close"])[0]
+        elif agent == "balthasar":
+            action, _ = technical_signals(adjusted["High"], adjusted["Low"], adjusted["Close"])
+            votes[agent] = action
+        else:
+            raise ValueError(f"Unknown agent '{agent}' (expected one of {list(AGENT_NAMES)})")
+    decisions = majority_vote(list(votes.values()))
+    return WindowSignals(price_codes, dates, adjusted["Close"], decisions, votes)
+
+
+def simulate(
+    signals: WindowSignals,
+    start: date,
+    end: date,
+    long_only: bool = False,
+    cost_bps: float = 0.0,
+    horizon: int = 1,
+) -> Any:
+    """
+    判定に従って建てたポートフォリオの日次リターンと的中数を計算する
+
+    判定日 t の終値で等金額に建て (BUY は +1、SELL は -1)、t+1 の終値までのリターンを
+    t の行に記録する。売買コストは建玉の入れ替え (ウェイト変化の絶対値和) に比例させる。
+    的中は BUY / SELL の判定のうち horizon 営業日後の終値が判定方向に動いたもの。
+
+    Args:
+        signals: `window_signals` の結果
+        start / end: 評価する判定日 (助走期間は含めない)
+        long_only: SELL を空売りせずノーポジションにする
+        cost_bps: 片道の売買コスト (bp)
+        horizon: 的中判定に使う営業日数
+
+    Returns:
+        pandas.DataFrame (date, return, gross_return, turnover, long, short, calls, hits)
+    """
+    import pandas as pd
+
+    close = signals.close
+    valid = ~np.isnan(close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        following = np.full_like(close, np.nan)
+        following[:, :-1] = close[:, 1:] / close[:, :-1] - 1
+        forward = np.full_like(close, np.nan)
+        if horizon < close.shape[1]:
+            forward[:, :-horizon] = close[:, horizon:] / close[:, :-horizon] - 1
+
+    position = np.where(valid, signals.decisions, HOLD)
+    if long_only:
+        position = np.maximum(position, HOLD)
+    active = np.count_nonzero(position, axis=0)
+    weight = position / np.maximum(active, 1)
+    gross = np.nansum(weight * following, axis=0)
+    turnover = np.abs(np.diff(weight, axis=1, prepend=0.0)).sum(axis=0)
+
+    called = valid & (signals.decisions != HOLD) & ~np.isnan(forward)
+    hits = called & (np.sign(forward) == signals.decisions)
+
+    dates = pd.DatetimeIndex(signals.dates)
+    # 最終列は翌営業日の終値が無く結果が出ない
+    keep = (dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))
+    keep[-1:] = False
+    return pd.DataFrame(
+        {
+            "date": dates[keep],
+            "return": (gross - cost_bps / 10_000 * turnover)[keep],
+            "gross_return": gross[keep],
+            "turnover": turnover[keep],
+            "long": np.count_nonzero(position > 0, axis=0)[keep],
+            "short": np.count_nonzero(position < 0, axis=0)[keep],
+            "calls": called.sum(axis=0)[keep],
+            "hits": hits.sum(axis=0)[keep],
+        }
+    )
+
+
+def performance(daily: Any) -> dict[str, float]:
+    """
+    日次リターンから成績指標を計算する
+
+    Returns:
+        {"days", "total_return", "cagr", "volatility", "sharpe", "max_drawdown",
+         "hit_rate", "calls", "exposure", "turnover"} (年率は 252 営業日換算)
+    """
+    returns = np.asarray(daily["return"], dtype=np.float64)
+    days = len(returns)
+    if not days:
+        return {"days": 0}
+    equity = np.cumprod(1.0 + returns)
+    peak = np.maximum.accumulate(np.maximum(equity, 1.0))
+    years = days / TRADING_DAYS_PER_YEAR
+    std = returns.std()
+    calls = int(daily["calls"].sum())
+    invested = (np.asarray(daily["long"]) + np.asarray(daily["short"])) > 0
+    return {
+        "days": days,
+        "total_return": float(equity[-1] - 1),
+        "cagr": float(equity[-1] ** (1 / years) - 1) if equity[-1] > 0 else -1.0,
+        "volatility": float(std * math.sqrt(TRADING_DAYS_PER_YEAR)),
+        "sharpe": (
+            float(returns.mean() / std * math.sqrt(TRADING_DAYS_PER_YEAR)) if std > 0 else math.nan
+        ),
+        "max_drawdown": float((equity / peak - 1).min()),
+        "hit_rate": float(daily["hits"].sum() / calls) if calls else math.nan,
+        "calls": calls,
+        "exposure": float(invested.mean()),
+        "turnover": float(np.mean(daily["turnover"]) * TRADING_DAYS_PER_YEAR),
+    }
+
+
+class BacktestTask(NamedTuple):
+    """1 期間分の作業 (プロセス間で受け渡すため pickle 可能な値だけを持つ)"""
+
+    index: int
+    start: date
+    end: date
+    store_root: str
+    codes: list[str] | None
+    agents: tuple[str, ...]
+    long_only: bool = False
+    cost_bps: float = 0.0
+    horizon: int = 1
+    warmup_days: int = DEFAULT_LOOKBACK_DAYS
+
+
+def backtest_window(task: BacktestTask) -> Any:
+    """
+    1 期間を評価する (ワーカープロセスで実行)
+
+    指標の助走期間 (warmup_days) と、期間末の判定の結果に必要な数営業日分を前後に読み足す。
+
+    Returns:
+        `simulate` の日次 DataFrame
+    """
+    import pandas as pd
+
+    signals = window_signals(
+        ParquetStore(task.store_root),
+        task.codes,
+        task.start - timedelta(days=task.warmup_days),
+        task.end + timedelta(days=2 * task.horizon + 10),
+        task.agents,
+    )
+    if signals is None:
+        return pd.DataFrame()
+    return simulate(signals, task.start, task.end, task.long_only, task.cost_bps, task.horizon)
+
+
+def date_windows(start: date, end: date, days: int) -> list[tuple[date, date]]:
+    """start〜end (両端含む) を days 日ごとの期間に分ける"""
+    windows = []
+    days = max(days, 1)
+    while start <= end:
+        stop = min(start + timedelta(days=days - 1), end)
+        windows.append((start, stop))
+        start = stop + timedelta(days=1)
+    return windows
+
+
+def run_backtest(tasks: list[BacktestTask], workers: int) -> Any:
+    """
+    全期間を評価して日次の結果を日付順に結合する (workers <= 1 はプロセスプールを使わない)
+
+    Returns:
+        `simulate` の日次 DataFrame
+    """
+    import pandas as pd
+
+    started = time.monotonic()
+    results: list[Any] = []
+
+    def progress() -> None:
+        elapsed = time.monotonic() - started
+        print(
+            f"backtested {len(results)}/{len(tasks)} windows ({elapsed:.0f}s)",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    if workers <= 1:
+        for task in tasks:
+            results.append(backtest_window(task))
+            progress()
+    else:
+        # fork 後の pyarrow のスレッドプールとの競合を避けるため spawn で起動する
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [pool.submit(backtest_window, task) for task in tasks]
+            for future in as_completed(futures):
+                results.append(future.result())
+                progress()
+    frames = [r for r in results if len(r)]
+    if not frames:
+        return pd.DataFrame(
+            columns=["date", "return", "gross_return", "turnover", "long", "short", "calls", "hits"]
+        )
+    return pd.concat(frames).sort_values("date", ignore_index=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Backtest consensus decisions on local data")
+    parser.add_argument("--root", default=None, help="データの保存先 (既定: JQUANTS_STORE_ROOT)")
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    parser.add_argument("--tickers", default="", help="対象銘柄 (カンマ区切り、既定: 全銘柄)")
+    parser.add_argument("--agents", default=",".join(AGENT_NAMES))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--window-days", type=int, default=DEFAULT_WINDOW_DAYS)
+    parser.add_argument("--long-only", action="store_true", help="SELL を空売りしない")
+    parser.add_argument("--cost-bps", type=float, default=0.0, help="片道の売買コスト (bp)")
+    parser.add_argument("--horizon", type=int, default=1, help="的中判定の営業日数")
+    parser.add_argument("--output", default=None, help="日次結果の出力先 (.parquet / .csv)")
+    parser.add_argument("--json", action="store_true", help="成績を JSON で出力")
+    args = parser.parse_args(argv)
+
+    agents = tuple(a.strip().lower() for a in args.agents.split(",") if a.strip())
+    unknown = set(agents) - set(AGENT_NAMES)
+    if unknown or not agents:
+        parser.error(f"unknown agents: {sorted(unknown)} (choose from {list(AGENT_NAMES)})")
+
+    store = ParquetStore(args.root)
+    partitions = store.partitions("prices")
+    if not partitions:
+        print("no price data (run the ETL / sync first)", file=sys.stderr)
+        return 1
+    start = args.start or partitions[0] + timedelta(days=DEFAULT_LOOKBACK_DAYS)
+    end = args.end or partitions[-1]
+    if start > end:
+        parser.error(f"empty period: {start} > {end}")
+
+    codes = [t.strip() for t in args.tickers.split(",") if t.strip()] or None
+    tasks = [
+        BacktestTask(
+            index=i,
+            start=window_start,
+            end=window_end,
+            store_root=str(store.root),
+            codes=codes,
+            agents=agents,
+            long_only=args.long_only,
+            cost_bps=args.cost_bps,
+            horizon=max(args.horizon, 1),
+        )
+        for i, (window_start, window_end) in enumerate(date_windows(start, end, args.window_days))
+    ]
+    daily = run_backtest(tasks, min(args.workers, len(tasks)))
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        if output.suffix == ".csv":
+            daily.to_csv(output, index=False)
+        else:
+            daily.to_parquet(output, index=False)
+
+    metrics = performance(daily)
+    if args.json:
+        print(json.dumps(metrics, ensure_ascii=False))
+    else:
+        for key, value in metrics.items():
+            print(f"{key:<13} {value:.4f}" if isinstance(value, float) else f"{key:<13} {value}")
+    return 0
+
+
+__all__ = [
+    "BacktestTask",
+    "WindowSignals",
+    "backtest_window",
+    "date_windows",
+    "fundamental_signals",
+    "majority_vote",
+    "performance",
+    "point_in_time_statements",
+    "run_backtest",
+    "simulate",
+    "technical_signals",
+    "window_signals",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
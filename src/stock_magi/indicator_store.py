@@ -0,0 +1,383 @@
+"""
+Persisted, memory-mapped indicator state for streaming bar updates.
+
+    python -m src.stock_magi.indicator_store build            # 保存済み株価から状態を作成
+    python -m src.stock_magi.indicator_store update           # 前回以降の日足を 1 日ずつ反映
+    python -m src.stock_magi.indicator_store show 7203.T
+
+`IndicatorState` (EMA の平滑値、RSI / ATR の平均、SMA 用リングバッファ) を
+状態名ごとの `.npy` ファイルに保存し、`numpy.load(mmap_mode="r+")` で開きます。
+
+    <root>/meta.json          銘柄コードの並び、指標パラメータ、反映済みの最終日
+    <root>/<状態名>.npy       (銘柄数,) または (銘柄数, window) の配列
+    <root>/applied.npy        反映済みの最終日 (序数)。状態と同じくメモリマップで更新する
+    <root>/pending.npz        反映中の日付と反映前の状態 (反映が終われば消す)
+
+- 起動時はファイルをメモリマップするだけなので、銘柄数によらずすぐに使える
+- 新しい足の反映は全銘柄で O(銘柄数)、1 銘柄の参照は O(1) (全履歴を読み直さない)
+- 更新は反映前の状態を pending.npz に書いてからメモリマップ上でその場で行い、状態を flush
+  した後に反映済みの日付を書く。途中で落ちた場合は次に開いたときに反映前の状態へ戻すため、
+  同じ日を 2 回反映しない (meta.json の書き換え前に落ちた場合も applied.npy の日付を正とする)
+- 分割・併合の日 (AdjustmentFactor != 1) は、その銘柄の状態を調整係数で過去に遡って
+  換算してから反映する (価格に線形な状態なので、調整済みの履歴から作り直したのと同じ値になる)
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from src.stock_magi.indicators import (
+    IndicatorParams,
+    IndicatorState,
+    compute_indicators,
+    ohlcv_matrix,
+    split_adjusted,
+)
+
+DEFAULT_STATE_ROOT = "./data/indicators"
+META_FILE = "meta.json"
+APPLIED_FILE = "applied.npy"
+PENDING_FILE = "pending.npz"
+
+# build 時に読み込む日数 (EMA の初期値の影響が十分小さくなる長さ)
+DEFAULT_BUILD_DAYS = 400
+
+
+def state_root() -> Path:
+    """保存先ルート (環境変数 INDICATOR_STATE_ROOT で上書き可能)"""
+    return Path(os.environ.get("INDICATOR_STATE_ROOT", DEFAULT_STATE_ROOT))
+
+
+class IndicatorStateStore:
+    """
+    銘柄ごとの指標状態をメモリマップしたファイルで保持するストア
+
+    使用例:
+        >>> store = IndicatorStateStore("./data/indicators")
+        >>> store.build(history_df)                     # 初回のみ全履歴から作成
+        >>> store.apply_bars(date(2024, 6, 3), bars_df)  # 以後は新しい足を O(銘柄数) で反映
+        >>> store.lookup("7203.T")                       # 最新の指標値を O(1) で参照
+    """
+
+    def __init__(self, root: str | Path | None = None):
+        self.root = Path(root) if root is not None else state_root()
+        self._state: IndicatorState | None = None
+        self._codes: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._last_date: date | None = None
+        self._applied: np.ndarray | None = None
+
+    @property
+    def meta_path(self) -> Path:
+        return self.root / META_FILE
+
+    def exists(self) -> bool:
+        return self.meta_path.exists()
+
+    @property
+    def codes(self) -> list[str]:
+        self._ensure_open()
+        return list(self._codes)
+
+    @property
+    def last_date(self) -> date | None:
+        self._ensure_open()
+        return self._last_date
+
+    # ------------------------------------------------------------------
+    # 保存 / 読み込み
+    # ------------------------------------------------------------------
+
+    def _write_meta(self, params: IndicatorParams) -> None:
+        meta = {
+            "codes": self._codes,
+            "params": params._asdict(),
+            "last_date": self._last_date.isoformat() if self._last_date else None,
+        }
+        tmp = self.meta_path.with_name(f".{META_FILE}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self.meta_path)
+
+    def _save(self, state: IndicatorState, codes: list[str], last_date: date | None) -> None:
+        """状態を .npy に書き出し、メモリマップで開き直す"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        for name, array in state.to_arrays().items():
+            path = self.root / f"{name}.npy"
+            tmp = path.with_name(f".{name}.{os.getpid()}.tmp.npy")
+            np.save(tmp, np.asarray(array))
+            os.replace(tmp, path)
+        applied = np.array([last_date.toordinal() if last_date else 0], dtype=np.int64)
+        tmp = self.root / f".applied.{os.getpid()}.tmp.npy"
+        np.save(tmp, applied)
+        os.replace(tmp, self.root / APPLIED_FILE)
+        self._codes = list(codes)
+        self._last_date = last_date
+        self._write_meta(state.params)
+        self._state = None
+        self._ensure_open()
+
+    def _ensure_open(self) -> IndicatorState:
+        if self._state is not None:
+            return self._state
+        if not self.exists():
+            raise FileNotFoundError(f"indicator state not found under {self.root} (run build)")
+
+        meta = json.loads(self.meta_path.read_text())
+        params = IndicatorParams(**meta["params"])
+        names = IndicatorState.empty(0, params).to_arrays()
+        arrays = {name: np.load(self.root / f"{name}.npy", mmap_mode="r+") for name in names}
+        self._state = IndicatorState.from_arrays(arrays, params)
+        self._codes = list(meta["codes"])
+        self._rows = {code: i for i, code in enumerate(self._codes)}
+        self._last_date = date.fromisoformat(meta["last_date"]) if meta["last_date"] else None
+        applied_path = self.root / APPLIED_FILE
+        if not applied_path.exists():  # applied.npy を持たない以前の形式
+            ordinal = self._last_date.toordinal() if self._last_date else 0
+            np.save(applied_path, np.array([ordinal], dtype=np.int64))
+        self._applied = np.load(applied_path, mmap_mode="r+")
+        self._recover()
+        if self._applied[0]:
+            # meta.json の書き換え前に落ちた場合も、状態の後に書いた日付を正とする
+            self._last_date = date.fromordinal(int(self._applied[0]))
+        return self._state
+
+    def _recover(self) -> None:
+        """反映の途中で落ちていたら反映前の状態に戻す (日付まで書けていれば反映済み)"""
+        pending = self.root / PENDING_FILE
+        if not pending.exists():
+            return
+        assert self._state is not None and self._applied is not None
+        with np.load(pending) as undo:
+            if int(self._applied[0]) != int(undo["day"][0]):
+                for name, array in self._state.arrays.items():
+                    array[...] = undo[name]
+                self.flush()
+        pending.unlink()
+
+    def _write_pending(self, state: IndicatorState, day: date) -> None:
+        """反映前の状態を退避する (反映が終わるまで残す)"""
+        tmp = self.root / f".pending.{os.getpid()}.tmp.npz"
+        arrays = {name: np.asarray(array) for name, array in state.arrays.items()}
+        np.savez(tmp, day=np.array([day.toordinal()], dtype=np.int64), **arrays)
+        os.replace(tmp, self.root / PENDING_FILE)
+
+    def flush(self) -> None:
+        """メモリマップへの変更をディスクへ書き出す"""
+        if self._state is None:
+            return
+        for array in (*self._state.arrays.values(), self._applied):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    # ------------------------------------------------------------------
+    # 作成 / 更新
+    # ------------------------------------------------------------------
+
+    def build(self, history: Any, params: IndicatorParams | None = None) -> int:
+        """
+        縦持ちの日足 (Code, Date, High, Low, Close) から状態を作り直す
+
+        AdjustmentFactor 列があれば期間内の分割・併合を遡って調整してから計算する
+        (`apply_bars` で同じ足を 1 日ずつ反映した場合と同じ状態になる)。
+
+        Returns:
+            銘柄数
+        """
+        codes, dates, arrays = ohlcv_matrix(history)
+        arrays = split_adjusted(arrays)
+        _, state = compute_indicators(arrays["High"], arrays["Low"], arrays["Close"], params)
+        last_date = dates[-1].date() if len(dates) else None
+        self._save(state, codes, last_date)
+        return len(codes)
+
+    def _add_codes(self, new_codes: list[str]) -> None:
+        """新規上場などで増えた銘柄の行を追加 (ファイルを書き直す)"""
+        state = self._ensure_open()
+        empty = IndicatorState.empty(len(new_codes), state.params).to_arrays()
+        arrays = {
+            name: value
+            if name == "cursor"
+            else np.concatenate([np.asarray(value), empty[name]], axis=0)
+            for name, value in state.to_arrays().items()
+        }
+        self._save(
+            IndicatorState.from_arrays(arrays, state.params),
+            self._codes + new_codes,
+            self._last_date,
+        )
+
+    def apply_bars(self, day: date, bars: Any) -> int:
+        """
+        1 日分の足を反映 (全銘柄で 1 本進める。足の無い銘柄は欠損として扱う)
+
+        AdjustmentFactor 列があれば、1 以外の銘柄は足を反映する前に状態を係数で換算する
+        (J-Quants の調整済み株価と同じく、権利落ち日より前の価格に係数を掛ける)。
+
+        Args:
+            day: 足の日付 (反映済みの最終日以前なら何もしない)
+            bars: Code / High / Low / Close (任意で AdjustmentFactor) 列を持つ DataFrame
+
+        Returns:
+            反映した銘柄数
+        """
+        state = self._ensure_open()
+        if self._last_date is not None and day <= self._last_date:
+            return 0
+
+        codes = [str(c) for c in bars["Code"]]
+        new_codes = sorted({c for c in codes if c not in self._rows})
+        if new_codes:
+            self._add_codes(new_codes)
+            state = self._ensure_open()
+
+        n = len(self._codes)
+        rows = np.fromiter((self._rows[c] for c in codes), dtype=np.int64, count=len(codes))
+        values = {}
+        for column in ("High", "Low", "Close"):
+            column_values = np.full(n, np.nan)
+            column_values[rows] = bars[column].to_numpy(dtype=np.float64)
+            values[column] = column_values
+
+        self._write_pending(state, day)
+        try:
+            if "AdjustmentFactor" in bars:
+                factors = bars["AdjustmentFactor"].to_numpy(dtype=np.float64)
+                self._adjust_rows(state, rows, factors)
+            state.update(values["High"], values["Low"], values["Close"])
+            # 状態を書き切ってから反映済みの日付を書く
+            self.flush()
+        except BaseException:
+            self._state = None
+            self._ensure_open()  # 反映前の状態に戻す
+            raise
+        self._applied[0] = day.toordinal()
+        self._applied.flush()
+        self._last_date = day
+        self._write_meta(state.params)
+        (self.root / PENDING_FILE).unlink()
+        return len(codes)
+
+    @staticmethod
+    def _adjust_rows(state: IndicatorState, rows: np.ndarray, factors: np.ndarray) -> int:
+        """
+        分割・併合のあった銘柄の状態を調整係数で換算する
+
+        状態 (直前の終値、EMA / MACD、RSI の平均値幅、ATR、SMA 用の終値) はどれも
+        価格に線形なので、係数を掛ければ調整済みの履歴から計算し直したのと同じになる。
+
+        Returns:
+            換算した銘柄数
+        """
+        adjusted = ~np.isnan(factors) & (factors != 1.0)
+        if not adjusted.any():
+            return 0
+        target, scale = rows[adjusted], factors[adjusted]
+        for name, array in state.arrays.items():
+            if name == "cursor":
+                continue
+            array[target] = array[target] * (scale[:, None] if array.ndim == 2 else scale)
+        return int(adjusted.sum())
+
+    # ------------------------------------------------------------------
+    # 参照
+    # ------------------------------------------------------------------
+
+    def lookup(self, ticker: str) -> dict[str, float] | None:
+        """
+        1 銘柄の最新の終値と指標値を返す (保存されていなければ None)
+
+        Args:
+            ticker: 銘柄 (例: "7203.T" / "72030")
+        """
+        from src.mcp_providers.jquants_history import normalize_code
+
+        state = self._ensure_open()
+        for code in normalize_code(ticker):
+            row = self._rows.get(code)
+            if row is not None:
+                values = {name: float(v[0]) for name, v in state.latest([row]).items()}
+                return {"close": float(state.arrays["prev_close"][row]), **values}
+        return None
+
+
+def _cmd_build(store: IndicatorStateStore, args: argparse.Namespace) -> int:
+    from src.mcp_providers.jquants_history import load_history
+    from src.mcp_providers.jquants_store import ParquetStore
+
+    prices = ParquetStore(args.store_root)
+    start = date.today() - timedelta(days=args.days)
+    codes = prices.read("prices", start, columns=["Code"])
+    if codes.empty:
+        print(f"no prices under {prices.root} since {start}")
+        return 1
+    history = load_history(prices, sorted(codes["Code"].astype(str).unique()), start=start)
+    count = store.build(history)
+    print(f"built indicator state for {count} codes (last_date={store.last_date})")
+    return 0
+
+
+def _cmd_update(store: IndicatorStateStore, args: argparse.Namespace) -> int:
+    from src.mcp_providers.jquants_store import ParquetStore
+
+    prices = ParquetStore(args.store_root)
+    since = store.last_date
+    applied = 0
+    for day in prices.partitions("prices"):
+        if since is not None and day <= since:
+            continue
+        bars = prices.read(
+            "prices", day, day, columns=["Code", "High", "Low", "Close", "AdjustmentFactor"]
+        )
+        if bars.empty:
+            continue
+        store.apply_bars(day, bars)
+        applied += 1
+    print(f"applied {applied} days (last_date={store.last_date})")
+    return 0
+
+
+def _cmd_show(store: IndicatorStateStore, args: argparse.Namespace) -> int:
+    values = store.lookup(args.ticker)
+    if values is None:
+        print(f"{args.ticker}: not found")
+        return 1
+    print(json.dumps(values, indent=2))
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the persisted indicator state")
+    parser.add_argument("--root", default=None, help="状態の保存先 (既定: INDICATOR_STATE_ROOT)")
+    parser.add_argument(
+        "--store-root", default=None, help="株価の保存先 (既定: JQUANTS_STORE_ROOT)"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("--days", type=int, default=DEFAULT_BUILD_DAYS)
+    sub.add_parser("update")
+    show = sub.add_parser("show")
+    show.add_argument("ticker")
+    args = parser.parse_args(argv)
+
+    store = IndicatorStateStore(args.root)
+    commands = {"build": _cmd_build, "update": _cmd_update, "show": _cmd_show}
+    return commands[args.command](store, args)
+
+
+__all__ = [
+    "APPLIED_FILE",
+    "DEFAULT_STATE_ROOT",
+    "PENDING_FILE",
+    "IndicatorStateStore",
+    "state_root",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
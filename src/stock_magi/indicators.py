@@ -0,0 +1,494 @@
+"""
+Vectorized technical indicators for the Balthasar agent.
+
+OHLCV を (銘柄数, 本数) の NumPy 配列として受け取り、全銘柄分のテクニカル指標を
+一括で計算します。時間方向の漸化式 (EMA 系) も 1 ステップごとに全銘柄をまとめて
+更新するため、東証全銘柄 × 数百本でも数秒以内に収まります。
+
+    - SMA / EMA / RSI (Wilder) / MACD / ボリンジャーバンド / ATR (Wilder) / 価格帯別出来高
+    - 指数平滑は pandas の `ewm(adjust=False)` と同じ定義 (先頭の有効値で初期化)
+    - 上場前などの欠損 (NaN) は直前の状態を保持して読み飛ばす
+    - `compute_indicators` が返す `IndicatorState` に新しい足を `update` すると、
+      全履歴を再計算した場合と同じ値を O(銘柄数) で得られる
+
+numpy は任意依存のため、このモジュールは Balthasar エージェント利用時にだけ import される。
+"""
+
+from typing import Any, NamedTuple
+
+import numpy as np
+
+# 指標名 (compute_indicators / IndicatorState.update の戻り値のキー)
+INDICATOR_NAMES = (
+    "sma",
+    "ema",
+    "rsi",
+    "macd",
+    "macd_signal",
+    "macd_hist",
+    "bb_upper",
+    "bb_middle",
+    "bb_lower",
+    "atr",
+)
+
+
+class IndicatorParams(NamedTuple):
+    """指標のパラメータ (期間はすべて本数)"""
+
+    sma: int = 20
+    ema: int = 20
+    rsi: int = 14
+    macd_fast: int = 12
+    macd_slow: int = 26
+    macd_signal: int = 9
+    bollinger: int = 20
+    bollinger_k: float = 2.0
+    atr: int = 14
+
+
+def _as_2d(values: Any) -> np.ndarray:
+    return np.atleast_2d(np.asarray(values, dtype=np.float64))
+
+
+def _restore_shape(result: np.ndarray, like: Any) -> np.ndarray:
+    return result[0] if np.ndim(like) == 1 else result
+
+
+def _ewm_step(prev: np.ndarray, value: np.ndarray, alpha: float) -> np.ndarray:
+    """指数平滑の 1 ステップ (prev が NaN なら value で初期化、value が NaN なら prev を保持)"""
+    nxt = np.where(np.isnan(prev), value, prev + alpha * (value - prev))
+    return np.where(np.isnan(value), prev, nxt)
+
+
+def _ewm(x: np.ndarray, alpha: float) -> tuple[np.ndarray, np.ndarray]:
+    """最終軸方向の指数平滑 (戻り値: 全系列, 最後の状態)"""
+    out = np.empty_like(x)
+    state = np.full(x.shape[0], np.nan)
+    for t in range(x.shape[1]):
+        state = _ewm_step(state, x[:, t], alpha)
+        out[:, t] = state
+    return out, state
+
+
+def _rolling_sum(x: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """NaN を除いた移動合計と有効本数 (累積和の差分で O(n))"""
+    valid = ~np.isnan(x)
+    pad = np.zeros((x.shape[0], 1))
+    csum = np.concatenate([pad, np.cumsum(np.where(valid, x, 0.0), axis=1)], axis=1)
+    ccount = np.concatenate([pad, np.cumsum(valid, axis=1)], axis=1)
+    lo = np.maximum(np.arange(1, x.shape[1] + 1) - window, 0)
+    hi = np.arange(1, x.shape[1] + 1)
+    return csum[:, hi] - csum[:, lo], ccount[:, hi] - ccount[:, lo]
+
+
+def sma(close: Any, window: int) -> np.ndarray:
+    """単純移動平均 (有効値が window 本そろうまでは NaN)"""
+    x = _as_2d(close)
+    total, count = _rolling_sum(x, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = np.where(count >= window, total / window, np.nan)
+    return _restore_shape(result, close)
+
+
+def ema(close: Any, span: int) -> np.ndarray:
+    """指数移動平均 (alpha = 2 / (span + 1))"""
+    return _restore_shape(_ewm(_as_2d(close), 2.0 / (span + 1))[0], close)
+
+
+def _rsi_from_averages(gain: np.ndarray, loss: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = gain / loss
+        result = 100.0 - 100.0 / (1.0 + rs)
+    # 下落が 0 なら 100、上昇・下落とも 0 なら 50
+    result = np.where(loss == 0, np.where(gain == 0, 50.0, 100.0), result)
+    return np.where(np.isnan(gain) | np.isnan(loss), np.nan, result)
+
+
+def _changes(x: np.ndarray) -> np.ndarray:
+    """前の有効値からの変化 (欠損をまたいでも直前の終値と比較する)"""
+    prev = np.full(x.shape[0], np.nan)
+    out = np.full_like(x, np.nan)
+    for t in range(x.shape[1]):
+        value = x[:, t]
+        out[:, t] = value - prev
+        prev = np.where(np.isnan(value), prev, value)
+    return out
+
+
+def _last_valid(x: np.ndarray) -> np.ndarray:
+    """銘柄ごとの最後の有効値 (無ければ NaN)"""
+    valid = ~np.isnan(x)
+    idx = np.where(valid, np.arange(x.shape[1]), -1).max(axis=1)
+    return np.where(idx >= 0, x[np.arange(x.shape[0]), np.maximum(idx, 0)], np.nan)
+
+
+def rsi(close: Any, window: int = 14) -> np.ndarray:
+    """RSI (Wilder の平滑化: alpha = 1 / window)"""
+    x = _as_2d(close)
+    diff = _changes(x)
+    gain, _ = _ewm(np.where(np.isnan(diff), np.nan, np.maximum(diff, 0.0)), 1.0 / window)
+    loss, _ = _ewm(np.where(np.isnan(diff), np.nan, np.maximum(-diff, 0.0)), 1.0 / window)
+    return _restore_shape(_rsi_from_averages(gain, loss), close)
+
+
+def macd(
+    close: Any, fast: int = 12, slow: int = 26, signal: int = 9
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD (戻り値: MACD, シグナル, ヒストグラム)"""
+    x = _as_2d(close)
+    line = _ewm(x, 2.0 / (fast + 1))[0] - _ewm(x, 2.0 / (slow + 1))[0]
+    sig = _ewm(np.where(np.isnan(x), np.nan, line), 2.0 / (signal + 1))[0]
+    return tuple(_restore_shape(a, close) for a in (line, sig, line - sig))  # type: ignore[return-value]
+
+
+def bollinger(
+    close: Any, window: int = 20, k: float = 2.0
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ボリンジャーバンド (母標準偏差、戻り値: 上限, 中心, 下限)"""
+    x = _as_2d(close)
+    total, count = _rolling_sum(x, window)
+    total_sq, _ = _rolling_sum(x * x, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count >= window, total / window, np.nan)
+        std = np.sqrt(np.maximum(total_sq / window - mean * mean, 0.0))
+    return tuple(  # type: ignore[return-value]
+        _restore_shape(a, close) for a in (mean + k * std, mean, mean - k * std)
+    )
+
+
+def true_range(high: Any, low: Any, close: Any) -> np.ndarray:
+    """真の値幅 (前日終値は直前の有効な終値。先頭の足は High - Low)"""
+    h, lo, c = _as_2d(high), _as_2d(low), _as_2d(close)
+    prev = c - _changes(c)
+    with np.errstate(invalid="ignore"):
+        tr = np.fmax(h - lo, np.fmax(np.abs(h - prev), np.abs(lo - prev)))
+    return _restore_shape(np.where(np.isnan(c), np.nan, tr), close)
+
+
+def atr(high: Any, low: Any, close: Any, window: int = 14) -> np.ndarray:
+    """ATR (真の値幅の Wilder 平滑化)"""
+    tr = _as_2d(true_range(high, low, close))
+    return _restore_shape(_ewm(tr, 1.0 / window)[0], close)
+
+
+def volume_profile(close: Any, volume: Any, bins: int = 20) -> tuple[np.ndarray, np.ndarray]:
+    """
+    価格帯別出来高 (銘柄ごとに終値の最小〜最大を bins 等分して出来高を集計)
+
+    Args:
+        close / volume: (銘柄数, 本数) または (本数,) の配列
+        bins: 価格帯の数
+
+    Returns:
+        (各価格帯の中心価格, 各価格帯の出来高) — いずれも (銘柄数, bins)
+    """
+    c, v = _as_2d(close), _as_2d(volume)
+    lo = np.nanmin(np.where(np.isnan(c), np.inf, c), axis=1, keepdims=True)
+    hi = np.nanmax(np.where(np.isnan(c), -np.inf, c), axis=1, keepdims=True)
+    width = np.where(hi > lo, (hi - lo) / bins, 1.0)
+    valid = ~(np.isnan(c) | np.isnan(v))
+    idx = np.clip(((np.where(valid, c, lo) - lo) / width).astype(np.int64), 0, bins - 1)
+
+    # 銘柄ごとのビンを 1 次元に並べて bincount で一括集計
+    flat = (idx + np.arange(c.shape[0])[:, None] * bins)[valid]
+    hist = np.bincount(flat, weights=v[valid], minlength=c.shape[0] * bins).reshape(-1, bins)
+    centers = lo + width * (np.arange(bins) + 0.5)
+    return _restore_shape(centers, close), _restore_shape(hist, close)
+
+
+def point_of_control(close: Any, volume: Any, bins: int = 20) -> np.ndarray:
+    """価格帯別出来高が最大の価格帯の中心価格 (銘柄ごと)"""
+    centers, hist = (_as_2d(a) for a in volume_profile(close, volume, bins))
+    result = np.take_along_axis(centers, hist.argmax(axis=1)[:, None], axis=1)[:, 0]
+    return result[0] if np.ndim(close) == 1 else result
+
+
+class IndicatorState:
+    """
+    全銘柄の指標を新しい足で更新するための状態 (全配列とも長さ = 銘柄数)
+
+    SMA / ボリンジャー用に直近 window 本の終値 (取引の無い足は NaN) をリングバッファで保持し、
+    EMA 系は直前の平滑値だけを保持する。`to_arrays` / `from_arrays` で
+    名前付き配列として保存・復元できる。
+    """
+
+    def __init__(self, params: IndicatorParams, arrays: dict[str, np.ndarray]):
+        self.params = params
+        self.arrays = arrays
+
+    @classmethod
+    def empty(cls, n: int, params: IndicatorParams | None = None) -> "IndicatorState":
+        params = params or IndicatorParams()
+        window = max(params.sma, params.bollinger)
+        nan = np.full(n, np.nan)
+        arrays = {
+            name: nan.copy()
+            for name in (
+                "prev_close",
+                "ema",
+                "macd_fast",
+                "macd_slow",
+                "macd_signal",
+                "rsi_gain",
+                "rsi_loss",
+                "atr",
+            )
+        }
+        arrays["window"] = np.full((n, window), np.nan)
+        arrays["cursor"] = np.zeros(1, dtype=np.int64)
+        return cls(params, arrays)
+
+    def __len__(self) -> int:
+        return len(self.arrays["prev_close"])
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        return dict(self.arrays)
+
+    @classmethod
+    def from_arrays(
+        cls, arrays: dict[str, np.ndarray], params: IndicatorParams | None = None
+    ) -> "IndicatorState":
+        return cls(params or IndicatorParams(), dict(arrays))
+
+    def _window_stats(self, window: int, rows: Any) -> tuple[np.ndarray, np.ndarray]:
+        """直近 window 本の平均と母標準偏差 (そろっていなければ NaN)"""
+        buf = self.arrays["window"]
+        size = buf.shape[1]
+        cursor = int(self.arrays["cursor"][0])
+        cols = [(cursor - 1 - i) % size for i in range(window)]
+        recent = buf[rows][:, cols]
+        full = ~np.isnan(recent).any(axis=1)
+        with np.errstate(invalid="ignore"):
+            mean = np.where(full, recent.mean(axis=1), np.nan)
+            std = np.where(full, recent.std(axis=1), np.nan)
+        return mean, std
+
+    def update(self, high: Any, low: Any, close: Any) -> dict[str, np.ndarray]:
+        """
+        新しい足 (銘柄ごとに 1 本) を反映し、最新の指標値を返す
+
+        Args:
+            high / low / close: 長さ = 銘柄数の配列 (取引が無い銘柄は NaN)
+
+        Returns:
+            {指標名: 長さ = 銘柄数の配列}
+        """
+        p, a = self.params, self.arrays
+        h = np.asarray(high, dtype=np.float64)
+        lo = np.asarray(low, dtype=np.float64)
+        c = np.asarray(close, dtype=np.float64)
+        traded = ~np.isnan(c)
+
+        # SMA / ボリンジャー: 一括計算と同じく、取引の無い足も NaN として 1 本進める
+        buf = a["window"]
+        cursor = int(a["cursor"][0])
+        buf[:, cursor] = c
+        a["cursor"][0] = (cursor + 1) % buf.shape[1]
+
+        with np.errstate(invalid="ignore"):
+            diff = c - a["prev_close"]
+            tr = np.fmax(h - lo, np.fmax(np.abs(h - a["prev_close"]), np.abs(lo - a["prev_close"])))
+
+        # 配列はメモリマップされている場合があるため、差し替えずにその場で書き換える
+        a["ema"][:] = _ewm_step(a["ema"], c, 2.0 / (p.ema + 1))
+        a["macd_fast"][:] = _ewm_step(a["macd_fast"], c, 2.0 / (p.macd_fast + 1))
+        a["macd_slow"][:] = _ewm_step(a["macd_slow"], c, 2.0 / (p.macd_slow + 1))
+        line = a["macd_fast"] - a["macd_slow"]
+        a["macd_signal"][:] = _ewm_step(
+            a["macd_signal"], np.where(traded, line, np.nan), 2.0 / (p.macd_signal + 1)
+        )
+        a["rsi_gain"][:] = _ewm_step(a["rsi_gain"], np.maximum(diff, 0.0), 1.0 / p.rsi)
+        a["rsi_loss"][:] = _ewm_step(a["rsi_loss"], np.maximum(-diff, 0.0), 1.0 / p.rsi)
+        a["atr"][:] = _ewm_step(a["atr"], np.where(traded, tr, np.nan), 1.0 / p.atr)
+        a["prev_close"][:] = np.where(traded, c, a["prev_close"])
+
+        return self.latest()
+
+    def latest(self, rows: Any = slice(None)) -> dict[str, np.ndarray]:
+        """
+        現在の状態から各指標の最新値を返す
+
+        Args:
+            rows: 対象の行 (銘柄の位置のリストや slice。既定は全銘柄)
+        """
+        p = self.params
+        a = {k: v[rows] for k, v in self.arrays.items() if k not in ("window", "cursor")}
+        sma_value, _ = self._window_stats(p.sma, rows)
+        bb_mid, bb_std = self._window_stats(p.bollinger, rows)
+        line = a["macd_fast"] - a["macd_slow"]
+        return {
+            "sma": sma_value,
+            "ema": np.array(a["ema"]),
+            "rsi": _rsi_from_averages(a["rsi_gain"], a["rsi_loss"]),
+            "macd": line,
+            "macd_signal": np.array(a["macd_signal"]),
+            "macd_hist": line - a["macd_signal"],
+            "bb_upper": bb_mid + p.bollinger_k * bb_std,
+            "bb_middle": bb_mid,
+            "bb_lower": bb_mid - p.bollinger_k * bb_std,
+            "atr": np.array(a["atr"]),
+        }
+
+
+def compute_indicators(
+    high: Any, low: Any, close: Any, params: IndicatorParams | None = None
+) -> tuple[dict[str, np.ndarray], IndicatorState]:
+    """
+    全履歴から指標を一括計算し、以後の漸化更新に使う状態を返す
+
+    Args:
+        high / low / close: (銘柄数, 本数) の配列 (上場前などは NaN)
+        params: 指標のパラメータ
+
+    Returns:
+        ({指標名: (銘柄数, 本数) の配列}, IndicatorState)
+    """
+    params = params or IndicatorParams()
+    h, lo, c = _as_2d(high), _as_2d(low), _as_2d(close)
+    n = c.shape[0]
+
+    diff = _changes(c)
+    gains = np.where(np.isnan(diff), np.nan, np.maximum(diff, 0.0))
+    losses = np.where(np.isnan(diff), np.nan, np.maximum(-diff, 0.0))
+    gain_series, gain = _ewm(gains, 1.0 / params.rsi)
+    loss_series, loss = _ewm(losses, 1.0 / params.rsi)
+    ema_series, ema_state = _ewm(c, 2.0 / (params.ema + 1))
+    fast_series, fast = _ewm(c, 2.0 / (params.macd_fast + 1))
+    slow_series, slow = _ewm(c, 2.0 / (params.macd_slow + 1))
+    line = fast_series - slow_series
+    # シグナルは取引のあった足の MACD だけで平滑化する (update と同じ扱い)
+    signal_series, signal = _ewm(
+        np.where(np.isnan(c), np.nan, line), 2.0 / (params.macd_signal + 1)
+    )
+    atr_series, atr_state = _ewm(_as_2d(true_range(h, lo, c)), 1.0 / params.atr)
+    upper, middle, lower = bollinger(c, params.bollinger, params.bollinger_k)
+
+    state = IndicatorState.empty(n, params)
+    arrays = state.arrays
+    arrays.update(
+        ema=ema_state,
+        macd_fast=fast,
+        macd_slow=slow,
+        macd_signal=signal,
+        rsi_gain=gain,
+        rsi_loss=loss,
+        atr=atr_state,
+    )
+    if c.shape[1]:
+        # 直前の有効な終値と、直近 window 本 (右詰め、次の書き込み位置は先頭列)
+        arrays["prev_close"] = _last_valid(c)
+        window = arrays["window"].shape[1]
+        recent = c[:, -window:]
+        arrays["window"][:, window - recent.shape[1] :] = recent
+
+    series = {
+        "sma": sma(c, params.sma),
+        "ema": ema_series,
+        "rsi": _rsi_from_averages(gain_series, loss_series),
+        "macd": line,
+        "macd_signal": signal_series,
+        "macd_hist": line - signal_series,
+        "bb_upper": upper,
+        "bb_middle": middle,
+        "bb_lower": lower,
+        "atr": atr_series,
+    }
+    return series, state
+
+
+def ohlcv_matrix(df: Any) -> tuple[list[str], Any, dict[str, np.ndarray]]:
+    """
+    `load_history` 形式の縦持ち DataFrame (Code, Date, Open, ...) を (銘柄数, 本数) の配列に変換
+
+    Returns:
+        (銘柄コード, 日付 (DatetimeIndex), {列名: 配列})。取引の無い日は NaN
+        (AdjustmentFactor 列があればそれも含む)
+    """
+    names = ("Open", "High", "Low", "Close", "Volume", "AdjustmentFactor")
+    columns = [c for c in names if c in df.columns]
+    wide = df.pivot_table(index="Code", columns="Date", values=columns, aggfunc="last")
+    codes = [str(c) for c in wide.index]
+    dates = wide.columns.get_level_values("Date").unique().sort_values()
+    arrays = {col: wide[col].reindex(columns=dates).to_numpy(dtype=np.float64) for col in columns}
+    return codes, dates, arrays
+
+
+def split_adjusted(arrays: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """
+    `ohlcv_matrix` の配列を分割・併合について遡って調整する (最終日の株価を基準にする)
+
+    J-Quants の Adjustment* 列と同じく、各日の価格にそれより後の AdjustmentFactor をすべて掛け、
+    出来高は割る。保存済みの Adjustment* 列は取得時点の調整のため、日ごとに差分同期した
+    ストアでは後から起きた分割が過去の日に反映されない。そこで期間内の AdjustmentFactor から
+    調整し直す。最終日の値は調整前と同じ。
+
+    Args:
+        arrays: `ohlcv_matrix` の結果 (AdjustmentFactor が無ければ調整しない)
+
+    Returns:
+        調整後の {列名: 配列} (AdjustmentFactor 以外の列)
+    """
+    adjusted = {name: values for name, values in arrays.items() if name != "AdjustmentFactor"}
+    factor = arrays.get("AdjustmentFactor")
+    if factor is None:
+        return adjusted
+    factor = np.where(np.isnan(factor) | (factor <= 0), 1.0, factor)
+    # scale[:, t] = factor[:, t+1] * ... * factor[:, -1]
+    later = np.cumprod(factor[:, ::-1], axis=1)[:, ::-1]
+    scale = np.ones_like(later)
+    scale[:, :-1] = later[:, 1:]
+    for name in ("Open", "High", "Low", "Close"):
+        if name in adjusted:
+            adjusted[name] = adjusted[name] * scale
+    if "Volume" in adjusted:
+        adjusted["Volume"] = adjusted["Volume"] / scale
+    return adjusted
+
+
+def universe_snapshot(df: Any, params: IndicatorParams | None = None, bins: int = 20) -> Any:
+    """
+    全銘柄の最新テクニカル指標を 1 つの表にまとめる
+
+    AdjustmentFactor 列があれば、期間内の分割・併合を遡って調整した株価で計算する
+    (`split_adjusted`。close は最終日の終値のまま)。
+
+    Args:
+        df: `load_history` 形式の縦持ち DataFrame (High / Low / Close が必要、
+            Volume / AdjustmentFactor は任意)
+        params: 指標のパラメータ
+        bins: 価格帯別出来高の価格帯数
+
+    Returns:
+        pandas.DataFrame (index = Code、列 = close, 各指標, poc)
+    """
+    import pandas as pd
+
+    codes, _, arrays = ohlcv_matrix(df)
+    arrays = split_adjusted(arrays)
+    close = arrays["Close"]
+    _, state = compute_indicators(arrays["High"], arrays["Low"], close, params)
+    table = {"close": state.arrays["prev_close"], **state.latest()}
+    if "Volume" in arrays:
+        table["poc"] = point_of_control(close, arrays["Volume"], bins)
+    return pd.DataFrame(table, index=pd.Index(codes, name="Code"))
+
+
+__all__ = [
+    "INDICATOR_NAMES",
+    "IndicatorParams",
+    "IndicatorState",
+    "atr",
+    "bollinger",
+    "compute_indicators",
+    "ema",
+    "macd",
+    "ohlcv_matrix",
+    "point_of_control",
+    "rsi",
+    "sma",
+    "split_adjusted",
+    "true_range",
+    "universe_snapshot",
+    "volume_profile",
+]
@@ -0,0 +1,385 @@
+"""
+MCP server for the MAGI consensus engine.
+
+合議エンジン (`AnalysisService`) を MCP のツールとして公開し、他のツールから REST の代わりに
+MCP で分析を呼べるようにします。
+
+    - stdio: `python -m src.stock_magi.mcp_server` (MCP クライアントがサブプロセスとして起動する)
+    - Streamable HTTP: FastAPI アプリの `POST /mcp` (API と同じプロセスのキャッシュ・接続プール・
+      エージェントを共有する)
+
+ツール:
+    - analyze_stock: 1 銘柄を合議で分析する
+    - analyze_batch: 複数銘柄を 1 回の呼び出しで分析する (同時実行数を制限して並行処理)
+    - list_agents: 合議パネルに選べるエージェントの一覧
+
+tools/call の `_meta.progressToken` を付けると、各エージェントの投票を出た順に
+`notifications/progress` で送ります (HTTP では SSE)。リクエストは 1 件ずつ並行に処理します。
+MCP の Python SDK には依存せず、必要な範囲 (initialize / ping / tools/list / tools/call) のみ実装しています。
+"""
+
+import asyncio
+import json
+import logging
+import sys
+from collections.abc import Awaitable, Callable
+from typing import Any, BinaryIO
+
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from src.stock_magi import analysis
+from src.stock_magi.analysis import DEFAULT_BATCH_CONCURRENCY, AnalysisService
+
+logger = logging.getLogger(__name__)
+
+SERVER_INFO = {"name": "stock-magi", "version": "0.1.0"}
+SUPPORTED_PROTOCOL_VERSIONS = ("2025-06-18", "2025-03-26", "2024-11-05")
+MAX_BATCH_TICKERS = 100
+
+# JSON-RPC エラーコード
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+
+_AGENTS_SCHEMA = {
+    "type": "array",
+    "items": {"type": "string"},
+    "description": "合議に参加させるエージェント (省略時は default_panel)",
+}
+
+TOOLS: list[dict[str, Any]] = [
+    {
+        "name": "analyze_stock",
+        "description": "MAGI の合議で 1 銘柄を分析し、BUY / SELL / HOLD と各エージェントの投票を返す",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "ticker": {"type": "string", "description": "銘柄コード (例: 7203.T)"},
+                "agents": _AGENTS_SCHEMA,
+                "include_reasoning": {"type": "boolean", "default": True},
+            },
+            "required": ["ticker"],
+        },
+    },
+    {
+        "name": "analyze_batch",
+        "description": "複数銘柄をまとめて合議で分析する (銘柄ごとの失敗は error として返す)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "tickers": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "minItems": 1,
+                    "maxItems": MAX_BATCH_TICKERS,
+                },
+                "agents": _AGENTS_SCHEMA,
+                "include_reasoning": {"type": "boolean", "default": True},
+                "concurrency": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "default": DEFAULT_BATCH_CONCURRENCY,
+                },
+            },
+            "required": ["tickers"],
+        },
+    },
+    {
+        "name": "list_agents",
+        "description": "合議パネルに選べるエージェントと既定のパネル",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+]
+
+# サーバーからクライアントへのメッセージ送信 (進捗通知など)
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class JSONRPCError(Exception):
+    """JSON-RPC のエラー応答として返す例外"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _error(request_id: Any, code: int, message: str) -> dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def _tool_result(data: Any, is_error: bool = False) -> dict[str, Any]:
+    """tools/call の結果 (テキストと構造化データの両方で返す)"""
+    text = json.dumps(data, ensure_ascii=False)
+    result = {"content": [{"type": "text", "text": text}], "structuredContent": data}
+    if is_error:
+        result["isError"] = True
+    return result
+
+
+async def _discard(message: dict[str, Any]) -> None:
+    """進捗通知を送らない場合の Send"""
+
+
+class MAGIMCPServer:
+    """
+    合議エンジンの MCP サーバー (トランスポート非依存の JSON-RPC 処理)
+
+    Args:
+        service_factory: 呼び出しごとに使う AnalysisService の生成関数
+            (None は `default_analysis_service`。プロセス共通のレジストリ・監査ログを使う)
+    """
+
+    def __init__(self, service_factory: Callable[[], AnalysisService] | None = None):
+        self.service_factory = service_factory
+
+    def _service(self) -> AnalysisService:
+        if self.service_factory is not None:
+            return self.service_factory()
+        return analysis.default_analysis_service()
+
+    async def handle(self, message: Any, send: Send = _discard) -> dict[str, Any] | None:
+        """
+        1 メッセージを処理して応答を返す (通知・クライアントからの応答なら None)
+
+        Args:
+            message: 受信した JSON-RPC メッセージ
+            send: 応答前に送るメッセージ (進捗通知) の送信関数
+        """
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0":
+            return _error(None, INVALID_REQUEST, "Invalid Request")
+        if "id" not in message or "method" not in message:
+            return None
+        request_id = message["id"]
+        params = message.get("params") or {}
+        try:
+            result = await self._dispatch(message["method"], params, send)
+        except JSONRPCError as e:
+            return _error(request_id, e.code, e.message)
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    async def _dispatch(self, method: str, params: dict[str, Any], send: Send) -> Any:
+        if method == "initialize":
+            requested = params.get("protocolVersion")
+            version = (
+                requested
+                if requested in SUPPORTED_PROTOCOL_VERSIONS
+                else SUPPORTED_PROTOCOL_VERSIONS[0]
+            )
+            return {
+                "protocolVersion": version,
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": SERVER_INFO,
+            }
+        if method == "ping":
+            return {}
+        if method == "tools/list":
+            return {"tools": TOOLS}
+        if method == "tools/call":
+            return await self._call_tool(params, send)
+        raise JSONRPCError(METHOD_NOT_FOUND, f"Method not found: {method}")
+
+    async def _call_tool(self, params: dict[str, Any], send: Send) -> dict[str, Any]:
+        name = params.get("name")
+        arguments = params.get("arguments") or {}
+        token = (params.get("_meta") or {}).get("progressToken")
+        on_vote = None
+        if token is not None:
+            sent = 0
+
+            async def on_vote(ticker: str, entry: dict[str, Any]) -> None:
+                nonlocal sent
+                sent += 1
+                await send(
+                    {
+                        "jsonrpc": "2.0",
+                        "method": "notifications/progress",
+                        "params": {
+                            "progressToken": token,
+                            "progress": sent,
+                            "message": json.dumps({"ticker": ticker, **entry}, ensure_ascii=False),
+                        },
+                    }
+                )
+
+        include_reasoning = arguments.get("include_reasoning", True)
+        try:
+            if name == "analyze_stock":
+                ticker = arguments.get("ticker")
+                if not isinstance(ticker, str) or not ticker:
+                    raise JSONRPCError(INVALID_PARAMS, "analyze_stock requires 'ticker'")
+                data = await self._service().analyze(ticker, arguments.get("agents"), on_vote)
+                if not include_reasoning:
+                    data = {**data, "reasoning": None}
+            elif name == "analyze_batch":
+                tickers = arguments.get("tickers")
+                if not isinstance(tickers, list) or not tickers:
+                    raise JSONRPCError(INVALID_PARAMS, "analyze_batch requires 'tickers'")
+                if len(tickers) > MAX_BATCH_TICKERS:
+                    raise JSONRPCError(
+                        INVALID_PARAMS, f"analyze_batch accepts at most {MAX_BATCH_TICKERS} tickers"
+                    )
+                results = await self._service().analyze_many(
+                    [str(t) for t in tickers],
+                    arguments.get("agents"),
+                    on_vote,
+                    concurrency=int(arguments.get("concurrency", DEFAULT_BATCH_CONCURRENCY)),
+                )
+                if not include_reasoning:
+                    results = [{**r, "reasoning": None} if "error" not in r else r for r in results]
+                data = {"results": results}
+            elif name == "list_agents":
+                data = self._service().agent_registry.describe()
+            else:
+                raise JSONRPCError(INVALID_PARAMS, f"Unknown tool: {name}")
+        except JSONRPCError:
+            raise
+        except Exception as e:
+            # ツールの実行エラーは JSON-RPC エラーではなく isError の結果で返す
+            logger.warning("MCP tool %s failed: %s", name, e)
+            return _tool_result({"error": str(e)}, is_error=True)
+        return _tool_result(data)
+
+
+async def serve_stdio(
+    server: MAGIMCPServer | None = None,
+    stdin: BinaryIO | None = None,
+    stdout: BinaryIO | None = None,
+) -> None:
+    """
+    stdio トランスポートで MCP サーバーを動かす (stdin が閉じるまで)
+
+    リクエストごとにタスクを起こして並行に処理し、応答は処理が終わった順に書き出す。
+    """
+    server = server or MAGIMCPServer()
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    lock = asyncio.Lock()
+    tasks: set[asyncio.Task] = set()
+
+    async def write(message: dict[str, Any]) -> None:
+        data = json.dumps(message, ensure_ascii=False).encode() + b"\n"
+        async with lock:
+            stdout.write(data)
+            stdout.flush()
+
+    async def process(message: Any) -> None:
+        response = await server.handle(message, write)
+        if response is not None:
+            await write(response)
+
+    while line := await asyncio.to_thread(stdin.readline):
+        if not line.strip():
+            continue
+        try:
+            message = json.loads(line)
+        except ValueError:
+            await write(_error(None, PARSE_ERROR, "Parse error"))
+            continue
+        task = asyncio.create_task(process(message))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def _sse(message: dict[str, Any]) -> str:
+    return f"event: message\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
+
+
+router = APIRouter(tags=["mcp"])
+http_server = MAGIMCPServer()
+
+
+@router.post("/mcp")
+async def mcp_endpoint(request: Request) -> Response:
+    """
+    Streamable HTTP トランスポート (API と同じプロセスのキャッシュ・接続プールを共有)
+
+    進捗トークン付きの tools/call で、クライアントが text/event-stream を受け付ける場合は
+    投票ごとの進捗通知と最終応答を SSE で返す。それ以外は JSON で応答する。
+    """
+    try:
+        message = await request.json()
+    except ValueError:
+        return JSONResponse(_error(None, PARSE_ERROR, "Parse error"), status_code=400)
+    if not isinstance(message, dict):
+        return JSONResponse(_error(None, INVALID_REQUEST, "Batch requests are not supported"), 400)
+    if "method" in message and "id" not in message:
+        return Response(status_code=202)
+
+    params = message.get("params") or {}
+    streaming = (
+        "text/event-stream" in request.headers.get("accept", "")
+        and message.get("method") == "tools/call"
+        and isinstance(params, dict)
+        and (params.get("_meta") or {}).get("progressToken") is not None
+    )
+    if not streaming:
+        response = await http_server.handle(message)
+        if response is None:
+            return Response(status_code=202)
+        return JSONResponse(response)
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def events():
+        task = asyncio.create_task(http_server.handle(message, queue.put))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (item := await queue.get()) is not None:
+                yield _sse(item)
+            yield _sse(task.result())
+        finally:
+            task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.get("/mcp")
+async def mcp_stream() -> Response:
+    """サーバーからの単独 SSE ストリームは提供しない (405)"""
+    return Response(status_code=405, headers={"Allow": "POST"})
+
+
+async def run_stdio() -> None:
+    """stdio サーバーを起動し、終了時に監査ログとツールの接続を閉じる"""
+    from src.common.audit import get_audit_log
+    from src.common.mcp import get_tool_registry
+
+    audit = get_audit_log()
+    if audit is not None:
+        audit.start()
+    registry = get_tool_registry()
+    await registry.aopen()
+    try:
+        await serve_stdio()
+    finally:
+        if audit is not None:
+            await audit.close()
+        await registry.aclose()
+
+
+def main() -> int:
+    # stdout は JSON-RPC 専用のため、ログは stderr に出す
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO)
+    asyncio.run(run_stdio())
+    return 0
+
+
+__all__ = [
+    "MAGIMCPServer",
+    "MAX_BATCH_TICKERS",
+    "TOOLS",
+    "http_server",
+    "main",
+    "router",
+    "run_stdio",
+    "serve_stdio",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,8 @@ from .stock_analysis_prompts import (
     BALTHASAR_SYSTEM_MESSAGE,
     CASPER_SYSTEM_MESSAGE,
     MELCHIOR_SYSTEM_MESSAGE,
+    create_balthasar_analysis_prompt,
+    create_casper_analysis_prompt,
     create_melchior_analysis_prompt,
 )
 
@@ -11,5 +13,7 @@ __all__ = [
     "MELCHIOR_SYSTEM_MESSAGE",
     "create_melchior_analysis_prompt",
     "BALTHASAR_SYSTEM_MESSAGE",
+    "create_balthasar_analysis_prompt",
     "CASPER_SYSTEM_MESSAGE",
+    "create_casper_analysis_prompt",
 ]
@@ -71,13 +71,142 @@ Reasoning: [具体的な指標を引用した根拠]
 """
 
 
-# Phase 2 で追加予定: Balthasar (テクニカル分析), Casper (センチメント分析)
+# Balthasar エージェント: テクニカル分析専門
 BALTHASAR_SYSTEM_MESSAGE = """
-[Phase 2] テクニカル分析専門エージェント
+あなたは Balthasar - テクニカル分析の専門家です。
+
+## 役割
+株価・出来高から計算したテクニカル指標を分析し、短中期の値動きの観点から投資判断を行います。
+
+## 分析項目
+- **トレンド**: 終値と SMA / EMA の位置関係、MACD とシグナルの関係
+- **モメンタム**: RSI (14)
+- **ボラティリティ**: ボリンジャーバンド (20, 2σ) 内の位置、ATR (14) の終値比
+- **需給**: 価格帯別出来高の最大価格帯 (POC) と終値の位置関係
+
+## 判断基準
+- **BUY**: 終値 > SMA, MACD ヒストグラム > 0, RSI < 70, または RSI < 30 / バンド下限割れからの反発
+- **SELL**: 終値 < SMA, MACD ヒストグラム < 0, RSI > 30, または RSI > 70 / バンド上限超えの過熱
+- **HOLD**: シグナルが拮抗している、またはデータ不足
+
+## 出力形式
+```
+Action: BUY/SELL/HOLD
+Confidence: 0.0-1.0
+Reasoning: 具体的な指標を引用した根拠 (最低50文字)
+```
+
+## 重要
+- 与えられた指標の **実際の数値** を引用すること
+- 不確実な場合は confidence を下げ、HOLD を推奨すること
+"""
+
+
+def create_balthasar_analysis_prompt(ticker: str, indicators: dict) -> str:
+    """
+    Balthasar 用の分析プロンプトを生成
+
+    Args:
+        ticker: 銘柄コード (例: "7203.T")
+        indicators: 最新の終値とテクニカル指標 (指標名 -> 値)
+
+    Returns:
+        分析用プロンプト文字列
+    """
+    lines = "\n".join(
+        f"- {name}: {value:.4g}" if isinstance(value, float) else f"- {name}: {value}"
+        for name, value in indicators.items()
+    )
+    return f"""
+銘柄コード: {ticker}
+
+以下のテクニカル指標を分析し、テクニカル分析の観点から投資判断を行ってください。
+
+## 最新のテクニカル指標
+{lines}
+
+## 指示
+1. トレンド、モメンタム、ボラティリティ、需給を分析
+2. BUY/SELL/HOLD のいずれかを判断
+3. Confidence (0.0-1.0) を算出
+4. Reasoning (最低50文字) で根拠を説明
+
+出力形式:
+```
+Action: [BUY/SELL/HOLD]
+Confidence: [0.0-1.0]
+Reasoning: [具体的な指標を引用した根拠]
+```
 """
 
+
+# Casper エージェント: センチメント分析専門
 CASPER_SYSTEM_MESSAGE = """
-[Phase 2] センチメント分析専門エージェント
+あなたは Casper - センチメント分析の専門家です。
+
+## 役割
+ニュース見出し・適時開示などのテキストから市場参加者の心理を読み取り、投資判断を行います。
+
+## 分析項目
+- **業績関連**: 上方修正 / 下方修正、増益 / 減益、増配 / 減配
+- **資本政策**: 自社株買い、配当方針
+- **リスク事象**: 不祥事、訴訟、リコール、特別損失
+- **評価の変化**: アナリストの格上げ / 格下げ
+
+## 判断基準
+- **BUY**: ポジティブな文書が多数を占め、平均スコアが明確にプラス
+- **SELL**: ネガティブな文書 (特にリスク事象) が多数を占め、平均スコアが明確にマイナス
+- **HOLD**: 材料が拮抗している、または文書が少ない
+
+## 出力形式
+```
+Action: BUY/SELL/HOLD
+Confidence: 0.0-1.0
+Reasoning: 具体的な見出しを引用した根拠 (最低50文字)
+```
+
+## 重要
+- 与えられた文書の **実際の内容** を引用すること
+- 文書が少ない・古い場合は confidence を下げ、HOLD を推奨すること
+"""
+
+
+def create_casper_analysis_prompt(ticker: str, documents: list[dict]) -> str:
+    """
+    Casper 用の分析プロンプトを生成
+
+    Args:
+        ticker: 銘柄コード (例: "7203.T")
+        documents: {"text", "score", "source", "published"} の一覧 (score は -1.0〜+1.0)
+
+    Returns:
+        分析用プロンプト文字列
+    """
+    lines = "\n".join(
+        f"- [{doc.get('score', 0.0):+.2f}] {doc['text']}"
+        + (f" ({doc['source']} {doc.get('published') or ''})".rstrip() if doc.get("source") else "")
+        for doc in documents
+    )
+    return f"""
+銘柄コード: {ticker}
+
+以下の文書 (先頭はローカル辞書による -1.0〜+1.0 のスコア) を分析し、センチメントの観点から投資判断を行ってください。
+
+## 文書
+{lines}
+
+## 指示
+1. 業績関連、資本政策、リスク事象、評価の変化を分析
+2. BUY/SELL/HOLD のいずれかを判断
+3. Confidence (0.0-1.0) を算出
+4. Reasoning (最低50文字) で根拠を説明
+
+出力形式:
+```
+Action: [BUY/SELL/HOLD]
+Confidence: [0.0-1.0]
+Reasoning: [具体的な見出しを引用した根拠]
+```
 """
 
 
@@ -85,5 +214,7 @@ __all__ = [
     "MELCHIOR_SYSTEM_MESSAGE",
     "create_melchior_analysis_prompt",
     "BALTHASAR_SYSTEM_MESSAGE",
+    "create_balthasar_analysis_prompt",
     "CASPER_SYSTEM_MESSAGE",
+    "create_casper_analysis_prompt",
 ]
@@ -0,0 +1,452 @@
+"""
+Universe screening over the local J-Quants store.
+
+    python -m src.stock_magi.screen                              # 全上場銘柄を判定して順位付け
+    python -m src.stock_magi.screen --output screen.csv --workers 8
+    python -m src.stock_magi.screen --tickers 7203,6758 --agents melchior,balthasar,casper
+
+`/api/analyze` を銘柄数だけ呼ぶ代わりに、ETL / 差分同期で保存した株価・決算・銘柄一覧
+(`listed_info`) だけを使って全銘柄の合議を行います (ネットワーク呼び出しなし)。
+
+    1. 銘柄一覧をチャンク (既定 200 銘柄) に分け、CPU コア数のプロセスプールで並列処理
+    2. 各ワーカーは自分のチャンクの株価・決算だけを Parquet から読み込み、
+       テクニカル指標 (`universe_snapshot`) と PER / PBR / ROE を一括計算
+    3. Melchior (バリュエーション)・Balthasar (テクニカル)・任意で Casper (需給特徴量) が投票
+    4. 完了したチャンクはチェックポイントとして保存し、中断後は未完了のチャンクだけ再実行
+    5. 全チャンクを結合し、スコア (投票の符号付き信頼度の平均) 順に Parquet / CSV へ出力
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from src.common.consensus import ReusableConsensusOrchestrator
+from src.mcp_providers.jquants_history import load_history, normalize_code
+from src.mcp_providers.jquants_store import ParquetStore
+from src.stock_magi.agents.balthasar_agent import DEFAULT_LOOKBACK_DAYS, create_balthasar_agent
+from src.stock_magi.agents.casper_agent import create_casper_agent
+from src.stock_magi.agents.melchior_agent import create_melchior_agent
+
+DEFAULT_SCREEN_ROOT = "./data/screen"
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_AGENTS = ("melchior", "balthasar")
+AGENT_NAMES = ("melchior", "balthasar", "casper")
+MANIFEST_FILE = "manifest.json"
+
+# 決算は直近 2 年分から銘柄ごとに最新の開示を使う
+STATEMENT_LOOKBACK_DAYS = 730
+
+_ACTION_SIGN = {"BUY": 1.0, "SELL": -1.0, "HOLD": 0.0}
+
+
+def _number(value: Any) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return number
+
+
+def statement_values(statements: Any) -> tuple[Any, Any]:
+    """
+    決算短信の各行から EPS / BPS を取り出す
+
+    EPS は今期予想 → 来期予想 → 通期実績の順に使う (実績は TypeOfCurrentPeriod が FY の行のみ)。
+
+    Args:
+        statements: J-Quants `statements` の DataFrame
+
+    Returns:
+        (eps, bps) の pandas.Series (index は statements と同じ)
+    """
+    import pandas as pd
+
+    def numeric(name: str) -> Any:
+        if name not in statements.columns:
+            return pd.Series(math.nan, index=statements.index)
+        return pd.to_numeric(statements[name], errors="coerce")
+
+    actual = numeric("EarningsPerShare")
+    if "TypeOfCurrentPeriod" in statements.columns:
+        actual = actual.where(statements["TypeOfCurrentPeriod"] == "FY")
+    eps = (
+        numeric("ForecastEarningsPerShare")
+        .fillna(numeric("NextYearForecastEarningsPerShare"))
+        .fillna(actual)
+    )
+    return eps, numeric("BookValuePerShare")
+
+
+def local_fundamentals(statements: Any, closes: dict[str, float] | None = None) -> Any:
+    """
+    決算短信 (`statements`) から銘柄別の EPS / BPS / ROE と PER / PBR を計算
+
+    EPS は今期予想 → 来期予想 → 通期実績の順に使い、ROE は EPS / BPS で近似する。
+
+    Args:
+        statements: J-Quants `statements` の DataFrame (LocalCode または Code、DisclosedDate)
+        closes: Code -> 直近終値 (PER / PBR の計算に使用)
+
+    Returns:
+        index = Code、列 = disclosed_date, eps, bps, roe, close, per, pbr の DataFrame
+    """
+    import pandas as pd
+
+    columns = ["disclosed_date", "eps", "bps", "roe", "close", "per", "pbr"]
+    code_column = "LocalCode" if "LocalCode" in statements.columns else "Code"
+    if statements.empty or code_column not in statements.columns:
+        return pd.DataFrame(columns=columns).rename_axis("Code")
+
+    df = statements.assign(Code=statements[code_column].astype(str))
+    sort_keys = [c for c in ("DisclosedDate", "DisclosedTime") if c in df.columns]
+    latest = df.sort_values(sort_keys).drop_duplicates("Code", keep="last").set_index("Code")
+
+    eps, bps = statement_values(latest)
+    close = pd.Series(closes or {}, dtype=float).reindex(latest.index)
+    table = pd.DataFrame(
+        {
+            "disclosed_date": latest.get("DisclosedDate"),
+            "eps": eps,
+            "bps": bps,
+            "roe": eps / bps.where(bps > 0),
+            "close": close,
+            "per": close / eps.where(eps > 0),
+            "pbr": close / bps.where(bps > 0),
+        },
+        index=latest.index,
+    )
+    return table.rename_axis("Code")
+
+
+class LocalFundamentalsTool:
+    """
+    事前計算したファンダメンタルズ表を Morningstar tool と同じ形で返すツール
+
+    `MelchiorAgent` にそのまま渡せる (ネットワーク呼び出しなし)。
+    """
+
+    name = "local"
+
+    def __init__(self, table: Any):
+        self.table = table
+
+    async def get_fundamentals(self, ticker: str) -> dict[str, Any]:
+        for code in normalize_code(ticker):
+            if code in self.table.index:
+                row = self.table.loc[code].to_dict()
+                return {
+                    "ticker": ticker,
+                    **{
+                        k: None if isinstance(v, float) and math.isnan(v) else v
+                        for k, v in row.items()
+                    },
+                }
+        return {"ticker": ticker, "per": None, "pbr": None, "roe": None}
+
+
+def _read_statements(store: ParquetStore, codes: list[str], start: date, end: date) -> Any:
+    import pandas as pd
+
+    frames = [
+        store.read_table("statements", start, end, filters={column: codes}).to_pandas()
+        for column in ("LocalCode", "Code")
+    ]
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+class ScreenTask(NamedTuple):
+    """1 チャンク分の作業 (プロセス間で受け渡すため pickle 可能な値だけを持つ)"""
+
+    index: int
+    codes: list[str]
+    store_root: str
+    as_of: date
+    agents: tuple[str, ...]
+    output: str
+    feature_db: str | None = None
+
+
+async def _screen_codes(
+    codes: list[str], fundamentals: Any, snapshot: Any, task: ScreenTask
+) -> list[dict[str, Any]]:
+    agents = []
+    if "melchior" in task.agents:
+        agents.append(create_melchior_agent(LocalFundamentalsTool(fundamentals)))
+    if "balthasar" in task.agents:
+        # スナップショットに無い銘柄は株価が無いので再読み込みしない
+        agents.append(create_balthasar_agent(price_loader=lambda _: None, snapshot=snapshot))
+    if "casper" in task.agents:
+        from src.mcp_providers.jquants_features import FeatureStore
+
+        agents.append(create_casper_agent(feature_store=FeatureStore(task.feature_db)))
+    orchestrator = ReusableConsensusOrchestrator(agents=agents)
+
+    rows = []
+    for code in codes:
+        decision = await orchestrator.reach_consensus({"ticker": code})
+        signed = [_ACTION_SIGN[v.action.value] * v.confidence for v in decision.votes]
+        row: dict[str, Any] = {
+            "code": code,
+            "action": decision.final_action.value,
+            "score": round(sum(signed) / len(signed), 4),
+            "confidence": round(sum(v.confidence for v in decision.votes) / len(signed), 4),
+        }
+        for vote in decision.votes:
+            prefix = vote.agent_name.lower()
+            row[f"{prefix}_action"] = vote.action.value
+            row[f"{prefix}_confidence"] = vote.confidence
+        rows.append(row)
+    return rows
+
+
+def screen_chunk(task: ScreenTask) -> int:
+    """
+    1 チャンクを判定してチェックポイント (Parquet) に保存する (ワーカープロセスで実行)
+
+    Returns:
+        判定した銘柄数
+    """
+    import pandas as pd
+
+    from src.stock_magi.indicators import universe_snapshot
+
+    store = ParquetStore(task.store_root)
+    history = load_history(
+        store,
+        task.codes,
+        start=task.as_of - timedelta(days=DEFAULT_LOOKBACK_DAYS),
+        end=task.as_of,
+        columns=["High", "Low", "Close", "Volume", "AdjustmentFactor"],
+    )
+    snapshot = universe_snapshot(history) if len(history) else pd.DataFrame()
+    closes = snapshot["close"].to_dict() if len(snapshot) else {}
+    statements = _read_statements(
+        store,
+        sorted({c for t in task.codes for c in normalize_code(t)}),
+        task.as_of - timedelta(days=STATEMENT_LOOKBACK_DAYS),
+        task.as_of,
+    )
+    fundamentals = local_fundamentals(statements, closes)
+
+    rows = asyncio.run(_screen_codes(task.codes, fundamentals, snapshot, task))
+    table = pd.DataFrame(rows)
+    for source, column in [(fundamentals, c) for c in ("per", "pbr", "roe")] + [
+        (snapshot, c) for c in ("close", "rsi")
+    ]:
+        values = source[column] if column in source.columns else {}
+        table[column] = [_lookup(values, code) for code in table["code"]]
+
+    output = Path(task.output)
+    tmp = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+    table.to_parquet(tmp, index=False)
+    os.replace(tmp, output)
+    return len(rows)
+
+
+def _lookup(values: Any, code: str) -> float:
+    for candidate in normalize_code(code):
+        if candidate in values:
+            return _number(values[candidate])
+    return math.nan
+
+
+def load_universe(store: ParquetStore, as_of: date) -> Any:
+    """
+    スクリーニング対象の銘柄一覧 (`listed_info`、無ければ直近の株価に現れる銘柄)
+
+    Returns:
+        Code / CompanyName 列を持つ DataFrame (Code 昇順)
+    """
+    import pandas as pd
+
+    listed = store.read_current("listed_info")
+    if "Code" in listed.columns and len(listed):
+        listed = listed.assign(Code=listed["Code"].astype(str))
+        if "CompanyName" not in listed.columns:
+            listed["CompanyName"] = ""
+        return listed[["Code", "CompanyName"]].drop_duplicates("Code").sort_values("Code")
+    prices = store.read("prices", as_of - timedelta(days=14), as_of, columns=["Code"])
+    codes = sorted(prices["Code"].astype(str).unique()) if "Code" in prices.columns else []
+    return pd.DataFrame({"Code": codes, "CompanyName": ""})
+
+
+class Checkpoint:
+    """
+    チャンク単位のチェックポイント
+
+    `<dir>/manifest.json` に対象銘柄のハッシュ等を記録し、同じ条件での再実行時は
+    保存済みのチャンク (`chunk-00000.parquet`) を読み直すだけにする。条件が変わったら破棄する。
+    """
+
+    def __init__(self, directory: str | Path, manifest: dict[str, Any]):
+        self.directory = Path(directory)
+        self.manifest = manifest
+
+    def chunk_path(self, index: int) -> Path:
+        return self.directory / f"chunk-{index:05d}.parquet"
+
+    def open(self, fresh: bool = False) -> set[int]:
+        """
+        チェックポイントを開く
+
+        Returns:
+            完了済みのチャンク番号
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / MANIFEST_FILE
+        previous = json.loads(path.read_text()) if path.exists() else None
+        if fresh or previous != self.manifest:
+            for stale in self.directory.glob("chunk-*.parquet"):
+                stale.unlink()
+            path.write_text(json.dumps(self.manifest, indent=2))
+            return set()
+        return {int(p.stem.split("-")[1]) for p in self.directory.glob("chunk-*.parquet")}
+
+
+def rank(table: Any) -> Any:
+    """スコア降順 (同点は信頼度降順、銘柄コード昇順) に並べて rank 列を付ける"""
+    ranked = table.sort_values(
+        ["score", "confidence", "code"], ascending=[False, False, True]
+    ).reset_index(drop=True)
+    ranked.insert(0, "rank", range(1, len(ranked) + 1))
+    return ranked
+
+
+def _progress(done: int, total: int, started: float) -> None:
+    elapsed = time.monotonic() - started
+    rate = done / elapsed if elapsed > 0 else 0.0
+    eta = (total - done) / rate if rate > 0 else math.inf
+    print(
+        f"screened {done}/{total} ({done / max(total, 1):.0%}) {rate:.0f} tickers/s ETA {eta:.0f}s",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def run_screen(tasks: list[ScreenTask], completed: set[int], workers: int, total: int) -> None:
+    """未完了のチャンクを実行する (workers <= 1 はプロセスプールを使わない)"""
+    pending = [t for t in tasks if t.index not in completed]
+    done = sum(len(t.codes) for t in tasks if t.index in completed)
+    started = time.monotonic()
+    if completed:
+        print(f"resumed {len(completed)} chunks from checkpoint", file=sys.stderr)
+    if workers <= 1:
+        for task in pending:
+            done += screen_chunk(task)
+            _progress(done, total, started)
+        return
+    # fork 後の pyarrow のスレッドプールとの競合を避けるため spawn で起動する
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(screen_chunk, task) for task in pending]
+        for future in as_completed(futures):
+            done += future.result()
+            _progress(done, total, started)
+
+
+def main(argv: list[str] | None = None) -> int:
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Screen the listed universe with local data")
+    parser.add_argument("--root", default=None, help="データの保存先 (既定: JQUANTS_STORE_ROOT)")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None)
+    parser.add_argument("--tickers", default="", help="対象銘柄 (カンマ区切り、既定: 全銘柄)")
+    parser.add_argument("--agents", default=",".join(DEFAULT_AGENTS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--checkpoint-dir", default=None)
+    parser.add_argument("--fresh", action="store_true", help="チェックポイントを破棄してやり直す")
+    parser.add_argument("--output", default=None, help="出力先 (.parquet / .csv)")
+    parser.add_argument("--feature-db", default=None, help="Casper 用の需給特徴量 DB")
+    args = parser.parse_args(argv)
+
+    agents = tuple(a.strip().lower() for a in args.agents.split(",") if a.strip())
+    unknown = set(agents) - set(AGENT_NAMES)
+    if unknown or not agents:
+        parser.error(f"unknown agents: {sorted(unknown)} (choose from {list(AGENT_NAMES)})")
+
+    as_of = args.as_of or date.today()
+    store = ParquetStore(args.root)
+    universe = load_universe(store, as_of)
+    if args.tickers:
+        names = {
+            c: name
+            for code, name in zip(universe["Code"], universe["CompanyName"], strict=True)
+            for c in normalize_code(code)
+        }
+        tickers = [t.strip() for t in args.tickers.split(",") if t.strip()]
+        universe = pd.DataFrame(
+            {"Code": tickers, "CompanyName": [names.get(normalize_code(t)[0], "") for t in tickers]}
+        )
+    codes = list(universe["Code"])
+    if not codes:
+        print("no tickers to screen (run the ETL / sync first)", file=sys.stderr)
+        return 1
+
+    chunk_size = max(args.chunk_size, 1)
+    manifest = {
+        "as_of": as_of.isoformat(),
+        "agents": list(agents),
+        "chunk_size": chunk_size,
+        "codes": hashlib.sha256(",".join(codes).encode()).hexdigest(),
+    }
+    checkpoint = Checkpoint(
+        args.checkpoint_dir or Path(DEFAULT_SCREEN_ROOT) / f"checkpoint-{as_of.isoformat()}",
+        manifest,
+    )
+    completed = checkpoint.open(fresh=args.fresh)
+    tasks = [
+        ScreenTask(
+            index=i // chunk_size,
+            codes=codes[i : i + chunk_size],
+            store_root=str(store.root),
+            as_of=as_of,
+            agents=agents,
+            output=str(checkpoint.chunk_path(i // chunk_size)),
+            feature_db=args.feature_db,
+        )
+        for i in range(0, len(codes), chunk_size)
+    ]
+    run_screen(tasks, completed, min(args.workers, len(tasks)), len(codes))
+
+    results = pd.concat([pd.read_parquet(checkpoint.chunk_path(t.index)) for t in tasks])
+    names = dict(zip(universe["Code"], universe["CompanyName"], strict=True))
+    results.insert(1, "name", results["code"].map(names).fillna(""))
+    ranked = rank(results)
+
+    output = Path(args.output or Path(DEFAULT_SCREEN_ROOT) / f"screen-{as_of.isoformat()}.parquet")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if output.suffix == ".csv":
+        ranked.to_csv(output, index=False)
+    else:
+        ranked.to_parquet(output, index=False)
+    print(f"wrote {len(ranked)} ranked tickers to {output}")
+    return 0
+
+
+__all__ = [
+    "Checkpoint",
+    "LocalFundamentalsTool",
+    "ScreenTask",
+    "load_universe",
+    "local_fundamentals",
+    "rank",
+    "run_screen",
+    "screen_chunk",
+    "statement_values",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
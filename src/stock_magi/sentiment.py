@@ -0,0 +1,247 @@
+"""
+Batched local sentiment scoring with a deduplicated document cache.
+
+Casper エージェント用に、ニュース見出しや適時開示の本文を CPU だけでスコアリングします。
+
+    - `LexiconScorer`: 金融用語の極性辞書 (日本語 / 英語) による -1.0〜+1.0 のスコア。
+      1 回の正規表現走査で全語を数えるため、外部モデルや GPU は不要
+    - `DocumentScoreCache`: 正規化した本文のハッシュを文書 ID とし、同じ記事は
+      複数銘柄で言及されていても 1 回だけスコアリングする
+        1. プロセス内 LRU (キャッシュヒット時はマイクロ秒オーダー)
+        2. 共有 `CacheBackend` (ワーカー間で共有、任意)
+        3. 未スコアの文書は `MicroBatcher` でまとめてスコアラーに渡す
+           (同時リクエストが同じ文書を求めても実行は 1 回)
+"""
+
+import asyncio
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import Any, NamedTuple, Protocol
+
+from src.common.cache import CacheBackend
+from src.common.llm.batch_inference import MicroBatcher
+
+# 金融ニュース・開示向けの極性辞書 (語 -> 重み)。長い語が優先して一致する
+DEFAULT_LEXICON: dict[str, float] = {
+    # ポジティブ
+    "上方修正": 2.0,
+    "最高益": 2.0,
+    "過去最高": 1.5,
+    "増益": 1.5,
+    "増収": 1.0,
+    "増配": 1.5,
+    "復配": 1.5,
+    "黒字転換": 2.0,
+    "黒字": 1.0,
+    "自社株買い": 1.5,
+    "自己株式の取得": 1.5,
+    "好調": 1.0,
+    "好決算": 1.5,
+    "格上げ": 1.5,
+    "受注": 0.5,
+    "提携": 0.5,
+    "upgrade": 1.5,
+    "beat": 1.0,
+    "record high": 1.5,
+    "raises guidance": 2.0,
+    "buyback": 1.5,
+    "outperform": 1.0,
+    "strong": 0.5,
+    # ネガティブ
+    "下方修正": -2.0,
+    "減益": -1.5,
+    "減収": -1.0,
+    "減配": -1.5,
+    "無配": -1.5,
+    "赤字転落": -2.0,
+    "赤字": -1.0,
+    "特別損失": -1.5,
+    "減損": -1.0,
+    "不祥事": -2.0,
+    "不正": -2.0,
+    "訴訟": -1.0,
+    "リコール": -1.5,
+    "格下げ": -1.5,
+    "業務停止": -2.0,
+    "上場廃止": -2.0,
+    "downgrade": -1.5,
+    "miss": -1.0,
+    "cuts guidance": -2.0,
+    "lawsuit": -1.0,
+    "recall": -1.5,
+    "fraud": -2.0,
+    "weak": -0.5,
+}
+
+
+class Document(NamedTuple):
+    """スコアリング対象の文書 (見出し・開示本文など)"""
+
+    text: str
+    source: str = ""
+    published: str | None = None
+    url: str | None = None
+
+
+class TextScorer(Protocol):
+    """テキストのバッチスコアラー (CPU 上で動くローカルモデルや辞書)"""
+
+    version: str
+
+    def score_batch(self, texts: list[str]) -> list[float]:
+        """各テキストのスコア (-1.0〜+1.0) を返す"""
+        ...
+
+
+def normalize_text(text: str) -> str:
+    """全角/半角・大文字/小文字・空白の揺れを吸収 (NFKC + 小文字化 + 空白の畳み込み)"""
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def document_id(text: str) -> str:
+    """正規化した本文の SHA-256 (同じ記事は配信元や表記揺れに関係なく同じ ID)"""
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()[:32]
+
+
+class LexiconScorer:
+    """
+    極性辞書によるスコアラー
+
+    スコア = Σ重み / (Σ|重み| + smoothing)。該当語が無ければ 0.0 (中立)。
+    """
+
+    def __init__(self, lexicon: dict[str, float] | None = None, smoothing: float = 1.0):
+        self.lexicon = {normalize_text(k): v for k, v in (lexicon or DEFAULT_LEXICON).items()}
+        self.smoothing = smoothing
+        terms = sorted(self.lexicon, key=len, reverse=True)
+        # 英単語は語境界で区切る ("miss" が "mission" に一致しないように)
+        self._pattern = re.compile(
+            "|".join(rf"\b{re.escape(t)}\b" if t.isascii() else re.escape(t) for t in terms)
+        )
+        digest = hashlib.sha256(repr(sorted(self.lexicon.items())).encode()).hexdigest()
+        # 辞書を変えると別のキャッシュキーになる
+        self.version = f"lexicon-{digest[:12]}"
+
+    def score(self, text: str) -> float:
+        weights = [self.lexicon[m] for m in self._pattern.findall(normalize_text(text))]
+        if not weights:
+            return 0.0
+        return sum(weights) / (sum(abs(w) for w in weights) + self.smoothing)
+
+    def score_batch(self, texts: list[str]) -> list[float]:
+        return [self.score(text) for text in texts]
+
+
+class DocumentScoreCache:
+    """
+    文書 ID 単位で重複排除するスコアキャッシュ
+
+    使用例:
+        >>> cache = DocumentScoreCache(LexiconScorer())
+        >>> scores = await cache.score_documents(documents)   # {document_id: score}
+    """
+
+    def __init__(
+        self,
+        scorer: TextScorer | None = None,
+        backend: CacheBackend | None = None,
+        max_entries: int = 65536,
+        max_batch_size: int = 64,
+        max_wait_s: float = 0.005,
+        ttl: float = 0,
+    ):
+        """
+        Args:
+            scorer: バッチスコアラー (None は LexiconScorer)
+            backend: ワーカー間で共有するキャッシュ (None はプロセス内のみ)
+            max_entries: プロセス内 LRU の上限
+            max_batch_size / max_wait_s: スコアラーへのバッチの大きさと待ち時間
+            ttl: 共有キャッシュの TTL 秒 (0 は無期限。本文が同じならスコアは変わらない)
+        """
+        self.scorer = scorer or LexiconScorer()
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local: OrderedDict[str, float] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._batcher = MicroBatcher(self._score_batch, max_batch_size, max_wait_s)
+        self.scored = 0  # スコアラーで実際に評価した文書数
+
+    def _key(self, doc_id: str) -> str:
+        return f"sentiment:{self.scorer.version}:{doc_id}"
+
+    def _remember(self, doc_id: str, score: float) -> None:
+        self._local[doc_id] = score
+        self._local.move_to_end(doc_id)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def _score_batch(self, items: list[tuple[str, str]]) -> dict[str, Any]:
+        texts = [text for _, text in items]
+        scores = await asyncio.to_thread(self.scorer.score_batch, texts)
+        self.scored += len(items)
+        return {doc_id: float(score) for (doc_id, _), score in zip(items, scores, strict=True)}
+
+    async def _score_one(self, doc_id: str, text: str) -> float:
+        if self.backend is not None:
+            cached = await self.backend.get(self._key(doc_id))
+            if cached is not None:
+                return float(cached)
+        score = await self._batcher.submit(doc_id, text)
+        if self.backend is not None:
+            await self.backend.set(self._key(doc_id), score, ttl=self.ttl)
+        return score
+
+    async def score_documents(self, documents: Iterable[Document]) -> dict[str, float]:
+        """
+        文書をスコアリング (キャッシュ済みは再計算しない)
+
+        Returns:
+            {document_id: score}
+        """
+        texts = {document_id(doc.text): doc.text for doc in documents}
+        results = {doc_id: self._local[doc_id] for doc_id in texts if doc_id in self._local}
+        missing = [doc_id for doc_id in texts if doc_id not in results]
+        if not missing:
+            return results
+
+        waiters = {}
+        for doc_id in missing:
+            future = self._inflight.get(doc_id)
+            if future is None:
+                future = asyncio.ensure_future(self._score_one(doc_id, texts[doc_id]))
+                self._inflight[doc_id] = future
+                future.add_done_callback(lambda _, d=doc_id: self._inflight.pop(d, None))
+            waiters[doc_id] = future
+
+        for doc_id, future in waiters.items():
+            score = await future
+            self._remember(doc_id, score)
+            results[doc_id] = score
+        return results
+
+
+@lru_cache(maxsize=1)
+def get_document_score_cache() -> DocumentScoreCache:
+    """
+    プロセス内で共有する文書スコアキャッシュ (シングルトン)
+
+    全銘柄の Casper が同じインスタンスを使うことで、複数銘柄に言及する記事も 1 回だけ評価される。
+    """
+    return DocumentScoreCache()
+
+
+__all__ = [
+    "DEFAULT_LEXICON",
+    "Document",
+    "DocumentScoreCache",
+    "LexiconScorer",
+    "TextScorer",
+    "document_id",
+    "get_document_score_cache",
+    "normalize_text",
+]
@@ -0,0 +1,151 @@
+"""
+Startup warmup and readiness state for the Stock MAGI API.
+
+コールドスタート直後のリクエストがクライアント生成・設定読み込み・キャッシュミスの
+コストを払わないよう、起動時 (FastAPI lifespan) にバックグラウンドで次を実行します。
+
+    1. ツールクライアントの生成 (FoundryToolRegistry / エージェント用ツール)
+    2. 共有 HTTP 接続プールとキャッシュバックエンドのオープン
+    3. ウォッチリスト銘柄のファンダメンタルズをキャッシュへ事前取得
+
+完了するまで `/api/ready` は 503 を返し (`/api/health` は常に 200)、
+オートスケーラーがコールドな Pod にトラフィックを流さないようにします。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from pydantic import ConfigDict, Field
+from pydantic_settings import BaseSettings
+
+from src.common.agent_registry import get_agent_registry
+from src.common.cache import get_cache
+from src.common.mcp import FoundryToolRegistry, get_tool_registry
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupSettings(BaseSettings):
+    """
+    ウォームアップ設定
+
+    環境変数から読み込み:
+        WARMUP_ENABLED: ウォームアップを実行するか (false なら即 ready)
+        WARMUP_WATCHLIST: 事前取得する銘柄のカンマ区切りリスト (例: "7203.T,6758.T")
+        WARMUP_AGENTS: ツールとともに事前生成するエージェント名のカンマ区切りリスト
+        WARMUP_TIMEOUT: ウォームアップ全体のタイムアウト秒数 (超過しても ready にする)
+        WARMUP_CONCURRENCY: ウォッチリスト事前取得の同時実行数
+    """
+
+    warmup_enabled: bool = Field(True, alias="WARMUP_ENABLED")
+    warmup_watchlist: str = Field("", alias="WARMUP_WATCHLIST")
+    warmup_agents: str = Field("Melchior", alias="WARMUP_AGENTS")
+    warmup_timeout: float = Field(30.0, alias="WARMUP_TIMEOUT")
+    warmup_concurrency: int = Field(8, alias="WARMUP_CONCURRENCY")
+
+    model_config = ConfigDict(env_file=None)
+
+    @property
+    def watchlist(self) -> list[str]:
+        return [t.strip() for t in self.warmup_watchlist.split(",") if t.strip()]
+
+    @property
+    def agents(self) -> list[str]:
+        return [a.strip() for a in self.warmup_agents.split(",") if a.strip()]
+
+
+class ReadinessState:
+    """起動ウォームアップの進捗 (app.state.readiness に保持)"""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.started_at = time.monotonic()
+        self.duration_s: float | None = None
+        self.preloaded: int = 0
+        self.errors: list[str] = []
+
+    def mark_ready(self) -> None:
+        self.ready = True
+        self.duration_s = round(time.monotonic() - self.started_at, 3)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warmup_seconds": self.duration_s,
+            "preloaded_tickers": self.preloaded,
+            "errors": self.errors[:20],
+        }
+
+
+async def _preload_watchlist(
+    registry: FoundryToolRegistry, settings: WarmupSettings, state: ReadinessState
+) -> None:
+    tool = registry.get_tool("morningstar")
+    semaphore = asyncio.Semaphore(max(settings.warmup_concurrency, 1))
+
+    async def preload(ticker: str) -> None:
+        async with semaphore:
+            try:
+                await tool.get_fundamentals(ticker)
+                state.preloaded += 1
+            except Exception as e:
+                state.errors.append(f"preload {ticker}: {e}")
+
+    await asyncio.gather(*(preload(t) for t in settings.watchlist))
+
+
+async def _warmup_steps(
+    registry: FoundryToolRegistry | None, settings: WarmupSettings, state: ReadinessState
+) -> None:
+    # 1. エージェントとツールクライアントの生成 (設定読み込みを含む)
+    registry = registry or get_tool_registry()
+    agents = get_agent_registry()
+    for agent_name in settings.agents:
+        try:
+            agents.get(agent_name, registry)
+        except ValueError as e:
+            state.errors.append(f"agent {agent_name}: {e}")
+
+    # 2. 接続プール・キャッシュバックエンドを開く
+    await registry.aopen()
+    cache = registry.cache or get_cache()
+    await cache.get("warmup:ping")
+
+    # 3. ウォッチリストをキャッシュへ事前取得
+    if settings.watchlist:
+        await _preload_watchlist(registry, settings, state)
+
+
+async def run_warmup(
+    state: ReadinessState,
+    settings: WarmupSettings | None = None,
+    registry: FoundryToolRegistry | None = None,
+) -> None:
+    """
+    ウォームアップを実行し、完了 (または失敗・タイムアウト) 後に ready にする
+
+    個々の失敗はログと `state.errors` に記録するだけで ready への遷移は妨げない
+    (ウォームアップは最適化であり、未完了でもリクエストは処理できるため)。
+    """
+    settings = settings or WarmupSettings()
+    if settings.warmup_enabled:
+        try:
+            await asyncio.wait_for(
+                _warmup_steps(registry, settings, state), timeout=settings.warmup_timeout
+            )
+        except TimeoutError:
+            state.errors.append(f"warmup timed out after {settings.warmup_timeout}s")
+        except Exception as e:
+            state.errors.append(f"warmup failed: {e}")
+
+    state.mark_ready()
+    if state.errors:
+        logger.warning("Warmup finished with errors: %s", state.errors[:5])
+    logger.info(
+        "✅ Warmup complete in %.3fs (%d tickers preloaded)", state.duration_s, state.preloaded
+    )
+
+
+__all__ = ["ReadinessState", "WarmupSettings", "run_warmup"]
@@ -29,3 +29,6 @@ def filter_and_set_foundry_env_vars(monkeypatch):
     monkeypatch.setenv("FOUNDRY_API_KEY", "test_api_key_12345")
     monkeypatch.setenv("FOUNDRY_DEPLOYMENT", "gpt-4o-test")
     monkeypatch.setenv("FOUNDRY_API_VERSION", "2024-12-01")
+    # 監査ログ・スナップショットはリポジトリ配下 (./data) に書かない
+    monkeypatch.setenv("AUDIT_BACKEND", "none")
+    monkeypatch.setenv("SNAPSHOT_BACKEND", "none")
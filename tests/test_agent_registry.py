@@ -0,0 +1,169 @@
+"""
+宣言的エージェントレジストリ (src.common.agent_registry) のテスト
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.common.agent_registry import AgentRegistry, create_agent_registry, get_agent_registry
+from src.common.cache import InMemoryCache
+from src.common.mcp import FoundryToolRegistry
+from src.common.mcp.foundry_tool_registry import FoundryHTTPTool
+from src.mcp_providers.jquants_features import get_feature_store
+from src.stock_magi.agents import BalthasarAgent, MelchiorAgent
+from src.stock_magi.sentiment import get_document_score_cache
+
+CONFIG = {
+    "_comment": "テスト用",
+    "default_panel": ["melchior"],
+    "agents": {
+        "melchior": {
+            "factory": "src.stock_magi.agents.melchior_agent:create_melchior_agent",
+            "tools": ["morningstar"],
+            "snapshot_store": True,
+        },
+        "balthasar": {
+            "factory": "src.stock_magi.agents.balthasar_agent:create_balthasar_agent",
+            "options": {"price_loader": None},
+        },
+        "casper": {
+            "factory": "src.stock_magi.agents.casper_agent:create_casper_agent",
+            "enabled": False,
+        },
+    },
+}
+
+
+class ToolSource:
+    def __init__(self):
+        self.tools = {"morningstar": SimpleNamespace(name="morningstar")}
+
+    def get_tool(self, name):
+        return self.tools[name]
+
+
+def test_panel_selection():
+    agents = AgentRegistry.from_config(CONFIG)
+
+    assert agents.default_panel == ["melchior"]
+    assert agents.resolve_panel(None) == ["melchior"]
+    assert agents.resolve_panel(["Balthasar", "MELCHIOR", "balthasar"]) == [
+        "balthasar",
+        "melchior",
+    ]
+    assert agents.names() == ["melchior", "balthasar"]
+    assert agents.tool_names("Melchior") == ["morningstar"]
+    assert agents.tool_names("Unknown") == []
+    with pytest.raises(ValueError, match="not found"):
+        agents.resolve_panel(["gaspard"])
+    with pytest.raises(ValueError, match="disabled"):
+        agents.resolve_panel(["casper"])
+    with pytest.raises(ValueError, match="factory"):
+        AgentRegistry.from_config({"agents": {"melchior": {"tools": []}}})
+
+
+def test_agents_are_constructed_once_per_tool_binding():
+    agents = AgentRegistry.from_config(CONFIG)
+    source = ToolSource()
+
+    melchior, balthasar = agents.panel(["melchior", "balthasar"], source)
+
+    assert isinstance(melchior, MelchiorAgent) and isinstance(balthasar, BalthasarAgent)
+    assert melchior.foundry_tool is source.tools["morningstar"]
+    assert agents.panel(None, source) == [melchior]
+    assert agents.get("Balthasar", source) is balthasar
+    assert agents.constructed == 2
+    # ツールが差し替わったエージェントだけ作り直す
+    other = ToolSource()
+    assert agents.get("melchior", other) is not melchior
+    assert agents.get("balthasar", other) is balthasar
+    assert agents.constructed == 3
+
+
+def test_option_factories_are_called_when_the_agent_is_built():
+    agents = AgentRegistry.from_config(
+        {
+            "agents": {
+                "casper": {
+                    "factory": "src.stock_magi.agents.casper_agent:create_casper_agent",
+                    "options": {
+                        "document_source": {"factory": "builtins:dict"},
+                        "score_cache": {
+                            "factory": "src.stock_magi.sentiment:DocumentScoreCache",
+                            "options": {"max_entries": 10},
+                        },
+                    },
+                }
+            }
+        }
+    )
+
+    casper = agents.get("casper", ToolSource())
+
+    assert casper.document_source == {}
+    assert casper.score_cache is not get_document_score_cache()
+
+
+def test_shipped_config_matches_tool_registry(tmp_path, monkeypatch):
+    agents = create_agent_registry()
+    registry = FoundryToolRegistry(cache=InMemoryCache())
+
+    assert agents.default_panel == ["melchior"]
+    assert {"melchior", "balthasar", "casper"} <= set(agents.names())
+    assert [t.name for t in registry.get_tools_for_agent("Melchior")] == ["morningstar"]
+    # casper は宣言した特徴量ストアを受け取る (文書も特徴量も無く常に HOLD にはならない)
+    monkeypatch.setenv("JQUANTS_FEATURE_DB", str(tmp_path / "features.sqlite3"))
+    get_feature_store.cache_clear()
+    assert agents.get("casper", registry).feature_store is get_feature_store()
+    get_feature_store.cache_clear()
+
+    (tmp_path / "agents.json").write_text('{"agents": {}}')
+    monkeypatch.setenv("AGENTS_CONFIG_PATH", str(tmp_path / "agents.json"))
+    assert create_agent_registry().names() == []
+
+
+@pytest.fixture
+def api(monkeypatch):
+    async def fake_fundamentals(self, ticker):
+        return {"ticker": ticker, "per": 8.0, "pbr": 0.8, "roe": 0.15}
+
+    monkeypatch.setattr(FoundryHTTPTool, "get_fundamentals", fake_fundamentals)
+    registry = FoundryToolRegistry(cache=InMemoryCache())
+    agents = AgentRegistry.from_config(CONFIG)
+    monkeypatch.setattr("src.stock_magi.api.endpoints.get_tool_registry", lambda: registry)
+    monkeypatch.setattr("src.stock_magi.api.endpoints.get_agent_registry", lambda: agents)
+    return agents
+
+
+async def test_analyze_with_requested_panel(api):
+    from src.main import app
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        default = await client.post("/api/analyze", json={"ticker": "7203.T"})
+        panel = await client.post(
+            "/api/analyze", json={"ticker": "7203.T", "agents": ["melchior", "balthasar"]}
+        )
+        unknown = await client.post("/api/analyze", json={"ticker": "7203.T", "agents": ["x"]})
+        listed = await client.get("/api/agents")
+
+    assert default.status_code == 200
+    assert [r["agent"] for r in default.json()["reasoning"]] == ["Melchior"]
+    assert panel.status_code == 200
+    assert [r["agent"] for r in panel.json()["reasoning"]] == ["Melchior", "Balthasar"]
+    assert panel.json()["reasoning"][0]["action"] == "BUY"
+    # Melchior は 2 リクエストで共有される
+    assert api.constructed == 2
+    assert unknown.status_code == 400
+    assert listed.json()["default_panel"] == ["melchior"]
+    assert listed.json()["agents"]["melchior"]["tools"] == ["morningstar"]
+    assert "casper" not in listed.json()["agents"]
+
+
+def test_process_registry_is_shared():
+    assert get_agent_registry() is get_agent_registry()
+
+
+__all__ = []  # テストモジュールはエクスポート不要
@@ -0,0 +1,202 @@
+"""
+決算発表予定に連動したキャッシュ失効 (src.stock_magi.announcements) のテスト
+"""
+
+from datetime import date, datetime, time, timedelta
+
+import httpx
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.common.cache import InMemoryCache
+from src.common.mcp import FoundryToolRegistry
+from src.common.mcp.foundry_tool_registry import FoundryHTTPTool, fundamentals_cache_key
+from src.stock_magi.announcements import (
+    JST,
+    AnnouncementInvalidator,
+    AnnouncementSchedule,
+    decision_cache_key,
+    get_announcement_schedule,
+    get_announcement_settings,
+    load_announcement_schedule,
+)
+
+ANNOUNCED = datetime(2024, 8, 1, 15, 30, tzinfo=JST)
+SCHEDULE = AnnouncementSchedule.from_records(
+    [
+        {"Code": "72030", "Date": "2024-08-01"},
+        {"Code": "67580", "Date": "2024-08-07"},
+        {"Code": "99840", "Date": ""},  # 日付未定
+    ]
+)
+
+
+def test_ttl_is_capped_at_next_announcement():
+    two_hours_before = ANNOUNCED - timedelta(hours=2)
+
+    assert SCHEDULE.ttl("7203.T", 86400, now=two_hours_before) == 7200
+    assert SCHEDULE.ttl("7203", 3600, now=two_hours_before) == 3600
+    # 無期限 (0) も発表時刻で打ち切る
+    assert SCHEDULE.ttl("72030", 0, now=two_hours_before) == 7200
+    # 発表予定の無い銘柄はそのまま
+    assert SCHEDULE.ttl("9984.T", 86400, now=two_hours_before) == 86400
+    assert len(SCHEDULE) == 2
+
+
+def test_ttl_is_short_while_announcement_settles():
+    just_after = ANNOUNCED + timedelta(minutes=10)
+    next_day = ANNOUNCED + timedelta(days=1)
+
+    assert SCHEDULE.ttl("7203.T", 7 * 86400, now=just_after, short_ttl=3600) == 3600
+    assert SCHEDULE.ttl("7203.T", 7 * 86400, now=next_day, short_ttl=3600) == 7 * 86400
+    assert SCHEDULE.last_announcement("7203.T", next_day) == ANNOUNCED
+    assert SCHEDULE.next_announcement("7203.T", next_day) is None
+
+
+class CountingTool:
+    name = "morningstar"
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls: list[str] = []
+
+    async def get_fundamentals(self, ticker):
+        self.calls.append(ticker)
+        await self.cache.set(fundamentals_cache_key(self.name, ticker), {"eps": 2})
+        return {"eps": 2}
+
+
+async def test_invalidator_evicts_at_announcement_and_prefetches_after_delay():
+    cache = InMemoryCache()
+    for ticker in ("7203.T", "6758.T"):
+        await cache.set(fundamentals_cache_key("morningstar", ticker), {"eps": 1})
+        await cache.set(decision_cache_key(ticker), {"final_action": "BUY"})
+    tool = CountingTool(cache)
+    invalidator = AnnouncementInvalidator(
+        cache, SCHEDULE, tool=tool, prefetch_delay=600, now=ANNOUNCED - timedelta(hours=1)
+    )
+
+    await invalidator.tick(ANNOUNCED - timedelta(seconds=1))
+    assert await cache.get(decision_cache_key("7203.T")) is not None
+    assert invalidator.seconds_until_next(ANNOUNCED - timedelta(seconds=1)) == 1
+
+    await invalidator.tick(ANNOUNCED)
+    assert await cache.get(fundamentals_cache_key("morningstar", "7203.T")) is None
+    assert await cache.get(decision_cache_key("7203.T")) is None
+    # 表記ゆれで保存された合議結果も同じキーなので消える
+    assert decision_cache_key("7203.t") == decision_cache_key("7203.TSE")
+    assert decision_cache_key("72030") == decision_cache_key("7203.T")
+    # 他の銘柄は残る
+    assert await cache.get(decision_cache_key("6758.T")) is not None
+    assert tool.calls == []
+    assert invalidator.seconds_until_next(ANNOUNCED) == 600
+
+    await invalidator.tick(ANNOUNCED + timedelta(seconds=600))
+    assert tool.calls == ["7203.T"]
+    assert await cache.get(fundamentals_cache_key("morningstar", "7203.T")) == {"eps": 2}
+
+    # 同じ発表は 2 回処理しない
+    await invalidator.tick(ANNOUNCED + timedelta(hours=1))
+    assert invalidator.evicted == 1
+    assert invalidator.prefetched == 1
+
+
+async def test_prefetch_skipped_when_another_worker_already_fetched():
+    cache = InMemoryCache()
+    tool = CountingTool(cache)
+    invalidator = AnnouncementInvalidator(
+        cache, SCHEDULE, tool=tool, prefetch_delay=60, now=ANNOUNCED - timedelta(hours=1)
+    )
+
+    await invalidator.tick(ANNOUNCED)
+    await cache.set(fundamentals_cache_key("morningstar", "7203.T"), {"eps": 3})
+    await invalidator.tick(ANNOUNCED + timedelta(minutes=5))
+
+    assert tool.calls == []
+
+
+async def test_registry_ttl_policy_applies_to_fundamentals_cache():
+    ttls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"eps": 1})
+
+    class RecordingCache(InMemoryCache):
+        async def set(self, key, value, ttl=None):
+            ttls.append(ttl)
+            await super().set(key, value, ttl)
+
+    cache = RecordingCache()
+    registry = FoundryToolRegistry(cache=cache)
+    registry.ttl_policy = lambda ticker, ttl: ttl * 24 if ticker == "6758.T" else ttl
+    await registry.aopen(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    tool = registry.get_tool("morningstar")
+
+    await tool.get_fundamentals("7203.T")
+    await tool.get_fundamentals("6758.T")
+    await registry.aclose()
+
+    assert ttls == [3600.0, 86400.0]
+
+
+def test_load_schedule_from_etl_store(tmp_path):
+    pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    from src.mcp_providers.jquants_store import ParquetStore
+
+    store = ParquetStore(tmp_path)
+    tomorrow = date.today() + timedelta(days=1)
+    store.write_partition(
+        "announcement",
+        date.today(),
+        [{"Code": "72030", "Date": tomorrow.isoformat(), "FiscalQuarter": "1Q"}],
+    )
+
+    schedule = load_announcement_schedule(store, publish_time=time(15, 0))
+
+    expected = datetime.combine(tomorrow, time(15, 0), tzinfo=JST)
+    assert schedule.next_announcement("7203.T") == expected
+    assert len(load_announcement_schedule(ParquetStore(tmp_path / "empty"))) == 0
+
+
+@pytest.fixture
+def decision_cache(monkeypatch):
+    monkeypatch.setenv("DECISION_CACHE_TTL", "86400")
+    get_announcement_settings.cache_clear()
+    get_announcement_schedule.cache_clear()
+    cache = InMemoryCache()
+    registry = FoundryToolRegistry(cache=cache)
+    monkeypatch.setattr("src.stock_magi.api.endpoints.get_tool_registry", lambda: registry)
+    yield cache
+    get_announcement_settings.cache_clear()
+    get_announcement_schedule.cache_clear()
+
+
+async def test_analyze_endpoint_caches_decision(decision_cache, monkeypatch):
+    from src.main import app
+
+    calls = []
+
+    async def fake_fundamentals(self, ticker):
+        calls.append(ticker)
+        return {"ticker": ticker, "pe_ratio": 8.0, "roe": 0.2}
+
+    monkeypatch.setattr(FoundryHTTPTool, "get_fundamentals", fake_fundamentals)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.post("/api/analyze", json={"ticker": "7203.T"})
+        second = await client.post(
+            "/api/analyze", json={"ticker": "7203.T", "include_reasoning": False}
+        )
+        variant = await client.post("/api/analyze", json={"ticker": "7203.t"})
+
+    assert first.status_code == second.status_code == variant.status_code == 200
+    assert len(calls) == 1
+    assert variant.json()["ticker"] == "7203.t"
+    assert second.json()["final_action"] == first.json()["final_action"]
+    assert second.json()["reasoning"] is None
+    assert (await decision_cache.get(decision_cache_key("7203.T")))["reasoning"]
+
+
+__all__ = []  # テストモジュールはエクスポート不要
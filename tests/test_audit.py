@@ -0,0 +1,291 @@
+"""
+合議結果の監査ログ (src.common.audit) のテスト
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+from datetime import UTC, datetime
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.common.audit import (
+    AuditLog,
+    AuditSettings,
+    ParquetAuditWriter,
+    SQLiteAuditWriter,
+    audit_record,
+    create_audit_log,
+    get_audit_log,
+)
+from src.common.cache import InMemoryCache
+from src.common.mcp import FoundryToolRegistry
+from src.common.mcp.foundry_tool_registry import FoundryHTTPTool
+from src.common.models import Action, AgentVote, FinalDecision
+
+
+def _decision(action: Action = Action.BUY) -> FinalDecision:
+    return FinalDecision(
+        final_action=action,
+        votes=[
+            AgentVote(
+                agent_name="Melchior",
+                action=action,
+                confidence=0.7,
+                reasoning="PER 8.0 倍 (割安)、ROE 15%",
+                snapshot_id="ab" * 32,
+            )
+        ],
+        summary="Phase 1 MVP: 1エージェントによる合議結果。",
+    )
+
+
+class RecordingWriter:
+    def __init__(self, delay: float = 0.0):
+        self.batches: list[list[dict]] = []
+        self.delay = delay
+        self.threads: set[int] = set()
+
+    def write(self, records):
+        self.threads.add(threading.get_ident())
+        if self.delay:
+            threading.Event().wait(self.delay)
+        self.batches.append(list(records))
+
+    def query(self, ticker=None, start=None, end=None, limit=1000):
+        return []
+
+
+async def test_records_are_flushed_in_batches_and_drained_on_close():
+    writer = RecordingWriter()
+    audit = AuditLog(writer, batch_size=10, flush_interval=0.05)
+    audit.start()
+
+    for i in range(25):
+        await audit.record(f"{1000 + i}.T", _decision())
+    await audit.close()
+
+    tickers = [r["ticker"] for batch in writer.batches for r in batch]
+    assert tickers == [f"{1000 + i}.T" for i in range(25)]
+    assert all(len(batch) <= 10 for batch in writer.batches)
+    assert len(writer.batches) < 25
+    assert audit.direct_writes == 0
+    assert threading.get_ident() not in writer.threads
+    # 終了後の記録はその場で書き込む
+    await audit.record("7203.T", _decision())
+    assert audit.direct_writes == 1 and audit.written == 26
+
+
+async def test_full_queue_applies_backpressure_without_losing_records():
+    writer = RecordingWriter(delay=0.05)
+    audit = AuditLog(writer, queue_size=2, batch_size=1, flush_interval=0.01, enqueue_timeout=0.01)
+    audit.start()
+
+    await asyncio.gather(*(audit.record(f"{1000 + i}.T", _decision()) for i in range(8)))
+    await audit.close()
+
+    written = sorted(r["ticker"] for batch in writer.batches for r in batch)
+    assert written == [f"{1000 + i}.T" for i in range(8)]
+    assert audit.direct_writes > 0
+    assert audit.pending == 0
+
+
+class FlakyWriter(RecordingWriter):
+    def __init__(self):
+        super().__init__()
+        self.down = True
+
+    def write(self, records):
+        if self.down:
+            raise sqlite3.OperationalError("database is locked")
+        super().write(records)
+
+
+@pytest.mark.parametrize("spill", [True, False])
+async def test_failed_batches_are_kept_and_replayed(tmp_path, spill):
+    writer = FlakyWriter()
+    spill_dir = tmp_path / "spill" if spill else None
+    audit = AuditLog(writer, batch_size=10, flush_interval=0.01, spill_dir=spill_dir)
+    audit.start()
+
+    for i in range(3):
+        await audit.record(f"{1000 + i}.T", _decision())
+    while audit.unwritten < 3:
+        await asyncio.sleep(0.01)
+
+    status = audit.status()
+    assert status["ok"] is False and status["spilled"] == 3
+    assert "database is locked" in status["last_error"]
+    assert (tmp_path / "spill" / f"audit-spill-{os.getpid()}.jsonl").exists() is spill
+
+    # 書き込めるようになったら (新しい記録が無くても) 退避した分を書き戻す
+    writer.down = False
+    while audit.unwritten:
+        await asyncio.sleep(0.01)
+    await audit.record("7203.T", _decision())
+    await audit.close()
+
+    tickers = [r["ticker"] for batch in writer.batches for r in batch]
+    assert tickers == ["1000.T", "1001.T", "1002.T", "7203.T"]
+    assert audit.status()["ok"] and audit.replayed == 3
+    assert not list(tmp_path.glob("spill/*.jsonl"))
+
+
+async def test_direct_write_failure_is_spilled_not_raised(tmp_path):
+    writer = FlakyWriter()
+    audit = AuditLog(writer, queue_size=1, flush_interval=0.01, spill_dir=tmp_path)
+
+    # 起動前 (直接書き込み) に書き込み先が落ちていても、リクエストには例外を返さない
+    await audit.record("7203.T", _decision())
+    await audit.record("6758.T", _decision())
+
+    status = audit.status()
+    assert status["ok"] is False and status["unwritten"] == 2
+    assert "database is locked" in status["last_error"]
+    assert (tmp_path / f"audit-spill-{os.getpid()}.jsonl").exists()
+
+    writer.down = False
+    audit.start()
+    await audit.close()
+
+    assert sorted(r["ticker"] for batch in writer.batches for r in batch) == ["6758.T", "7203.T"]
+    assert audit.status()["ok"] and audit.direct_writes == 2
+
+
+async def test_spill_left_by_exited_worker_is_replayed_on_start(tmp_path):
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    spill = tmp_path / f"audit-spill-{exited.pid}.jsonl"
+    spill.write_text(json.dumps(audit_record("7203.T", _decision(), ts=1.0)) + "\n")
+    writer = RecordingWriter()
+
+    audit = AuditLog(writer, flush_interval=0.01, spill_dir=tmp_path)
+    audit.start()
+    await audit.close()
+
+    assert [r["ticker"] for batch in writer.batches for r in batch] == ["7203.T"]
+    assert not spill.exists() and audit.replayed == 1
+
+
+async def test_ready_reports_degraded_audit_log(monkeypatch):
+    from src.main import app
+    from src.stock_magi.warmup import ReadinessState
+
+    monkeypatch.setattr("src.common.audit.FLUSH_RETRIES", 0)
+    audit = AuditLog(FlakyWriter(), flush_interval=0.01)
+    await audit._flush([audit_record("7203.T", _decision())])
+    monkeypatch.setattr("src.stock_magi.api.endpoints.get_audit_log", lambda: audit)
+    readiness = ReadinessState()
+    readiness.mark_ready()
+    monkeypatch.setattr(app.state, "readiness", readiness, raising=False)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/ready")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "degraded"
+    assert response.json()["audit"]["unwritten"] == 1
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "parquet"])
+async def test_query_by_ticker_and_time_range(tmp_path, backend):
+    if backend == "parquet":
+        pytest.importorskip("pyarrow")
+        pytest.importorskip("pandas")
+        writer = ParquetAuditWriter(tmp_path / "audit")
+    else:
+        writer = SQLiteAuditWriter(tmp_path / "audit.sqlite3")
+    day = datetime(2024, 8, 1, tzinfo=UTC).timestamp()
+    writer.write(
+        [
+            audit_record("7203.T", _decision(Action.BUY), ts=day),
+            audit_record("6758.T", _decision(Action.SELL), ts=day + 60),
+            audit_record("7203.T", _decision(Action.HOLD), ts=day + 86400),
+        ]
+    )
+    audit = AuditLog(writer)
+
+    everything = await audit.query()
+    toyota = await audit.query(ticker="7203.T")
+    first_day = await audit.query(
+        start=datetime(2024, 8, 1), end=datetime(2024, 8, 1, 23, 59, tzinfo=UTC)
+    )
+
+    assert [r["final_action"] for r in everything] == ["HOLD", "SELL", "BUY"]
+    assert [r["final_action"] for r in toyota] == ["HOLD", "BUY"]
+    assert [r["ticker"] for r in first_day] == ["6758.T", "7203.T"]
+    assert toyota[1]["ts"] == "2024-08-01T00:00:00+00:00"
+    assert toyota[1]["has_conflict"] is False
+    assert toyota[1]["votes"][0]["snapshot_id"] == "ab" * 32
+    assert len(await audit.query(limit=1)) == 1
+
+
+def test_create_audit_log_backends(tmp_path):
+    settings = AuditSettings(AUDIT_BACKEND="sqlite", AUDIT_SQLITE_PATH=str(tmp_path / "a.db"))
+
+    assert isinstance(create_audit_log(settings).writer, SQLiteAuditWriter)
+    assert create_audit_log(AuditSettings(AUDIT_BACKEND="none")) is None
+    with pytest.raises(ValueError):
+        create_audit_log(AuditSettings(AUDIT_BACKEND="s3"))
+
+
+@pytest.fixture
+def audit_log(tmp_path, monkeypatch):
+    monkeypatch.setenv("AUDIT_BACKEND", "sqlite")
+    monkeypatch.setenv("AUDIT_SQLITE_PATH", str(tmp_path / "audit.sqlite3"))
+    monkeypatch.setenv("AUDIT_FLUSH_INTERVAL", "60")
+    monkeypatch.setenv("AUDIT_SPILL_DIR", str(tmp_path / "spill"))
+    get_audit_log.cache_clear()
+    yield get_audit_log()
+    get_audit_log.cache_clear()
+
+
+async def test_lifespan_flushes_audit_log_on_shutdown(audit_log, monkeypatch):
+    from src.main import app
+
+    async def fake_fundamentals(self, ticker):
+        return {"ticker": ticker, "per": 8.0, "pbr": 0.8, "roe": 0.15}
+
+    monkeypatch.setattr(FoundryHTTPTool, "get_fundamentals", fake_fundamentals)
+    registry = FoundryToolRegistry(cache=InMemoryCache())
+    monkeypatch.setattr("src.stock_magi.api.endpoints.get_tool_registry", lambda: registry)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        async with app.router.lifespan_context(app):
+            assert audit_log.running
+            for ticker in ("7203.T", "6758.T"):
+                response = await client.post("/api/analyze", json={"ticker": ticker})
+                assert response.status_code == 200
+            # フラッシュ間隔 (60 秒) 前なのでまだ書き込まれていない
+            assert audit_log.written == 0
+        assert audit_log.written == 2 and audit_log.direct_writes == 0
+
+        response = await client.get("/api/audit", params={"ticker": "7203.T"})
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["count"] == 1
+    assert body["records"][0]["final_action"] == "BUY"
+    assert body["records"][0]["votes"][0]["agent_name"] == "Melchior"
+
+
+async def test_audit_endpoint_disabled():
+    from src.main import app
+
+    get_audit_log.cache_clear()
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/audit")
+    get_audit_log.cache_clear()
+
+    assert response.status_code == 404
+
+
+__all__ = []  # テストモジュールはエクスポート不要
@@ -0,0 +1,277 @@
+"""
+ウォークフォワード・バックテスト (src.stock_magi.backtest) のテスト
+"""
+
+import json
+from datetime import date, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from src.common.consensus import ReusableConsensusOrchestrator  # noqa: E402
+from src.mcp_providers.jquants_store import ParquetStore  # noqa: E402
+from src.stock_magi.agents.balthasar_agent import create_balthasar_agent  # noqa: E402
+from src.stock_magi.agents.melchior_agent import (  # noqa: E402
+    create_melchior_agent,
+    score_fundamentals,
+)
+from src.stock_magi.backtest import (  # noqa: E402
+    BUY,
+    HOLD,
+    SELL,
+    fundamental_signals,
+    main,
+    majority_vote,
+    performance,
+    point_in_time_statements,
+    simulate,
+    window_signals,
+)
+from src.stock_magi.indicators import universe_snapshot  # noqa: E402
+from src.stock_magi.screen import LocalFundamentalsTool, local_fundamentals  # noqa: E402
+
+FIRST_DAY = date(2023, 1, 2)
+LAST_DAY = date(2023, 12, 29)
+CODES = ["13010", "67580", "72030", "99840"]
+# (開示日, Code, EPS 予想, BPS)
+DISCLOSURES = [
+    (date(2023, 5, 10), "13010", "250", "2000"),
+    (date(2023, 5, 10), "72030", "-30", "200"),
+    (date(2023, 8, 4), "72030", "150", "900"),
+    (date(2023, 8, 4), "67580", "40", "300"),
+]
+# 72030 の 1:2 分割 (権利落ち日)
+SPLIT_DAY = date(2023, 7, 3)
+
+
+def _seed(store: ParquetStore, split: bool = False) -> None:
+    rng = np.random.default_rng(7)
+    closes = dict.fromkeys(CODES, 1000.0)
+    day = FIRST_DAY
+    while day <= LAST_DAY:
+        if day.weekday() < 5:
+            rows = []
+            for i, code in enumerate(CODES):
+                # 上場前 (99840 は 3 月から) と途中の売買停止日は行を書かない
+                if code == "99840" and day < date(2023, 3, 1):
+                    continue
+                if code == "67580" and day == date(2023, 9, 5):
+                    continue
+                closes[code] *= 1 + rng.normal(0.0005 * (i - 1), 0.02)
+                close = closes[code]
+                factor = 1.0
+                if split and code == "72030" and day >= SPLIT_DAY:
+                    close /= 2
+                    factor = 0.5 if day == SPLIT_DAY else 1.0
+                rows.append(
+                    {
+                        "Code": code,
+                        "Date": day.isoformat(),
+                        "High": close * 1.01,
+                        "Low": close * 0.99,
+                        "Close": close,
+                        "AdjustmentFactor": factor,
+                    }
+                )
+            store.write_partition("prices", day, rows)
+        day += timedelta(days=1)
+    for disclosed, code, eps, bps in DISCLOSURES:
+        store.merge_partition(
+            "statements",
+            disclosed,
+            [
+                {
+                    "LocalCode": code,
+                    "DisclosedDate": disclosed.isoformat(),
+                    "TypeOfCurrentPeriod": "FY",
+                    "ForecastEarningsPerShare": eps,
+                    "BookValuePerShare": bps,
+                }
+            ],
+            ["LocalCode", "DisclosedDate"],
+        )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ParquetStore(tmp_path / "jquants")
+    _seed(store)
+    return store
+
+
+def test_majority_vote_breaks_ties_by_agent_order():
+    melchior = np.array([BUY, BUY, SELL, HOLD], dtype=np.int8)
+    balthasar = np.array([SELL, BUY, HOLD, SELL], dtype=np.int8)
+    casper = np.array([HOLD, SELL, HOLD, BUY], dtype=np.int8)
+
+    assert list(majority_vote([melchior, balthasar, casper])) == [BUY, BUY, HOLD, HOLD]
+    assert list(majority_vote([balthasar, melchior])) == [SELL, BUY, HOLD, SELL]
+
+
+def test_fundamental_signals_match_score_fundamentals():
+    rng = np.random.default_rng(0)
+    eps = rng.choice([np.nan, -20.0, 0.0, 40.0, 80.0, 300.0], size=(6, 40))
+    bps = rng.choice([np.nan, -5.0, 300.0, 900.0, 3000.0], size=(6, 40))
+    close = rng.choice([np.nan, 500.0, 1000.0, 2500.0], size=(6, 40))
+    close[:, 0] = 1000.0
+
+    actions, confidence = fundamental_signals(eps, bps, close)
+
+    filled = pd.DataFrame(close).ffill(axis=1).to_numpy()
+    sign = {"BUY": BUY, "SELL": SELL, "HOLD": HOLD}
+    for i, j in np.ndindex(eps.shape):
+        e, b, c = eps[i, j], bps[i, j], filled[i, j]
+        data = {
+            "eps": e,
+            "per": c / e if e > 0 else None,
+            "pbr": c / b if b > 0 else None,
+            "roe": e / b if b > 0 else None,
+        }
+        action, expected, _ = score_fundamentals(data)
+        assert (actions[i, j], confidence[i, j]) == (sign[action], pytest.approx(expected))
+
+
+def test_point_in_time_statements_use_disclosures_from_next_day():
+    statements = pd.DataFrame(
+        [
+            {"LocalCode": "72030", "DisclosedDate": "2023-05-10", "ForecastEarningsPerShare": 10},
+            {"LocalCode": "72030", "DisclosedDate": "2023-08-04", "ForecastEarningsPerShare": 20},
+            {"LocalCode": "6758", "DisclosedDate": "2021-01-04", "ForecastEarningsPerShare": 5},
+        ]
+    )
+    dates = pd.DatetimeIndex(["2023-05-10", "2023-05-11", "2023-08-04", "2023-08-07"])
+
+    eps, bps = point_in_time_statements(statements, ["67580", "72030", "99840"], dates)
+
+    assert list(eps[1]) == pytest.approx([np.nan, 10, 10, 20], nan_ok=True)
+    # 2 年以上前の開示は使わない / 開示の無い銘柄は NaN
+    assert np.isnan(eps[0]).all() and np.isnan(eps[2]).all()
+    assert np.isnan(bps).all()
+
+
+async def test_vectorized_decisions_match_orchestrator(store):
+    signals = window_signals(store, None, FIRST_DAY, LAST_DAY)
+    dates = pd.DatetimeIndex(signals.dates)
+    statements = store.read("statements")
+    history = store.read("prices").assign(Date=lambda df: pd.to_datetime(df["Date"]))
+
+    for day in ["2023-03-15", "2023-05-10", "2023-05-11", "2023-08-07", "2023-09-05", "2023-12-01"]:
+        t = dates.get_loc(pd.Timestamp(day))
+        snapshot = universe_snapshot(history[history["Date"] <= day])
+        known = statements[pd.to_datetime(statements["DisclosedDate"]) < pd.Timestamp(day)]
+        fundamentals = local_fundamentals(known, snapshot["close"].to_dict())
+        orchestrator = ReusableConsensusOrchestrator(
+            agents=[
+                create_melchior_agent(LocalFundamentalsTool(fundamentals)),
+                create_balthasar_agent(price_loader=lambda _: None, snapshot=snapshot),
+            ]
+        )
+        for i, code in enumerate(signals.codes):
+            if code not in snapshot.index:
+                continue
+            decision = await orchestrator.reach_consensus({"ticker": code})
+            melchior, balthasar = (v.action.value for v in decision.votes)
+            assert signals.votes["melchior"][i, t] == {"BUY": BUY, "SELL": SELL}.get(melchior, 0)
+            assert signals.votes["balthasar"][i, t] == {"BUY": BUY, "SELL": SELL}.get(balthasar, 0)
+            assert signals.decisions[i, t] == {"BUY": BUY, "SELL": SELL}.get(
+                decision.final_action.value, 0
+            ), (day, code)
+
+
+def test_split_does_not_change_returns_or_technical_signals(store, tmp_path, monkeypatch):
+    split_store = ParquetStore(tmp_path / "split")
+    _seed(split_store, split=True)
+
+    base = window_signals(store, None, FIRST_DAY, LAST_DAY, ("balthasar",))
+    split = window_signals(split_store, None, FIRST_DAY, LAST_DAY, ("balthasar",))
+
+    # 調整後の株価は分割前の株価を半分にしたものと同じ (リターン・指標は変わらない)
+    row = split.codes.index("72030")
+    assert split.close[row] == pytest.approx(base.close[row] / 2, nan_ok=True)
+    assert (split.votes["balthasar"] == base.votes["balthasar"]).all()
+    daily = simulate(split, FIRST_DAY, LAST_DAY)
+    assert list(daily["return"]) == pytest.approx(
+        list(simulate(base, FIRST_DAY, LAST_DAY)["return"])
+    )
+    assert daily["return"].min() > -0.2
+
+    # PER / PBR は EPS / BPS と同じ基準の調整前の終値で計算する
+    closes = []
+
+    def record(eps, bps, close):
+        closes.append(close)
+        return fundamental_signals(eps, bps, close)
+
+    monkeypatch.setattr("src.stock_magi.backtest.fundamental_signals", record)
+    window_signals(split_store, ["7203"], FIRST_DAY, LAST_DAY, ("melchior",))
+    after = pd.DatetimeIndex(split.dates) >= pd.Timestamp(SPLIT_DAY)
+    assert closes[0][0][after] == pytest.approx(base.close[row][after] / 2)
+    assert closes[0][0][~after] == pytest.approx(base.close[row][~after], nan_ok=True)
+
+
+def test_performance_metrics():
+    daily = pd.DataFrame(
+        {
+            "return": [0.1, -0.5, 0.2, 0.0],
+            "turnover": [1.0, 0.0, 0.0, 0.0],
+            "long": [1, 1, 1, 0],
+            "short": [0, 0, 0, 0],
+            "calls": [1, 1, 1, 0],
+            "hits": [1, 0, 1, 0],
+        }
+    )
+
+    metrics = performance(daily)
+
+    assert metrics["total_return"] == pytest.approx(1.1 * 0.5 * 1.2 - 1)
+    assert metrics["max_drawdown"] == pytest.approx(-0.5)
+    assert metrics["hit_rate"] == pytest.approx(2 / 3)
+    assert metrics["exposure"] == pytest.approx(0.75)
+
+
+def test_backtest_cli_parallel_windows(store, tmp_path, capsys):
+    common = ["--root", str(store.root), "--start", "2023-06-01", "--end", "2023-12-29", "--json"]
+
+    assert main([*common, "--workers", "1", "--output", str(tmp_path / "single.csv")]) == 0
+    single = json.loads(capsys.readouterr().out)
+    args = ["--workers", "2", "--window-days", "60", "--output", str(tmp_path / "daily.parquet")]
+    assert main([*common, *args]) == 0
+    captured = capsys.readouterr()
+    split = json.loads(captured.out)
+
+    assert "backtested 4/4 windows" in captured.err
+    daily = pd.read_parquet(tmp_path / "daily.parquet")
+    assert daily["date"].is_monotonic_increasing and daily["date"].is_unique
+    assert daily["date"].iloc[0] == pd.Timestamp("2023-06-01")
+    # 最終日は翌営業日が無いので評価しない
+    assert daily["date"].iloc[-1] == pd.Timestamp("2023-12-28")
+    # 期間を分けても (助走期間を読み足すので) 通しで計算した結果と一致する
+    reference = pd.read_csv(tmp_path / "single.csv")
+    assert list(daily["return"]) == pytest.approx(list(reference["return"]))
+    assert split == pytest.approx(single, nan_ok=True)
+    assert split["days"] == len(daily) and 0 <= split["hit_rate"] <= 1
+    assert split["max_drawdown"] <= 0
+
+
+def test_backtest_cli_long_only_with_costs(store, tmp_path, capsys):
+    output = tmp_path / "daily.csv"
+    common = ["--root", str(store.root), "--tickers", "7203,1301", "--start", "2023-04-03"]
+    common += ["--workers", "1", "--json"]
+
+    assert main(common) == 0
+    gross = json.loads(capsys.readouterr().out)
+    assert main([*common, "--long-only", "--cost-bps", "50", "--output", str(output)]) == 0
+    net = json.loads(capsys.readouterr().out)
+
+    daily = pd.read_csv(output)
+    assert net["days"] == gross["days"] > 150
+    assert (daily["short"] == 0).all()
+    assert net["turnover"] > 0
+    cost = 0.005 * daily["turnover"]
+    assert list(daily["return"]) == pytest.approx(list(daily["gross_return"] - cost))
+
+
+__all__ = []  # テストモジュールはエクスポート不要
@@ -0,0 +1,165 @@
+"""
+Unit tests for batched LLM inference (MicroBatcher / BatchedChatClient)
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.common.llm import BatchedChatClient, BatchItemMissingError, MicroBatcher
+from src.common.llm.batch_inference import build_batch_user_message, split_batch_results
+from src.common.llm.stub_server import create_stub_app, stub_action_for
+from src.common.mcp.foundry_tool_registry import FoundryConfig
+from src.stock_magi.agents import create_melchior_agent
+
+
+@pytest.mark.asyncio
+async def test_micro_batcher_groups_by_max_batch_size():
+    """max_batch_size 単位でまとめて batch_fn が呼ばれる"""
+    calls: list[list[str]] = []
+
+    async def batch_fn(items):
+        calls.append([key for key, _ in items])
+        return {key: payload.upper() for key, payload in items}
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=3, max_wait_s=1.0)
+    results = await asyncio.gather(*(batcher.submit(f"k{i}", f"p{i}") for i in range(6)))
+
+    assert results == [f"P{i}" for i in range(6)]
+    assert [len(c) for c in calls] == [3, 3]
+
+
+@pytest.mark.asyncio
+async def test_micro_batcher_flushes_after_max_wait():
+    """バッチが埋まらなくても max_wait_s 経過で送信される"""
+
+    async def batch_fn(items):
+        return dict(items)
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=100, max_wait_s=0.01)
+    assert await asyncio.wait_for(batcher.submit("a", "x"), timeout=1.0) == "x"
+
+
+@pytest.mark.asyncio
+async def test_micro_batcher_keeps_same_key_submits_apart():
+    """同じ key で別々のペイロードを送っても、それぞれの結果が返る"""
+    seen: list[str] = []
+
+    async def batch_fn(items):
+        seen.extend(key for key, _ in items)
+        return dict(items)
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=2, max_wait_s=1.0)
+    results = await asyncio.gather(
+        batcher.submit("7203.T", "fundamentals"), batcher.submit("7203.T", "technicals")
+    )
+
+    assert results == ["fundamentals", "technicals"]
+    assert len(set(seen)) == 2 and all(key.startswith("7203.T#") for key in seen)
+
+
+@pytest.mark.asyncio
+async def test_micro_batcher_missing_and_failed_items():
+    """欠落した結果と batch_fn の例外が呼び出し元に伝播する"""
+
+    async def partial(items):
+        return {items[0][0]: 1}
+
+    batcher = MicroBatcher(partial, max_batch_size=2, max_wait_s=1.0)
+    a, b = await asyncio.gather(
+        batcher.submit("a", ""), batcher.submit("b", ""), return_exceptions=True
+    )
+    assert a == 1
+    assert isinstance(b, BatchItemMissingError)
+
+    async def failing(items):
+        raise RuntimeError("upstream down")
+
+    batcher = MicroBatcher(failing, max_batch_size=1)
+    with pytest.raises(RuntimeError, match="upstream down"):
+        await batcher.submit("a", "")
+
+
+def test_split_batch_results():
+    """JSON バッチ応答を id ごとに分割する"""
+    content = (
+        '{"results": [{"id": "7203.T", "action": "BUY", "confidence": 0.8, "reasoning": "r"}]}'
+    )
+    assert split_batch_results(content) == {
+        "7203.T": {"action": "BUY", "confidence": 0.8, "reasoning": "r"}
+    }
+    with pytest.raises(ValueError):
+        split_batch_results("not json")
+
+    message = build_batch_user_message([("7203.T", "p1"), ("6758.T", "p2")])
+    assert "### id: 7203.T" in message
+    assert "### id: 6758.T" in message
+
+
+@pytest.mark.asyncio
+async def test_batched_chat_client_against_stub_server():
+    """スタブサーバーに対してバッチ化され、銘柄ごとの結果に分割される"""
+    app = create_stub_app(request_latency_s=0.0, per_item_latency_s=0.0)
+    transport = httpx.ASGITransport(app=app)
+    config = FoundryConfig()
+
+    async with httpx.AsyncClient(transport=transport) as http:
+        client = BatchedChatClient(
+            config, "system", max_batch_size=4, max_wait_s=0.01, http_client=http
+        )
+        tickers = [f"{1000 + i}.T" for i in range(8)]
+        results = await asyncio.gather(*(client.analyze(t, f"prompt {t}") for t in tickers))
+        await client.aclose()
+
+    assert client.requests_sent == 2
+    assert app.state.requests == 2
+    assert [r["action"] for r in results] == [stub_action_for(t) for t in tickers]
+
+
+@pytest.mark.asyncio
+async def test_melchior_uses_llm_client_when_provided():
+    """llm_client がある場合は Melchior がバッチクライアント経由で判定する"""
+
+    class Tool:
+        async def get_fundamentals(self, ticker):
+            return {"ticker": ticker, "price": 100.0}
+
+    class FakeLLM:
+        def __init__(self):
+            self.prompts = []
+
+        async def analyze(self, key, prompt):
+            self.prompts.append((key, prompt))
+            return {"action": "SELL", "confidence": 0.9, "reasoning": "llm verdict"}
+
+    llm = FakeLLM()
+    agent = create_melchior_agent(Tool(), llm_client=llm)
+    result = await agent.analyze("7203.T")
+
+    assert result["action"] == "SELL"
+    assert llm.prompts[0][0] == "7203.T"
+    assert "7203.T" in llm.prompts[0][1]
+
+
+@pytest.mark.asyncio
+async def test_melchior_logs_llm_failure_and_falls_back(caplog):
+    """LLM の失敗はログに残し、ヒューリスティック判定で返す"""
+
+    class Tool:
+        async def get_fundamentals(self, ticker):
+            return {"ticker": ticker, "recommendation": "buy"}
+
+    class BrokenLLM:
+        async def analyze(self, key, prompt):
+            raise httpx.ConnectError("llm down")
+
+    agent = create_melchior_agent(Tool(), llm_client=BrokenLLM())
+    with caplog.at_level("WARNING", logger="src.stock_magi.agents.melchior_agent"):
+        result = await agent.analyze("7203.T")
+
+    assert result["action"] == "BUY"
+    assert "llm down" in caplog.text
+
+
+__all__ = []  # テストモジュールはエクスポート不要
@@ -0,0 +1,70 @@
+"""
+Unit tests for cache backends (memory / SQLite) and fundamentals caching
+"""
+
+import pytest
+
+from src.common.cache import CacheSettings, InMemoryCache, SQLiteCache, create_cache
+from src.common.mcp.foundry_tool_registry import FoundryToolRegistry, fundamentals_cache_key
+
+
+@pytest.mark.asyncio
+async def test_in_memory_cache_ttl_and_lru():
+    """TTL 切れと LRU 追い出しの動作"""
+    cache = InMemoryCache(max_entries=2)
+
+    await cache.set("a", {"v": 1})
+    await cache.set("b", 2)
+    await cache.get("a")  # a を最近使用にする
+    await cache.set("c", 3)  # b が追い出される
+
+    assert await cache.get("a") == {"v": 1}
+    assert await cache.get("b") is None
+
+    await cache.set("short", 1, ttl=-1)
+    assert await cache.get("short") is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_shared_between_instances(tmp_path):
+    """同じファイルを開いた別インスタンス (別ワーカー相当) から値が見える"""
+    path = tmp_path / "cache.sqlite3"
+    writer = SQLiteCache(path)
+    reader = SQLiteCache(path)
+
+    await writer.set("fundamentals:morningstar:7203.T", {"price": 100.0}, ttl=60)
+    assert await reader.get("fundamentals:morningstar:7203.T") == {"price": 100.0}
+
+    await reader.delete("fundamentals:morningstar:7203.T")
+    assert await writer.get("fundamentals:morningstar:7203.T") is None
+
+    await writer.set("expired", 1, ttl=-1)
+    assert await reader.get("expired") is None
+
+
+def test_create_cache_from_settings(tmp_path):
+    """CACHE_BACKEND に応じたバックエンドを生成する"""
+    assert isinstance(create_cache(CacheSettings(CACHE_BACKEND="memory")), InMemoryCache)
+
+    sqlite_settings = CacheSettings(
+        CACHE_BACKEND="sqlite", CACHE_SQLITE_PATH=str(tmp_path / "c.sqlite3")
+    )
+    assert isinstance(create_cache(sqlite_settings), SQLiteCache)
+
+    with pytest.raises(ValueError, match="Unknown CACHE_BACKEND"):
+        create_cache(CacheSettings(CACHE_BACKEND="memcached"))
+
+
+@pytest.mark.asyncio
+async def test_foundry_tool_serves_fundamentals_from_cache():
+    """キャッシュ済みのファンダメンタルズは HTTP 呼び出しなしで返る"""
+    cache = InMemoryCache()
+    await cache.set(fundamentals_cache_key("morningstar", "7203.T"), {"price": 1.0})
+
+    tool = FoundryToolRegistry(cache=cache).get_tool("morningstar")
+
+    # test endpoint is unreachable, so a cache miss would raise
+    assert await tool.get_fundamentals("7203.T") == {"price": 1.0}
+
+
+__all__ = []  # テストモジュールはエクスポート不要
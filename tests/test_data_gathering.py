@@ -0,0 +1,263 @@
+"""
+複数ツールの同時データ取得 (src.common.data_gathering) のテスト
+"""
+
+import asyncio
+import time
+from types import MappingProxyType
+
+import pytest
+
+from src.common.agent_registry import AgentRegistry
+from src.common.consensus import ReusableConsensusOrchestrator
+from src.common.data_gathering import (
+    DataGatherer,
+    DataGatheringError,
+    DataRequirement,
+    RequestDataContext,
+    parse_requirements,
+)
+from src.stock_magi.analysis import AnalysisService
+
+
+class FakeFundamentals:
+    def __init__(self, data=None, delay=0.3):
+        self.data = data or {"ticker": "7203.T", "fair_value": 3000, "price": 2000}
+        self.delay = delay
+        self.calls = 0
+
+    async def get_fundamentals(self, ticker):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {**self.data, "as_of": "2026-10-16"}
+
+
+class FakeHistory:
+    def load(self, ticker):
+        time.sleep(0.3)  # 同期 API もスレッドで並行に動く
+        return {"ticker": ticker, "close": 2450}
+
+
+class FakeMCP:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.arguments = None
+
+    async def call(self, tool_name, arguments=None):
+        self.arguments = arguments
+        await asyncio.sleep(0.3)
+        if self.fail:
+            raise RuntimeError("quote server down")
+        return {"price": 2500, "date": "2026-10-17"}
+
+
+class FakeRegistry:
+    def __init__(self, tools):
+        self.tools = tools
+
+    def get_tool(self, name):
+        if name not in self.tools:
+            raise ValueError(f"Tool '{name}' not found")
+        return self.tools[name]
+
+
+REQUIREMENTS = parse_requirements(
+    [
+        {"key": "fundamentals", "tool": "morningstar"},
+        {
+            "key": "quote",
+            "tool": "yahoo-finance",
+            "call": "get_quote",
+            "arguments": {"symbol": "{ticker}", "fields": ["price"]},
+        },
+        {"key": "history", "tool": "local", "method": "load"},
+        {"key": "news", "tool": "slow-news", "timeout": 0.1},
+        {"key": "missing", "tool": "not-configured"},
+    ]
+)
+
+
+async def test_sources_are_fetched_concurrently_and_failures_isolated():
+    quote = FakeMCP()
+    registry = FakeRegistry(
+        {
+            "morningstar": FakeFundamentals(),
+            "yahoo-finance": quote,
+            "local": FakeHistory(),
+            "slow-news": FakeFundamentals(delay=5.0),
+        }
+    )
+
+    started = time.perf_counter()
+    gathered = await DataGatherer(registry).gather("7203.T", REQUIREMENTS)
+    elapsed = time.perf_counter() - started
+
+    # 最も遅いソース (0.3 秒) 程度で終わる (合計 0.9 秒 + タイムアウト待ちにはならない)
+    assert elapsed < 0.6
+    assert list(gathered.data) == ["fundamentals", "quote", "history"]
+    assert gathered.missing == ["news", "missing"]
+    assert not gathered.complete
+    assert quote.arguments == {"symbol": "7203.T", "fields": ["price"]}
+    assert gathered.sources["news"].error == "timed out after 0.1s"
+    assert "not found" in gathered.sources["missing"].error
+    assert gathered.sources["fundamentals"].as_of == "2026-10-16"
+    assert gathered.sources["quote"].as_of == "2026-10-17"
+    assert gathered.sources["quote"].fetched_at <= time.time()
+    assert 0.25 < gathered.sources["history"].elapsed < 0.6
+    # 同じキーは先に宣言したソースを優先する
+    assert gathered.merged()["price"] == 2000
+    assert gathered.merged()["close"] == 2450
+    context = gathered.context()
+    assert context["quote"]["price"] == 2500
+    assert context["sources"]["news"]["ok"] is False
+
+
+async def test_required_source_failure_raises_with_partial_result():
+    requirements = (
+        DataRequirement(key="fundamentals", tool="morningstar", required=True),
+        DataRequirement(key="quote", tool="yahoo-finance", call="get_quote"),
+    )
+    registry = FakeRegistry({"morningstar": FakeMCP(fail=True), "yahoo-finance": FakeMCP()})
+
+    with pytest.raises(DataGatheringError, match="fundamentals") as excinfo:
+        await DataGatherer(registry).gather("7203.T", requirements)
+
+    assert list(excinfo.value.result.data) == ["quote"]
+    assert excinfo.value.result.missing == ["fundamentals"]
+
+
+def test_parse_requirements_validation():
+    with pytest.raises(ValueError):
+        parse_requirements([{"key": "quote"}])
+    with pytest.raises(ValueError, match="Duplicate"):
+        parse_requirements([{"key": "a", "tool": "x"}, {"key": "a", "tool": "y"}])
+    with pytest.raises(ValueError):
+        AgentRegistry.from_config(
+            {"agents": {"melchior": {"factory": "m:f", "data": [{"tool": "x"}]}}}
+        )
+
+
+async def test_agent_merges_sources_from_registry():
+    config = {
+        "agents": {
+            "melchior": {
+                "factory": "src.stock_magi.agents.melchior_agent:create_melchior_agent",
+                "tools": ["morningstar"],
+                "data": [
+                    {"key": "fundamentals", "tool": "morningstar", "required": True},
+                    {"key": "quote", "tool": "yahoo-finance", "call": "get_quote"},
+                ],
+            }
+        }
+    }
+    fundamentals = FakeFundamentals({"fair_value": 3000})
+    agents = AgentRegistry.from_config(config)
+    up = FakeRegistry({"morningstar": fundamentals, "yahoo-finance": FakeMCP()})
+    down = FakeRegistry({"morningstar": fundamentals, "yahoo-finance": FakeMCP(fail=True)})
+    broken = FakeRegistry({"morningstar": FakeMCP(fail=True), "yahoo-finance": FakeMCP()})
+
+    merged = await agents.get("melchior", up).analyze("7203.T")
+    partial = await agents.get("melchior", down).analyze("7203.T")
+    failed = await agents.get("melchior", broken).analyze("7203.T")
+
+    # fair_value (morningstar) と price (yahoo-finance) を合わせて判定する
+    assert merged["action"] == "BUY"
+    assert merged["reasoning"] == "fair_value > price"
+    # quote が取れなくても fundamentals だけで判定を続ける
+    assert partial["action"] == "HOLD"
+    assert partial["confidence"] == 0.5
+    assert failed == {
+        "action": "HOLD",
+        "confidence": 0.0,
+        "reasoning": "Data unavailable: fundamentals",
+    }
+    assert agents.describe()["agents"]["melchior"]["data"] == ["fundamentals", "quote"]
+    assert agents.constructed == 3
+
+
+async def test_request_context_shares_one_read_only_result():
+    fundamentals = FakeFundamentals()
+    registry = FakeRegistry({"morningstar": fundamentals})
+    requirement = DataRequirement(key="fundamentals", tool="morningstar")
+    impatient = DataGatherer(registry, timeout=0.1)
+
+    with RequestDataContext.scope() as data:
+        timed_out = await impatient.gather("7203.T", [requirement])
+        first = await DataGatherer(registry).fetch(requirement, "7203.T")
+        second = await DataGatherer(registry).fetch(requirement, "7203.T")
+        with RequestDataContext.scope() as inner:
+            assert inner is data
+    outside = await DataGatherer(registry).fetch(requirement, "7203.T")
+
+    # タイムアウトした側の待ちは取り消されても、共有の取得は続いて他のエージェントが使う
+    assert timed_out.missing == ["fundamentals"]
+    assert first is second
+    assert isinstance(first, MappingProxyType)
+    with pytest.raises(TypeError):
+        first["price"] = 0
+    assert data.fetches == 1
+    assert fundamentals.calls == 2
+    assert outside is not first and RequestDataContext.current() is None
+
+
+async def test_shared_fetch_reports_completion_time_of_the_fetch():
+    registry = FakeRegistry({"morningstar": FakeFundamentals(delay=0.3)})
+    requirement = DataRequirement(key="fundamentals", tool="morningstar")
+    gatherer = DataGatherer(registry)
+
+    async def late_gather(delay):
+        await asyncio.sleep(delay)
+        return await gatherer.gather("7203.T", [requirement])
+
+    with RequestDataContext.scope():
+        first, joined = await asyncio.gather(late_gather(0.0), late_gather(0.2))
+        await asyncio.sleep(0.1)
+        after = await gatherer.gather("7203.T", [requirement])
+
+    statuses = [g.sources["fundamentals"] for g in (first, joined, after)]
+    # 相乗り・取得後の呼び出しも、待った時間ではなく共有の取得の完了時刻と所要時間を記録する
+    assert {s.fetched_at for s in statuses} == {statuses[0].fetched_at}
+    assert {s.elapsed for s in statuses} == {statuses[0].elapsed}
+    assert statuses[0].elapsed >= 0.29
+
+
+CONSENSUS_AGENTS = {
+    "agents": {
+        name: {
+            "factory": "src.stock_magi.agents.melchior_agent:create_melchior_agent",
+            "tools": ["morningstar"],
+            "data": [{"key": "fundamentals", "tool": "morningstar", "required": True}, *extra],
+        }
+        for name, extra in (
+            ("melchior", []),
+            ("value", [{"key": "quote", "tool": "yahoo-finance", "call": "get_quote"}]),
+            ("growth", [{"key": "quote", "tool": "yahoo-finance", "call": "get_quote"}]),
+        )
+    }
+}
+
+
+async def test_consensus_fetches_each_source_once_per_ticker():
+    fundamentals = FakeFundamentals()
+    registry = FakeRegistry({"morningstar": fundamentals, "yahoo-finance": FakeMCP()})
+    agents = AgentRegistry.from_config(CONSENSUS_AGENTS)
+    service = AnalysisService(registry, agents, decision_cache_ttl=0)
+    panel = ["melchior", "value", "growth"]
+
+    started = time.perf_counter()
+    result = await service.analyze("7203.T", panel)
+    elapsed = time.perf_counter() - started
+    orchestrator = ReusableConsensusOrchestrator(agents.panel(panel, registry))
+    decision = await orchestrator.reach_consensus({"ticker": "6758.T"})
+    batch = await service.analyze_many(["7267.T", "6501.T"], panel)
+
+    # 3 エージェントが同じ fundamentals を使っても上流は銘柄ごとに 1 回だけ
+    assert fundamentals.calls == 4
+    assert [r["action"] for r in result["reasoning"]] == ["BUY", "BUY", "BUY"]
+    assert len(decision.votes) == 3
+    assert all(len(r["reasoning"]) == 3 for r in batch)
+    # 取得を先に同時に始めるため、エージェントごとに 0.3 秒ずつ待たない
+    assert elapsed < 0.6
+
+
+__all__ = []  # テストモジュールはエクスポート不要
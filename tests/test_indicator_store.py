@@ -0,0 +1,248 @@
+"""
+永続化された指標状態 (src.stock_magi.indicator_store) のテスト
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from src.stock_magi.agents import BalthasarAgent  # noqa: E402
+from src.stock_magi.indicator_store import IndicatorStateStore, main  # noqa: E402
+from src.stock_magi.indicators import (  # noqa: E402
+    INDICATOR_NAMES,
+    IndicatorState,
+    compute_indicators,
+    ohlcv_matrix,
+)
+
+START = date(2024, 1, 1)
+
+
+def _history(days: int = 80, codes=("72030", "67580")) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    frames = []
+    for code in codes:
+        close = 100 + np.cumsum(rng.normal(0, 1, days))
+        frames.append(
+            pd.DataFrame(
+                {
+                    "Code": code,
+                    "Date": pd.to_datetime([START + timedelta(days=i) for i in range(days)]),
+                    "High": close + 1,
+                    "Low": close - 1,
+                    "Close": close,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def _bars(df: pd.DataFrame, day: date) -> pd.DataFrame:
+    return df[df["Date"] == pd.Timestamp(day)]
+
+
+def _expected_latest(df: pd.DataFrame) -> tuple[list[str], dict]:
+    codes, _, arrays = ohlcv_matrix(df)
+    series, _ = compute_indicators(arrays["High"], arrays["Low"], arrays["Close"])
+    return codes, {name: values[:, -1] for name, values in series.items()}
+
+
+def test_apply_bars_matches_full_recompute(tmp_path):
+    df = _history()
+    last_days = [START + timedelta(days=i) for i in range(77, 80)]
+    store = IndicatorStateStore(tmp_path)
+    store.build(df[df["Date"] < pd.Timestamp(last_days[0])])
+
+    for day in last_days:
+        assert store.apply_bars(day, _bars(df, day)) == 2
+
+    codes, expected = _expected_latest(df)
+    for i, code in enumerate(codes):
+        values = store.lookup(code)
+        for name in INDICATOR_NAMES:
+            assert np.isclose(values[name], expected[name][i], equal_nan=True), name
+    assert store.last_date == last_days[-1]
+
+
+def test_state_is_memory_mapped_and_reopens(tmp_path):
+    df = _history()
+    store = IndicatorStateStore(tmp_path)
+    store.build(df)
+    store.apply_bars(
+        START + timedelta(days=80),
+        pd.DataFrame({"Code": ["72030"], "High": [101.0], "Low": [99.0], "Close": [100.0]}),
+    )
+
+    reopened = IndicatorStateStore(tmp_path)
+
+    assert isinstance(reopened._ensure_open().arrays["ema"], np.memmap)
+    assert reopened.last_date == START + timedelta(days=80)
+    assert reopened.lookup("7203.T") == store.lookup("7203.T")
+    assert reopened.lookup("7203.T")["close"] == 100.0
+    # 反映済みの日付は無視する
+    assert reopened.apply_bars(START + timedelta(days=80), _bars(df, START)) == 0
+
+
+def test_apply_bars_rescales_state_on_split_day(tmp_path):
+    df = _history()
+    split_day = START + timedelta(days=79)
+    # 72030 が最終日に 1:2 の分割 (権利落ち日以降の株価が半分になる)
+    split = (df["Code"] == "72030") & (df["Date"] >= pd.Timestamp(split_day))
+    raw = df.copy()
+    raw.loc[split, ["High", "Low", "Close"]] /= 2
+    raw["AdjustmentFactor"] = np.where((raw["Date"] == pd.Timestamp(split_day)) & split, 0.5, 1.0)
+    store = IndicatorStateStore(tmp_path)
+    store.build(raw[raw["Date"] < pd.Timestamp(split_day)])
+
+    store.apply_bars(split_day, _bars(raw, split_day))
+
+    # 調整済みの履歴 (分割前の株価を半分にしたもの) から計算し直した値と一致する
+    adjusted = df.copy()
+    adjusted.loc[adjusted["Code"] == "72030", ["High", "Low", "Close"]] /= 2
+    codes, expected = _expected_latest(adjusted)
+    for i, code in enumerate(codes):
+        values = store.lookup(code)
+        for name in INDICATOR_NAMES:
+            assert np.isclose(values[name], expected[name][i], equal_nan=True), (code, name)
+
+
+def test_apply_bars_is_idempotent_when_meta_write_is_lost(tmp_path):
+    df = _history()
+    day = START + timedelta(days=79)
+    store = IndicatorStateStore(tmp_path)
+    store.build(df[df["Date"] < pd.Timestamp(day)])
+    stale_meta = store.meta_path.read_text()
+
+    store.apply_bars(day, _bars(df, day))
+    expected = store.lookup("7203")
+    # 状態の flush 後、meta.json を書き換える前に落ちた場合
+    store.meta_path.write_text(stale_meta)
+
+    reopened = IndicatorStateStore(tmp_path)
+    assert reopened.last_date == day
+    assert reopened.apply_bars(day, _bars(df, day)) == 0
+    assert reopened.lookup("7203") == expected
+
+
+def test_build_over_split_matches_daily_updates(tmp_path):
+    df = _history()
+    split_day = START + timedelta(days=60)
+    split = (df["Code"] == "72030") & (df["Date"] >= pd.Timestamp(split_day))
+    raw = df.copy()
+    raw.loc[split, ["High", "Low", "Close"]] /= 5
+    raw["AdjustmentFactor"] = np.where((raw["Date"] == pd.Timestamp(split_day)) & split, 0.2, 1.0)
+    built = IndicatorStateStore(tmp_path / "built")
+    built.build(raw)
+    updated = IndicatorStateStore(tmp_path / "updated")
+    updated.build(raw[raw["Date"] < pd.Timestamp(split_day)])
+
+    for i in range(60, 80):
+        day = START + timedelta(days=i)
+        updated.apply_bars(day, _bars(raw, day))
+
+    for code in ("72030", "67580"):
+        expected = updated.lookup(code)
+        for name, value in built.lookup(code).items():
+            assert np.isclose(value, expected[name], equal_nan=True), (code, name)
+
+
+def test_interrupted_update_is_rolled_back(tmp_path, monkeypatch):
+    df = _history()
+    day = START + timedelta(days=79)
+    store = IndicatorStateStore(tmp_path)
+    store.build(df[df["Date"] < pd.Timestamp(day)])
+    before = store.lookup("7203")
+
+    # 状態を書き換えた後、反映済みの日付を書く前にプロセスが落ちた場合
+    state = store._ensure_open()
+    store._write_pending(state, day)
+    state.update(*(np.full(len(store.codes), 1.0) for _ in range(3)))
+    store.flush()
+
+    reopened = IndicatorStateStore(tmp_path)
+    assert reopened.last_date == day - timedelta(days=1)
+    assert reopened.lookup("7203") == before
+    assert not (tmp_path / "pending.npz").exists()
+
+    # 反映中の例外でも反映前の状態に戻る
+    def fail(self, high, low, close):
+        self.arrays["ema"][:] = 0.0
+        raise RuntimeError("interrupted")
+
+    monkeypatch.setattr(IndicatorState, "update", fail)
+    with pytest.raises(RuntimeError):
+        reopened.apply_bars(day, _bars(df, day))
+    assert reopened.lookup("7203") == before
+    assert IndicatorStateStore(tmp_path).lookup("7203") == before
+
+
+def test_apply_bars_adds_new_codes(tmp_path):
+    store = IndicatorStateStore(tmp_path)
+    store.build(_history())
+
+    bars = pd.DataFrame({"Code": ["13010"], "High": [51.0], "Low": [49.0], "Close": [50.0]})
+    store.apply_bars(START + timedelta(days=80), bars)
+
+    assert store.codes == ["67580", "72030", "13010"]
+    values = store.lookup("1301.T")
+    assert values["close"] == 50.0
+    assert values["ema"] == 50.0
+    assert np.isnan(values["sma"])
+    assert IndicatorStateStore(tmp_path).lookup("7203")["close"] == store.lookup("72030")["close"]
+
+
+def test_lookup_unknown_ticker_and_missing_store(tmp_path):
+    store = IndicatorStateStore(tmp_path)
+    assert not store.exists()
+    with pytest.raises(FileNotFoundError):
+        store.lookup("7203")
+
+    store.build(_history())
+    assert store.lookup("9999") is None
+
+
+async def test_balthasar_reads_from_state_store(tmp_path):
+    store = IndicatorStateStore(tmp_path)
+    store.build(_history())
+
+    def fail(ticker):
+        raise AssertionError("保存済みの銘柄は株価を読み込まない")
+
+    agent = BalthasarAgent(price_loader=fail, state_store=store)
+    result = await agent.analyze("6758.T")
+
+    assert result["confidence"] > 0.0
+    assert "RSI" in result["reasoning"]
+
+
+def test_cli_build_and_update_from_price_store(tmp_path, capsys):
+    pytest.importorskip("pyarrow")
+    from src.mcp_providers.jquants_store import ParquetStore
+
+    prices = ParquetStore(tmp_path / "jquants")
+    df = _history(days=30)
+    for day, rows in df.groupby("Date"):
+        records = rows.assign(Date=day.date().isoformat()).to_dict(orient="records")
+        prices.write_partition("prices", day.date(), records)
+    root = ["--root", str(tmp_path / "state"), "--store-root", str(prices.root)]
+    build_days = (date.today() - START).days + 1
+
+    # 最終日のパーティションを後から追加して update で反映する
+    last = max(prices.partitions("prices"))
+    last_records = prices.read("prices", last, last).to_dict(orient="records")
+    (prices.partition_path("prices", last)).unlink()
+    assert main([*root, "build", "--days", str(build_days)]) == 0
+    prices.write_partition("prices", last, last_records)
+    assert main([*root, "update"]) == 0
+
+    store = IndicatorStateStore(tmp_path / "state")
+    assert store.last_date == last
+    codes, expected = _expected_latest(df)
+    assert np.isclose(store.lookup(codes[0])["ema"], expected["ema"][0])
+    assert "applied 1 days" in capsys.readouterr().out
+
+
+__all__ = []  # テストモジュールはエクスポート不要
@@ -0,0 +1,266 @@
+"""
+テクニカル指標 (src.stock_magi.indicators) と Balthasar エージェントのテスト
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from src.common.consensus import ReusableConsensusOrchestrator  # noqa: E402
+from src.common.models import Action  # noqa: E402
+from src.stock_magi.agents import BalthasarAgent, create_balthasar_agent  # noqa: E402
+from src.stock_magi.agents.balthasar_agent import score_indicators  # noqa: E402
+from src.stock_magi.indicators import (  # noqa: E402
+    INDICATOR_NAMES,
+    IndicatorState,
+    atr,
+    bollinger,
+    compute_indicators,
+    ema,
+    macd,
+    point_of_control,
+    rsi,
+    sma,
+    universe_snapshot,
+)
+
+
+@pytest.fixture
+def ohlc():
+    rng = np.random.default_rng(42)
+    close = 100 + np.cumsum(rng.normal(0, 1, (5, 120)), axis=1)
+    high = close + rng.uniform(0, 2, close.shape)
+    low = close - rng.uniform(0, 2, close.shape)
+    # 上場前 (先頭が欠損) と売買停止 (途中の欠損) を含める
+    for a in (high, low, close):
+        a[0, :30] = np.nan
+        a[1, 60] = np.nan
+    return high, low, close
+
+
+def test_matches_pandas_definitions(ohlc):
+    high, low, close = ohlc
+    s = pd.Series(close[2])
+
+    assert np.allclose(sma(close[2], 20), s.rolling(20).mean(), equal_nan=True)
+    assert np.allclose(ema(close[2], 20), s.ewm(span=20, adjust=False).mean())
+
+    line, signal, hist = macd(close[2])
+    expected = s.ewm(span=12, adjust=False).mean() - s.ewm(span=26, adjust=False).mean()
+    assert np.allclose(line, expected)
+    assert np.allclose(signal, expected.ewm(span=9, adjust=False).mean())
+    assert np.allclose(hist, line - signal)
+
+    diff = s.diff()
+    gain = diff.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-diff).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    assert np.allclose(rsi(close[2]), 100 - 100 / (1 + gain / loss), equal_nan=True)
+
+    upper, middle, lower = bollinger(close[2], 20, 2.0)
+    std = s.rolling(20).std(ddof=0)
+    assert np.allclose(upper, middle + 2 * std, equal_nan=True)
+    assert np.allclose(lower, middle - 2 * std, equal_nan=True)
+
+    h, lo, prev = pd.Series(high[2]), pd.Series(low[2]), s.shift()
+    tr = pd.concat([h - lo, (h - prev).abs(), (lo - prev).abs()], axis=1)
+    expected_atr = tr.max(axis=1).ewm(alpha=1 / 14, adjust=False).mean()
+    assert np.allclose(atr(high[2], low[2], close[2]), expected_atr)
+
+
+def test_leading_nan_is_skipped(ohlc):
+    _, _, close = ohlc
+    result = ema(close, 10)
+
+    assert np.isnan(result[0, :30]).all()
+    assert result[0, 30] == close[0, 30]
+
+
+def test_incremental_update_matches_full_recompute(ohlc):
+    high, low, close = ohlc
+    full, _ = compute_indicators(high, low, close)
+
+    _, state = compute_indicators(high[:, :-5], low[:, :-5], close[:, :-5])
+    for t in range(-5, 0):
+        latest = state.update(high[:, t], low[:, t], close[:, t])
+
+    for name in INDICATOR_NAMES:
+        assert np.allclose(latest[name], full[name][:, -1], equal_nan=True), name
+
+
+def test_incremental_update_with_missing_bar(ohlc):
+    high, low, close = ohlc
+    close, high, low = close.copy(), high.copy(), low.copy()
+    for a in (high, low, close):
+        a[3, -2] = np.nan
+    full, _ = compute_indicators(high, low, close)
+
+    _, state = compute_indicators(high[:, :-2], low[:, :-2], close[:, :-2])
+    state.update(high[:, -2], low[:, -2], close[:, -2])
+    latest = state.update(high[:, -1], low[:, -1], close[:, -1])
+
+    for name in INDICATOR_NAMES:
+        assert np.allclose(latest[name], full[name][:, -1], equal_nan=True), name
+
+
+def test_state_roundtrip_through_arrays(ohlc):
+    high, low, close = ohlc
+    _, state = compute_indicators(high, low, close)
+
+    restored = IndicatorState.from_arrays(
+        {k: v.copy() for k, v in state.to_arrays().items()}, state.params
+    )
+
+    assert len(restored) == 5
+    for name, value in state.latest().items():
+        assert np.allclose(restored.latest()[name], value, equal_nan=True)
+
+
+def test_point_of_control():
+    close = np.array([10.0, 10.0, 10.0, 20.0, 30.0])
+    volume = np.array([1.0, 1.0, 1.0, 100.0, 1.0])
+
+    assert 19.0 < point_of_control(close, volume, bins=4) < 25.5
+
+
+def _history(trend: float, days: int = 120) -> pd.DataFrame:
+    start = date(2024, 1, 1)
+    close = 100 + trend * np.arange(days) + np.sin(np.arange(days))
+    return pd.DataFrame(
+        {
+            "Code": "72030",
+            "Date": pd.to_datetime([start + timedelta(days=i) for i in range(days)]),
+            "High": close + 1,
+            "Low": close - 1,
+            "Close": close,
+            "Volume": 1000.0,
+        }
+    )
+
+
+def test_universe_snapshot_one_row_per_code():
+    df = pd.concat([_history(0.5), _history(-0.5).assign(Code="67580")])
+
+    snapshot = universe_snapshot(df)
+
+    assert sorted(snapshot.index) == ["67580", "72030"]
+    assert {"close", "rsi", "macd_hist", "poc"} <= set(snapshot.columns)
+
+
+def _split(df: pd.DataFrame, day: int, ratio: float) -> pd.DataFrame:
+    """day 本目を権利落ち日とする 1:ratio の分割 (以降の株価は 1/ratio、出来高は ratio 倍)"""
+    after = np.arange(len(df)) >= day
+    split = df.copy()
+    split.loc[after, ["High", "Low", "Close"]] /= ratio
+    split.loc[after, "Volume"] *= ratio
+    split["AdjustmentFactor"] = np.where(np.arange(len(df)) == day, 1 / ratio, 1.0)
+    return split
+
+
+async def test_split_inside_window_matches_adjusted_history():
+    df = _history(-0.3)
+    split = _split(df, 100, 5)
+    # 分割前の株価を 1/5 にした (調整済みの) 履歴
+    adjusted = df.assign(
+        High=df["High"] / 5, Low=df["Low"] / 5, Close=df["Close"] / 5, Volume=df["Volume"] * 5
+    )
+
+    snapshot = universe_snapshot(split)
+    expected = universe_snapshot(adjusted)
+
+    assert snapshot.loc["72030", "close"] == pytest.approx(split["Close"].iloc[-1])
+    for column in expected.columns:
+        assert snapshot.loc["72030", column] == pytest.approx(
+            expected.loc["72030", column], nan_ok=True
+        ), column
+    # 調整しなければ分割で急落したように見える
+    raw = universe_snapshot(split.drop(columns="AdjustmentFactor"))
+    assert raw.loc["72030", "rsi"] < snapshot.loc["72030", "rsi"]
+
+    live = await create_balthasar_agent(price_loader=lambda ticker: split).analyze("7203.T")
+    reference = await create_balthasar_agent(price_loader=lambda ticker: adjusted).analyze("7203.T")
+    assert live == reference
+
+
+@pytest.mark.parametrize(
+    "values, expected",
+    [
+        ({"close": 110.0, "sma": 100.0, "macd_hist": 0.5, "rsi": 55.0}, "BUY"),
+        ({"close": 90.0, "sma": 100.0, "macd_hist": -0.5, "rsi": 45.0}, "SELL"),
+        # 上昇トレンドでも RSI 過熱とバンド上限超えで相殺
+        (
+            {
+                "close": 120.0,
+                "sma": 100.0,
+                "macd_hist": 0.5,
+                "rsi": 80.0,
+                "bb_upper": 115.0,
+                "bb_lower": 85.0,
+            },
+            "HOLD",
+        ),
+        ({"close": float("nan"), "sma": float("nan")}, "HOLD"),
+    ],
+)
+def test_score_indicators(values, expected):
+    action, confidence, _ = score_indicators(values)
+
+    assert action == expected
+    assert 0.5 <= confidence <= 0.9
+
+
+async def test_balthasar_analyze_from_price_loader():
+    agent = create_balthasar_agent(price_loader=lambda ticker: _history(0.5))
+
+    result = await agent.analyze("7203.T")
+
+    assert result["action"] in ("BUY", "SELL", "HOLD")
+    assert "終値" in result["reasoning"]
+    assert "RSI" in result["reasoning"]
+
+
+async def test_balthasar_without_data_holds():
+    agent = BalthasarAgent(price_loader=lambda ticker: pd.DataFrame())
+
+    result = await agent.analyze("9999.T")
+
+    assert result["action"] == "HOLD"
+    assert result["confidence"] == 0.0
+
+
+async def test_balthasar_uses_snapshot_and_llm_client():
+    class FakeLLM:
+        def __init__(self):
+            self.prompts = []
+
+        async def analyze(self, key, prompt):
+            self.prompts.append(prompt)
+            return {"action": "SELL", "confidence": 0.6, "reasoning": "LLM 判定"}
+
+    def fail(ticker):
+        raise AssertionError("snapshot にある銘柄は読み込まない")
+
+    llm = FakeLLM()
+    agent = BalthasarAgent(
+        price_loader=fail, llm_client=llm, snapshot=universe_snapshot(_history(0.5))
+    )
+
+    result = await agent.analyze("7203.T")
+
+    assert result["action"] == "SELL"
+    assert "rsi" in llm.prompts[0]
+
+
+async def test_balthasar_in_consensus_orchestrator():
+    agent = create_balthasar_agent(price_loader=lambda ticker: _history(0.5))
+    orchestrator = ReusableConsensusOrchestrator(agents=[agent])
+
+    decision = await orchestrator.reach_consensus({"ticker": "7203.T"})
+
+    assert decision.votes[0].agent_name == "Balthasar"
+    assert decision.final_action == Action((await agent.analyze("7203.T"))["action"])
+
+
+__all__ = []  # テストモジュールはエクスポート不要
@@ -0,0 +1,128 @@
+"""
+J-Quants ETL パイプラインとパーティションストアのテスト
+"""
+
+import asyncio
+from datetime import date
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.mcp_providers.jquants_etl import business_days, plan_jobs, run_etl  # noqa: E402
+from src.mcp_providers.jquants_store import ParquetStore  # noqa: E402
+
+DAYS = business_days(date(2024, 1, 4), date(2024, 1, 9))  # 木, 金, 月, 火
+
+
+class FakeFetcher:
+    """エンドポイントごとに 2 ページ返す fetch (fail_on の日付は失敗させる)"""
+
+    def __init__(self, fail_on: set[str] | None = None, empty: bool = False):
+        self.fail_on = fail_on or set()
+        self.empty = empty
+        self.calls: list[tuple[str, dict]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _pages(self, endpoint, params):
+        self.calls.append((endpoint, params))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            key = params.get("date") or params.get("from") or "snapshot"
+            if key in self.fail_on:
+                raise RuntimeError("upstream 500")
+            await asyncio.sleep(0)
+            if self.empty:
+                return
+            yield [{"Code": "7203", "Date": key, "page": 1}]
+            yield [{"Code": "6758", "Date": key, "page": 2}]
+        finally:
+            self.in_flight -= 1
+
+    def __call__(self, endpoint, params):
+        return self._pages(endpoint, params)
+
+
+def test_business_days_skips_weekends():
+    assert DAYS == [date(2024, 1, 4), date(2024, 1, 5), date(2024, 1, 8), date(2024, 1, 9)]
+
+
+def test_plan_jobs_interleaves_datasets_and_snapshots_last_day_only():
+    jobs = plan_jobs(["prices", "announcement"], DAYS)
+
+    assert jobs[:2] == [("prices", DAYS[0]), ("prices", DAYS[1])]
+    assert jobs[-1] == ("announcement", DAYS[-1])
+    assert sum(1 for name, _ in jobs if name == "announcement") == 1
+
+
+async def test_run_etl_writes_partitions_and_reports_throughput(tmp_path):
+    store = ParquetStore(tmp_path)
+    fetch = FakeFetcher()
+
+    stats = await run_etl(fetch, store, ["prices", "trades_spec"], DAYS, concurrency=3)
+
+    assert stats["prices"].partitions == 4
+    assert stats["prices"].rows == 8
+    assert stats["prices"].pages == 8
+    assert stats["trades_spec"].as_dict()["rows"] == 8
+    assert 1 < fetch.max_in_flight <= 3
+    assert store.partitions("prices") == DAYS
+    assert ("daily_quotes", {"date": "20240104"}) in fetch.calls
+    assert ("trades_spec", {"from": "20240105", "to": "20240105"}) in fetch.calls
+
+    df = store.read("prices", date(2024, 1, 5), date(2024, 1, 8), columns=["Code", "Date"])
+    assert list(df.columns) == ["Code", "Date"]
+    assert len(df) == 4
+
+
+async def test_run_etl_resumes_after_failure(tmp_path):
+    store = ParquetStore(tmp_path)
+
+    first = await run_etl(FakeFetcher(fail_on={"20240108"}), store, ["prices"], DAYS)
+    assert first["prices"].failed == 1
+    assert not store.has_partition("prices", date(2024, 1, 8))
+
+    retry = FakeFetcher()
+    second = await run_etl(retry, store, ["prices"], DAYS)
+
+    assert second["prices"].skipped == 3
+    assert second["prices"].partitions == 1
+    assert retry.calls == [("daily_quotes", {"date": "20240108"})]
+
+
+async def test_run_etl_rejects_unknown_dataset(tmp_path):
+    with pytest.raises(ValueError):
+        await run_etl(FakeFetcher(), ParquetStore(tmp_path), ["nope"], DAYS)
+
+
+async def test_run_etl_does_not_mark_recent_empty_days_as_fetched(tmp_path):
+    store = ParquetStore(tmp_path)
+    today = date(2024, 1, 9)
+
+    first = await run_etl(
+        FakeFetcher(empty=True), store, ["prices"], DAYS, today=today, empty_final_days=3
+    )
+    # 当日公開前・配信遅延の 0 件は保存せず、確定した古い日 (祝日扱い) だけ空で保存する
+    assert first["prices"].deferred == 2
+    assert store.partitions("prices") == DAYS[:2]
+
+    retry = FakeFetcher()
+    second = await run_etl(retry, store, ["prices"], DAYS, today=today, empty_final_days=3)
+
+    assert second["prices"].skipped == 2
+    assert [params["date"] for _, params in retry.calls] == ["20240108", "20240109"]
+    assert len(store.read("prices")) == 4
+
+
+def test_store_empty_partition_counts_as_fetched(tmp_path):
+    store = ParquetStore(tmp_path)
+
+    assert store.write_partition("prices", date(2024, 1, 1), []) == 0
+    assert store.has_partition("prices", date(2024, 1, 1))
+    assert store.read("prices").empty
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+__all__ = []  # テストモジュールはエクスポート不要
@@ -0,0 +1,190 @@
+"""
+信用残・空売り残高の特徴量 (src.mcp_providers.jquants_features) のテスト
+"""
+
+import math
+from datetime import date, timedelta
+
+import httpx
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from src.mcp_providers.jquants_features import (  # noqa: E402
+    FeatureStore,
+    build_features,
+    feature_signal,
+    get_feature_store,
+    main,
+    margin_features,
+    short_position_features,
+)
+from src.mcp_providers.jquants_store import ParquetStore  # noqa: E402
+from src.stock_magi.agents import CasperAgent  # noqa: E402
+from src.stock_magi.sentiment import DocumentScoreCache  # noqa: E402
+
+AS_OF = date(2024, 6, 28)
+FRIDAYS = [AS_OF - timedelta(weeks=i) for i in range(11, -1, -1)]
+
+
+def _margin(long_last: float = 300_000.0) -> pd.DataFrame:
+    """72030 は最終週に買い残が急増、67580 は横ばい"""
+    rows = []
+    for i, day in enumerate(FRIDAYS):
+        last = i == len(FRIDAYS) - 1
+        rows.append(
+            {
+                "Code": "72030",
+                "Date": day.isoformat(),
+                "LongMarginTradeVolume": long_last if last else 100_000.0 + 1_000 * (i % 3),
+                "ShortMarginTradeVolume": 50_000.0,
+            }
+        )
+        rows.append(
+            {
+                "Code": "67580",
+                "Date": day.isoformat(),
+                "LongMarginTradeVolume": 80_000.0,
+                "ShortMarginTradeVolume": 40_000.0,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def _shorts() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            # 4 週間前から保有、直近で積み増し
+            ("72030", "2024-05-20", "Fund A", 0.006),
+            ("72030", "2024-06-20", "Fund A", 0.012),
+            # 新規の報告
+            ("72030", "2024-06-25", "Fund B", 0.008),
+            # 報告義務未満 (解消)
+            ("72030", "2024-06-26", "Fund C", 0.004),
+            # 基準日より後は含めない
+            ("72030", "2024-07-05", "Fund D", 0.05),
+        ],
+        columns=[
+            "Code",
+            "CalculatedDate",
+            "ShortSellerName",
+            "ShortPositionsToSharesOutstandingRatio",
+        ],
+    )
+
+
+def test_margin_features_ratio_and_zscore():
+    table = margin_features(_margin())
+
+    toyota = table.loc["72030"]
+    assert toyota["margin_date"] == AS_OF.isoformat()
+    assert toyota["margin_ratio"] == 6.0
+    assert toyota["long_margin_z"] > 3
+    assert toyota["long_margin_change_1w"] > 1.5
+    assert toyota["margin_ratio_change_4w"] == pytest.approx(6.0 - 101_000 / 50_000)
+    # 変動が無い系列の z スコアは NaN
+    assert math.isnan(table.loc["67580", "long_margin_z"])
+    assert table.loc["67580", "margin_ratio"] == 2.0
+
+
+def test_short_position_features_latest_per_holder():
+    table = short_position_features(_shorts(), AS_OF)
+
+    row = table.loc["72030"]
+    assert row["short_ratio"] == pytest.approx(0.02)
+    assert row["short_holders"] == 2
+    assert row["short_date"] == "2024-06-25"
+    assert row["short_ratio_change_4w"] == pytest.approx(0.014)
+
+
+def test_feature_signal_direction():
+    assert feature_signal({"long_margin_z": 3.0, "short_ratio_change_4w": 0.02}) < -0.5
+    assert feature_signal({"short_margin_z": 3.0}) > 0
+    assert feature_signal({"long_margin_z": math.nan}) == 0.0
+
+
+def _seed(store: ParquetStore) -> None:
+    margin = _margin()
+    for day, rows in margin.groupby("Date"):
+        store.write_partition(
+            "weekly_margin_interest", date.fromisoformat(day), rows.to_dict("records")
+        )
+    for day, rows in _shorts().groupby("CalculatedDate"):
+        store.write_partition(
+            "short_selling_positions", date.fromisoformat(day), rows.to_dict("records")
+        )
+
+
+def test_build_and_store_features(tmp_path):
+    store = ParquetStore(tmp_path / "jquants")
+    _seed(store)
+
+    table = build_features(store, AS_OF)
+    features = FeatureStore(tmp_path / "features.sqlite3")
+    assert features.replace(table, AS_OF) == 2
+
+    toyota = features.get("7203.T")
+    assert toyota["code"] == "72030"
+    assert toyota["as_of"] == AS_OF.isoformat()
+    assert toyota["short_holders"] == 2
+    assert toyota["signal"] < 0
+    sony = features.get("6758")
+    assert sony["short_ratio"] is None
+    assert sony["long_margin_z"] is None
+    assert features.get("9999.T") is None
+
+    # 再計算は全件入れ替え
+    assert features.replace(table.loc[["67580"]], AS_OF) == 1
+    assert features.count() == 1
+    assert features.get("7203.T") is None
+
+
+@pytest.fixture
+def feature_db(tmp_path, monkeypatch):
+    store = ParquetStore(tmp_path / "jquants")
+    _seed(store)
+    db = tmp_path / "features.sqlite3"
+    monkeypatch.setenv("JQUANTS_FEATURE_DB", str(db))
+    get_feature_store.cache_clear()
+    assert main(["--root", str(store.root), "--as-of", AS_OF.isoformat()]) == 0
+    yield db
+    get_feature_store.cache_clear()
+
+
+async def test_features_endpoint(feature_db):
+    from src.mcp_providers.jquants_mcp import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        found = await client.get("/tools/jquants/features/7203.T")
+        missing = await client.get("/tools/jquants/features/9999")
+
+    assert found.status_code == 200
+    assert found.json()["features"]["margin_ratio"] == 6.0
+    assert missing.status_code == 404
+
+
+async def test_casper_blends_feature_signal(feature_db):
+    store = get_feature_store()
+
+    # 文書が無くても需給シグナルだけで判定する
+    alone = await CasperAgent(feature_store=store).analyze("7203.T")
+    assert alone["action"] == "SELL"
+    assert 0.5 < alone["confidence"] <= 0.6
+    assert "信用倍率" in alone["reasoning"]
+
+    # 弱いポジティブ文書は需給悪化で打ち消される
+    agent = CasperAgent(
+        lambda t: ["受注が好調"], score_cache=DocumentScoreCache(), feature_store=store
+    )
+    blended = await agent.analyze("7203.T")
+    plain = await CasperAgent(lambda t: ["受注が好調"], score_cache=DocumentScoreCache()).analyze(
+        "7203.T"
+    )
+    assert plain["action"] == "BUY"
+    assert blended["action"] == "HOLD"
+    assert "空売り比率" in blended["reasoning"]
+
+
+__all__ = []  # テストモジュールはエクスポート不要
@@ -0,0 +1,142 @@
+"""
+株価履歴エンドポイント (/tools/jquants/history) とリサンプルのテスト
+"""
+
+from datetime import date, timedelta
+
+import httpx
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pytest.importorskip("pandas")
+
+from src.mcp_providers.jquants_history import load_history, normalize_code  # noqa: E402
+from src.mcp_providers.jquants_store import ParquetStore  # noqa: E402
+
+
+def _seed_prices(store: ParquetStore, codes=("72030", "67580"), days=40) -> None:
+    """2024-01-01 から平日の日足を書き込む (Close は日ごとに +1)"""
+    day = date(2024, 1, 1)
+    n = 0
+    while n < days:
+        if day.weekday() < 5:
+            store.write_partition(
+                "prices",
+                day,
+                [
+                    {
+                        "Code": code,
+                        "Date": day.isoformat(),
+                        "Open": 100.0 + n,
+                        "High": 110.0 + n,
+                        "Low": 90.0 + n,
+                        "Close": 105.0 + n,
+                        "Volume": 1000.0,
+                    }
+                    for code in codes
+                ],
+            )
+            n += 1
+        day += timedelta(days=1)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("JQUANTS_STORE_ROOT", str(tmp_path))
+    store = ParquetStore(tmp_path)
+    _seed_prices(store)
+    return store
+
+
+def test_normalize_code():
+    assert normalize_code("7203.T") == ["7203", "72030"]
+    assert normalize_code("72030") == ["72030", "7203"]
+
+
+def test_load_history_daily_filters_codes_and_columns(store):
+    df = load_history(store, ["7203.T"], date(2024, 1, 8), date(2024, 1, 12), columns=["Close"])
+
+    assert list(df.columns) == ["Code", "Date", "Close"]
+    assert set(df["Code"]) == {"72030"}
+    assert len(df) == 5
+
+
+def test_load_history_weekly_ohlcv(store):
+    df = load_history(store, ["7203"], date(2024, 1, 1), date(2024, 1, 12), interval="W")
+
+    assert len(df) == 2
+    first = df.iloc[0]
+    # 2024-01-01 (月) 〜 01-05 (金) の 5 営業日 (n = 0..4)
+    assert first["Date"].date() == date(2024, 1, 5)
+    assert first["Open"] == 100.0
+    assert first["High"] == 114.0
+    assert first["Low"] == 90.0
+    assert first["Close"] == 109.0
+    assert first["Volume"] == 5000.0
+
+
+def test_load_history_monthly_uses_last_trading_day(store):
+    df = load_history(store, ["6758"], interval="M")
+
+    assert [d.date() for d in df["Date"]] == [date(2024, 1, 31), date(2024, 2, 23)]
+    assert df.iloc[0]["Volume"] == 23 * 1000.0
+
+
+def test_load_history_rejects_unknown_interval(store):
+    with pytest.raises(ValueError):
+        load_history(store, ["7203"], interval="Q")
+
+
+@pytest.fixture
+def client(store):
+    from src.mcp_providers.jquants_mcp import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_history_endpoint_json_gzip(client):
+    async with client:
+        response = await client.get(
+            "/tools/jquants/history",
+            params={"tickers": "7203.T,6758.T", "interval": "D"},
+            headers={"Accept-Encoding": "gzip"},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    body = response.json()
+    assert body["count"] == 80
+    assert body["columns"][:2] == ["Code", "Date"]
+    assert body["data"][0]["Date"] == "2024-01-01"
+
+
+async def test_history_endpoint_arrow_stream(client):
+    async with client:
+        response = await client.get(
+            "/tools/jquants/history",
+            params={"tickers": "7203", "interval": "W", "columns": "Close", "format": "arrow"},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column_names == ["Code", "Date", "Close"]
+    assert table.num_rows == 8
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"tickers": ""},
+        {"tickers": "7203", "start": "2024-02-01", "end": "2024-01-01"},
+        {"tickers": "7203", "interval": "Y"},
+    ],
+)
+async def test_history_endpoint_rejects_bad_params(client, params):
+    async with client:
+        response = await client.get("/tools/jquants/history", params=params)
+
+    assert response.status_code in (400, 422)
+
+
+__all__ = []  # テストモジュールはエクスポート不要
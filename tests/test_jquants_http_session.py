@@ -0,0 +1,154 @@
+"""
+J-Quants HTTP セッション・リトライポリシーのテスト
+"""
+
+import httpx
+import pytest
+import requests
+
+from sample.http_session import (
+    IdTokenCache,
+    RetryPolicy,
+    arequest_with_retry,
+    backoff_delay,
+    create_session,
+    parse_retry_after,
+    request_with_retry,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+class ScriptedSession:
+    """事前に決めた応答 (または例外) を順に返すセッション"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_backoff_delay_is_bounded_full_jitter():
+    policy = RetryPolicy(backoff_base=1.0, backoff_max=10.0)
+
+    assert backoff_delay(0, policy, rand=lambda: 1.0) == 1.0
+    assert backoff_delay(3, policy, rand=lambda: 0.5) == 4.0
+    assert backoff_delay(10, policy, rand=lambda: 1.0) == 10.0
+    assert backoff_delay(2, policy, rand=lambda: 0.0) == 0.0
+
+
+def test_backoff_delay_prefers_retry_after():
+    policy = RetryPolicy(backoff_max=30.0)
+
+    assert backoff_delay(0, policy, retry_after=7.0) == 7.0
+    assert backoff_delay(0, policy, retry_after=120.0) == 30.0
+
+
+def test_parse_retry_after_formats():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_request_with_retry_honors_429_retry_after():
+    session = ScriptedSession(
+        FakeResponse(429, {"Retry-After": "3"}), FakeResponse(503), FakeResponse(200)
+    )
+    sleeps: list[float] = []
+
+    response = request_with_retry(
+        session, "GET", "https://example.test", RetryPolicy(backoff_base=0.1), sleep=sleeps.append
+    )
+
+    assert response.status_code == 200
+    assert session.calls == 3
+    assert sleeps[0] == 3.0
+    assert 0.0 <= sleeps[1] <= 0.2
+
+
+def test_request_with_retry_gives_up_and_returns_last_response():
+    session = ScriptedSession(*(FakeResponse(500) for _ in range(3)))
+
+    response = request_with_retry(
+        session, "GET", "https://example.test", RetryPolicy(max_retries=2), sleep=lambda s: None
+    )
+
+    assert response.status_code == 500
+    assert session.calls == 3
+
+
+def test_request_with_retry_does_not_retry_client_errors():
+    session = ScriptedSession(FakeResponse(404))
+
+    assert request_with_retry(session, "GET", "https://x", sleep=lambda s: None).status_code == 404
+    assert session.calls == 1
+
+
+def test_request_with_retry_reraises_connection_error_after_retries():
+    session = ScriptedSession(requests.ConnectionError(), requests.ConnectionError())
+
+    with pytest.raises(requests.ConnectionError):
+        request_with_retry(
+            session, "GET", "https://x", RetryPolicy(max_retries=1), sleep=lambda s: None
+        )
+
+
+async def test_arequest_with_retry_with_httpx():
+    statuses = iter([429, 200])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(next(statuses), headers={"Retry-After": "1"})
+
+    sleeps: list[float] = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        response = await arequest_with_retry(client, "GET", "https://x", sleep=fake_sleep)
+
+    assert response.status_code == 200
+    assert sleeps == [1.0]
+
+
+def test_id_token_cache_expires():
+    now = [0.0]
+    fetched: list[str] = []
+
+    def fetch():
+        fetched.append("t")
+        return f"token-{len(fetched)}"
+
+    cache = IdTokenCache(ttl=100.0, clock=lambda: now[0])
+
+    assert cache.get(fetch) == "token-1"
+    now[0] = 99.0
+    assert cache.get(fetch) == "token-1"
+    now[0] = 100.0
+    assert cache.get(fetch) == "token-2"
+    cache.invalidate()
+    assert cache.get(fetch) == "token-3"
+
+
+def test_create_session_mounts_bounded_pool():
+    session = create_session(pool_size=4)
+    adapter = session.get_adapter("https://api.jquants.com")
+
+    assert adapter._pool_maxsize == 4
+
+
+__all__ = []  # テストモジュールはエクスポート不要
@@ -0,0 +1,130 @@
+"""
+J-Quants ページネーション対応フェッチャーのテスト
+"""
+
+import logging
+
+import httpx
+import pytest
+
+from sample.pagination import (
+    ENDPOINTS,
+    PaginationError,
+    aiter_pages,
+    iter_pages,
+    records_to_dataframe,
+)
+
+PAGES = {
+    None: {"trades_spec": [{"Date": "2024-01-04", "Section": "A"}], "pagination_key": "k1"},
+    "k1": {"trades_spec": [{"Date": "2024-01-05", "Section": "B"}], "pagination_key": "k2"},
+    "k2": {"trades_spec": [{"Date": "2024-01-09", "Section": "C"}]},
+}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        return None
+
+    def json(self):
+        return self._payload
+
+
+class FakeGet:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls: list[dict] = []
+
+    def __call__(self, url, headers=None, params=None, timeout=None):
+        self.calls.append(dict(params))
+        return FakeResponse(self.pages[params.get("pagination_key")])
+
+    def request(self, method, url, **kwargs):
+        return self(url, **kwargs)
+
+
+def test_iter_pages_follows_pagination_key():
+    get = FakeGet(PAGES)
+
+    batches = list(iter_pages(get, ENDPOINTS["trades_spec"], {}, {"from": "20240101"}))
+
+    assert [b[0]["Section"] for b in batches] == ["A", "B", "C"]
+    assert get.calls == [
+        {"from": "20240101"},
+        {"from": "20240101", "pagination_key": "k1"},
+        {"from": "20240101", "pagination_key": "k2"},
+    ]
+
+
+def test_iter_pages_streams_lazily():
+    get = FakeGet(PAGES)
+    pages = iter_pages(get, ENDPOINTS["trades_spec"], {})
+
+    next(pages)
+    assert len(get.calls) == 1
+
+
+def test_iter_pages_detects_pagination_cycle():
+    looping = {
+        None: {"trades_spec": [], "pagination_key": "k"},
+        "k": {"trades_spec": [], "pagination_key": "k"},
+    }
+
+    with pytest.raises(PaginationError):
+        list(iter_pages(FakeGet(looping), ENDPOINTS["trades_spec"], {}))
+
+
+def test_iter_pages_missing_response_key():
+    with pytest.raises(ValueError, match="想定キー"):
+        list(iter_pages(FakeGet({None: {"message": "x"}}), ENDPOINTS["trades_spec"], {}))
+
+
+async def test_aiter_pages_with_httpx():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/v1/markets/trades_spec"
+        return httpx.Response(200, json=PAGES[request.url.params.get("pagination_key")])
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        batches = [b async for b in aiter_pages(client.get, ENDPOINTS["trades_spec"], {})]
+
+    assert sum(len(b) for b in batches) == 3
+
+
+def test_client_fallback_concatenates_all_pages():
+    pytest.importorskip("pandas")
+    import sample.client as client_module
+    from sample.http_session import IdTokenCache, RetryPolicy
+
+    get = FakeGet(PAGES)
+
+    class TokenOnlyClient:
+        def get_id_token(self):
+            return "token"
+
+    api = object.__new__(client_module.JQuantsAPIClient)
+    api.logger = logging.getLogger("test")
+    api.client = TokenOnlyClient()
+    api.session = get
+    api.retry_policy = RetryPolicy()
+    api.rate_limiter = None
+    api._id_token = IdTokenCache()
+
+    df = api.get_trades_spec(start_date="20240101", end_date="20240110")
+
+    assert list(df["Section"]) == ["A", "B", "C"]
+    assert str(df["Date"].dtype).startswith("datetime64")
+    assert get.calls[0] == {"from": "20240101", "to": "20240110"}
+
+
+def test_records_to_dataframe_empty():
+    pytest.importorskip("pandas")
+
+    assert records_to_dataframe([[], []]).empty
+
+
+__all__ = []  # テストモジュールはエクスポート不要
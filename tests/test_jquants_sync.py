@@ -0,0 +1,179 @@
+"""
+J-Quants 差分同期 (ウォーターマーク + 自然キーでのマージ) のテスト
+"""
+
+from datetime import date
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.mcp_providers.jquants_store import ParquetStore  # noqa: E402
+from src.mcp_providers.jquants_sync import DeltaSync, WatermarkStore  # noqa: E402
+
+
+class FakeUpstream:
+    """エンドポイント別のレコードを保持し、クエリに応じて絞り込んで返す"""
+
+    def __init__(self, data: dict[str, list[dict]]):
+        self.data = data
+        self.calls: list[tuple[str, dict]] = []
+
+    def __call__(self, endpoint, params):
+        self.calls.append((endpoint, dict(params)))
+        return self._pages(endpoint, params)
+
+    async def _pages(self, endpoint, params):
+        rows = self.data.get(endpoint, [])
+        if "code" in params:
+            rows = [r for r in rows if r["Code"] == params["code"]]
+        if "date" in params:
+            rows = [r for r in rows if _ymd(r) == params["date"]]
+        if "from" in params:
+            rows = [r for r in rows if params["from"] <= _ymd(r) <= params["to"]]
+        yield rows
+
+
+def _ymd(record: dict) -> str:
+    value = record.get("Date") or record.get("DisclosedDate")
+    return value.replace("-", "")
+
+
+def _quote(code: str, day: str, close: float) -> dict:
+    return {"Code": code, "Date": day, "Close": close}
+
+
+async def test_range_sync_only_requests_from_watermark_day(tmp_path):
+    upstream = FakeUpstream(
+        {"daily_quotes": [_quote("7203", "2024-01-04", 100.0), _quote("7203", "2024-01-05", 101.0)]}
+    )
+    sync = DeltaSync(upstream, ParquetStore(tmp_path), lookback_days=10)
+
+    first = await sync.sync("prices", today=date(2024, 1, 5))
+    assert first.written == 2
+    assert first.watermark == date(2024, 1, 5)
+
+    upstream.data["daily_quotes"].append(_quote("7203", "2024-01-09", 102.0))
+    upstream.calls.clear()
+    second = await sync.sync("prices", today=date(2024, 1, 9))
+
+    # 全銘柄は date= でウォーターマークの日以降の営業日ごとに取得する (code も date も無いクエリは送らない)
+    assert upstream.calls == [
+        ("daily_quotes", {"date": "20240105"}),
+        ("daily_quotes", {"date": "20240108"}),
+        ("daily_quotes", {"date": "20240109"}),
+    ]
+    assert second.fetched == 2
+    assert second.written == 1
+    assert len(sync.store.read("prices")) == 3
+
+    upstream.calls.clear()
+    await sync.sync("prices", code="7203", today=date(2024, 1, 9))
+    assert upstream.calls == [
+        ("daily_quotes", {"code": "7203", "from": "20231230", "to": "20240109"})
+    ]
+
+
+async def test_resync_when_up_to_date_writes_nothing(tmp_path):
+    upstream = FakeUpstream({"daily_quotes": [_quote("7203", "2024-01-05", 101.0)]})
+    sync = DeltaSync(upstream, ParquetStore(tmp_path), lookback_days=3)
+    await sync.sync("prices", today=date(2024, 1, 5))
+    upstream.calls.clear()
+
+    result = await sync.sync("prices", today=date(2024, 1, 5))
+
+    assert upstream.calls == [("daily_quotes", {"date": "20240105"})]
+    assert result.written == 0
+
+
+async def test_same_day_sync_picks_up_later_disclosures(tmp_path):
+    statements = [{"DisclosedNumber": "1", "Code": "7203", "DisclosedDate": "2024-01-04"}]
+    upstream = FakeUpstream({"statements": statements})
+    store = ParquetStore(tmp_path)
+    sync = DeltaSync(upstream, store, lookback_days=1)
+
+    morning = await sync.sync("statements", today=date(2024, 1, 4))
+    assert morning.watermark == date(2024, 1, 4)
+
+    # 同じ日の 15 時以降に公開された開示
+    statements.append({"DisclosedNumber": "2", "Code": "6758", "DisclosedDate": "2024-01-04"})
+    evening = await sync.sync("statements", today=date(2024, 1, 4))
+
+    assert evening.written == 1
+    assert sorted(store.read("statements")["DisclosedNumber"]) == ["1", "2"]
+
+    # 銘柄別の同期も同じ日を取り直す
+    statements.append({"DisclosedNumber": "3", "Code": "7203", "DisclosedDate": "2024-01-05"})
+    await sync.sync("statements", code="7203", today=date(2024, 1, 5))
+    statements.append({"DisclosedNumber": "4", "Code": "7203", "DisclosedDate": "2024-01-05"})
+    assert (await sync.sync("statements", code="7203", today=date(2024, 1, 5))).written == 1
+
+
+async def test_by_date_sync_dedups_on_natural_key_and_applies_corrections(tmp_path):
+    statements = [
+        {"DisclosedNumber": "1", "Code": "7203", "DisclosedDate": "2024-01-04", "EPS": "10"},
+        {"DisclosedNumber": "2", "Code": "6758", "DisclosedDate": "2024-01-04", "EPS": "20"},
+    ]
+    store = ParquetStore(tmp_path)
+    sync = DeltaSync(FakeUpstream({"statements": statements}), store, lookback_days=1)
+    await sync.sync("statements", today=date(2024, 1, 4))
+
+    # 同じ行の再取得は書き込まない / 訂正は置き換える
+    assert (
+        store.merge_partition("statements", date(2024, 1, 4), statements, ["DisclosedNumber"]) == 0
+    )
+    corrected = [{**statements[0], "EPS": "11"}]
+    assert (
+        store.merge_partition("statements", date(2024, 1, 4), corrected, ["DisclosedNumber"]) == 1
+    )
+
+    df = store.read("statements")
+    assert len(df) == 2
+    assert df.set_index("DisclosedNumber").loc["1", "EPS"] == "11"
+
+
+async def test_per_code_watermarks_are_independent(tmp_path):
+    upstream = FakeUpstream(
+        {
+            "statements": [
+                {"DisclosedNumber": "1", "Code": "7203", "DisclosedDate": "2024-01-04"},
+                {"DisclosedNumber": "2", "Code": "6758", "DisclosedDate": "2024-01-05"},
+            ]
+        }
+    )
+    sync = DeltaSync(upstream, ParquetStore(tmp_path), lookback_days=30)
+
+    results = await sync.sync_many(["statements"], codes=["7203", "6758"], today=date(2024, 1, 9))
+
+    assert {r.code: r.written for r in results} == {"7203": 1, "6758": 1}
+    assert sync.watermarks.get("statements", "7203") == date(2024, 1, 4)
+    assert sync.watermarks.get("statements", "6758") == date(2024, 1, 5)
+    assert sync.watermarks.get("statements") is None
+
+
+async def test_snapshot_sync_upserts_current_table(tmp_path):
+    upstream = FakeUpstream(
+        {"listed_info": [{"Code": "7203", "Date": "2024-01-04", "CompanyName": "TOYOTA"}]}
+    )
+    store = ParquetStore(tmp_path)
+    sync = DeltaSync(upstream, store)
+
+    assert (await sync.sync("listed_info", today=date(2024, 1, 4))).written == 1
+    assert (await sync.sync("listed_info", today=date(2024, 1, 5))).written == 0
+
+    upstream.data["listed_info"].append(
+        {"Code": "6758", "Date": "2024-01-05", "CompanyName": "SONY"}
+    )
+    assert (await sync.sync("listed_info", today=date(2024, 1, 5))).written == 1
+    assert sorted(store.read_current("listed_info")["Code"]) == ["6758", "7203"]
+
+
+def test_watermark_store_persists(tmp_path):
+    path = tmp_path / "wm.json"
+    WatermarkStore(path).set("prices", date(2024, 1, 5), code="7203")
+
+    assert WatermarkStore(path).get("prices", "7203") == date(2024, 1, 5)
+    assert WatermarkStore(path).get("prices") is None
+
+
+__all__ = []  # テストモジュールはエクスポート不要
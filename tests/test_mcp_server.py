@@ -0,0 +1,203 @@
+"""
+合議エンジンの MCP サーバー (src.stock_magi.mcp_server) のテスト
+"""
+
+import asyncio
+import io
+import json
+import sys
+import time
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.common.agent_registry import AgentRegistry
+from src.common.cache import InMemoryCache
+from src.common.mcp import FoundryToolRegistry
+from src.common.mcp.foundry_tool_registry import FoundryHTTPTool
+from src.common.mcp.server_pool import HTTPSession, MCPServerConfig, MCPServerPool, MCPTool
+from src.stock_magi.analysis import AnalysisService
+from src.stock_magi.mcp_server import MAGIMCPServer, serve_stdio
+
+AGENTS = {
+    "default_panel": ["melchior"],
+    "agents": {
+        "melchior": {
+            "factory": "src.stock_magi.agents.melchior_agent:create_melchior_agent",
+            "tools": ["morningstar"],
+        },
+        "balthasar": {
+            "factory": "src.stock_magi.agents.balthasar_agent:create_balthasar_agent",
+        },
+    },
+}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    async def fake_fundamentals(self, ticker):
+        await asyncio.sleep(0.2)
+        per = 8.0 if ticker.startswith("7") else 40.0
+        return {"ticker": ticker, "per": per, "pbr": 0.8, "roe": 0.15}
+
+    monkeypatch.setattr(FoundryHTTPTool, "get_fundamentals", fake_fundamentals)
+    service = AnalysisService(
+        FoundryToolRegistry(cache=InMemoryCache()),
+        AgentRegistry.from_config(AGENTS),
+        decision_cache_ttl=0,
+    )
+    monkeypatch.setattr("src.stock_magi.analysis.default_analysis_service", lambda: service)
+    return service
+
+
+def _request(request_id, method, params=None):
+    message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+    if params is not None:
+        message["params"] = params
+    return message
+
+
+async def _stdio(messages):
+    stdin = io.BytesIO(b"".join(json.dumps(m).encode() + b"\n" for m in messages) + b"{oops\n")
+    stdout = io.BytesIO()
+    await serve_stdio(MAGIMCPServer(), stdin, stdout)
+    return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+async def test_stdio_protocol_and_tool_errors(service):
+    replies = await _stdio(
+        [
+            _request(1, "initialize", {"protocolVersion": "2024-11-05", "capabilities": {}}),
+            {"jsonrpc": "2.0", "method": "notifications/initialized"},
+            _request(2, "tools/list"),
+            _request(3, "tools/call", {"name": "analyze_stock", "arguments": {}}),
+            _request(
+                4,
+                "tools/call",
+                {"name": "analyze_stock", "arguments": {"ticker": "7203.T", "agents": ["x"]}},
+            ),
+            _request(5, "resources/list"),
+            _request(6, "tools/call", {"name": "list_agents"}),
+        ]
+    )
+    by_id = {r.get("id"): r for r in replies}
+
+    assert by_id[1]["result"]["protocolVersion"] == "2024-11-05"
+    assert by_id[1]["result"]["serverInfo"]["name"] == "stock-magi"
+    tools = [t["name"] for t in by_id[2]["result"]["tools"]]
+    assert tools == ["analyze_stock", "analyze_batch", "list_agents"]
+    assert by_id[3]["error"]["code"] == -32602
+    assert by_id[4]["result"]["isError"] is True
+    assert "not found" in by_id[4]["result"]["structuredContent"]["error"]
+    assert by_id[5]["error"]["code"] == -32601
+    assert by_id[6]["result"]["structuredContent"]["default_panel"] == ["melchior"]
+    assert by_id[None]["error"]["code"] == -32700
+    # 通知には応答しない
+    assert len(replies) == 7
+
+
+async def test_batch_streams_votes_and_runs_concurrently(service):
+    tickers = ["7203.T", "6758.T", "7267.T", "6501.T", "7974.T"]
+    params = {
+        "name": "analyze_batch",
+        "arguments": {"tickers": tickers, "agents": ["melchior", "balthasar"], "concurrency": 5},
+        "_meta": {"progressToken": "batch-1"},
+    }
+
+    started = time.perf_counter()
+    replies = await _stdio([_request(1, "tools/call", params)])
+    elapsed = time.perf_counter() - started
+
+    progress = [r["params"] for r in replies if r.get("method") == "notifications/progress"]
+    result = next(r for r in replies if r.get("id") == 1)["result"]["structuredContent"]
+    votes = [json.loads(p["message"]) for p in progress]
+    assert [p["progress"] for p in progress] == list(range(1, 11))
+    assert {p["progressToken"] for p in progress} == {"batch-1"}
+    assert sorted((v["ticker"], v["agent"]) for v in votes) == sorted(
+        (t, a) for t in tickers for a in ("Melchior", "Balthasar")
+    )
+    assert [r["ticker"] for r in result["results"]] == tickers
+    assert result["results"][0]["final_action"] == "BUY"
+    assert all(len(r["reasoning"]) == 2 for r in result["results"])
+    # 0.2 秒のデータ取得 x 5 銘柄を並行に処理する
+    assert elapsed < 0.9
+
+
+async def test_http_transport_shares_the_app(service):
+    from src.main import app
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        session = HTTPSession(
+            MCPServerConfig(name="magi", url="http://test/mcp"), http_client=client
+        )
+        await session.start()
+        result = await session.request(
+            "tools/call", {"name": "analyze_stock", "arguments": {"ticker": "7203.T"}}
+        )
+        streamed = await client.post(
+            "/mcp",
+            json=_request(
+                9,
+                "tools/call",
+                {
+                    "name": "analyze_stock",
+                    "arguments": {"ticker": "6758.T", "include_reasoning": False},
+                    "_meta": {"progressToken": 1},
+                },
+            ),
+            headers={"Accept": "application/json, text/event-stream"},
+        )
+        notification = await client.post(
+            "/mcp", json={"jsonrpc": "2.0", "method": "notifications/initialized"}
+        )
+        stream_get = await client.get("/mcp")
+
+    events = HTTPSession._messages(streamed)
+    assert result["structuredContent"]["final_action"] == "BUY"
+    assert json.loads(result["content"][0]["text"])["ticker"] == "7203.T"
+    assert streamed.headers["content-type"].startswith("text/event-stream")
+    assert events[0]["method"] == "notifications/progress"
+    assert json.loads(events[0]["params"]["message"])["agent"] == "Melchior"
+    assert events[-1]["id"] == 9
+    assert events[-1]["result"]["structuredContent"]["reasoning"] is None
+    assert notification.status_code == 202
+    assert stream_get.status_code == 405
+
+
+async def test_stdio_entry_point_subprocess():
+    config = MCPServerConfig(
+        name="magi",
+        command=sys.executable,
+        args=("-m", "src.stock_magi.mcp_server"),
+        env={"AUDIT_BACKEND": "none"},
+    )
+    pool = MCPServerPool(config, size=1, start_timeout=30.0)
+    tool = MCPTool("magi", pool)
+
+    try:
+        names = [t["name"] for t in await tool.list_tools()]
+        agents = await tool.call("list_agents")
+    finally:
+        await pool.aclose()
+
+    assert "analyze_batch" in names
+    assert agents["default_panel"] == ["melchior"]
+
+
+async def test_http_parse_errors():
+    from src.main import app
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        broken = await client.post("/mcp", content=b"{oops")
+        batch = await client.post("/mcp", json=[_request(1, "ping")])
+        ping = await client.post("/mcp", json=_request(2, "ping"))
+
+    assert broken.status_code == 400
+    assert broken.json()["error"]["code"] == -32700
+    assert batch.json()["error"]["code"] == -32600
+    assert ping.json() == {"jsonrpc": "2.0", "id": 2, "result": {}}
+
+
+__all__ = []  # テストモジュールはエクスポート不要
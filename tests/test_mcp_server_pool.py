@@ -0,0 +1,205 @@
+"""
+MCP サーバープール (src.common.mcp.server_pool) のテスト
+
+stdio サーバーは最小限の MCP サーバー (下の FAKE_SERVER) をサブプロセスとして起動して確認する。
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+import pytest
+
+from src.common.mcp import FoundryToolRegistry
+from src.common.mcp.server_pool import (
+    HTTPSession,
+    MCPConnectionError,
+    MCPError,
+    MCPServerConfig,
+    MCPServerManager,
+    MCPServerPool,
+    MCPSettings,
+    MCPTool,
+    create_mcp_server_manager,
+    load_server_configs,
+)
+
+FAKE_SERVER = r"""
+import json, os, sys, threading, time
+
+lock = threading.Lock()
+
+def send(message):
+    with lock:
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+def handle(message):
+    params = message.get("params") or {}
+    if message["method"] == "initialize":
+        result = {"protocolVersion": params["protocolVersion"], "capabilities": {"tools": {}},
+                  "serverInfo": {"name": "fake", "pid": os.getpid()}}
+    elif message["method"] == "tools/list":
+        if params.get("cursor"):
+            result = {"tools": [{"name": "crash"}]}
+        else:
+            result = {"tools": [{"name": "echo"}, {"name": "slow"}], "nextCursor": "2"}
+    else:
+        name, args = params["name"], params.get("arguments", {})
+        if name == "crash":
+            os._exit(1)
+        if name == "slow":
+            time.sleep(args["seconds"])
+        if name == "fail":
+            result = {"content": [{"type": "text", "text": "boom"}], "isError": True}
+        else:
+            text = json.dumps({"pid": os.getpid(), **args})
+            result = {"content": [{"type": "text", "text": text}]}
+    send({"jsonrpc": "2.0", "id": message["id"], "result": result})
+
+print("fake MCP server starting", file=sys.stderr, flush=True)
+for line in sys.stdin:
+    message = json.loads(line)
+    if "id" not in message:
+        continue
+    threading.Thread(target=handle, args=(message,), daemon=True).start()
+"""
+
+
+@pytest.fixture
+def server_config(tmp_path):
+    script = tmp_path / "fake_mcp_server.py"
+    script.write_text(FAKE_SERVER)
+    return MCPServerConfig(name="fake", command=sys.executable, args=("-u", str(script)))
+
+
+async def test_calls_are_multiplexed_over_warm_sessions(server_config):
+    pool = MCPServerPool(server_config, size=2)
+    await pool.start()
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(pool.call_tool("slow", {"seconds": 0.3, "i": i}) for i in range(20))
+    )
+    elapsed = time.perf_counter() - started
+    tool = MCPTool("fake", pool)
+    echoed = await tool.call("echo", {"ticker": "7203.T"})
+    names = [t["name"] for t in await tool.list_tools()]
+    await pool.aclose()
+
+    values = [json.loads(r["content"][0]["text"]) for r in results]
+    assert sorted(v["i"] for v in values) == list(range(20))
+    # 20 件 x 0.3 秒を 2 プロセスで同時に処理する (起動し直していない)
+    assert elapsed < 2.0
+    assert len({v["pid"] for v in values}) == 2
+    assert echoed["ticker"] == "7203.T"
+    assert names == ["echo", "slow", "crash"]
+    assert pool.stats() == {"sessions": 0, "in_flight": 0, "calls": 21, "restarts": 0}
+
+
+async def test_crashed_server_is_restarted(server_config):
+    pool = MCPServerPool(server_config, size=1)
+    first = (await MCPTool("fake", pool).call("echo"))["pid"]
+
+    with pytest.raises(MCPConnectionError):
+        await pool.call_tool("crash")
+    second = (await MCPTool("fake", pool).call("echo"))["pid"]
+    with pytest.raises(MCPError, match="boom"):
+        await pool.call_tool("fail")
+    await pool.aclose()
+
+    assert first != second
+    assert pool.restarts >= 1
+
+
+def test_load_server_configs(tmp_path):
+    path = tmp_path / "mcp_servers.json"
+    path.write_text(
+        json.dumps(
+            {
+                "_comment": "ignored",
+                "yahoo-finance": {"command": "npx", "args": ["-y", "pkg"], "enabled": False},
+                "docs": {"url": "http://mcp.test/mcp", "pool_size": 4},
+            }
+        )
+    )
+
+    servers = load_server_configs(path)
+    manager = create_mcp_server_manager(MCPSettings(MCP_SERVERS_CONFIG_PATH=str(path)))
+
+    assert servers["yahoo-finance"].args == ("-y", "pkg")
+    assert manager.names() == ["docs"]
+    assert manager.pool("docs").size == 4
+    with pytest.raises(ValueError):
+        manager.pool("yahoo-finance")
+    path.write_text(json.dumps({"broken": {"args": []}}))
+    with pytest.raises(ValueError):
+        load_server_configs(path)
+
+
+async def test_http_session_with_sse_responses():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.method == "DELETE":
+            return httpx.Response(200)
+        message = json.loads(request.content)
+        if "id" not in message:
+            return httpx.Response(202)
+        if message["method"] == "initialize":
+            body = {"jsonrpc": "2.0", "id": message["id"], "result": {"serverInfo": {"name": "h"}}}
+            return httpx.Response(200, json=body, headers={"Mcp-Session-Id": "s-1"})
+        result = {"content": [{"type": "text", "text": '{"price": 2500}'}]}
+        events = [
+            {"jsonrpc": "2.0", "method": "notifications/progress", "params": {}},
+            {"jsonrpc": "2.0", "id": message["id"], "result": result},
+        ]
+        text = "".join(f"event: message\ndata: {json.dumps(e)}\n\n" for e in events)
+        return httpx.Response(200, text=text, headers={"content-type": "text/event-stream"})
+
+    config = MCPServerConfig(name="http", url="http://mcp.test/mcp")
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    session = HTTPSession(config, http_client=client)
+    await session.start()
+
+    result = await session.request("tools/call", {"name": "quote", "arguments": {}})
+    await session.aclose()
+    await client.aclose()
+
+    assert session.server_info == {"name": "h"}
+    assert result["content"][0]["text"] == '{"price": 2500}'
+    assert [r.headers.get("mcp-session-id") for r in requests] == [None, "s-1", "s-1", "s-1"]
+    assert requests[-1].method == "DELETE"
+
+
+async def test_registry_exposes_enabled_servers(server_config):
+    manager = MCPServerManager({"fake": server_config})
+    registry = FoundryToolRegistry(mcp_servers=manager)
+
+    await registry.aopen()
+    tool = registry.get_tool("fake")
+    assert manager.pool("fake").stats()["sessions"] == 2
+    result = await tool.call("echo", {"ticker": "6758.T"})
+    await registry.aclose()
+
+    assert isinstance(tool, MCPTool) and registry.get_tool("fake") is tool
+    assert result["ticker"] == "6758.T"
+    assert registry.list_available_tools() == ["morningstar", "fake"]
+    with pytest.raises(ValueError):
+        FoundryToolRegistry().get_tool("fake")
+
+
+async def test_manager_start_reports_failures(server_config):
+    broken = MCPServerConfig(name="broken", command=sys.executable, args=("-c", "pass"))
+    manager = MCPServerManager({"fake": server_config, "broken": broken}, start_timeout=5.0)
+
+    errors = await manager.start()
+    await manager.aclose()
+
+    assert list(errors) == ["broken"]
+
+
+__all__ = []  # テストモジュールはエクスポート不要
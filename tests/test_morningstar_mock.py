@@ -1,8 +1,8 @@
 """
 Tests that mock Morningstar (Foundry) tool and verify the API -> agent -> consensus call path.
 
-These tests monkeypatch `FoundryToolRegistry.get_tool` and `create_melchior_agent`
-to inject a mock tool and agent that return deterministic results.
+These tests monkeypatch `FoundryToolRegistry.get_tool` and the `create_melchior_agent`
+factory declared in config/agents.json to inject a mock tool and agent that return deterministic results.
 """
 
 from types import SimpleNamespace
@@ -48,7 +48,7 @@ async def test_analyze_endpoint_bullish(monkeypatch):
 
     # Monkeypatch create_melchior_agent to return our MockAgent
     monkeypatch.setattr(
-        "src.stock_magi.api.endpoints.create_melchior_agent", lambda tool: MockAgent(tool)
+        "src.stock_magi.agents.melchior_agent.create_melchior_agent", lambda tool: MockAgent(tool)
     )
 
     transport = ASGITransport(app=app)
@@ -76,7 +76,7 @@ async def test_analyze_endpoint_bearish(monkeypatch):
 
     monkeypatch.setattr(FoundryToolRegistry, "get_tool", lambda self, name: mock_tool)
     monkeypatch.setattr(
-        "src.stock_magi.api.endpoints.create_melchior_agent", lambda tool: MockAgent(tool)
+        "src.stock_magi.agents.melchior_agent.create_melchior_agent", lambda tool: MockAgent(tool)
     )
 
     transport = ASGITransport(app=app)
@@ -97,7 +97,7 @@ async def test_analyze_endpoint_tool_failure(monkeypatch):
 
     monkeypatch.setattr(FoundryToolRegistry, "get_tool", lambda self, name: mock_tool)
     monkeypatch.setattr(
-        "src.stock_magi.api.endpoints.create_melchior_agent", lambda tool: MockAgent(tool)
+        "src.stock_magi.agents.melchior_agent.create_melchior_agent", lambda tool: MockAgent(tool)
     )
 
     transport = ASGITransport(app=app)
@@ -108,3 +108,21 @@ async def test_analyze_endpoint_tool_failure(monkeypatch):
 
     assert resp.status_code == 500
     assert "分析中にエラーが発生しました" in resp.text
+
+
+@pytest.mark.asyncio
+async def test_analyze_endpoint_registry_failure(monkeypatch):
+    """If building the agent registry fails, API should return the same 500 JSON"""
+
+    def broken_registry():
+        raise ValueError("config/agents.json: invalid factory")
+
+    monkeypatch.setattr("src.stock_magi.api.endpoints.get_agent_registry", broken_registry)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.post("/api/analyze", json={"ticker": "7203.T"})
+
+    assert resp.status_code == 500
+    assert "分析中にエラーが発生しました" in resp.json()["detail"]
+    assert "invalid factory" in resp.json()["detail"]
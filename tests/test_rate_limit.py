@@ -0,0 +1,268 @@
+"""
+トークンバケット型レートリミッターのテスト
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.common.rate_limit import (
+    EndpointRateLimiter,
+    RateLimitExceeded,
+    RateLimitSettings,
+    SQLiteTokenBucket,
+    TokenBucket,
+    create_rate_limiter,
+    parse_rate,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+async def test_burst_up_to_capacity_then_waits_for_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=3, clock=clock, sleep=clock.sleep)
+
+    waits = [await bucket.acquire() for _ in range(5)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(0.5)
+    assert waits[4] == pytest.approx(0.5)
+    assert clock.now == pytest.approx(1.0)
+
+
+async def test_concurrent_waiters_are_queued_not_rejected():
+    clock = FakeClock()
+    slept: list[float] = []
+
+    async def record_sleep(seconds):
+        slept.append(seconds)
+
+    bucket = TokenBucket(rate=10.0, capacity=1, clock=clock, sleep=record_sleep)
+
+    waits = await asyncio.gather(*(bucket.acquire() for _ in range(11)))
+
+    # 到着順に 0.1 秒間隔の送信時刻が割り当てられる (バースト 1 + 10 リクエスト分の補充 = 1 秒)
+    assert waits == pytest.approx([i * 0.1 for i in range(11)])
+    assert slept == pytest.approx(waits[1:])
+
+
+async def test_refill_is_capped_at_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, capacity=2, clock=clock, sleep=clock.sleep)
+    await bucket.acquire(2)
+
+    clock.now += 100.0
+    assert await bucket.acquire(2) == 0.0
+    assert await bucket.acquire() == pytest.approx(1.0)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1, capacity=0)
+
+
+async def test_acquire_more_than_capacity_is_rejected():
+    with pytest.raises(ValueError):
+        await TokenBucket(rate=1, capacity=1).acquire(2)
+
+
+def test_max_wait_rejects_without_reserving():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, capacity=1, clock=clock, max_wait=1.5)
+    bucket.reserve()
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        bucket.reserve()
+    assert excinfo.value.retry_after == pytest.approx(2.0)
+
+    clock.now = 2.0
+    assert bucket.reserve() == pytest.approx(0.0)
+
+
+def test_parse_rate():
+    assert parse_rate("60/min") == (1.0, 1.0)
+    assert parse_rate("120/min@10") == (2.0, 10.0)
+    assert parse_rate("5/s") == (5.0, 5.0)
+    assert parse_rate("3600/hour") == (1.0, 1.0)
+    for bad in ("fast", "10/fortnight", "0/min", "10/min@0"):
+        with pytest.raises(ValueError):
+            parse_rate(bad)
+
+
+def test_sqlite_bucket_is_shared_between_instances(tmp_path):
+    path = tmp_path / "rl.sqlite3"
+    now = [1000.0]
+    worker_a = SQLiteTokenBucket(path, "jquants", rate=1.0, capacity=2, clock=lambda: now[0])
+    worker_b = SQLiteTokenBucket(path, "jquants", rate=1.0, capacity=2, clock=lambda: now[0])
+    other = SQLiteTokenBucket(path, "other", rate=1.0, capacity=2, clock=lambda: now[0])
+
+    assert worker_a.reserve() == 0.0
+    assert worker_b.reserve() == 0.0
+    assert worker_a.reserve() == pytest.approx(1.0)
+    assert worker_b.reserve() == pytest.approx(2.0)
+    assert other.reserve() == 0.0
+
+    now[0] += 3.0
+    assert worker_a.reserve() == pytest.approx(0.0)
+
+
+async def test_sqlite_bucket_async_acquire(tmp_path):
+    slept: list[float] = []
+
+    async def record_sleep(seconds):
+        slept.append(seconds)
+
+    bucket = SQLiteTokenBucket(
+        tmp_path / "rl.sqlite3", "k", rate=2.0, capacity=1, sleep=record_sleep
+    )
+
+    await bucket.acquire()
+    await bucket.acquire()
+
+    assert len(slept) == 1
+    assert 0.0 < slept[0] <= 0.5
+
+
+def test_endpoint_limiter_applies_global_and_endpoint_limits():
+    clock = FakeClock()
+    limiter = EndpointRateLimiter(
+        TokenBucket(rate=10.0, capacity=10, clock=clock),
+        {"statements": TokenBucket(rate=1.0, capacity=1, clock=clock)},
+    )
+
+    assert limiter.bucket("statements").acquire_sync() == 0.0
+    assert limiter.bucket("daily_quotes").acquire_sync() == 0.0
+    assert len(limiter.bucket("statements").limiters) == 2
+    assert len(limiter.bucket("daily_quotes").limiters) == 1
+    assert limiter.endpoint_limiters["statements"].reserve() == pytest.approx(1.0)
+
+
+class VirtualTime:
+    """並行する sleep を起床時刻順に進める仮想時計 (送信時刻の計測用)"""
+
+    def __init__(self):
+        self.now = 0.0
+        self._sleepers: list[tuple[float, int, asyncio.Future]] = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        future = asyncio.get_running_loop().create_future()
+        self._sleepers.append((self.now + seconds, len(self._sleepers), future))
+        await future
+
+    async def run(self, *coros):
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        while not all(task.done() for task in tasks):
+            for _ in range(10):
+                await asyncio.sleep(0)
+            pending = [s for s in self._sleepers if not s[2].done()]
+            if pending:
+                wake, _, future = min(pending)
+                self.now = wake
+                future.set_result(None)
+        return [task.result() for task in tasks]
+
+
+async def test_endpoint_wait_does_not_push_sends_over_global_limit():
+    clock = VirtualTime()
+    limiter = EndpointRateLimiter(
+        TokenBucket(rate=1.0, capacity=1, clock=clock, sleep=clock.sleep),
+        {"statements": TokenBucket(rate=0.5, capacity=1, clock=clock, sleep=clock.sleep)},
+    )
+
+    async def send(endpoint):
+        await limiter.bucket(endpoint).acquire()
+        return clock.now
+
+    sent = await clock.run(
+        *(send("statements") for _ in range(3)), *(send("daily_quotes") for _ in range(3))
+    )
+
+    # 実際の送信時刻で、全体 1 リクエスト/秒 (バースト 1) を超えない
+    sent.sort()
+    assert all(b - a >= 1.0 - 1e-9 for a, b in zip(sent, sent[1:], strict=False))
+
+
+def test_create_rate_limiter_from_settings(tmp_path):
+    settings = RateLimitSettings(
+        RATE_LIMIT_BACKEND="sqlite",
+        RATE_LIMIT_SQLITE_PATH=str(tmp_path / "rl.sqlite3"),
+        RATE_LIMIT_DEFAULT="120/min@5",
+        RATE_LIMIT_ENDPOINTS="daily_quotes=30/min, statements=10/min@2",
+    )
+
+    limiter = create_rate_limiter(settings)
+
+    assert isinstance(limiter.global_limiter, SQLiteTokenBucket)
+    assert limiter.global_limiter.rate == 2.0
+    assert set(limiter.endpoint_limiters) == {"daily_quotes", "statements"}
+    assert limiter.endpoint_limiters["statements"].capacity == 2.0
+
+    with pytest.raises(ValueError):
+        create_rate_limiter(RateLimitSettings(RATE_LIMIT_BACKEND="etcd"))
+
+
+class _PriceClient:
+    def __init__(self, error: Exception | None = None):
+        self.error = error
+        self.calls = 0
+
+    def get_price(self, ticker):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return {"Close": 100.0}
+
+
+async def _get_price(monkeypatch, client, limiter):
+    from src.mcp_providers import jquants_mcp
+
+    monkeypatch.setattr(jquants_mcp, "_build_jquants_client", lambda: client)
+    monkeypatch.setattr(jquants_mcp, "get_rate_limiter", lambda: limiter)
+    transport = httpx.ASGITransport(app=jquants_mcp.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        return await http.get("/tools/jquants/price/7203.T")
+
+
+async def test_jquants_price_returns_429_when_queue_wait_exceeds_limit(monkeypatch):
+    bucket = TokenBucket(rate=1.0, capacity=1, max_wait=0.5)
+    bucket.reserve()
+    client = _PriceClient()
+
+    response = await _get_price(monkeypatch, client, EndpointRateLimiter(bucket))
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert client.calls == 0
+
+
+async def test_jquants_price_maps_upstream_429(monkeypatch):
+    upstream = httpx.Response(429, headers={"Retry-After": "7"})
+    error = httpx.HTTPStatusError(
+        "429", request=httpx.Request("GET", "https://x"), response=upstream
+    )
+
+    response = await _get_price(monkeypatch, _PriceClient(error), EndpointRateLimiter(None))
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+
+
+__all__ = []  # テストモジュールはエクスポート不要
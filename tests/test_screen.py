@@ -0,0 +1,212 @@
+"""
+全銘柄スクリーニング (src.stock_magi.screen) とバリュエーション判定のテスト
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from src.mcp_providers.jquants_store import ParquetStore  # noqa: E402
+from src.stock_magi.agents.melchior_agent import MelchiorAgent, score_fundamentals  # noqa: E402
+from src.stock_magi.screen import (  # noqa: E402
+    LocalFundamentalsTool,
+    local_fundamentals,
+    main,
+)
+
+AS_OF = date(2024, 6, 28)
+
+# (Code, EPS 予想, BPS, 終値のトレンド)
+COMPANIES = [
+    ("13010", "250", "2000", 1.0),  # 割安・高 ROE・上昇
+    ("72030", "120", "1500", 0.0),
+    ("99990", "-50", "400", -1.0),  # 赤字・下落
+]
+
+
+def _seed(store: ParquetStore) -> None:
+    day = AS_OF - timedelta(days=120)
+    n = 0
+    while day <= AS_OF:
+        if day.weekday() < 5:
+            store.write_partition(
+                "prices",
+                day,
+                [
+                    {
+                        "Code": code,
+                        "Date": day.isoformat(),
+                        "High": 1001.0 + trend * n,
+                        "Low": 999.0 + trend * n,
+                        "Close": 1000.0 + trend * n,
+                        "Volume": 1000.0,
+                    }
+                    for code, _, _, trend in COMPANIES
+                ],
+            )
+            n += 1
+        day += timedelta(days=1)
+    store.write_partition(
+        "statements",
+        AS_OF - timedelta(days=60),
+        [
+            {
+                "LocalCode": code,
+                "DisclosedDate": (AS_OF - timedelta(days=60)).isoformat(),
+                "TypeOfCurrentPeriod": "FY",
+                "EarningsPerShare": eps,
+                "ForecastEarningsPerShare": eps,
+                "BookValuePerShare": bps,
+            }
+            for code, eps, bps, _ in COMPANIES
+        ],
+    )
+    store.merge_table(
+        "listed_info",
+        [
+            {"Code": "13010", "CompanyName": "極洋"},
+            {"Code": "72030", "CompanyName": "トヨタ自動車"},
+            {"Code": "99990", "CompanyName": "テスト"},
+        ],
+        ["Code"],
+    )
+
+
+@pytest.mark.parametrize(
+    ("data", "action"),
+    [
+        ({"per": 8.0, "pbr": 0.8, "roe": 0.12}, "BUY"),
+        ({"per": 45.0, "pbr": 5.0, "roe": 0.02}, "SELL"),
+        ({"per": 18.0, "pbr": 1.5, "roe": 0.06}, "HOLD"),
+        ({"eps": -10.0, "per": None, "pbr": 6.0}, "SELL"),
+        ({"per": None, "pbr": None, "roe": None}, "HOLD"),
+    ],
+)
+def test_score_fundamentals(data, action):
+    assert score_fundamentals(data)[0] == action
+
+
+def test_local_fundamentals_prefers_forecast_eps():
+    statements = pd.DataFrame(
+        [
+            {
+                "LocalCode": "72030",
+                "DisclosedDate": "2024-02-06",
+                "TypeOfCurrentPeriod": "3Q",
+                "EarningsPerShare": "300",
+                "ForecastEarningsPerShare": "",
+                "BookValuePerShare": "2000",
+            },
+            {
+                "LocalCode": "72030",
+                "DisclosedDate": "2024-05-08",
+                "TypeOfCurrentPeriod": "FY",
+                "EarningsPerShare": "350",
+                "ForecastEarningsPerShare": "400",
+                "BookValuePerShare": "2500",
+            },
+        ]
+    )
+
+    table = local_fundamentals(statements, {"72030": 3200.0})
+
+    row = table.loc["72030"]
+    assert row["eps"] == 400
+    assert row["per"] == 8.0
+    assert row["pbr"] == pytest.approx(1.28)
+    assert row["roe"] == pytest.approx(0.16)
+
+
+async def test_melchior_scores_local_fundamentals():
+    table = local_fundamentals(
+        pd.DataFrame(
+            [{"Code": "72030", "ForecastEarningsPerShare": 400, "BookValuePerShare": 5000}]
+        ),
+        {"72030": 3000.0},
+    )
+    agent = MelchiorAgent(LocalFundamentalsTool(table))
+
+    result = await agent.analyze("7203.T")
+    missing = await agent.analyze("9999.T")
+
+    assert result["action"] == "BUY"
+    assert "PER 7.5" in result["reasoning"]
+    assert missing["action"] == "HOLD"
+
+
+def test_screen_cli_ranks_and_resumes(tmp_path, capsys):
+    store = ParquetStore(tmp_path / "jquants")
+    _seed(store)
+    checkpoint = tmp_path / "checkpoint"
+    args = [
+        "--root",
+        str(store.root),
+        "--as-of",
+        AS_OF.isoformat(),
+        "--workers",
+        "1",
+        "--chunk-size",
+        "1",
+        "--checkpoint-dir",
+        str(checkpoint),
+        "--output",
+        str(tmp_path / "screen.csv"),
+    ]
+
+    assert main(args) == 0
+    ranked = pd.read_csv(tmp_path / "screen.csv", dtype={"code": str})
+
+    assert list(ranked["code"]) == ["13010", "72030", "99990"]
+    assert list(ranked["rank"]) == [1, 2, 3]
+    assert ranked.loc[0, "action"] == "BUY"
+    assert ranked.loc[0, "name"] == "極洋"
+    assert ranked.loc[2, "action"] == "SELL"
+    assert ranked.loc[0, "per"] == pytest.approx(ranked.loc[0, "close"] / 250)
+    assert "screened 3/3" in capsys.readouterr().err
+
+    # 中断を再現: 1 チャンクだけ消して再実行すると残りはチェックポイントから読む
+    (checkpoint / "chunk-00001.parquet").unlink()
+    assert main(args) == 0
+    err = capsys.readouterr().err
+    assert "resumed 2 chunks" in err
+    assert pd.read_csv(tmp_path / "screen.csv", dtype={"code": str}).equals(ranked)
+
+    # 条件が変わればチェックポイントを破棄する
+    assert main([*args, "--tickers", "7203.T"]) == 0
+    assert "resumed" not in capsys.readouterr().err
+    assert len(pd.read_csv(tmp_path / "screen.csv")) == 1
+
+
+def test_screen_cli_process_pool_parquet(tmp_path):
+    store = ParquetStore(tmp_path / "jquants")
+    _seed(store)
+    output = tmp_path / "screen.parquet"
+
+    code = main(
+        [
+            "--root",
+            str(store.root),
+            "--as-of",
+            AS_OF.isoformat(),
+            "--workers",
+            "2",
+            "--chunk-size",
+            "2",
+            "--checkpoint-dir",
+            str(tmp_path / "checkpoint"),
+            "--output",
+            str(output),
+        ]
+    )
+
+    assert code == 0
+    ranked = pd.read_parquet(output)
+    assert list(ranked["code"]) == ["13010", "72030", "99990"]
+    assert {"melchior_action", "balthasar_action", "rsi"} <= set(ranked.columns)
+
+
+__all__ = []  # テストモジュールはエクスポート不要
@@ -0,0 +1,174 @@
+"""
+センチメントスコアリング (src.stock_magi.sentiment) と Casper エージェントのテスト
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.common.cache import InMemoryCache
+from src.common.consensus import ReusableConsensusOrchestrator
+from src.common.models import Action
+from src.stock_magi.agents import CasperAgent, create_casper_agent
+from src.stock_magi.agents.casper_agent import summarize_scores
+from src.stock_magi.sentiment import (
+    Document,
+    DocumentScoreCache,
+    LexiconScorer,
+    document_id,
+)
+
+GOOD = "トヨタ、通期業績を上方修正 最高益を更新へ"
+BAD = "トヨタ、品質不正でリコール 特別損失を計上"
+
+
+class CountingScorer(LexiconScorer):
+    """スコアラーに渡されたバッチを記録する"""
+
+    def __init__(self):
+        super().__init__()
+        self.batches: list[list[str]] = []
+
+    def score_batch(self, texts):
+        self.batches.append(list(texts))
+        return super().score_batch(texts)
+
+
+def test_lexicon_scorer_polarity():
+    scorer = LexiconScorer()
+
+    assert scorer.score(GOOD) > 0.5
+    assert scorer.score(BAD) < -0.5
+    assert scorer.score("本日の天気は晴れ") == 0.0
+    # 長い語が優先 ("黒字転換" は "黒字" と二重に数えない)
+    assert scorer.score("黒字転換") == 2.0 / 3.0
+    # 英単語は語境界で一致
+    assert scorer.score("Mission statement") == 0.0
+    assert scorer.score("Analyst UPGRADE after earnings beat") > 0
+
+
+def test_document_id_ignores_width_case_and_whitespace():
+    assert document_id("ＴＯＹＯＴＡ  上方修正") == document_id("toyota 上方修正")
+    assert document_id(GOOD) != document_id(BAD)
+
+
+async def test_same_document_scored_once_across_tickers():
+    scorer = CountingScorer()
+    cache = DocumentScoreCache(scorer)
+    shared = Document("自動車大手各社、そろって増配を発表")
+
+    first, second = await asyncio.gather(
+        cache.score_documents([shared, Document(GOOD)]),
+        cache.score_documents([shared, Document(BAD)]),
+    )
+    again = await cache.score_documents([shared])
+
+    assert first[document_id(shared.text)] == second[document_id(shared.text)]
+    assert again == {document_id(shared.text): first[document_id(shared.text)]}
+    assert cache.scored == 3
+    # 同時に届いた文書はまとめて 1 バッチで評価される
+    assert len(scorer.batches) == 1
+
+
+async def test_shared_backend_avoids_rescoring_in_other_worker():
+    backend = InMemoryCache()
+    worker_a = DocumentScoreCache(CountingScorer(), backend=backend)
+    worker_b = DocumentScoreCache(CountingScorer(), backend=backend)
+
+    await worker_a.score_documents([Document(GOOD)])
+    scores = await worker_b.score_documents([Document(GOOD)])
+
+    assert worker_b.scored == 0
+    assert scores[document_id(GOOD)] > 0
+
+
+async def test_cache_hit_is_fast():
+    cache = DocumentScoreCache()
+    documents = [Document(f"{GOOD} {i}") for i in range(50)]
+    await cache.score_documents(documents)
+
+    started = time.perf_counter()
+    for _ in range(100):
+        await cache.score_documents(documents)
+    per_call_ms = (time.perf_counter() - started) * 1000 / 100
+
+    assert per_call_ms < 5
+
+
+def test_summarize_scores():
+    assert summarize_scores([]) == ("HOLD", 0.0, 0.0)
+    assert summarize_scores([0.8, 0.6, 0.7])[0] == "BUY"
+    assert summarize_scores([-0.8, -0.6])[0] == "SELL"
+    assert summarize_scores([0.8, -0.8])[0] == "HOLD"
+    assert summarize_scores([0.0, 0.0])[1] == 0.5
+
+
+async def test_casper_agent_scores_documents():
+    async def source(ticker):
+        return [GOOD, {"title": "受注が好調", "source": "TDnet"}]
+
+    agent = create_casper_agent(source, score_cache=DocumentScoreCache())
+    result = await agent.analyze("7203.T")
+
+    assert result["action"] == "BUY"
+    assert result["confidence"] > 0.5
+    assert "上方修正" in result["reasoning"]
+
+
+async def test_casper_agent_without_documents_holds():
+    agent = CasperAgent()
+
+    result = await agent.analyze("7203.T")
+
+    assert result["action"] == "HOLD"
+    assert result["confidence"] == 0.0
+
+
+async def test_casper_agent_uses_llm_client_with_scored_documents():
+    class FakeLLM:
+        prompt = ""
+
+        async def analyze(self, key, prompt):
+            FakeLLM.prompt = prompt
+            return {"action": "SELL", "confidence": 0.7, "reasoning": "LLM 判定"}
+
+    agent = CasperAgent(lambda t: [BAD], score_cache=DocumentScoreCache(), llm_client=FakeLLM())
+
+    result = await agent.analyze("7203.T")
+
+    assert result["action"] == "SELL"
+    assert "リコール" in FakeLLM.prompt
+
+
+async def test_casper_as_third_voter():
+    class Fixed:
+        def __init__(self, name, action):
+            self.name = name
+            self.action = action
+
+        async def analyze(self, ticker):
+            return {"action": self.action, "confidence": 0.8, "reasoning": "fixed"}
+
+    casper = CasperAgent(lambda t: [BAD], score_cache=DocumentScoreCache())
+    orchestrator = ReusableConsensusOrchestrator(
+        agents=[Fixed("Melchior", "BUY"), Fixed("Balthasar", "SELL"), casper]
+    )
+
+    decision = await orchestrator.reach_consensus({"ticker": "7203.T"})
+
+    assert [v.agent_name for v in decision.votes] == ["Melchior", "Balthasar", "Casper"]
+    assert decision.final_action == Action.SELL
+
+
+@pytest.mark.parametrize("bad_item", [123, None])
+async def test_casper_agent_bad_source_holds(bad_item):
+    agent = CasperAgent(lambda t: [bad_item], score_cache=DocumentScoreCache())
+
+    result = await agent.analyze("7203.T")
+
+    assert result["action"] == "HOLD"
+    assert result["confidence"] == 0.0
+
+
+__all__ = []  # テストモジュールはエクスポート不要
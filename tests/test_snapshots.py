@@ -0,0 +1,142 @@
+"""
+入力データのスナップショットストア (src.common.snapshots) のテスト
+"""
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.common.cache import InMemoryCache
+from src.common.mcp import FoundryToolRegistry
+from src.common.mcp.foundry_tool_registry import FoundryHTTPTool
+from src.common.snapshots import (
+    InMemorySnapshotStore,
+    SnapshotSettings,
+    SQLiteSnapshotStore,
+    create_snapshot_store,
+    get_snapshot_store,
+    snapshot_id,
+)
+from src.stock_magi.agents import create_melchior_agent
+
+MARKET_DATA = {"ticker": "7203.T", "per": 8.5, "pbr": 0.9, "roe": 0.12, "name": "トヨタ自動車"}
+
+
+def test_snapshot_id_ignores_key_order():
+    reordered = dict(reversed(list(MARKET_DATA.items())))
+
+    assert snapshot_id(reordered) == snapshot_id(MARKET_DATA)
+    assert snapshot_id({**MARKET_DATA, "per": 8.6}) != snapshot_id(MARKET_DATA)
+    assert len(snapshot_id(MARKET_DATA)) == 64
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_store_deduplicates_and_compresses(tmp_path, backend):
+    store = create_snapshot_store(
+        SnapshotSettings(
+            SNAPSHOT_BACKEND=backend, SNAPSHOT_SQLITE_PATH=str(tmp_path / "snapshots.sqlite3")
+        )
+    )
+    payload = {**MARKET_DATA, "history": [{"close": 1000.0 + i % 5} for i in range(500)]}
+
+    ids = [await store.put(dict(payload)) for _ in range(50)]
+    other = await store.put(MARKET_DATA)
+
+    assert set(ids) == {snapshot_id(payload)}
+    assert await store.get(ids[0]) == payload
+    assert await store.get(other) == MARKET_DATA
+    assert await store.get("0" * 64) is None
+    stats = store.stats()
+    assert stats["count"] == 2
+    assert stats["stored_bytes"] < stats["raw_bytes"] / 5
+
+
+def test_sqlite_store_is_shared_and_append_only(tmp_path):
+    path = tmp_path / "snapshots.sqlite3"
+    first, second = SQLiteSnapshotStore(path), SQLiteSnapshotStore(path)
+
+    key = first.put_sync(MARKET_DATA)
+
+    # 別ワーカー (別インスタンス) が同じ内容を書いても 1 行のまま
+    assert second.put_sync(MARKET_DATA) == key
+    assert second.get_sync(key) == MARKET_DATA
+    assert second.stats()["count"] == 1
+    assert create_snapshot_store(SnapshotSettings(SNAPSHOT_BACKEND="none")) is None
+    with pytest.raises(ValueError):
+        create_snapshot_store(SnapshotSettings(SNAPSHOT_BACKEND="s3"))
+
+
+def test_memory_store_is_bounded_and_sqlite_is_default():
+    store = create_snapshot_store(
+        SnapshotSettings(SNAPSHOT_BACKEND="memory", SNAPSHOT_MEMORY_MAX_ENTRIES=3)
+    )
+
+    keys = [store.put_sync({"i": i}) for i in range(5)]
+
+    # 古いものから消え、消えた ID は None
+    assert store.stats()["count"] == 3
+    assert store.get_sync(keys[0]) is None
+    assert store.get_sync(keys[4]) == {"i": 4}
+    # 消えた内容をもう一度保存すれば取得できる
+    assert store.put_sync({"i": 0}) == keys[0]
+    assert store.get_sync(keys[0]) == {"i": 0}
+    assert SnapshotSettings.model_fields["snapshot_backend"].default == "sqlite"
+
+
+class FundamentalsTool:
+    name = "morningstar"
+
+    async def get_fundamentals(self, ticker):
+        return {**MARKET_DATA, "ticker": ticker}
+
+
+async def test_melchior_records_market_data_snapshot():
+    store = InMemorySnapshotStore()
+    agent = create_melchior_agent(FundamentalsTool(), snapshot_store=store)
+
+    result = await agent.analyze("7203.T")
+    again = await agent.analyze("7203.T")
+
+    assert result["action"] == "BUY"
+    assert again["snapshot_id"] == result["snapshot_id"]
+    assert await store.get(result["snapshot_id"]) == {**MARKET_DATA, "ticker": "7203.T"}
+    assert store.stats()["count"] == 1
+    # ストアを渡さなければ従来どおり
+    assert "snapshot_id" not in await create_melchior_agent(FundamentalsTool()).analyze("7203.T")
+
+
+@pytest.fixture
+def snapshot_store(monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_BACKEND", "memory")
+    get_snapshot_store.cache_clear()
+    yield get_snapshot_store()
+    get_snapshot_store.cache_clear()
+
+
+async def test_analyze_response_references_snapshot(snapshot_store, monkeypatch):
+    from src.main import app
+
+    async def fake_fundamentals(self, ticker):
+        return {"ticker": ticker, "per": 8.0, "pbr": 0.8, "roe": 0.15}
+
+    monkeypatch.setattr(FoundryHTTPTool, "get_fundamentals", fake_fundamentals)
+    registry = FoundryToolRegistry(cache=InMemoryCache())
+    monkeypatch.setattr("src.stock_magi.api.endpoints.get_tool_registry", lambda: registry)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        analyzed = await client.post("/api/analyze", json={"ticker": "7203.T"})
+        key = analyzed.json()["snapshot_ids"]["Melchior"]
+        found = await client.get(f"/api/snapshots/{key}")
+        missing = await client.get(f"/api/snapshots/{'0' * 64}")
+
+    assert analyzed.status_code == 200
+    assert analyzed.json()["reasoning"][0]["snapshot_id"] == key
+    assert found.status_code == 200
+    assert found.json() == {
+        "snapshot_id": key,
+        "data": {"ticker": "7203.T", "per": 8.0, "pbr": 0.8, "roe": 0.15},
+    }
+    assert missing.status_code == 404
+
+
+__all__ = []  # テストモジュールはエクスポート不要
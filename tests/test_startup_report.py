@@ -0,0 +1,75 @@
+"""
+起動時間レポートと遅延 import のテスト
+"""
+
+import subprocess
+import sys
+
+from src.startup_report import PROJECT_ROOT, parse_importtime, summarize_by_package
+
+SAMPLE_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   pydantic.version
+import time:      3000 |       3120 | pydantic
+import time:       500 |        500 |     src.common.cache.backends
+import time:       200 |        700 |   src.common.cache
+import time:       100 |        800 | src.common
+some unrelated warning line
+"""
+
+
+def test_parse_importtime_skips_header_and_noise():
+    records = parse_importtime(SAMPLE_OUTPUT)
+
+    assert [r.module for r in records] == [
+        "pydantic.version",
+        "pydantic",
+        "src.common.cache.backends",
+        "src.common.cache",
+        "src.common",
+    ]
+    assert records[1].self_us == 3000
+    assert records[1].cumulative_us == 3120
+    assert records[0].depth == 1
+    assert records[2].depth == 2
+    assert records[4].depth == 0
+
+
+def test_summarize_by_package_groups_src_subpackages():
+    totals = summarize_by_package(parse_importtime(SAMPLE_OUTPUT))
+
+    assert totals == {"pydantic": 3120, "src.common": 800}
+    assert list(totals) == ["pydantic", "src.common"]
+
+
+def _loaded_modules_after(import_stmt: str, candidates: list[str]) -> list[str]:
+    code = (
+        f"import sys; {import_stmt}; print(','.join(m for m in {candidates!r} if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    return [m for m in out.split(",") if m]
+
+
+def test_app_import_does_not_load_heavy_optional_dependencies():
+    loaded = _loaded_modules_after("import src.main", ["jquantsapi", "pandas", "numpy", "httpx"])
+    assert loaded == []
+
+
+def test_jquants_mcp_import_defers_clients_and_pandas():
+    loaded = _loaded_modules_after(
+        "import src.mcp_providers.jquants_mcp",
+        ["jquantsapi", "sample.client", "pandas", "requests"],
+    )
+    assert loaded == []
+
+
+def test_jquants_mcp_dataframe_check_without_pandas_import():
+    from src.mcp_providers.jquants_mcp import _is_dataframe
+
+    assert _is_dataframe({"Close": 1.0}) is False
+    assert _is_dataframe([1, 2, 3]) is False
+
+
+__all__ = []  # テストモジュールはエクスポート不要
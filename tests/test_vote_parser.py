@@ -0,0 +1,122 @@
+"""
+Unit tests for the structured agent output parser
+"""
+
+import pytest
+
+from src.common.consensus import ReusableConsensusOrchestrator, parse_agent_output, vote_from_output
+from src.common.consensus.vote_parser import coerce_action, coerce_confidence
+from src.common.models import Action
+
+
+def test_parse_text_format():
+    """プロンプト指定の Action/Confidence/Reasoning 形式を解釈する"""
+    raw = """
+```
+Action: BUY
+Confidence: 0.82
+Reasoning: PER 11.2, ROE 14% と割安かつ高収益。
+自己資本比率 52% で財務も健全。
+```
+"""
+    parsed = parse_agent_output(raw)
+
+    assert parsed.action == Action.BUY
+    assert parsed.confidence == pytest.approx(0.82)
+    assert parsed.reasoning.startswith("PER 11.2")
+    assert "自己資本比率 52%" in parsed.reasoning
+
+
+def test_parse_markdown_and_variants():
+    """markdown 装飾・全角コロン・パーセント表記を許容する"""
+    raw = "**Action**：[SELL]\n- **Confidence**: 75%\n- **Reasoning**: PER 45 と割高です"
+    parsed = parse_agent_output(raw)
+
+    assert parsed.action == Action.SELL
+    assert parsed.confidence == pytest.approx(0.75)
+    assert parsed.reasoning == "PER 45 と割高です"
+
+
+def test_parse_json_and_mapping():
+    """JSON 文字列と dict の両方を同じ結果に変換する"""
+    as_dict = {"action": "strong_buy", "confidence": "0.9", "reasoning": "fair_value > price"}
+    as_json = '{"action": "strong_buy", "confidence": 0.9, "reasoning": "fair_value > price"}'
+
+    assert parse_agent_output(as_dict) == parse_agent_output(as_json)
+    assert parse_agent_output(as_dict).action == Action.BUY
+
+
+def test_parse_unparseable_defaults_to_hold():
+    """解釈できない出力は HOLD / 0.5 になる"""
+    assert parse_agent_output("I cannot decide.").action == Action.HOLD
+    assert parse_agent_output(None).confidence == 0.5
+    assert parse_agent_output("{broken json").action == Action.HOLD
+
+
+def test_coercion_helpers():
+    """Action / confidence の変換は例外を出さない"""
+    assert coerce_action(" sell ") == Action.SELL
+    assert coerce_action("unknown") == Action.HOLD
+    assert coerce_action(42) == Action.HOLD
+    assert coerce_confidence("n/a") == 0.5
+    assert coerce_confidence(-1) == 0.0
+    assert coerce_confidence("1.5%") == pytest.approx(0.015)
+
+
+def test_confidence_is_monotonic():
+    """単位の無い数値は丸めるだけで、パーセント扱いは % と分数表記に限る"""
+    assert coerce_confidence(1.99) == 1.0
+    assert coerce_confidence(2) == 1.0
+    assert coerce_confidence(85) == 1.0
+    assert coerce_confidence("85%") == pytest.approx(0.85)
+    assert coerce_confidence("80/100") == pytest.approx(0.8)
+    assert coerce_confidence("8/10") == pytest.approx(0.8)
+    assert coerce_confidence("3 / 5") == pytest.approx(0.6)
+    assert coerce_confidence("1/0") == 1.0
+
+    values = [0, 0.3, 0.99, 1.0, 1.01, 1.5, 1.99, 2, 5, 50, 99, 100, 150]
+    coerced = [coerce_confidence(v) for v in values]
+    assert coerced == sorted(coerced)
+
+
+def test_dict_and_text_actions_use_the_same_rules():
+    """dict の action もテキストと同じくアクション名を探して解釈する"""
+    for value, expected in [
+        ("Buy.", Action.BUY),
+        ("[SELL]", Action.SELL),
+        ("Strong Buy", Action.BUY),
+        ("**hold**", Action.HOLD),
+        ("買い推奨", Action.BUY),
+    ]:
+        as_dict = parse_agent_output({"action": value, "confidence": 0.7, "reasoning": "x"})
+        as_text = parse_agent_output(f"Action: {value}\nConfidence: 0.7\nReasoning: x")
+        assert as_dict.action == as_text.action == expected
+
+
+def test_vote_from_output_pads_short_reasoning():
+    """AgentVote の最低文字数を満たすよう短い根拠を補う"""
+    vote = vote_from_output("Melchior", {"action": "BUY", "confidence": 0.7, "reasoning": "ok"})
+
+    assert vote.action == Action.BUY
+    assert len(vote.reasoning) >= 10
+    assert "Melchior" in vote.reasoning
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_parses_text_output():
+    """オーケストレータがテキスト出力のエージェントを投票に変換する"""
+
+    class TextAgent:
+        name = "Casper"
+
+        async def analyze(self, ticker):
+            return "Action: SELL\nConfidence: 0.6\nReasoning: センチメントが悪化しています"
+
+    orchestrator = ReusableConsensusOrchestrator(agents=[TextAgent()])
+    decision = await orchestrator.reach_consensus({"ticker": "7203.T"})
+
+    assert decision.final_action == Action.SELL
+    assert decision.votes[0].confidence == 0.6
+
+
+__all__ = []  # テストモジュールはエクスポート不要
@@ -0,0 +1,93 @@
+"""
+Tests for startup warmup and the /api/ready readiness probe
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.common.cache import InMemoryCache
+from src.common.mcp import FoundryToolRegistry
+from src.common.mcp.foundry_tool_registry import fundamentals_cache_key
+from src.main import app
+from src.stock_magi.warmup import ReadinessState, WarmupSettings, run_warmup
+
+
+@pytest.mark.asyncio
+async def test_run_warmup_preloads_watchlist_into_cache():
+    """ウォッチリストのファンダメンタルズが共有プール経由でキャッシュに入る"""
+    requested: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        ticker = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json={"ticker": ticker, "price": 100.0})
+
+    cache = InMemoryCache()
+    registry = FoundryToolRegistry(cache=cache)
+    await registry.aopen(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    state = ReadinessState()
+    settings = WarmupSettings(WARMUP_WATCHLIST="7203.T, 6758.T")
+    await run_warmup(state, settings, registry=registry)
+    await registry.aclose()
+
+    assert state.ready is True
+    assert state.preloaded == 2
+    assert state.errors == []
+    assert len(requested) == 2
+    assert await cache.get(fundamentals_cache_key("morningstar", "6758.T")) == {
+        "ticker": "6758.T",
+        "price": 100.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_run_warmup_records_failures_and_still_becomes_ready():
+    """事前取得に失敗しても ready になり、エラーが記録される"""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503)
+
+    registry = FoundryToolRegistry(cache=InMemoryCache())
+    await registry.aopen(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    state = ReadinessState()
+    await run_warmup(state, WarmupSettings(WARMUP_WATCHLIST="7203.T"), registry=registry)
+    await registry.aclose()
+
+    assert state.ready is True
+    assert state.preloaded == 0
+    assert "7203.T" in state.errors[0]
+
+
+@pytest.mark.asyncio
+async def test_ready_endpoint_reflects_warmup(monkeypatch):
+    """/api/ready はウォームアップ完了まで 503、/api/health は常に 200"""
+    release = asyncio.Event()
+
+    async def slow_warmup(state, settings=None, registry=None):
+        await release.wait()
+        state.mark_ready()
+
+    monkeypatch.setattr("src.main.run_warmup", slow_warmup)
+
+    async with app.router.lifespan_context(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.get("/api/health")).status_code == 200
+
+            starting = await client.get("/api/ready")
+            assert starting.status_code == 503
+            assert starting.json()["status"] == "starting"
+
+            release.set()
+            await asyncio.sleep(0)
+            ready = await client.get("/api/ready")
+            assert ready.status_code == 200
+            assert ready.json()["status"] == "ready"
+
+
+__all__ = []  # テストモジュールはエクスポート不要